@@ -0,0 +1,213 @@
+
+
+
+import typing
+
+import jk_prettyprintobj
+import jk_logging
+
+from .AsyncGitWrapper import AsyncGitWrapper
+from .GitFileInfo import GitFileInfo
+from .GitWorkingCopy import GitWorkingCopy
+from .GitCommitHistory import GitCommitHistory
+from .GitRefDatabase import GitRefDatabase
+from .impl.GitConfigFile import GitConfigFile
+from .workingcopy._GitStatusOutputParser import _GitStatusOutputParser
+
+
+
+
+
+
+
+
+
+#
+# This class is the asyncio counterpart of `GitWorkingCopy`. All methods that run git are coroutines.
+# Information that is read from disk only (configuration, references) is provided by properties just like `GitWorkingCopy` does.
+#
+class AsyncGitWorkingCopy(jk_prettyprintobj.DumpMixin):
+
+	def __init__(self,
+			rootDir:str,
+			gitWrapper:AsyncGitWrapper = None,
+			log:jk_logging.AbstractLogger = None,
+		):
+
+		if gitWrapper:
+			self.__gitWrapper = gitWrapper
+		else:
+			if log is None:
+				raise Exception("Logger must not be None!")
+			self.__gitWrapper = AsyncGitWrapper(log)
+
+		self.__workingCopy = GitWorkingCopy(rootDir, gitWrapper=self.__gitWrapper.gitWrapper)
+		self.__gitRootDir = self.__workingCopy.rootDir
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def config(self) -> GitConfigFile:
+		return self.__workingCopy.config
+	#
+
+	@property
+	def rootDir(self) -> str:
+		return self.__gitRootDir
+	#
+
+	@property
+	def remoteOriginURL(self) -> typing.Union[str,None]:
+		return self.__workingCopy.remoteOriginURL
+	#
+
+	@property
+	def areCredentialsStored(self) -> bool:
+		return self.__workingCopy.areCredentialsStored
+	#
+
+	#
+	# Get a list of all remotes
+	#
+	@property
+	def remotes(self) -> typing.List[str]:
+		return self.__workingCopy.remotes
+	#
+
+	@property
+	def refDatabase(self) -> GitRefDatabase:
+		return self.__workingCopy.refDatabase
+	#
+
+	################################################################################################################################
+	## Protected Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self):
+		return [
+			"rootDir",
+			"remoteOriginURL",
+			"remotes",
+			"areCredentialsStored",
+			"config",
+		]
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	async def isClean(self, bIgnoreUntracked:bool = False, bIgnoreSubmodules:bool = False, log:jk_logging.AbstractLogger = None) -> bool:
+		return not await self.__gitWrapper.isDirty(self.__gitRootDir, bIgnoreUntracked, bIgnoreSubmodules, log)
+	#
+
+	#
+	# Check if this working copy contains changes. This stops as soon as the first change is found. (See `GitWrapper.isDirty()`.)
+	#
+	async def isDirty(self, bIgnoreUntracked:bool = False, bIgnoreSubmodules:bool = False, log:jk_logging.AbstractLogger = None) -> bool:
+		return await self.__gitWrapper.isDirty(self.__gitRootDir, bIgnoreUntracked, bIgnoreSubmodules, log)
+	#
+
+	#
+	# Get the hash of the HEAD revision of the remote repository.
+	#
+	async def getHeadRevisionID(self, log:jk_logging.AbstractLogger = None) -> typing.Union[str,None]:
+		if not self.remoteOriginURL:
+			return None
+		for revID, revName in await self.__gitWrapper.lsRemote_dir(self.__gitRootDir, log):
+			if revName == "HEAD":
+				return revID
+		return None
+	#
+
+	#
+	# Run a <c>git pull</c> request.
+	#
+	async def pull(self, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
+		return await self.__gitWrapper.pull(self.__gitRootDir, log)
+	#
+
+	async def addFile(self, filePath:str, log:jk_logging.AbstractLogger = None):
+		lines = await self.__gitWrapper.add(self.__gitRootDir, filePath, log)
+		if lines:
+			raise Exception("Unexpected output received: " + repr(lines))
+	#
+
+	#
+	# Retrieve the status of this working copy
+	#
+	# @return	GitFileInfo[]	A list of file information objects.
+	#
+	async def status(self, bIncludeIgnored:bool = False, log:jk_logging.AbstractLogger = None) -> typing.List[GitFileInfo]:
+		if self.__gitWrapper.supportsStatusZ:
+			data = await self.__gitWrapper.statusRaw(self.__gitRootDir, bIncludeIgnored, log)
+			return _GitStatusOutputParser.parseZ(data.split(b"\0"), bIncludeIgnored, self)
+
+		lines = await self.__gitWrapper.status(self.__gitRootDir, bIncludeIgnored, log)
+		return _GitStatusOutputParser.parse(lines, self.__gitWrapper.porcelainVersion, bIncludeIgnored, self)
+	#
+
+	#
+	# Download a single file from the HEAD revision.
+	# The text is normalized the way `GitWrapper.downloadFromHead()` does; use `downloadFromRevision()` to retrieve the content unchanged.
+	#
+	# @return		str			Either returns the file content if the file exists or `None` if the file does not exist.
+	#
+	async def downloadFromHead(self, filePath:str, log:jk_logging.AbstractLogger = None) -> typing.Union[str,None]:
+		return await self.__gitWrapper.downloadFromHead(self.__gitRootDir, filePath, log)
+	#
+
+	#
+	# Download a single file from the specified revision.
+	#
+	# @return		str			Either returns the file content if the file exists or `None` if the file does not exist.
+	#
+	async def downloadFromRevision(self, revision:str, filePath:str, log:jk_logging.AbstractLogger = None) -> typing.Union[str,None]:
+		return await self.__gitWrapper.downloadFromRevision(self.__gitRootDir, revision, filePath, log)
+	#
+
+	#
+	# Retrieve the commit history.
+	#
+	# @return		GitCommitHistory		Returns `None` if no commits have been made yet.
+	#
+	async def getCommitHistory(self, log:jk_logging.AbstractLogger = None) -> typing.Union[GitCommitHistory,None]:
+		return GitCommitHistory.createFromLogRecords(await self.__gitWrapper.getLogParsable(self.__gitRootDir, log=log))
+	#
+
+	async def commit(self, commitMsg:str, log:jk_logging.AbstractLogger = None) -> None:
+		await self.__gitWrapper.commit(self.__gitRootDir, commitMsg, log)
+	#
+
+	async def listTags(self, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
+		return await self.__gitWrapper.listTags(self.__gitRootDir, log)
+	#
+
+	async def createTag(self, tagName:str, commitMsg:str, log:jk_logging.AbstractLogger = None) -> None:
+		await self.__gitWrapper.createTag(self.__gitRootDir, tagName, commitMsg, log)
+	#
+
+	async def deleteTag(self, tagName:str, log:jk_logging.AbstractLogger = None) -> None:
+		await self.__gitWrapper.deleteTag(self.__gitRootDir, tagName, log)
+	#
+
+	async def listBranches(self, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
+		return await self.__gitWrapper.listBranches(self.__gitRootDir, log)
+	#
+
+	async def createBranch(self, branchName:str, log:jk_logging.AbstractLogger = None):
+		await self.__gitWrapper.createBranch(self.__gitRootDir, branchName, log)
+	#
+
+	async def switchToBranch(self, branchName:str, log:jk_logging.AbstractLogger = None):
+		await self.__gitWrapper.switchToBranch(self.__gitRootDir, branchName, log)
+	#
+
+#
+
+
+
+
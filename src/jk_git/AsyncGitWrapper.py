@@ -0,0 +1,622 @@
+
+
+
+import os
+import io
+import signal
+import time
+import typing
+import asyncio
+
+import jk_typing
+import jk_logging
+import jk_prettyprintobj
+import jk_simpleexec
+import jk_version
+
+from .GitWrapper import GitWrapper
+from .GitExecutionException import GitExecutionException
+from .GitTimeoutException import GitTimeoutException
+from .GitSSHMultiplexer import GitSSHMultiplexer
+from .GitInstrumentation import GitInstrumentation
+from .impl.GitCatFileBatch import GitCatFileBatch
+from .impl._GitOutputParser import _GitOutputParser
+
+
+
+
+
+
+
+
+
+
+
+#
+# This class wraps around the program 'git' for use with asyncio. It provides the same methods as `GitWrapper`, but all of them are
+# coroutines: git is run with `asyncio.create_subprocess_exec()`, so waiting for git neither blocks the event loop nor requires a thread.
+#
+# The output of git is parsed exactly the same way as `GitWrapper` does.
+#
+class AsyncGitWrapper(jk_prettyprintobj.DumpMixin):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		int maxConcurrentProcesses		(optional) The maximum number of git processes to run at the same time. If not specified
+	#												the number of processes is not limited.
+	# @param		str gitBinPath					(optional) The git binary to use. (See `GitWrapper`.)
+	# @param		GitSSHMultiplexer sshMultiplexer	(optional) If specified SSH connections are reused by all invocations of git.
+	#
+	@jk_typing.checkFunctionSignature()
+	def __init__(self,
+			log:jk_logging.AbstractLogger = None,
+			maxConcurrentProcesses:int = None,
+			gitBinPath:str = None,
+			sshMultiplexer:GitSSHMultiplexer = None,
+		):
+
+		if maxConcurrentProcesses is not None:
+			assert maxConcurrentProcesses > 0
+
+		self.__gitWrapper = GitWrapper(log, gitBinPath, sshMultiplexer)
+		self.__semaphore = asyncio.Semaphore(maxConcurrentProcesses) if maxConcurrentProcesses else None
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def version(self) -> jk_version.Version:
+		return self.__gitWrapper.version
+	#
+
+	@property
+	def porcelainVersion(self):
+		return self.__gitWrapper.porcelainVersion
+	#
+
+	@property
+	def supportsStatusZ(self) -> bool:
+		return self.__gitWrapper.supportsStatusZ
+	#
+
+	@property
+	def supportsFetchPorcelain(self) -> bool:
+		return self.__gitWrapper.supportsFetchPorcelain
+	#
+
+	@property
+	def gitBinPath(self) -> str:
+		return self.__gitWrapper.gitBinPath
+	#
+
+	#
+	# The instrumentation object recording all invocations of git. (See `GitWrapper.instrumentation`.)
+	#
+	@property
+	def instrumentation(self) -> GitInstrumentation:
+		return self.__gitWrapper.instrumentation
+	#
+
+	#
+	# The synchronous git wrapper sharing the same git installation.
+	#
+	@property
+	def gitWrapper(self) -> GitWrapper:
+		return self.__gitWrapper
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self):
+		return [
+			"version",
+			"gitBinPath",
+			"porcelainVersion",
+		]
+	#
+
+	#
+	# Run git and wait for it to terminate. git runs in a process group of its own: if the calling task is cancelled git is killed
+	# together with all of its child processes.
+	#
+	async def __communicate(self,
+			workingDirectory:typing.Union[str,None],
+			arguments:typing.List[str],
+			log:jk_logging.AbstractLogger,
+			stdInData:bytes,
+			tQueued:float,
+		) -> typing.Tuple[bytes,bytes,int,float]:
+
+		cmd = [ self.gitBinPath ]
+		if workingDirectory is not None:
+			cmd.extend([ "-C", workingDirectory ])
+		cmd.extend(arguments)
+		if log:
+			log.notice("run: " + str(cmd))
+
+		sshMultiplexer = self.__gitWrapper.sshMultiplexer
+		tStart = time.monotonic()
+		p = await asyncio.create_subprocess_exec(
+			*cmd,
+			stdin=asyncio.subprocess.PIPE if stdInData is not None else asyncio.subprocess.DEVNULL,
+			stdout=asyncio.subprocess.PIPE,
+			stderr=asyncio.subprocess.PIPE,
+			start_new_session=(os.name == "posix"),
+			env=sshMultiplexer.getEnvironment() if sshMultiplexer is not None else None,
+		)
+		stdOutData = stdErrData = b""
+		try:
+			stdOutData, stdErrData = await p.communicate(stdInData)
+		except BaseException:
+			if p.returncode is None:
+				# kill git together with its helper processes (e.g. ssh)
+				if os.name == "posix":
+					try:
+						os.killpg(p.pid, signal.SIGKILL)
+					except ProcessLookupError:
+						pass
+				else:
+					p.kill()
+				await p.wait()
+			raise
+		finally:
+			if self.instrumentation.isActive:
+				self.instrumentation._recordRun(workingDirectory, arguments, tQueued, tStart, p.returncode, len(stdOutData), len(stdErrData))
+
+		return stdOutData, stdErrData, p.returncode, time.monotonic() - tStart
+	#
+
+	async def __run(self,
+			workingDirectory:typing.Union[str,None],
+			arguments:typing.List[str],
+			log:jk_logging.AbstractLogger,
+			stdInData:bytes = None,
+		) -> typing.Tuple[bytes,bytes,int,float]:
+
+		tQueued = GitInstrumentation._takeQueuedSince()
+		if tQueued is None:
+			tQueued = time.monotonic()
+		if self.__semaphore is None:
+			return await self.__communicate(workingDirectory, arguments, log, stdInData, tQueued)
+		async with self.__semaphore:
+			return await self.__communicate(workingDirectory, arguments, log, stdInData, tQueued)
+	#
+
+	async def __runGitWD(self,
+			workingDirectory:typing.Union[str,None],
+			arguments:typing.List[str],
+			log:jk_logging.AbstractLogger = None,
+			*,
+			bRaiseExceptionOnError:bool = True,
+		) -> jk_simpleexec.CommandResult:
+
+		stdOutData, stdErrData, returnCode, duration = await self.__run(workingDirectory, arguments, log)
+		ret = _GitOutputParser.createCommandResult(self.gitBinPath, arguments, stdOutData, stdErrData, returnCode, duration)
+
+		if bRaiseExceptionOnError and ret.isErrorRC:
+			if log:
+				ret.dump(printFunc = log.notice)
+			raise GitExecutionException("Failed to run git!", arguments, ret.returnCode, ret.stdErrLines)
+
+		return ret
+	#
+
+	#
+	# Run git and check if it writes anything to STDOUT. git is killed as soon as the first byte has been received.
+	#
+	async def __probeOutput(self,
+			workingDirectory:str,
+			arguments:typing.List[str],
+			log:jk_logging.AbstractLogger,
+		) -> bool:
+
+		tQueued = GitInstrumentation._takeQueuedSince()
+		if tQueued is None:
+			tQueued = time.monotonic()
+		if self.__semaphore is None:
+			return await self.__probeOutput0(workingDirectory, arguments, log, tQueued)
+		async with self.__semaphore:
+			return await self.__probeOutput0(workingDirectory, arguments, log, tQueued)
+	#
+
+	async def __probeOutput0(self,
+			workingDirectory:str,
+			arguments:typing.List[str],
+			log:jk_logging.AbstractLogger,
+			tQueued:float,
+		) -> bool:
+
+		cmd = [ self.gitBinPath, "-C", workingDirectory ]
+		cmd.extend(arguments)
+		if log:
+			log.notice("run: " + str(cmd))
+
+		tStart = time.monotonic()
+		p = await asyncio.create_subprocess_exec(
+			*cmd,
+			stdin=asyncio.subprocess.DEVNULL,
+			stdout=asyncio.subprocess.PIPE,
+			stderr=asyncio.subprocess.PIPE,
+			start_new_session=(os.name == "posix"),
+		)
+		nStdOutBytes = 0
+		stdErrData = b""
+		try:
+			if await p.stdout.read(1):
+				nStdOutBytes = 1
+				return True
+			stdErrData = await p.stderr.read()
+			returnCode = await p.wait()
+		finally:
+			if p.returncode is None:
+				if os.name == "posix":
+					try:
+						os.killpg(p.pid, signal.SIGKILL)
+					except ProcessLookupError:
+						pass
+				else:
+					p.kill()
+				await p.wait()
+			if self.instrumentation.isActive:
+				self.instrumentation._recordRun(workingDirectory, arguments, tQueued, tStart, p.returncode, nStdOutBytes, len(stdErrData))
+
+		if returnCode != 0:
+			raise GitExecutionException("Failed to run git!", arguments, returnCode, AsyncGitWrapper.__toLines(stdErrData))
+		return False
+	#
+
+	@staticmethod
+	def __toLines(data:bytes) -> typing.List[str]:
+		return data.decode("utf-8", errors="replace").rstrip().split("\n")
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	async def runGit(self,
+			*args,
+			cmdArgs:typing.Union[typing.List[str],typing.Tuple[str]],
+			workingDirectory:str = None,
+			bRaiseExceptionOnError:bool = True,
+			log:jk_logging.AbstractLogger = None,
+			**kwargs,
+		) -> jk_simpleexec.CommandResult:
+
+		assert not args
+		assert not kwargs
+
+		# ---
+
+		return await self.__runGitWD(
+			workingDirectory,
+			list(cmdArgs),
+			log,
+			bRaiseExceptionOnError=bRaiseExceptionOnError,
+		)
+	#
+
+	################################################################################################################################
+	## Public High Level Methods
+	################################################################################################################################
+
+	#
+	# Retrieve the status of a working copy
+	#
+	# @return	str[]		Text output of the 'status' command
+	#
+	async def status(self, gitRootDir:str, bIncludeIgnored:bool = False, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
+		_cmdArgs = _GitOutputParser.statusArgs(self.porcelainVersion, bIncludeIgnored)
+		r = await self.__runGitWD(gitRootDir, _cmdArgs, log)
+		_GitOutputParser.checkResult(r, log)
+		return _GitOutputParser.stdOutLines(r)
+	#
+
+	#
+	# Retrieve the status of a working copy in porcelain format version 2 (with `-z`).
+	#
+	# @return	bytes		The raw output of git: NUL separated records. (Parse them with `_GitStatusOutputParser.parseZ()`.)
+	#
+	async def statusRaw(self, gitRootDir:str, bIncludeIgnored:bool = False, log:jk_logging.AbstractLogger = None) -> bytes:
+		_cmdArgs = _GitOutputParser.statusZArgs(bIncludeIgnored)
+		stdOutData, stdErrData, returnCode, _ = await self.__run(gitRootDir, _cmdArgs, log)
+		if returnCode != 0:
+			raise GitExecutionException("Failed to run git!", _cmdArgs, returnCode, AsyncGitWrapper.__toLines(stdErrData))
+		return stdOutData
+	#
+
+	#
+	# Check if a working copy contains changes. This stops as soon as the first change is found. (See `GitWrapper.isDirty()`.)
+	#
+	async def isDirty(self,
+			gitRootDir:str,
+			bIgnoreUntracked:bool = False,
+			bIgnoreSubmodules:bool = False,
+			log:jk_logging.AbstractLogger = None,
+		) -> bool:
+
+		for bCached in [ True, False ]:
+			r = await self.__runGitWD(gitRootDir, _GitOutputParser.diffQuietArgs(bCached, bIgnoreSubmodules), log, bRaiseExceptionOnError=False)
+			if _GitOutputParser.evalDiffQuietResult(r, log):
+				return True
+
+		if not bIgnoreUntracked:
+			if await self.__probeOutput(gitRootDir, _GitOutputParser.untrackedProbeArgs(), log):
+				return True
+
+		return False
+	#
+
+	#
+	# Retrieve the references of a remote repository.
+	#
+	# @param		str url				The URL of the remote repository.
+	# @param		float timeout		(optional) The maximum number of seconds to wait for git. If git does not terminate in time it is killed.
+	#
+	async def lsRemote_url(self, url:str, log:jk_logging.AbstractLogger = None, timeout:float = None) -> list:
+		tStart = time.monotonic()
+		try:
+			r = await asyncio.wait_for(self.__runGitWD(None, [ "ls-remote", url ], log), timeout)
+		except asyncio.TimeoutError:
+			raise GitTimeoutException([ "ls-remote", url ], timeout, time.monotonic() - tStart)
+		_GitOutputParser.checkResult(r, log)
+		return _GitOutputParser.parseLsRemoteOutput(r.stdOutLines)
+	#
+
+	#
+	# Retrieve the references of many remote repositories concurrently. (See `GitWrapper.lsRemoteMany()`.)
+	#
+	# @return		dict							A dictionary that maps every URL to either the references or the exception that occurred.
+	#
+	async def lsRemoteMany(self,
+			urls:typing.Iterable[str],
+			maxConcurrency:int = 16,
+			maxConcurrencyPerHost:int = 4,
+			timeout:typing.Union[float,int,None] = 60,
+			log:jk_logging.AbstractLogger = None,
+		) -> typing.Dict[str,typing.Union[list,Exception]]:
+
+		assert maxConcurrency > 0
+		assert maxConcurrencyPerHost > 0
+
+		urls = _GitOutputParser.interleaveURLsByHost(set(urls))
+		semaphore = asyncio.Semaphore(maxConcurrency)
+		hostSemaphores = {}
+		for url in urls:
+			host = _GitOutputParser.getHostOfURL(url)
+			if host not in hostSemaphores:
+				hostSemaphores[host] = asyncio.Semaphore(maxConcurrencyPerHost)
+
+		async def _lsRemote(url:str) -> list:
+			# (every task runs in a context of its own)
+			with GitInstrumentation.queuedSince(time.monotonic()):
+				async with hostSemaphores[_GitOutputParser.getHostOfURL(url)]:
+					async with semaphore:
+						return await self.lsRemote_url(url, timeout=timeout)
+
+		results = await asyncio.gather(*[ _lsRemote(url) for url in urls ], return_exceptions=True)
+
+		ret = {}
+		for url, r in zip(urls, results):
+			if isinstance(r, BaseException) and not isinstance(r, Exception):
+				raise r
+			if log and isinstance(r, Exception):
+				log.warn("ls-remote failed for " + url + ": " + str(r))
+			ret[url] = r
+		return ret
+	#
+
+	async def lsRemote_dir(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> list:
+		r = await self.__runGitWD(gitRootDir, [ "-C", ".", "ls-remote" ], log)
+		_GitOutputParser.checkResult(r, log, bCheckRCOnly=True)
+		return _GitOutputParser.parseLsRemoteOutput(r.stdOutLines)
+	#
+
+	#
+	# Add a file to the git repository.
+	#
+	# @return	str[]		Text output of the 'add' command
+	#
+	async def add(self, gitRootDir:str, filePath:str, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
+		assert os.path.isabs(filePath)
+
+		s = gitRootDir
+		if not s.endswith("/"):
+			s += "/"
+		if not filePath.startswith(s):
+			raise Exception("File does not seem to be part of the git tree: " + filePath)
+
+		r = await self.__runGitWD(gitRootDir, [ "-C", ".", "add", filePath ], log)
+		_GitOutputParser.checkResult(r, log)
+		return _GitOutputParser.stdOutLines(r)
+	#
+
+	async def pull(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
+		assert os.path.isdir(gitRootDir)
+
+		r = await self.__runGitWD(gitRootDir, [ "-C", ".", "pull" ], log)
+		_GitOutputParser.checkResult(r, log, bCheckRCOnly=True)
+		return _GitOutputParser.allOutputLines(r)
+	#
+
+	async def clone(self, gitRootDir:str, url:str, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
+		assert os.path.isdir(gitRootDir)
+		assert isinstance(url, str)
+		assert url
+
+		for something in os.listdir(gitRootDir):
+			raise Exception("Target directory is not empty: " + gitRootDir)
+
+		r = await self.__runGitWD(gitRootDir, [ "clone", url, "." ], log)
+		_GitOutputParser.checkResult(r, log, bCheckRCOnly=True)
+		return r.stdErrLines if r.stdErrLines else []
+	#
+
+	#
+	# Download a single file from the HEAD revision.
+	# For compatibility the text is normalized: lines are right trimmed, leading and trailing empty lines are removed.
+	# Use `downloadFromRevision()` to retrieve the content unchanged.
+	#
+	# @return		str			Either returns the file content if the file exists or `None` if the file does not exist.
+	#
+	async def downloadFromHead(self, gitRootDir:str, filePath:str, log:jk_logging.AbstractLogger = None) -> typing.Union[str,None]:
+		return _GitOutputParser.toDownloadedText(await self.downloadFromRevision(gitRootDir, "HEAD", filePath, log))
+	#
+
+	#
+	# Download a single file from the specified revision.
+	#
+	# @return		str			Either returns the file content if the file exists or `None` if the file does not exist.
+	#
+	async def downloadFromRevision(self, gitRootDir:str, revision:str, filePath:str, log:jk_logging.AbstractLogger = None) -> typing.Union[str,None]:
+		data = (await self.downloadMany(gitRootDir, revision, [ filePath ], log))[filePath]
+		if data is None:
+			return None
+		return data.decode("utf-8")
+	#
+
+	#
+	# Download multiple files from the specified revision using a single git process.
+	#
+	# @return		dict				A dictionary that maps each file path to the raw file content or `None` if the file does not exist.
+	#
+	async def downloadMany(self,
+			gitRootDir:str,
+			revision:str,
+			filePaths:typing.Union[typing.List[str],typing.Tuple[str]],
+			log:jk_logging.AbstractLogger = None,
+		) -> typing.Dict[str,typing.Union[bytes,None]]:
+
+		objectNames = []
+		for filePath in filePaths:
+			objectName = revision + ":" + filePath
+			if "\n" in objectName:
+				raise Exception("Invalid object name: " + repr(objectName))
+			objectNames.append(objectName)
+		if not objectNames:
+			return {}
+
+		stdInData = ("\n".join(objectNames) + "\n").encode("utf-8")
+		stdOutData, stdErrData, returnCode, _ = await self.__run(gitRootDir, [ "cat-file", "--batch" ], log, stdInData)
+		if returnCode != 0:
+			raise GitExecutionException("Failed to run git!", [ "cat-file", "--batch" ], returnCode, AsyncGitWrapper.__toLines(stdErrData))
+
+		ret = {}
+		stream = io.BytesIO(stdOutData)
+		for filePath in filePaths:
+			r = GitCatFileBatch._readRecord(stream)
+			if r is None:
+				ret[filePath] = None
+			elif r[1] != "blob":
+				raise Exception("Not a file: " + repr(filePath))
+			else:
+				ret[filePath] = r[2]
+		return ret
+	#
+
+	async def init(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> None:
+		await self.__runGitWD(gitRootDir, [ "init" ], log)
+	#
+
+	async def commit(self, gitRootDir:str, commitMsg:str, log:jk_logging.AbstractLogger = None) -> None:
+		assert commitMsg
+
+		await self.__runGitWD(gitRootDir, [ "commit", "-m", commitMsg ], log)
+	#
+
+	async def listTags(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
+		r = await self.__runGitWD(gitRootDir, [ "-C", ".", "tag", "--list" ], log)
+		return r.stdOutLines
+	#
+
+	async def createTag(self, gitRootDir:str, tagName:str, commitMsg:str, log:jk_logging.AbstractLogger = None) -> None:
+		assert tagName
+		assert commitMsg
+
+		await self.__runGitWD(gitRootDir, [ "-C", ".", "tag", "-a", tagName, "-m", commitMsg ], log)
+	#
+
+	async def deleteTag(self, gitRootDir:str, tagName:str, log:jk_logging.AbstractLogger = None) -> None:
+		assert tagName
+
+		await self.__runGitWD(gitRootDir, [ "-C", ".", "tag", "-d", tagName ], log)
+	#
+
+	async def listBranches(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
+		r = await self.__runGitWD(gitRootDir, [ "-C", ".", "branch", "--all" ], log)
+		_GitOutputParser.checkResult(r, log)
+		return r.stdOutLines
+	#
+
+	async def createBranch(self, gitRootDir:str, branchName:str, log:jk_logging.AbstractLogger = None) -> None:
+		assert branchName
+
+		await self.__runGitWD(gitRootDir, [ "-C", ".", "checkout", "-b", branchName ], log)
+	#
+
+	async def switchToBranch(self, gitRootDir:str, branchName:str, log:jk_logging.AbstractLogger = None) -> None:
+		assert branchName
+
+		await self.__runGitWD(gitRootDir, [ "-C", ".", "checkout", branchName ], log)
+	#
+
+	async def showLog(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
+		r = await self.__runGitWD(gitRootDir, [ "-C", ".", "log" ], log)
+		return r.stdOutLines
+	#
+
+	#
+	# Get the hash of the commit HEAD refers to.
+	#
+	# @return		str			Returns the commit hash or `None` if there are no commits yet.
+	#
+	async def getHeadCommitHash(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> typing.Union[str,None]:
+		r = await self.__runGitWD(gitRootDir, [ "-C", ".", "rev-parse", "--verify", "-q", "HEAD^{commit}" ], log, bRaiseExceptionOnError=False)
+		if r.returnCode == 0:
+			return r.stdOutLines[0].strip()
+		if (r.returnCode == 1) and not r.stdOutLines:
+			return None
+		if log:
+			r.dump(printFunc=log.warn)
+		raise GitExecutionException("Running git failed!", r.commandArguments, r.returnCode, r.stdErrLines)
+	#
+
+	#
+	# Run `git log` and retrieve the commits from the latest to the oldest commit. (See `GitWrapper.iterLogParsable()` for details.)
+	#
+	# @param		str gitRootDir			The root directory of the repository.
+	# @param		str revisionRange		(optional) A revision or revision range such as "HEAD" or "abc123..HEAD". Defaults to the current HEAD.
+	# @return		tuple[]					A tuple of six strings for every commit.
+	#
+	async def getLogParsable(self,
+			gitRootDir:str,
+			revisionRange:str = None,
+			log:jk_logging.AbstractLogger = None,
+		) -> typing.List[typing.Tuple[str,str,str,str,str,str]]:
+
+		_cmdArgs = _GitOutputParser.logParsableArgs(revisionRange)
+		stdOutData, stdErrData, returnCode, _ = await self.__run(gitRootDir, _cmdArgs, log)
+		if returnCode != 0:
+			stdErrLines = AsyncGitWrapper.__toLines(stdErrData)
+			if _GitOutputParser.isNoCommitsYetError(stdErrLines):
+				return []
+			raise GitExecutionException("Failed to run git!", _cmdArgs, returnCode, stdErrLines)
+		if not stdOutData:
+			return []
+		return list(_GitOutputParser.iterLogRecords(stdOutData.split(b"\0")))
+	#
+
+#
+
+
+
+
@@ -0,0 +1,112 @@
+
+
+
+import typing
+import threading
+
+import jk_prettyprintobj
+
+
+
+
+
+#
+# A cancellation token. Pass it to any method that accepts the keyword argument `cancellationToken` (see `GitDeadline`). As soon
+# as `cancel()` is invoked (by any thread) all git processes started within that call are killed (including their child processes
+# such as `ssh`) and the call raises a `GitCancelledException`. Calls started after the token has been cancelled fail immediately.
+#
+# A token can be used for any number of calls. It can't be reset.
+#
+class GitCancellationToken(jk_prettyprintobj.DumpMixin):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	def __init__(self):
+		self.__lock = threading.Lock()
+		self.__event = threading.Event()
+		self.__callbacks:typing.Dict[int,typing.Callable[[],None]] = {}
+		self.__nextCallbackID = 0
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def isCancelled(self) -> bool:
+		return self.__event.is_set()
+	#
+
+	################################################################################################################################
+	## Protected Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self):
+		return [
+			"isCancelled",
+		]
+	#
+
+	#
+	# Register a callback that is invoked (once) when the token gets cancelled. If the token already is cancelled the callback is
+	# invoked immediately.
+	#
+	# @return		int				An identifier to unregister the callback with.
+	#
+	def _addCallback(self, callback:typing.Callable[[],None]) -> int:
+		with self.__lock:
+			if not self.__event.is_set():
+				self.__nextCallbackID += 1
+				self.__callbacks[self.__nextCallbackID] = callback
+				return self.__nextCallbackID
+		callback()
+		return 0
+	#
+
+	def _removeCallback(self, callbackID:int):
+		with self.__lock:
+			self.__callbacks.pop(callbackID, None)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Cancel all calls using this token. Invoking this method more than once has no effect.
+	#
+	def cancel(self):
+		with self.__lock:
+			if self.__event.is_set():
+				return
+			self.__event.set()
+			callbacks = list(self.__callbacks.values())
+			self.__callbacks.clear()
+
+		for callback in callbacks:
+			try:
+				callback()
+			except Exception:
+				pass
+	#
+
+	#
+	# Wait until the token gets cancelled.
+	#
+	# @param		float timeout		(optional) The maximum number of seconds to wait.
+	# @return		bool				Returns `True` if the token has been cancelled.
+	#
+	def wait(self, timeout:float = None) -> bool:
+		return self.__event.wait(timeout)
+	#
+
+#
+
+
+
+
@@ -0,0 +1,49 @@
+
+
+
+import typing
+
+from .GitExecutionException import GitExecutionException
+
+
+
+
+
+#
+# This exception is raised if a call has been cancelled using a `GitCancellationToken`. All git processes started by the call
+# have been killed.
+#
+class GitCancelledException(GitExecutionException):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str[] cmdArgs				The arguments of the git invocation that has been killed (or that has not been started).
+	# @param		float elapsed				The number of seconds the call ran until it has been cancelled.
+	# @param		str[] stdErrLines			The output git has written to STDERR before it has been killed.
+	#
+	def __init__(self,
+			cmdArgs:typing.Union[typing.List[str],typing.Tuple[str],None],
+			elapsed:float,
+			stdErrLines:typing.Union[typing.List[str],None] = None,
+		):
+
+		super().__init__(
+			"git has been cancelled! (The call ran for {:.1f} seconds.)".format(elapsed),
+			cmdArgs,
+			None,
+			stdErrLines,
+		)
+
+		self.elapsed = elapsed
+	#
+
+#
+
+
+
+
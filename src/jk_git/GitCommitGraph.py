@@ -0,0 +1,331 @@
+
+
+
+import heapq
+import typing
+import collections
+from array import array
+
+import jk_typing
+
+
+
+
+
+#
+# This class represents the commit graph (= a directed acyclic graph) of a commit history. It is built once and provides
+# parent/child adjacency, generation numbers and fast ancestry queries.
+#
+# Generation numbers are defined as follows: A commit without parents (within the history) has generation 1, every other commit
+# has the maximum generation of its parents plus one. As a commit always has a higher generation than all of its ancestors,
+# graph walks can be stopped early.
+#
+# Additionally a reachability index is built: every commit is labeled with intervals of post-order numbers of the first parent
+# spanning forest. If a commit lies on the first parent chain of another commit, it is an ancestor (positive cut); if the
+# interval of all descendants of a commit does not contain the interval of another commit, it is not an ancestor (negative cut).
+# Most ancestry queries are answered by these labels without walking the graph.
+#
+class GitCommitGraph(object):
+
+	__FLAG_A = 1
+	__FLAG_B = 2
+	__FLAG_STALE = 4
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str[] commitHashes					The hashes of all commits.
+	# @param		str[][] parentCommitHashesList		For every commit the hashes of its parents. Parents not contained in
+	#													`commitHashes` are ignored.
+	#
+	@jk_typing.checkFunctionSignature()
+	def __init__(self, commitHashes:typing.Sequence[str], parentCommitHashesList:typing.Sequence[typing.Sequence[str]]):
+		assert len(commitHashes) == len(parentCommitHashesList)
+
+		self.__hashes = list(commitHashes)
+		self.__indexMap = { h: i for i, h in enumerate(self.__hashes) }
+
+		n = len(self.__hashes)
+		self.__parents:typing.List[typing.Tuple[int]] = []
+		self.__children:typing.List[typing.List[int]] = [ [] for i in range(n) ]
+		for i, parentHashes in enumerate(parentCommitHashesList):
+			parents = tuple([ self.__indexMap[h] for h in parentHashes if h in self.__indexMap ])
+			self.__parents.append(parents)
+			for p in parents:
+				self.__children[p].append(i)
+
+		self.__generations, topologicalOrder = GitCommitGraph.__calculateGenerations(self.__parents, self.__children)
+		self.__post, self.__treeLow, self.__low, self.__high = GitCommitGraph.__calculateIntervals(
+			self.__parents, self.__children, topologicalOrder)
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def commitHashes(self) -> typing.List[str]:
+		return list(self.__hashes)
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	#
+	# Calculate the generation numbers. This is done in topological order without recursion.
+	#
+	# @return		array generations			The generation numbers.
+	# @return		int[] topologicalOrder		The commits in topological order (parents first).
+	#
+	@staticmethod
+	def __calculateGenerations(parents:typing.List[typing.Tuple[int]], children:typing.List[typing.List[int]]) -> typing.Tuple[array,typing.List[int]]:
+		n = len(parents)
+		generations = array("i", bytes(4 * n))
+		remainingParents = array("i", [ len(p) for p in parents ])
+
+		topologicalOrder = []
+		queue = collections.deque([ i for i in range(n) if not parents[i] ])
+		while queue:
+			i = queue.popleft()
+			topologicalOrder.append(i)
+			g = 0
+			for p in parents[i]:
+				if generations[p] > g:
+					g = generations[p]
+			generations[i] = g + 1
+
+			for c in children[i]:
+				remainingParents[c] -= 1
+				if remainingParents[c] == 0:
+					queue.append(c)
+
+		return generations, topologicalOrder
+	#
+
+	#
+	# Calculate the reachability index. This is done without recursion.
+	#
+	# The post-order numbers are assigned by a depth first traversal of the spanning forest formed by the first parent edges. The
+	# descendants of a commit within this forest (= all commits having this commit on their first parent chain) are numbered
+	# `treeLow[i]` to `post[i]`. `low[i]` and `high[i]` are the minimum and maximum post-order numbers of all descendants of a commit.
+	#
+	@staticmethod
+	def __calculateIntervals(
+			parents:typing.List[typing.Tuple[int]],
+			children:typing.List[typing.List[int]],
+			topologicalOrder:typing.List[int],
+		) -> typing.Tuple[array,array,array,array]:
+
+		n = len(parents)
+		treeChildren = [ [] for i in range(n) ]
+		stack = []
+		for i in range(n - 1, -1, -1):
+			if parents[i]:
+				treeChildren[parents[i][0]].append(i)
+			else:
+				stack.append(i)
+
+		post = array("i", bytes(4 * n))
+		treeLow = array("i", bytes(4 * n))
+		counter = 0
+		while stack:
+			i = stack.pop()
+			if i < 0:
+				post[~i] = counter
+				counter += 1
+			else:
+				treeLow[i] = counter
+				stack.append(~i)
+				stack.extend(treeChildren[i])
+
+		low = array("i", post)
+		high = array("i", post)
+		for i in reversed(topologicalOrder):
+			lo = low[i]
+			hi = high[i]
+			for c in children[i]:
+				if low[c] < lo:
+					lo = low[c]
+				if high[c] > hi:
+					hi = high[c]
+			low[i] = lo
+			high[i] = hi
+
+		return post, treeLow, low, high
+	#
+
+	def __indexOfE(self, commitHash:str) -> int:
+		i = self.__indexMap.get(commitHash)
+		if i is None:
+			raise KeyError("No such commit: " + repr(commitHash))
+		return i
+	#
+
+	#
+	# Check if `a` is an ancestor of `b`. The reachability index answers most queries directly; otherwise the descendants of `a`
+	# are walked. The walk is pruned by the same labels and by the generation numbers.
+	#
+	def __isAncestor(self, a:int, b:int) -> bool:
+		if a == b:
+			return True
+		generations = self.__generations
+		genB = generations[b]
+		if generations[a] >= genB:
+			return False
+
+		post = self.__post
+		treeLow = self.__treeLow
+		low = self.__low
+		high = self.__high
+		postB = post[b]
+		lowB = low[b]
+		highB = high[b]
+
+		if treeLow[a] <= postB <= post[a]:
+			return True
+		if (lowB < low[a]) or (highB > high[a]):
+			return False
+
+		visited = { a }
+		stack = [ a ]
+		while stack:
+			i = stack.pop()
+			for c in self.__children[i]:
+				if treeLow[c] <= postB <= post[c]:
+					return True
+				if (c in visited) or (generations[c] >= genB) or (lowB < low[c]) or (highB > high[c]):
+					continue
+				visited.add(c)
+				stack.append(c)
+		return False
+	#
+
+	#
+	# Determine all best common ancestors of two commits. If one commit is an ancestor of the other it is the only one. Otherwise
+	# commits are processed in descending order of their generation numbers. This ensures that the flags of a commit are complete
+	# before the commit itself is processed.
+	#
+	def __mergeBases(self, a:int, b:int) -> typing.List[int]:
+		if self.__isAncestor(a, b):
+			return [ a ]
+		if self.__isAncestor(b, a):
+			return [ b ]
+
+		FLAG_A = GitCommitGraph.__FLAG_A
+		FLAG_B = GitCommitGraph.__FLAG_B
+		FLAG_STALE = GitCommitGraph.__FLAG_STALE
+		generations = self.__generations
+
+		flags = { a: FLAG_A, b: FLAG_B }
+		heap = [ (-generations[a], a), (-generations[b], b) ]
+		heapq.heapify(heap)
+		countNonStale = 2
+
+		ret = []
+		while heap and countNonStale:
+			_, i = heapq.heappop(heap)
+			f = flags[i]
+			if not f & FLAG_STALE:
+				countNonStale -= 1
+				if (f & (FLAG_A | FLAG_B)) == (FLAG_A | FLAG_B):
+					ret.append(i)
+					f |= FLAG_STALE
+
+			for p in self.__parents[i]:
+				fp = flags.get(p)
+				if fp is None:
+					flags[p] = f
+					heapq.heappush(heap, (-generations[p], p))
+					if not f & FLAG_STALE:
+						countNonStale += 1
+				elif (fp | f) != fp:
+					flags[p] = fp | f
+					if (f & FLAG_STALE) and not (fp & FLAG_STALE):
+						countNonStale -= 1
+
+		return ret
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def __len__(self):
+		return len(self.__hashes)
+	#
+
+	def __contains__(self, commitHash:str) -> bool:
+		return commitHash in self.__indexMap
+	#
+
+	#
+	# Get the hashes of the parents of the specified commit. Parents that are not part of the history are omitted.
+	#
+	def getParents(self, commitHash:str) -> typing.List[str]:
+		return [ self.__hashes[p] for p in self.__parents[self.__indexOfE(commitHash)] ]
+	#
+
+	#
+	# Get the hashes of the children of the specified commit.
+	#
+	def getChildren(self, commitHash:str) -> typing.List[str]:
+		return [ self.__hashes[c] for c in self.__children[self.__indexOfE(commitHash)] ]
+	#
+
+	#
+	# Get the generation number of the specified commit.
+	#
+	def getGeneration(self, commitHash:str) -> int:
+		return self.__generations[self.__indexOfE(commitHash)]
+	#
+
+	#
+	# Check if commit `a` is an ancestor of commit `b`. (Like git a commit is considered to be an ancestor of itself.)
+	#
+	def isAncestor(self, a:str, b:str) -> bool:
+		return self.__isAncestor(self.__indexOfE(a), self.__indexOfE(b))
+	#
+
+	#
+	# Get all best common ancestors of the specified commits.
+	#
+	# @return		str[]		The commit hashes. Returns an empty list if there is no common ancestor.
+	#
+	def mergeBases(self, a:str, b:str) -> typing.List[str]:
+		return [ self.__hashes[i] for i in self.__mergeBases(self.__indexOfE(a), self.__indexOfE(b)) ]
+	#
+
+	#
+	# Get the best common ancestor of the specified commits. If there are multiple best common ancestors the one with the
+	# highest generation number is returned.
+	#
+	# @return		str			The commit hash or `None` if there is no common ancestor.
+	#
+	def mergeBase(self, a:str, b:str) -> typing.Union[str,None]:
+		r = self.__mergeBases(self.__indexOfE(a), self.__indexOfE(b))
+		return self.__hashes[r[0]] if r else None
+	#
+
+	#
+	# Walk along the first parents, starting with the specified commit itself.
+	#
+	def iterFirstParents(self, commitHash:str) -> typing.Iterator[str]:
+		i = self.__indexOfE(commitHash)
+		while True:
+			yield self.__hashes[i]
+			parents = self.__parents[i]
+			if not parents:
+				break
+			i = parents[0]
+	#
+
+#
+
+
+
+
@@ -4,14 +4,17 @@ import re
 import typing
 import os
 
-import dateutil
-import dateutil.parser
-
 import jk_typing
 import jk_prettyprintobj
 
-from .GitWrapper import GitWrapper
 from .GitCommitHistoryEntry import GitCommitHistoryEntry
+from .GitCommitGraph import GitCommitGraph
+from .GitCommitHistorySlice import GitCommitHistorySlice
+from .impl.GitCommitColumns import GitCommitColumns
+
+# (`GitWrapper` is needed for type annotations only: it is not imported at runtime as importing it pulls in jk_simpleexec)
+if typing.TYPE_CHECKING:
+	from .GitWrapper import GitWrapper
 
 
 
@@ -20,24 +23,36 @@ from .GitCommitHistoryEntry import GitCommitHistoryEntry
 
 
 
+#
+# This class represents the commit history of a repository. The commit data is stored in a compact columnar way (see `GitCommitColumns`);
+# entries are lightweight views that are created on demand.
+#
+# A history behaves like a read only sequence of entries in forward order: The first entry is the oldest commit, the last entry is the
+# latest commit. Iterating and slicing does not copy any commit data.
+#
 class GitCommitHistory(jk_prettyprintobj.DumpMixin):
 
+	__ITER_CHUNK_SIZE = 1024
+
+	#
+	# Constructor method. The data of the entries is copied; the entries are then attached to this history. (Use one of the `create...()`
+	# methods to create a history from the output of git.)
+	#
+	# @param		GitCommitHistoryEntry[] entriesList		The entries in forward order: The first entry is the oldest commit, the last entry
+	#												is the latest commit.
+	#
 	@jk_typing.checkFunctionSignature()
 	def __init__(self, entriesList:list):
 		assert entriesList
-		assert entriesList[0].isOldest
-		assert entriesList[-1].isLatest
 
-		self._entriesList = entriesList
-
-		self._oldestEntry = entriesList[0]
-		self._latestEntry = entriesList[-1]
-
-		self._entriesMap = {}
-		for entry in entriesList:
-			assert isinstance(entry, GitCommitHistoryEntry)
+		columns = GitCommitHistory.__columnsFromEntries(reversed(entriesList))
+		for i, entry in enumerate(reversed(entriesList)):
+			entry._columns = columns
+			entry._index = i
 			entry._owner = self
-			self._entriesMap[entry.commitHash] = entry
+
+		self._columns = columns
+		self._graph = None
 	#
 
 	################################################################################################################################
@@ -46,25 +61,44 @@ class GitCommitHistory(jk_prettyprintobj.DumpMixin):
 
 	@property
 	def oldestEntry(self) -> GitCommitHistoryEntry:
-		return self._oldestEntry
+		return GitCommitHistoryEntry.fromColumns(self._columns, len(self._columns) - 1, self)
 	#
 
 	@property
 	def latestEntry(self) -> GitCommitHistoryEntry:
-		return self._latestEntry
+		return GitCommitHistoryEntry.fromColumns(self._columns, 0, self)
 	#
 
+	#
+	# Returns a dictionary that maps commit hashes to entries. (NOTE: This creates an entry object for every commit. Use `getEntry()` instead
+	# if you need to look up individual commits.)
+	#
 	@property
 	def entriesMap(self) -> typing.Dict[str,GitCommitHistoryEntry]:
-		return dict(self._entriesMap)
+		return { e.commitHash: e for e in self }
 	#
 
 	#
-	# Returns the commits in forward order: The first entry is the oldest commit, the last entry is the latest commit
+	# Returns the commits in forward order: The first entry is the oldest commit, the last entry is the latest commit.
+	# (NOTE: This creates an entry object for every commit. Iterate over the history object itself or slice it to avoid this.)
 	#
 	@property
 	def entriesList(self) -> typing.List[GitCommitHistoryEntry]:
-		return list(self._entriesList)
+		return list(self)
+	#
+
+	#
+	# The commit graph. It is built on first access.
+	#
+	@property
+	def graph(self) -> GitCommitGraph:
+		if self._graph is None:
+			n = len(self._columns)
+			self._graph = GitCommitGraph(
+				list(self._columns.iterHashes()),
+				[ self._columns.getParentHashes(i) for i in range(n) ],
+			)
+		return self._graph
 	#
 
 	################################################################################################################################
@@ -87,6 +121,85 @@ class GitCommitHistory(jk_prettyprintobj.DumpMixin):
 	## Public Methods
 	################################################################################################################################
 
+	#
+	# Get the entry of the specified commit.
+	#
+	# @return		GitCommitHistoryEntry		Returns the entry or `None` if there is no such commit.
+	#
+	def getEntry(self, commitHash:str) -> typing.Union[GitCommitHistoryEntry,None]:
+		i = self._columns.indexOf(commitHash)
+		if i is None:
+			return None
+		return GitCommitHistoryEntry.fromColumns(self._columns, i, self)
+	#
+
+	def __len__(self):
+		return len(self._columns)
+	#
+
+	#
+	# Iterate over all entries in forward order (from the oldest to the latest commit).
+	#
+	def __iter__(self) -> typing.Iterator[GitCommitHistoryEntry]:
+		columns = self._columns
+		for i in range(len(columns) - 1, -1, -1):
+			yield GitCommitHistoryEntry.fromColumns(columns, i, self)
+	#
+
+	#
+	# Iterate over all entries in reverse order (from the latest to the oldest commit).
+	#
+	def __reversed__(self) -> typing.Iterator[GitCommitHistoryEntry]:
+		columns = self._columns
+		for i in range(0, len(columns)):
+			yield GitCommitHistoryEntry.fromColumns(columns, i, self)
+	#
+
+	#
+	# Get an entry by its position in forward order or a slice of entries. A slice is returned as a `GitCommitHistorySlice`
+	# object that does not copy any data.
+	#
+	def __getitem__(self, ii):
+		n = len(self._columns)
+		if isinstance(ii, slice):
+			return GitCommitHistorySlice(self, range(n)[ii])
+		elif isinstance(ii, int):
+			if ii < 0:
+				ii += n
+			if (ii < 0) or (ii >= n):
+				raise IndexError(ii)
+			return GitCommitHistoryEntry.fromColumns(self._columns, n - 1 - ii, self)
+		else:
+			raise TypeError(repr(ii) + " - " + str(type(ii)))
+	#
+
+	#
+	# Check if commit `a` is an ancestor of commit `b`.
+	#
+	def isAncestor(self, a:str, b:str) -> bool:
+		return self.graph.isAncestor(a, b)
+	#
+
+	#
+	# Get the best common ancestor of the specified commits.
+	#
+	# @return		GitCommitHistoryEntry		Returns the entry or `None` if there is no common ancestor.
+	#
+	def mergeBase(self, a:str, b:str) -> typing.Union[GitCommitHistoryEntry,None]:
+		h = self.graph.mergeBase(a, b)
+		return self.getEntry(h) if h else None
+	#
+
+	#
+	# Walk along the first parents, starting with the specified commit. If no commit is specified the latest commit is used.
+	#
+	def iterFirstParents(self, commitHash:str = None) -> typing.Iterator[GitCommitHistoryEntry]:
+		if commitHash is None:
+			commitHash = self._columns.getHash(0)
+		for h in self.graph.iterFirstParents(commitHash):
+			yield self.getEntry(h)
+	#
+
 	################################################################################################################################
 	## Static Helper Methods
 	################################################################################################################################
@@ -101,43 +214,145 @@ class GitCommitHistory(jk_prettyprintobj.DumpMixin):
 	# @return		Returns (null) if no commits have been made jet, an instance of GitCommitHistory otherwise.
 	#
 	@staticmethod
-	def create(rootDir:str, wrapper:GitWrapper):
-		stdLines = wrapper.showLogParsable(rootDir)
-		if not stdLines:
+	def create(rootDir:str, wrapper:"GitWrapper"):
+		return GitCommitHistory.createFromLogRecords(wrapper.iterLogParsable(rootDir))
+	#
+
+	#
+	# Run `git log` and yield history entries as soon as git writes them. Entries are yielded from the latest to the oldest commit.
+	# The entries returned are not attached to a `GitCommitHistory` object.
+	#
+	# @param		str rootDir				The root directory of the repository.
+	# @param		GitWrapper wrapper		The git wrapper to use.
+	# @param		str revisionRange		(optional) A revision or revision range such as "abc123..HEAD". Defaults to the current HEAD.
+	#
+	@staticmethod
+	def iterEntries(rootDir:str, wrapper:"GitWrapper", revisionRange:str = None) -> typing.Iterator[GitCommitHistoryEntry]:
+		columns = None
+		for parts in wrapper.iterLogParsable(rootDir, revisionRange):
+			# store the data in chunks so that memory can be freed while iterating
+			if (columns is None) or (len(columns) >= GitCommitHistory.__ITER_CHUNK_SIZE):
+				columns = GitCommitColumns()
+			GitCommitHistory.__appendLogRecord(columns, parts)
+			yield GitCommitHistoryEntry.fromColumns(columns, len(columns) - 1)
+	#
+
+	#
+	# Create a GitCommitHistory object from records as returned by `GitWrapper.iterLogParsable()`.
+	#
+	# @return		Returns (null) if no records have been specified, an instance of GitCommitHistory otherwise.
+	#
+	@staticmethod
+	def createFromLogRecords(records:typing.Iterable[typing.Sequence[str]]):
+		columns = GitCommitColumns()
+		for parts in records:
+			GitCommitHistory.__appendLogRecord(columns, parts)
+		if len(columns) == 0:
+			return None
+
+		return GitCommitHistory.fromColumns(columns)
+	#
+
+	#
+	# Create a GitCommitHistory object from history entries.
+	#
+	# @param		GitCommitHistoryEntry[] entries		The entries in the order `git log` emits them: from the latest to the oldest commit.
+	# @return		Returns (null) if no entries have been specified, an instance of GitCommitHistory otherwise.
+	#
+	@staticmethod
+	def createFromEntries(entries:typing.Iterable[GitCommitHistoryEntry]):
+		columns = GitCommitHistory.__columnsFromEntries(entries)
+		if len(columns) == 0:
 			return None
 
-		return GitCommitHistory.createFromGitLogOutput(stdLines)
+		return GitCommitHistory.fromColumns(columns)
 	#
 
+	#
+	# Create a GitCommitHistory object from a column store.
+	#
+	# @param		GitCommitColumns columns		The commit data in the order `git log` emits it: from the latest to the oldest commit.
+	#
+	@staticmethod
+	def fromColumns(columns:GitCommitColumns):
+		assert len(columns) > 0
+
+		ret = GitCommitHistory.__new__(GitCommitHistory)
+		ret._columns = columns
+		ret._graph = None
+		return ret
+	#
+
+	#
+	# Copy the data of the specified entries to a new column store.
+	#
+	@staticmethod
+	def __columnsFromEntries(entries:typing.Iterable[GitCommitHistoryEntry]) -> GitCommitColumns:
+		columns = GitCommitColumns()
+		for e in entries:
+			columns.append(
+				" ".join(e.parentCommitHashes),
+				e.commitHash,
+				e.committerName,
+				e.committerEMail,
+				e.commitTimestamp,
+				e.tzOffsetMinutes,
+				e.text,
+			)
+		return columns
+	#
+
+	#
+	# Create a GitCommitHistory object from the (legacy) output of `GitWrapper.showLogParsable()`.
+	#
 	@staticmethod
 	def createFromGitLogOutput(stdLines:str):
-		entriesList = []
+		import dateutil.parser
+
+		columns = GitCommitColumns()
 		for line in stdLines:
 			parts = [
 				x if x else None
 					for x in line.split("|")
 			]
-			parts[4] = dateutil.parser.parse(parts[4])
 			assert len(parts) == 6
+			dt = dateutil.parser.parse(parts[4])
+			utcOffset = dt.utcoffset()
+			columns.append(
+				parts[0],
+				parts[1],
+				parts[2],
+				parts[3],
+				int(dt.timestamp()),
+				int(utcOffset.total_seconds()) // 60 if utcOffset else 0,
+				parts[5],
+			)
+		if len(columns) == 0:
+			return None
 
-			entry = GitCommitHistoryEntry(*parts)
-			entriesList.append(entry)
-
-		# now
-		#	-> the first record is: latest
-		#	-> the last record is: inital
-
-		# the ordering of all records is from newest to olders => reverse order
-		entriesList.reverse()
-
-		# now:
-		#	-> the first record is: inital
-		#	-> the last record is: latest
-
-		entriesList[0]._bIsOldest = True
-		entriesList[-1]._bIsLatest = True
+		return GitCommitHistory.fromColumns(columns)
+	#
 
-		return GitCommitHistory(entriesList)
+	#
+	# Append a record as returned by `GitWrapper.iterLogParsable()`.
+	# The timestamp is expected in the form "<seconds since epoch> <offset>", e.g. "1658649600 +0200".
+	#
+	@staticmethod
+	def __appendLogRecord(columns:GitCommitColumns, parts:typing.Sequence[str]):
+		sTimeStamp = parts[4]
+		tzOffsetMinutes = int(sTimeStamp[-4:-2]) * 60 + int(sTimeStamp[-2:])
+		if sTimeStamp[-5] == "-":
+			tzOffsetMinutes = -tzOffsetMinutes
+
+		columns.append(
+			parts[0] or None,
+			parts[1],
+			parts[2] or None,
+			parts[3] or None,
+			int(sTimeStamp[:-6]),
+			tzOffsetMinutes,
+			parts[5] or None,
+		)
 	#
 
 #
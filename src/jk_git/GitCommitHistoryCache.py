@@ -0,0 +1,246 @@
+
+
+
+import os
+import typing
+import hashlib
+import tempfile
+import threading
+
+import jk_typing
+import jk_logging
+
+from .GitWrapper import GitWrapper
+from .GitExecutionException import GitExecutionException
+from .GitCommitHistory import GitCommitHistory
+from .GitRefDatabase import GitRefDatabase
+
+
+
+
+
+#
+# This class maintains a persistent cache of the commit history of a single repository. The cache is keyed by the hash of the latest
+# commit. If new commits have been added since the cache has been written only these new commits are retrieved from git. If the history
+# has been rewritten (= the cached latest commit is no longer an ancestor of HEAD) the cache is rebuilt.
+#
+class GitCommitHistoryCache(object):
+
+	FILE_NAME = "jk_git_history_cache"
+	__MAGIC = b"jk_git-history-cache"
+	__FORMAT_VERSION = 2
+	__FIELDS_PER_RECORD = 6
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str rootDir				The root directory of the repository.
+	# @param		str cacheFilePath		The path of the file to store the cache data in.
+	# @param		GitRefDatabase refDatabase		(optional) The reference database of the repository. If specified the latest commit is determined
+	#										without running git.
+	#
+	@jk_typing.checkFunctionSignature()
+	def __init__(self, rootDir:str, cacheFilePath:str, refDatabase:GitRefDatabase = None):
+		self.__rootDir = rootDir
+		self.__cacheFilePath = cacheFilePath
+		self.__refDatabase = refDatabase
+
+		self.__lock = threading.Lock()
+		self.__lastTip = None
+		self.__lastHistory = None
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def rootDir(self) -> str:
+		return self.__rootDir
+	#
+
+	@property
+	def cacheFilePath(self) -> str:
+		return self.__cacheFilePath
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	#
+	# Load the cache file.
+	#
+	# @return		tuple				Returns `(tipHash, records)` or `(None, None)` if there is no (valid) cache file.
+	#
+	def __load(self) -> tuple:
+		try:
+			with open(self.__cacheFilePath, "rb") as f:
+				raw = f.read()
+		except FileNotFoundError:
+			return None, None
+
+		pos = raw.find(b"\n")
+		header = raw[:pos].split(b" ")
+		if (pos < 0) \
+			or (len(header) != 3) \
+			or (header[0] != GitCommitHistoryCache.__MAGIC) \
+			or (header[1] != str(GitCommitHistoryCache.__FORMAT_VERSION).encode("ascii")):
+			return None, None
+
+		tipHash = header[2].decode("ascii")
+		fields = raw[pos + 1:].decode("utf-8").split("\0")
+		n = GitCommitHistoryCache.__FIELDS_PER_RECORD
+		if len(fields) % n != 0:
+			return None, None
+
+		records = [ tuple(fields[i:i + n]) for i in range(0, len(fields), n) ]
+		return tipHash, records
+	#
+
+	#
+	# Write the cache file. The file is replaced atomically.
+	#
+	def __save(self, tipHash:str, records:typing.List[tuple], log:jk_logging.AbstractLogger):
+		header = b" ".join([
+			GitCommitHistoryCache.__MAGIC,
+			str(GitCommitHistoryCache.__FORMAT_VERSION).encode("ascii"),
+			tipHash.encode("ascii"),
+		])
+		dirPath, fileName = os.path.split(self.__cacheFilePath)
+		tempFilePath = None
+		try:
+			# (the temporary file name must be unique: other instances might write the same cache file at the same time)
+			fd, tempFilePath = tempfile.mkstemp(dir=dirPath or ".", prefix=fileName + ".", suffix=".tmp")
+			with open(fd, "wb") as f:
+				f.write(header + b"\n")
+				f.write("\0".join([ "\0".join(r) for r in records ]).encode("utf-8"))
+			os.replace(tempFilePath, self.__cacheFilePath)
+		except OSError as ee:
+			if tempFilePath is not None:
+				try:
+					os.unlink(tempFilePath)
+				except OSError:
+					pass
+			# caching is an optimization only: if the cache file can't be written we simply continue without it
+			if log:
+				log.warn("Failed to write history cache file " + repr(self.__cacheFilePath) + ": " + str(ee))
+	#
+
+	#
+	# Check if the new records extend the cached history without rewriting it.
+	#
+	@staticmethod
+	def __isFastForward(cachedTip:str, cachedRecords:typing.List[tuple], newRecords:typing.List[tuple]) -> bool:
+		knownHashes = set([ r[1] for r in newRecords ])
+		knownHashes.update([ r[1] for r in cachedRecords ])
+
+		bFoundCachedTip = False
+		for r in newRecords:
+			for parentHash in r[0].split():
+				if parentHash == cachedTip:
+					bFoundCachedTip = True
+				elif parentHash not in knownHashes:
+					return False
+		return bFoundCachedTip
+	#
+
+	def __retrieveRecords(self, wrapper:GitWrapper, tipHash:str, log:jk_logging.AbstractLogger) -> typing.List[tuple]:
+		cachedTip, cachedRecords = self.__load()
+
+		if cachedTip == tipHash:
+			return cachedRecords
+
+		if cachedTip is not None:
+			try:
+				newRecords = list(wrapper.iterLogParsable(self.__rootDir, cachedTip + ".." + tipHash, log))
+			except GitExecutionException:
+				# the cached tip does not exist any more
+				newRecords = None
+			if newRecords and GitCommitHistoryCache.__isFastForward(cachedTip, cachedRecords, newRecords):
+				records = newRecords + cachedRecords
+				self.__save(tipHash, records, log)
+				return records
+
+		# no cache or the history has been rewritten: rebuild
+
+		records = list(wrapper.iterLogParsable(self.__rootDir, tipHash, log))
+		self.__save(tipHash, records, log)
+		return records
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Retrieve the commit history. Git is only asked for commits that are not yet known.
+	#
+	# @return		Returns (null) if no commits have been made jet, an instance of GitCommitHistory otherwise.
+	#
+	@jk_typing.checkFunctionSignature()
+	def getCommitHistory(self, wrapper:GitWrapper, log:jk_logging.AbstractLogger = None) -> typing.Union[GitCommitHistory,None]:
+		with self.__lock:
+			if self.__refDatabase is not None:
+				tipHash = self.__refDatabase.resolve("HEAD")
+			else:
+				tipHash = wrapper.getHeadCommitHash(self.__rootDir, log)
+			if tipHash is None:
+				return None
+
+			if (self.__lastTip == tipHash) and (self.__lastHistory is not None):
+				return self.__lastHistory
+
+			records = self.__retrieveRecords(wrapper, tipHash, log)
+
+			self.__lastTip = tipHash
+			self.__lastHistory = GitCommitHistory.createFromLogRecords(records)
+			return self.__lastHistory
+	#
+
+	#
+	# Remove all cached data.
+	#
+	def invalidate(self):
+		with self.__lock:
+			self.__lastTip = None
+			self.__lastHistory = None
+			try:
+				os.unlink(self.__cacheFilePath)
+			except FileNotFoundError:
+				pass
+	#
+
+	################################################################################################################################
+	## Static Methods
+	################################################################################################################################
+
+	#
+	# Create a cache object for the specified repository.
+	#
+	# @param		str rootDir				The root directory of the repository.
+	# @param		str gitDirPath			The git directory of the repository. For working copies this is the ".git" directory, for bare
+	#										repositories this is the root directory itself.
+	# @param		str cacheDirPath		(optional) A directory to store the cache file in. If not specified the cache file is stored
+	#										in the git directory.
+	# @param		GitRefDatabase refDatabase		(optional) The reference database of the repository.
+	#
+	@staticmethod
+	def forRepository(rootDir:str, gitDirPath:str, cacheDirPath:str = None, refDatabase:GitRefDatabase = None):
+		if cacheDirPath:
+			key = hashlib.sha1(os.path.abspath(rootDir).encode("utf-8")).hexdigest()[:16]
+			cacheFilePath = os.path.join(cacheDirPath, GitCommitHistoryCache.FILE_NAME + "-" + key)
+		else:
+			cacheFilePath = os.path.join(gitDirPath, GitCommitHistoryCache.FILE_NAME)
+		return GitCommitHistoryCache(rootDir, cacheFilePath, refDatabase)
+	#
+
+#
+
+
+
+
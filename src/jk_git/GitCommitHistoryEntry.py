@@ -8,6 +8,7 @@ import datetime
 import jk_typing
 import jk_prettyprintobj
 
+from .impl.GitCommitColumns import GitCommitColumns
 
 
 
@@ -16,52 +17,171 @@ import jk_prettyprintobj
 
 
 
+
+#
+# Instances of this class represent a single commit. An entry is a lightweight view: the data itself is stored in
+# columns (see `GitCommitColumns`) that are shared by all entries of a history. Entries are created on demand.
+#
 class GitCommitHistoryEntry(jk_prettyprintobj.DumpMixin):
 
+	__slots__ = ( "_columns", "_index", "_owner" )
+
+	__TIMEZONES = {}
+
+	#
+	# Constructor method. This creates a standalone entry that stores its data in a column store of its own. (Entries of a history are
+	# created by `fromColumns()`.)
+	#
+	# @param		str parentCommitHash		The hashes of the parent commits (separated by space) as provided by git or `None` if there are no parents.
+	# @param		datetime|int commitDateTime	Either the commit date and time or the commit time as seconds since the epoch.
+	# @param		int tzOffsetMinutes			The offset of the committer's time zone in minutes. This is only used if `commitDateTime`
+	#											is specified as seconds since the epoch.
+	#
 	@jk_typing.checkFunctionSignature()
-	def __init__(self, parentCommitHash:typing.Union[str,None], commitHash:str, committerName:str, committerEMail:str, commitDateTime:datetime.datetime, text:str):
+	def __init__(self,
+			parentCommitHash:typing.Union[str,None],
+			commitHash:str,
+			committerName:typing.Union[str,None],
+			committerEMail:typing.Union[str,None],
+			commitDateTime:typing.Union[datetime.datetime,int],
+			text:typing.Union[str,None],
+			tzOffsetMinutes:int = 0,
+		):
+
+		if isinstance(commitDateTime, datetime.datetime):
+			timestamp = int(commitDateTime.timestamp())
+			utcOffset = commitDateTime.utcoffset()
+			tzOffsetMinutes = int(utcOffset.total_seconds()) // 60 if utcOffset else 0
+		else:
+			timestamp = commitDateTime
+
+		self._columns = GitCommitColumns()
+		self._columns.append(parentCommitHash, commitHash, committerName, committerEMail, timestamp, tzOffsetMinutes, text)
+		self._index = 0
 		self._owner = None
-		self.parentCommitHash = parentCommitHash
-		self.commitHash = commitHash
-		self.committerName = committerName
-		self.committerEMail = committerEMail
-		self.commitDateTime = commitDateTime
-		self.text = text
-		self._bIsLatest = False
-		self._bIsOldest = False
 	#
 
 	################################################################################################################################
 	## Public Properties
 	################################################################################################################################
 
+	@property
+	def commitHash(self) -> str:
+		return self._columns.getHash(self._index)
+	#
+
+	#
+	# The hashes of all parent commits
+	#
+	@property
+	def parentCommitHashes(self) -> typing.Tuple[str]:
+		return self._columns.getParentHashes(self._index)
+	#
+
+	#
+	# The hash of the first parent commit (or `None` if there is no parent)
+	#
+	@property
+	def parentCommitHash(self) -> typing.Union[str,None]:
+		parentCommitHashes = self._columns.getParentHashes(self._index)
+		return parentCommitHashes[0] if parentCommitHashes else None
+	#
+
+	@property
+	def committerName(self) -> typing.Union[str,None]:
+		return self._columns.getCommitterName(self._index)
+	#
+
+	@property
+	def committerEMail(self) -> typing.Union[str,None]:
+		return self._columns.getCommitterEMail(self._index)
+	#
+
+	@property
+	def text(self) -> typing.Union[str,None]:
+		return self._columns.getText(self._index)
+	#
+
+	#
+	# The commit time in seconds since the epoch
+	#
+	@property
+	def commitTimestamp(self) -> int:
+		return self._columns.getTimestamp(self._index)
+	#
+
+	#
+	# The offset of the committer's time zone in minutes
+	#
+	@property
+	def tzOffsetMinutes(self) -> int:
+		return self._columns.getTZOffsetMinutes(self._index)
+	#
+
+	#
+	# The commit date and time (in the time zone of the committer)
+	#
+	@property
+	def commitDateTime(self) -> datetime.datetime:
+		return datetime.datetime.fromtimestamp(
+			self._columns.getTimestamp(self._index),
+			GitCommitHistoryEntry._getTimeZone(self._columns.getTZOffsetMinutes(self._index)),
+		)
+	#
+
 	@property
 	def isOldest(self) -> bool:
-		return self._bIsOldest
+		return (self._owner is not None) and (self._index == len(self._columns) - 1)
 	#
 
 	@property
 	def isLatest(self) -> bool:
-		return self._bIsLatest
+		return (self._owner is not None) and (self._index == 0)
 	#
 
+	@property
+	def isMerge(self) -> bool:
+		return self._columns.getParentCount(self._index) > 1
+	#
+
+	#
+	# The entry of the first parent commit (or `None` if there is no parent)
+	#
 	@property
 	def predecessor(self):
-		if self.parentCommitHash:
-			return self._owner._entries.get(self.parentCommitHash)
+		parentCommitHash = self.parentCommitHash
+		if parentCommitHash and (self._owner is not None):
+			return self._owner.getEntry(parentCommitHash)
 		else:
 			return None
 	#
 
+	#
+	# The entries of all parent commits
+	#
 	@property
-	def successors(self) -> list:
+	def predecessors(self) -> list:
 		ret = []
-		for entry in self._owner._entries.values():
-			if entry.parentCommitHash == self.parentCommitHash:
-				ret.append(entry)
+		if self._owner is not None:
+			for parentCommitHash in self.parentCommitHashes:
+				entry = self._owner.getEntry(parentCommitHash)
+				if entry is not None:
+					ret.append(entry)
 		return ret
 	#
 
+	#
+	# The entries of all child commits
+	#
+	@property
+	def successors(self) -> list:
+		if self._owner is None:
+			return []
+		return [
+			self._owner.getEntry(h) for h in self._owner.graph.getChildren(self.commitHash)
+		]
+	#
+
 	################################################################################################################################
 	## Helper Methods
 	################################################################################################################################
@@ -72,7 +192,7 @@ class GitCommitHistoryEntry(jk_prettyprintobj.DumpMixin):
 
 	def _dumpVarNames(self):
 		return [
-			"parentCommitHash",
+			"parentCommitHashes",
 			"commitHash",
 			"committerName",
 			"committerEMail",
@@ -87,14 +207,52 @@ class GitCommitHistoryEntry(jk_prettyprintobj.DumpMixin):
 	## Public Methods
 	################################################################################################################################
 
+	def __eq__(self, other):
+		if isinstance(other, GitCommitHistoryEntry):
+			return (self._columns is other._columns) and (self._index == other._index)
+		return NotImplemented
+	#
+
+	def __hash__(self):
+		return hash((id(self._columns), self._index))
+	#
+
 	################################################################################################################################
 	## Static Helper Methods
 	################################################################################################################################
 
+	#
+	# Get a time zone object for the specified offset. Time zone objects are shared between all entries.
+	#
+	@staticmethod
+	def _getTimeZone(tzOffsetMinutes:int) -> datetime.timezone:
+		tz = GitCommitHistoryEntry.__TIMEZONES.get(tzOffsetMinutes)
+		if tz is None:
+			tz = datetime.timezone(datetime.timedelta(minutes=tzOffsetMinutes))
+			GitCommitHistoryEntry.__TIMEZONES[tzOffsetMinutes] = tz
+		return tz
+	#
+
 	################################################################################################################################
 	## Static Methods
 	################################################################################################################################
 
+	#
+	# Create an entry that is a view on a commit stored in a column store.
+	#
+	# @param		GitCommitColumns columns		The column store containing the commit data.
+	# @param		int index						The index of the commit within the column store.
+	# @param		GitCommitHistory owner			(optional) The history this entry belongs to.
+	#
+	@staticmethod
+	def fromColumns(columns:GitCommitColumns, index:int, owner = None):
+		ret = object.__new__(GitCommitHistoryEntry)
+		ret._columns = columns
+		ret._index = index
+		ret._owner = owner
+		return ret
+	#
+
 #
 
 
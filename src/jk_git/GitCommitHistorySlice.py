@@ -0,0 +1,62 @@
+
+
+import typing
+import collections.abc
+
+from .GitCommitHistoryEntry import GitCommitHistoryEntry
+
+
+
+
+
+#
+# A read only view on a range of entries of a `GitCommitHistory`. No commit data is copied.
+#
+class GitCommitHistorySlice(collections.abc.Sequence):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		GitCommitHistory history		The history this slice refers to.
+	# @param		range positions					The positions of the entries (in forward order) within the history.
+	#
+	def __init__(self, history, positions:range):
+		self.__history = history
+		self.__positions = positions
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def __len__(self):
+		return len(self.__positions)
+	#
+
+	def __iter__(self) -> typing.Iterator[GitCommitHistoryEntry]:
+		for i in self.__positions:
+			yield self.__history[i]
+	#
+
+	def __getitem__(self, ii):
+		if isinstance(ii, slice):
+			return GitCommitHistorySlice(self.__history, self.__positions[ii])
+		elif isinstance(ii, int):
+			return self.__history[self.__positions[ii]]
+		else:
+			raise TypeError(repr(ii) + " - " + str(type(ii)))
+	#
+
+	def __repr__(self):
+		return "GitCommitHistorySlice<" + repr(self.__positions) + ">"
+	#
+
+#
+
+
+
+
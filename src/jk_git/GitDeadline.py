@@ -0,0 +1,290 @@
+
+
+
+import time
+import types
+import typing
+import functools
+import contextlib
+import contextvars
+
+import jk_prettyprintobj
+
+from .GitCancellationToken import GitCancellationToken
+from .GitTimeoutException import GitTimeoutException
+from .GitCancelledException import GitCancelledException
+
+
+
+
+
+#
+# This class represents the limits of the current call: a deadline and/or cancellation tokens. Limits apply to all git processes
+# started within a `scope()` (by the current thread or task). Every process is started in a process group of its own and the whole
+# group gets killed if the deadline passes or a token gets cancelled; the call then raises a `GitTimeoutException` or a
+# `GitCancelledException`.
+#
+# All public methods of `GitWrapper`, `GitWorkingCopy`, `GitRemoteRepository` and `GitServerRepository` accept these keyword arguments
+# (see `aware()`):
+#
+# * `timeout` - the maximum number of seconds the call may run,
+# * `deadline` - the time the call must have completed by (a value of `time.monotonic()`),
+# * `cancellationToken` - a `GitCancellationToken`.
+#
+#	wrapper.pull(rootDir, timeout=30)
+#
+# Properties can't accept arguments. Use `scope()` instead:
+#
+#	with GitDeadline.scope(timeout=5, cancellationToken=token):
+#		if wc.isDirty:
+#			...
+#
+# Scopes can be nested: the earlier deadline applies and all tokens are observed.
+#
+class GitDeadline(jk_prettyprintobj.DumpMixin):
+
+	__CURRENT = contextvars.ContextVar("jk_git_deadline", default=None)
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method. (Use `scope()` instead of creating instances directly.)
+	#
+	# @param		float deadline						The deadline (a value of `time.monotonic()`) or `None`.
+	# @param		float tDeadlineStart				The time the deadline has been established (to report the time elapsed).
+	# @param		GitCancellationToken[] tokens		The cancellation tokens to observe.
+	# @param		float tStart						The time the outermost scope has been entered.
+	#
+	def __init__(self,
+			deadline:typing.Union[float,None],
+			tDeadlineStart:typing.Union[float,None],
+			tokens:typing.Tuple[GitCancellationToken],
+			tStart:float,
+		):
+
+		self.__deadline = deadline
+		self.__tDeadlineStart = tDeadlineStart
+		self.__tokens = tokens
+		self.__tStart = tStart
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	#
+	# The deadline (a value of `time.monotonic()`) or `None` if there is none.
+	#
+	@property
+	def deadline(self) -> typing.Union[float,None]:
+		return self.__deadline
+	#
+
+	#
+	# The number of seconds the call was allowed to run or `None` if there is no deadline.
+	#
+	@property
+	def timeout(self) -> typing.Union[float,None]:
+		if self.__deadline is None:
+			return None
+		return self.__deadline - self.__tDeadlineStart
+	#
+
+	#
+	# The number of seconds left until the deadline passes (at least zero) or `None` if there is no deadline.
+	#
+	@property
+	def remainingTime(self) -> typing.Union[float,None]:
+		if self.__deadline is None:
+			return None
+		return max(0.0, self.__deadline - time.monotonic())
+	#
+
+	@property
+	def isExpired(self) -> bool:
+		return (self.__deadline is not None) and (time.monotonic() >= self.__deadline)
+	#
+
+	@property
+	def isCancelled(self) -> bool:
+		for token in self.__tokens:
+			if token.isCancelled:
+				return True
+		return False
+	#
+
+	@property
+	def cancellationTokens(self) -> typing.Tuple[GitCancellationToken]:
+		return self.__tokens
+	#
+
+	################################################################################################################################
+	## Protected Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self):
+		return [
+			"timeout",
+			"remainingTime",
+			"isExpired",
+			"isCancelled",
+		]
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Build the exception to raise after git has been killed because the deadline passed.
+	#
+	def timeoutException(self, cmdArgs:typing.Sequence[str], stdErrLines:typing.List[str] = None) -> GitTimeoutException:
+		return GitTimeoutException(cmdArgs, self.timeout, time.monotonic() - self.__tDeadlineStart, stdErrLines)
+	#
+
+	#
+	# Build the exception to raise after git has been killed because the call has been cancelled.
+	#
+	def cancelledException(self, cmdArgs:typing.Sequence[str], stdErrLines:typing.List[str] = None) -> GitCancelledException:
+		return GitCancelledException(cmdArgs, time.monotonic() - self.__tStart, stdErrLines)
+	#
+
+	#
+	# Raise an exception if git must not be started any more: if the call has been cancelled or the deadline has passed.
+	#
+	# @param		str[] cmdArgs				The arguments git would be invoked with.
+	#
+	def checkE(self, cmdArgs:typing.Sequence[str]):
+		if self.isCancelled:
+			raise self.cancelledException(cmdArgs)
+		if self.isExpired:
+			raise self.timeoutException(cmdArgs)
+	#
+
+	################################################################################################################################
+	## Static Methods
+	################################################################################################################################
+
+	#
+	# Returns the limits of the current scope or `None` if there are none.
+	#
+	@staticmethod
+	def current() -> typing.Union["GitDeadline",None]:
+		return GitDeadline.__CURRENT.get()
+	#
+
+	#
+	# Apply limits to all git processes started within this context. If none of the arguments is specified the current limits
+	# remain unchanged.
+	#
+	# @param		float timeout						(optional) The maximum number of seconds the code within this context may run.
+	# @param		float deadline						(optional) The time the code within this context must have completed by (a value of `time.monotonic()`).
+	# @param		GitCancellationToken cancellationToken		(optional) A token to cancel all git processes with.
+	#
+	@staticmethod
+	@contextlib.contextmanager
+	def scope(
+			timeout:typing.Union[int,float,None] = None,
+			deadline:typing.Union[int,float,None] = None,
+			cancellationToken:GitCancellationToken = None,
+		):
+
+		if (timeout is None) and (deadline is None) and (cancellationToken is None):
+			yield GitDeadline.__CURRENT.get()
+			return
+
+		token = GitDeadline.__CURRENT.set(GitDeadline.__create(timeout, deadline, cancellationToken))
+		try:
+			yield GitDeadline.__CURRENT.get()
+		finally:
+			GitDeadline.__CURRENT.reset(token)
+	#
+
+	@staticmethod
+	def __create(
+			timeout:typing.Union[int,float,None],
+			deadline:typing.Union[int,float,None],
+			cancellationToken:typing.Union[GitCancellationToken,None],
+		) -> "GitDeadline":
+
+		if timeout is not None:
+			assert isinstance(timeout, (int, float)) and (timeout >= 0)
+		if deadline is not None:
+			assert isinstance(deadline, (int, float))
+		if cancellationToken is not None:
+			assert isinstance(cancellationToken, GitCancellationToken)
+
+		tNow = time.monotonic()
+		if timeout is not None:
+			deadline = tNow + timeout if deadline is None else min(deadline, tNow + timeout)
+
+		outer = GitDeadline.__CURRENT.get()
+		if outer is None:
+			tokens = ( cancellationToken, ) if cancellationToken is not None else ()
+			return GitDeadline(deadline, tNow if deadline is not None else None, tokens, tNow)
+
+		tokens = outer.__tokens
+		if (cancellationToken is not None) and (cancellationToken not in tokens):
+			tokens = tokens + ( cancellationToken, )
+		if (deadline is None) or ((outer.__deadline is not None) and (outer.__deadline <= deadline)):
+			# the outer deadline applies
+			return GitDeadline(outer.__deadline, outer.__tDeadlineStart, tokens, outer.__tStart)
+		return GitDeadline(deadline, tNow, tokens, outer.__tStart)
+	#
+
+	#
+	# Iterate over the specified generator within the specified limits.
+	#
+	@staticmethod
+	def __iterWithin(limits:"GitDeadline", gen:types.GeneratorType) -> typing.Iterator:
+		try:
+			while True:
+				token = GitDeadline.__CURRENT.set(limits)
+				try:
+					item = next(gen)
+				except StopIteration:
+					return
+				finally:
+					GitDeadline.__CURRENT.reset(token)
+				yield item
+		finally:
+			gen.close()
+	#
+
+	#
+	# A method decorator: the decorated method accepts the additional keyword arguments `timeout`, `deadline` and `cancellationToken`
+	# and is run within a `scope()` of these limits. If the method returns a generator the limits apply while iterating over it (the
+	# timeout starts when the method gets invoked).
+	#
+	# Place this decorator above `jk_typing.checkFunctionSignature()`. Methods that declare any of these arguments themselves
+	# (with a different meaning) must not be decorated.
+	#
+	@staticmethod
+	def aware(fn):
+		@functools.wraps(fn)
+		def _wrapper(*args,
+				timeout:typing.Union[int,float,None] = None,
+				deadline:typing.Union[int,float,None] = None,
+				cancellationToken:GitCancellationToken = None,
+				**kwargs):
+
+			if (timeout is None) and (deadline is None) and (cancellationToken is None):
+				return fn(*args, **kwargs)
+
+			with GitDeadline.scope(timeout, deadline, cancellationToken) as limits:
+				ret = fn(*args, **kwargs)
+			if isinstance(ret, types.GeneratorType):
+				return GitDeadline.__iterWithin(limits, ret)
+			return ret
+		#
+
+		return _wrapper
+	#
+
+#
+
+
+
+
@@ -0,0 +1,44 @@
+
+
+import typing
+
+
+
+
+
+#
+# This exception is raised if running git failed.
+#
+class GitExecutionException(Exception):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str message					The error message.
+	# @param		str[] cmdArgs				The arguments git has been invoked with.
+	# @param		int returnCode				The return code of git.
+	# @param		str[] stdErrLines			The output git has written to STDERR.
+	#
+	def __init__(self,
+			message:str,
+			cmdArgs:typing.Union[typing.List[str],typing.Tuple[str],None] = None,
+			returnCode:typing.Union[int,None] = None,
+			stdErrLines:typing.Union[typing.List[str],None] = None,
+		):
+
+		super().__init__(message)
+
+		self.cmdArgs = list(cmdArgs) if cmdArgs else []
+		self.returnCode = returnCode
+		self.stdErrLines = stdErrLines if stdErrLines else []
+	#
+
+#
+
+
+
+
@@ -1,15 +1,107 @@
-
-
-
 from .AbstractRepositoryFile import AbstractRepositoryFile
 
 
 
 class GitFileInfo(AbstractRepositoryFile):
 
-	def __init__(self, workingCopy, status:str, filePath:str):
+	#
+	# Constructor method.
+	#
+	# @param		str origFilePath		(optional) For renamed or copied files: the path of the file this file originates from.
+	# @param		str xy					(optional) The two character status code of git: the status in the index and the status in the working tree, e.g. "M." or ".D".
+	# @param		str[] modes				(optional) The octal file modes in HEAD, in the index and in the working tree, e.g. `("100644", "100755", "100755")`.
+	# @param		str submoduleState		(optional) The submodule state as reported by git: "N..." if the file is not a submodule, "S<c><m><u>" otherwise.
+	#
+	def __init__(self,
+			workingCopy,
+			status:str,
+			filePath:str,
+			*,
+			origFilePath:str = None,
+			xy:str = None,
+			modes:tuple = None,
+			submoduleState:str = None,
+		):
+
 		super().__init__(workingCopy, status, filePath)
+
+		self.__origFilePath = origFilePath
+		self.__xy = xy
+		self.__modes = modes
+		self.__submoduleState = submoduleState
+	#
+
+	#
+	# For renamed or copied files: the path of the file this file originates from. `None` otherwise.
+	#
+	def origFilePath(self) -> str:
+		return self.__origFilePath
+	#
+
+	#
+	# The two character status code of git (e.g. "M." or ".D") or `None` if not known.
+	#
+	def xy(self) -> str:
+		return self.__xy
+	#
+
+	#
+	# The status of the file in the index (first character of the git status code).
+	#
+	def indexStatus(self) -> str:
+		return self.__xy[0] if self.__xy else None
+	#
+
+	#
+	# The status of the file in the working tree (second character of the git status code).
+	#
+	def worktreeStatus(self) -> str:
+		return self.__xy[1] if self.__xy else None
+	#
+
+	#
+	# The octal file modes in HEAD, in the index and in the working tree or `None` if not known.
+	#
+	def modes(self) -> tuple:
+		return self.__modes
+	#
+
+	#
+	# Returns `True` if the file mode differs between HEAD, index and working tree. Added and deleted files are not considered.
+	#
+	def isModeChanged(self) -> bool:
+		if not self.__modes:
+			return False
+		modes = [ m for m in self.__modes if m != "000000" ]
+		return len(set(modes)) > 1
+	#
+
+	def isSubmodule(self) -> bool:
+		return bool(self.__submoduleState) and (self.__submoduleState[0] == "S")
+	#
+
+	#
+	# Returns `True` if the commit of a submodule has changed.
+	#
+	def isSubmoduleCommitChanged(self) -> bool:
+		return self.isSubmodule() and (self.__submoduleState[1] == "C")
+	#
+
+	#
+	# Returns `True` if a submodule has tracked changes.
+	#
+	def hasSubmoduleModifications(self) -> bool:
+		return self.isSubmodule() and (self.__submoduleState[2] == "M")
+	#
+
+	#
+	# Returns `True` if a submodule has untracked files.
+	#
+	def hasSubmoduleUntrackedFiles(self) -> bool:
+		return self.isSubmodule() and (self.__submoduleState[3] == "U")
 	#
 
 #
 
+
+
@@ -0,0 +1,399 @@
+
+
+
+import os
+import mmap
+import struct
+import typing
+import hashlib
+
+import jk_typing
+import jk_prettyprintobj
+
+from .GitIndexEntry import GitIndexEntry
+from .GitObjectStore import GitObjectStore
+
+
+
+
+#
+# This class reads the index of a repository (`.git/index`, versions 2 to 4) without running git. The file is memory mapped while
+# it is parsed.
+#
+# On top of the entries this class implements a quick check for modifications of tracked files: the working tree is compared to
+# the stat data recorded in the index the way `git status` does it, including git's handling of "racily clean" entries
+# (files modified within the same time slot the index was written in). Files are read only if their stat data is inconclusive.
+#
+# Limitations:
+#
+# * Split indices (`core.splitIndex`) are not supported.
+# * Clean filters and end of line conversions are not applied when hashing file contents: such files may be reported as modified
+#	even if `git status` considers them unmodified.
+#
+class GitIndex(jk_prettyprintobj.DumpMixin):
+
+	__SIGNATURE = b"DIRC"
+	__HASH_LENGTH = 20
+	__ENTRY_STRUCT = struct.Struct(">10I20sH")
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method. Don't invoke this constructor directly: use `loadFromFile()` instead.
+	#
+	def __init__(self, filePath:str, version:int, entries:typing.List[GitIndexEntry], fileMTimeNS:int, fileSize:int, cacheTreeRootHash:str):
+		self.__filePath = filePath
+		self.__version = version
+		self.__entries = entries
+		self.__fileMTimeNS = fileMTimeNS
+		self.__fileSize = fileSize
+		self.__cacheTreeRootHash = cacheTreeRootHash
+		self.__entriesByPath = None
+		self.__contentHash = None
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def filePath(self) -> str:
+		return self.__filePath
+	#
+
+	@property
+	def version(self) -> int:
+		return self.__version
+	#
+
+	#
+	# The entries of the index ordered by path and stage
+	#
+	@property
+	def entries(self) -> typing.List[GitIndexEntry]:
+		return self.__entries
+	#
+
+	#
+	# The modification time stamp of the index file at the time it was loaded (in nanoseconds)
+	#
+	@property
+	def fileMTimeNS(self) -> int:
+		return self.__fileMTimeNS
+	#
+
+	@property
+	def fileSize(self) -> int:
+		return self.__fileSize
+	#
+
+	#
+	# The hash of the tree the index would be written as (from the "TREE" extension) or `None` if not known.
+	# If present this matches the tree of HEAD if nothing has been staged.
+	#
+	@property
+	def cacheTreeRootHash(self) -> typing.Union[str,None]:
+		return self.__cacheTreeRootHash
+	#
+
+	#
+	# A hash over the paths, modes, blob hashes and flags of all entries. Stat data is not included: this hash does not change if git
+	# just refreshes the stat data of the index (which `git status` does).
+	#
+	@property
+	def contentHash(self) -> str:
+		if self.__contentHash is None:
+			h = hashlib.sha1()
+			for e in self.__entries:
+				h.update("{}\0{:o}\0{}\0{}\0{}\0".format(e._filePath, e._mode, e._objectHash, e._flags & 0xf000, e._extendedFlags).encode("utf-8", "surrogateescape"))
+			self.__contentHash = h.hexdigest()
+		return self.__contentHash
+	#
+
+	#
+	# Returns `True` if there are unmerged entries (merge conflicts).
+	#
+	@property
+	def hasConflicts(self) -> bool:
+		for e in self.__entries:
+			if e._flags & 0x3000:
+				return True
+		return False
+	#
+
+	################################################################################################################################
+	## Protected Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self):
+		return [
+			"filePath",
+			"version",
+			"fileMTimeNS",
+			"fileSize",
+			"cacheTreeRootHash",
+			"hasConflicts",
+		]
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __hashBlob(absFilePath:str, bSymLink:bool, size:int) -> str:
+		if bSymLink:
+			data = os.fsencode(os.readlink(absFilePath))
+			h = hashlib.sha1(b"blob %d\0" % len(data))
+			h.update(data)
+			return h.hexdigest()
+
+		h = hashlib.sha1(b"blob %d\0" % size)
+		n = 0
+		with open(absFilePath, "rb") as f:
+			while True:
+				chunk = f.read(1024 * 1024)
+				if not chunk:
+					break
+				n += len(chunk)
+				h.update(chunk)
+		if n != size:
+			# the file has been modified while it was read
+			return None
+		return h.hexdigest()
+	#
+
+	#
+	# Compare a single entry with the file in the working tree.
+	#
+	# @return		bool			Returns `True` if the file has been modified.
+	#
+	def __isEntryModified(self, e:GitIndexEntry, absFilePath:str, bTrustCTime:bool, bCheckStat:bool, bFileMode:bool) -> bool:
+		try:
+			st = os.lstat(absFilePath)
+		except (FileNotFoundError, NotADirectoryError):
+			return True
+
+		# type and mode changes
+
+		fileType = e._mode & 0o170000
+		if fileType != (st.st_mode & 0o170000):
+			return True
+		if fileType == 0o100000:
+			if bFileMode and ((e._mode ^ st.st_mode) & 0o100):
+				return True
+		elif fileType != 0o120000:
+			return True
+
+		# A different size is conclusive - unless git "smudged" the entry: git sets the size of "racily clean" entries (files modified
+		# after or in the same time slot as the index file was written) to zero. If the stat data matches and the entry is not racily
+		# clean the file is unmodified. In all other cases the content needs to be compared.
+
+		size = st.st_size & 0xffffffff
+		if size != e._size:
+			if e._size != 0:
+				return True
+		elif (divmod(st.st_mtime_ns, 1000000000) == (e._mtimeS, e._mtimeNS)) \
+			and ((not bTrustCTime) or (divmod(st.st_ctime_ns, 1000000000) == (e._ctimeS, e._ctimeNS))) \
+			and ((not bCheckStat) or (((st.st_ino & 0xffffffff) == e._ino) and (st.st_uid == e._uid) and (st.st_gid == e._gid))) \
+			and (st.st_mtime_ns < self.__fileMTimeNS):
+			return False
+
+		return GitIndex.__hashBlob(absFilePath, fileType == 0o120000, st.st_size) != e._objectHash
+	#
+
+	@staticmethod
+	def __parseCacheTreeRootHash(data:bytes) -> typing.Union[str,None]:
+		# the root entry: "<empty path>\0<entry count> <subtree count>\n<hash>"; the entry count is -1 if the tree is invalid
+		i = data.index(b"\0")
+		j = data.index(b"\n", i)
+		entryCount = int(data[i + 1:j].split(b" ")[0])
+		if entryCount < 0:
+			return None
+		return data[j + 1:j + 1 + GitIndex.__HASH_LENGTH].hex()
+	#
+
+	def __flattenTree(self, objectStore:GitObjectStore, treeHash:str, prefix:str, ret:dict):
+		for mode, name, h in objectStore.readTree(treeHash):
+			if mode == "40000":
+				self.__flattenTree(objectStore, h, prefix + name + "/", ret)
+			else:
+				ret[prefix + name] = (int(mode, 8), h)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def __len__(self):
+		return len(self.__entries)
+	#
+
+	def __iter__(self) -> typing.Iterator[GitIndexEntry]:
+		return iter(self.__entries)
+	#
+
+	#
+	# Get the entry of a tracked file.
+	#
+	# @param		str filePath			The path of the file relative to the root directory of the working copy (separated by "/").
+	# @return		GitIndexEntry			Returns the entry (stage 0) or `None` if the file is not tracked.
+	#
+	@jk_typing.checkFunctionSignature()
+	def getEntry(self, filePath:str) -> typing.Union[GitIndexEntry,None]:
+		if self.__entriesByPath is None:
+			self.__entriesByPath = { e._filePath: e for e in self.__entries if not (e._flags & 0x3000) }
+		return self.__entriesByPath.get(filePath)
+	#
+
+	#
+	# Check if the index file has been modified since it was loaded.
+	#
+	def isOutdated(self) -> bool:
+		try:
+			st = os.stat(self.__filePath)
+		except FileNotFoundError:
+			return True
+		return (st.st_mtime_ns != self.__fileMTimeNS) or (st.st_size != self.__fileSize)
+	#
+
+	#
+	# Compare the tracked files of the working tree with the index and yield all entries that have been modified in the working tree
+	# (modified, deleted or changed in type or executable bit). Submodules and entries marked "assume valid" or "skip worktree" are not checked.
+	#
+	# @param		str workTreeDir			The root directory of the working copy.
+	# @param		bool bTrustCTime		Compare the inode change time as well (git: `core.trustCTime`).
+	# @param		bool bCheckStat			Compare inode number, user and group as well (git: `core.checkStat`).
+	# @param		bool bFileMode			Compare the executable bit as well (git: `core.fileMode`).
+	#
+	@jk_typing.checkFunctionSignature()
+	def iterModifiedEntries(self,
+			workTreeDir:str,
+			bTrustCTime:bool = True,
+			bCheckStat:bool = True,
+			bFileMode:bool = True,
+		) -> typing.Iterator[GitIndexEntry]:
+
+		prefix = os.path.join(workTreeDir, "")
+		for e in self.__entries:
+			if (e._flags & (0x3000 | GitIndexEntry.FLAG_ASSUME_VALID)) \
+				or (e._extendedFlags & GitIndexEntry.EXTENDED_FLAG_SKIP_WORKTREE) \
+				or ((e._mode & 0o170000) == GitIndexEntry.MODE_GITLINK):
+				continue
+			if self.__isEntryModified(e, prefix + e._filePath, bTrustCTime, bCheckStat, bFileMode):
+				yield e
+	#
+
+	#
+	# Check if the index matches a tree: if this is the tree of HEAD, `False` means that changes have been staged.
+	# If the index contains a valid cache tree this is a single comparison, otherwise the tree is read recursively.
+	#
+	@jk_typing.checkFunctionSignature()
+	def matchesTree(self, objectStore:GitObjectStore, treeHash:str) -> bool:
+		if self.__cacheTreeRootHash is not None:
+			return self.__cacheTreeRootHash == treeHash
+
+		treeEntries = {}
+		self.__flattenTree(objectStore, treeHash, "", treeEntries)
+		if len(treeEntries) != len(self.__entries):
+			return False
+		for e in self.__entries:
+			if (e._flags & 0x3000) or (e._extendedFlags & GitIndexEntry.EXTENDED_FLAG_INTENT_TO_ADD):
+				return False
+			if treeEntries.get(e._filePath) != (e._mode, e._objectHash):
+				return False
+		return True
+	#
+
+	################################################################################################################################
+	## Static Methods
+	################################################################################################################################
+
+	#
+	# Load an index file.
+	#
+	# @param		str filePath			The path of the index file, e.g. "<working copy>/.git/index".
+	# @param		bool bVerifyChecksum	If `True` the checksum at the end of the file is verified.
+	#
+	@staticmethod
+	def loadFromFile(filePath:str, bVerifyChecksum:bool = False):
+		entryStruct = GitIndex.__ENTRY_STRUCT
+		hl = GitIndex.__HASH_LENGTH
+
+		with open(filePath, "rb") as f:
+			st = os.fstat(f.fileno())
+			if st.st_size == 0:
+				raise Exception("Not a git index file: " + filePath)
+			mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		try:
+			if (st.st_size < 12 + hl) or (mm[0:4] != GitIndex.__SIGNATURE):
+				raise Exception("Not a git index file: " + filePath)
+			version, count = struct.unpack(">II", mm[4:12])
+			if version not in (2, 3, 4):
+				raise Exception("Unsupported index version " + str(version) + ": " + filePath)
+			if bVerifyChecksum:
+				checksum = mm[-hl:]
+				if (checksum != bytes(hl)) and (hashlib.sha1(mm[:-hl]).digest() != checksum):
+					raise Exception("Index file is corrupt: " + filePath)
+
+			entries = []
+			pos = 12
+			prevPath = b""
+			for _ in range(count):
+				entryStart = pos
+				v = entryStruct.unpack_from(mm, pos)
+				flags = v[11]
+				pos += 62
+				extendedFlags = 0
+				if flags & GitIndexEntry.FLAG_EXTENDED:
+					extendedFlags = struct.unpack_from(">H", mm, pos)[0]
+					pos += 2
+
+				if version == 4:
+					# the path is prefix compressed: remove N bytes from the end of the previous path and append the following string
+					c = mm[pos]
+					pos += 1
+					n = c & 127
+					while c & 128:
+						c = mm[pos]
+						pos += 1
+						n = ((n + 1) << 7) | (c & 127)
+					j = mm.find(b"\0", pos)
+					path = prevPath[:len(prevPath) - n] + mm[pos:j]
+					pos = j + 1
+					prevPath = path
+				else:
+					nameLength = flags & 0xfff
+					if nameLength == 0xfff:
+						nameLength = mm.find(b"\0", pos) - pos
+					path = mm[pos:pos + nameLength]
+					# entries are padded with 1 to 8 NUL bytes to a multiple of eight bytes
+					pos = entryStart + ((pos - entryStart + nameLength + 8) & ~7)
+
+				entries.append(GitIndexEntry(path.decode("utf-8", "surrogateescape"), v[10].hex(), v[:10], flags, extendedFlags))
+
+			# extensions
+
+			cacheTreeRootHash = None
+			end = len(mm) - hl
+			while pos + 8 <= end:
+				signature = mm[pos:pos + 4]
+				size = struct.unpack(">I", mm[pos + 4:pos + 8])[0]
+				if signature == b"TREE":
+					cacheTreeRootHash = GitIndex.__parseCacheTreeRootHash(mm[pos + 8:pos + 8 + size])
+				elif signature == b"link":
+					raise Exception("Split indices are not supported: " + filePath)
+				pos += 8 + size
+		finally:
+			mm.close()
+
+		return GitIndex(filePath, version, entries, st.st_mtime_ns, st.st_size, cacheTreeRootHash)
+	#
+
+#
+
+
+
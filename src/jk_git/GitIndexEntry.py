@@ -0,0 +1,174 @@
+
+
+
+import stat
+import typing
+
+import jk_prettyprintobj
+
+
+
+
+
+#
+# Instances of this class represent a single entry of the index of a repository (`.git/index`): a tracked file together with the
+# stat data git recorded when the file was added or refreshed and the hash of its blob.
+#
+# Stat data is stored the way git stores it: truncated to 32 bits.
+#
+class GitIndexEntry(jk_prettyprintobj.DumpMixin):
+
+	__slots__ = (
+		"_filePath", "_objectHash", "_mode", "_flags", "_extendedFlags",
+		"_ctimeS", "_ctimeNS", "_mtimeS", "_mtimeNS", "_dev", "_ino", "_uid", "_gid", "_size",
+	)
+
+	FLAG_ASSUME_VALID = 0x8000
+	FLAG_EXTENDED = 0x4000
+	EXTENDED_FLAG_SKIP_WORKTREE = 0x4000
+	EXTENDED_FLAG_INTENT_TO_ADD = 0x2000
+
+	MODE_GITLINK = 0o160000
+
+	#
+	# Constructor method.
+	#
+	# @param		str filePath			The path of the file relative to the root directory of the working copy (separated by "/").
+	# @param		str objectHash			The hash of the blob (hexadecimal).
+	# @param		tuple statData			The stat data as stored in the index: ctime (seconds, nanoseconds), mtime (seconds, nanoseconds),
+	#										dev, ino, mode, uid, gid, size.
+	# @param		int flags				The 16 bit flags of the entry (including the stage).
+	# @param		int extendedFlags		The 16 bit extended flags of the entry (index version 3 and later).
+	#
+	def __init__(self, filePath:str, objectHash:str, statData:tuple, flags:int, extendedFlags:int = 0):
+		self._filePath = filePath
+		self._objectHash = objectHash
+		self._ctimeS, self._ctimeNS, self._mtimeS, self._mtimeNS, self._dev, self._ino, self._mode, self._uid, self._gid, self._size = statData
+		self._flags = flags
+		self._extendedFlags = extendedFlags
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def filePath(self) -> str:
+		return self._filePath
+	#
+
+	@property
+	def objectHash(self) -> str:
+		return self._objectHash
+	#
+
+	#
+	# The file mode recorded by git: 0o100644, 0o100755, 0o120000 (symbolic link) or 0o160000 (submodule)
+	#
+	@property
+	def mode(self) -> int:
+		return self._mode
+	#
+
+	@property
+	def size(self) -> int:
+		return self._size
+	#
+
+	@property
+	def mtimeNS(self) -> int:
+		return self._mtimeS * 1000000000 + self._mtimeNS
+	#
+
+	@property
+	def ctimeNS(self) -> int:
+		return self._ctimeS * 1000000000 + self._ctimeNS
+	#
+
+	@property
+	def dev(self) -> int:
+		return self._dev
+	#
+
+	@property
+	def ino(self) -> int:
+		return self._ino
+	#
+
+	@property
+	def uid(self) -> int:
+		return self._uid
+	#
+
+	@property
+	def gid(self) -> int:
+		return self._gid
+	#
+
+	#
+	# The merge stage: 0 for regular entries, 1 (base), 2 (ours) or 3 (theirs) for conflicting entries
+	#
+	@property
+	def stage(self) -> int:
+		return (self._flags >> 12) & 3
+	#
+
+	@property
+	def isAssumeValid(self) -> bool:
+		return bool(self._flags & GitIndexEntry.FLAG_ASSUME_VALID)
+	#
+
+	@property
+	def isSkipWorktree(self) -> bool:
+		return bool(self._extendedFlags & GitIndexEntry.EXTENDED_FLAG_SKIP_WORKTREE)
+	#
+
+	#
+	# Files added with `git add --intent-to-add`
+	#
+	@property
+	def isIntentToAdd(self) -> bool:
+		return bool(self._extendedFlags & GitIndexEntry.EXTENDED_FLAG_INTENT_TO_ADD)
+	#
+
+	@property
+	def isSymLink(self) -> bool:
+		return stat.S_ISLNK(self._mode)
+	#
+
+	@property
+	def isSubmodule(self) -> bool:
+		return (self._mode & 0o170000) == GitIndexEntry.MODE_GITLINK
+	#
+
+	################################################################################################################################
+	## Protected Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self):
+		return [
+			"filePath",
+			"objectHash",
+			"mode",
+			"size",
+			"mtimeNS",
+			"stage",
+		]
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def __str__(self):
+		return "GitIndexEntry<" + "{:06o} {} {} {}".format(self._mode, self._objectHash, self.stage, self._filePath) + ">"
+	#
+
+	def __repr__(self):
+		return self.__str__()
+	#
+
+#
+
+
+
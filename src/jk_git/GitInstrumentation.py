@@ -0,0 +1,351 @@
+
+
+
+import os
+import time
+import typing
+import threading
+import contextlib
+import contextvars
+
+import jk_prettyprintobj
+
+from .GitInvocation import GitInvocation
+from .impl._GitOutputParser import _GitOutputParser
+
+
+
+
+
+#
+# This class records every invocation of git. Recorded invocations are passed to registered callbacks and (if enabled) aggregated:
+#
+# * per command verb and repository: number of invocations, number of failed invocations, wall time, queueing delay and the number
+#	of bytes written to STDOUT and STDERR,
+# * per command verb: a histogram of the wall time.
+#
+# Aggregated metrics can be exported as a dictionary or in Prometheus text format.
+#
+# Every `GitWrapper` (and `AsyncGitWrapper`) provides the instrumentation object of the git binary it uses. This object is shared
+# by all wrappers using the same binary. Long running `git cat-file --batch` processes are not recorded.
+#
+class GitInstrumentation(jk_prettyprintobj.DumpMixin):
+
+	# upper bounds of the histogram buckets in seconds
+	DURATION_BUCKETS = ( 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0 )
+
+	# the time (`time.monotonic()`) the current task has been queued (see `queuedSince()`)
+	__QUEUED_SINCE = contextvars.ContextVar("jk_git_queuedSince", default=None)
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	def __init__(self):
+		self.__lock = threading.Lock()
+		self.__callbacks:typing.List[typing.Callable[[GitInvocation],None]] = []
+		self.__bMetricsEnabled = False
+		self.__callbackErrorCount = 0
+
+		# (verb, repository) -> [ count, errorCount, wallTime, queueDelay, stdOutBytes, stdErrBytes ]
+		self.__counters:typing.Dict[tuple,list] = {}
+		# verb -> [ bucketCounts..., count, sum ]
+		self.__histograms:typing.Dict[str,list] = {}
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	#
+	# Returns `True` if invocations need to be recorded at all.
+	#
+	@property
+	def isActive(self) -> bool:
+		return self.__bMetricsEnabled or bool(self.__callbacks)
+	#
+
+	@property
+	def isMetricsEnabled(self) -> bool:
+		return self.__bMetricsEnabled
+	#
+
+	#
+	# The number of exceptions raised by callbacks. (Exceptions raised by callbacks are ignored.)
+	#
+	@property
+	def callbackErrorCount(self) -> int:
+		return self.__callbackErrorCount
+	#
+
+	################################################################################################################################
+	## Protected Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self):
+		return [
+			"isActive",
+			"isMetricsEnabled",
+			"callbackErrorCount",
+		]
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __escapeLabelValue(s:typing.Union[str,None]) -> str:
+		if s is None:
+			return ""
+		return s.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+	#
+
+	@staticmethod
+	def __formatValue(v:typing.Union[int,float]) -> str:
+		return str(v) if isinstance(v, int) else repr(float(v))
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Register a callback. The callback is invoked with a `GitInvocation` object after every invocation of git. Please note that
+	# callbacks are invoked by the thread that ran git.
+	#
+	def addCallback(self, callback:typing.Callable[[GitInvocation],None]):
+		assert callable(callback)
+		with self.__lock:
+			# (copy on write: callbacks are invoked without holding the lock)
+			self.__callbacks = self.__callbacks + [ callback ]
+	#
+
+	def removeCallback(self, callback:typing.Callable[[GitInvocation],None]):
+		with self.__lock:
+			self.__callbacks = [ x for x in self.__callbacks if x != callback ]
+	#
+
+	def enableMetrics(self):
+		self.__bMetricsEnabled = True
+	#
+
+	def disableMetrics(self):
+		self.__bMetricsEnabled = False
+	#
+
+	def resetMetrics(self):
+		with self.__lock:
+			self.__counters.clear()
+			self.__histograms.clear()
+	#
+
+	#
+	# Record an invocation of git.
+	#
+	def record(self, invocation:GitInvocation):
+		if self.__bMetricsEnabled:
+			verb = invocation.verb or ""
+			with self.__lock:
+				c = self.__counters.get((verb, invocation.repository))
+				if c is None:
+					c = [ 0, 0, 0.0, 0.0, 0, 0 ]
+					self.__counters[(verb, invocation.repository)] = c
+				c[0] += 1
+				if invocation.isError:
+					c[1] += 1
+				c[2] += invocation.wallTime
+				c[3] += invocation.queueDelay
+				c[4] += invocation.stdOutBytes
+				c[5] += invocation.stdErrBytes
+
+				h = self.__histograms.get(verb)
+				if h is None:
+					h = [ 0 ] * (len(GitInstrumentation.DURATION_BUCKETS) + 1) + [ 0.0 ]
+					self.__histograms[verb] = h
+				for i, bound in enumerate(GitInstrumentation.DURATION_BUCKETS):
+					if invocation.wallTime <= bound:
+						h[i] += 1
+						break
+				h[-2] += 1
+				h[-1] += invocation.wallTime
+
+		for callback in self.__callbacks:
+			try:
+				callback(invocation)
+			except Exception:
+				self.__callbackErrorCount += 1
+	#
+
+	#
+	# Record an invocation of git that has just terminated. (This method is used by the git wrappers.)
+	#
+	# @param		str workingDirectory		The directory git has been run in (or `None`).
+	# @param		str[] arguments				The arguments passed to git.
+	# @param		float tQueued				The time the invocation has been requested (`time.monotonic()`) or `None`.
+	# @param		float tStart				The time git has been started (`time.monotonic()`).
+	# @param		int exitCode				The exit code of git.
+	# @param		int stdOutBytes				The number of bytes read from STDOUT.
+	# @param		int stdErrBytes				The number of bytes read from STDERR.
+	#
+	def _recordRun(self,
+			workingDirectory:typing.Union[str,None],
+			arguments:typing.Sequence[str],
+			tQueued:typing.Union[float,None],
+			tStart:float,
+			exitCode:typing.Union[int,None],
+			stdOutBytes:int,
+			stdErrBytes:int,
+		):
+
+		tEnd = time.monotonic()
+		self.record(GitInvocation(
+			_GitOutputParser.getVerb(arguments),
+			arguments,
+			os.path.abspath(workingDirectory) if workingDirectory is not None else None,
+			exitCode,
+			time.time() - (tEnd - tStart),
+			tEnd - tStart,
+			max(0.0, tStart - tQueued) if tQueued is not None else 0.0,
+			stdOutBytes,
+			stdErrBytes,
+		))
+	#
+
+	#
+	# Returns the aggregated metrics:
+	#
+	# {
+	#	"invocations": [
+	#		{ "verb": "status", "repository": "/some/dir", "count": 3, "errorCount": 0, "wallTime": 0.031, "queueDelay": 0.0,
+	#			"stdOutBytes": 1234, "stdErrBytes": 0 },
+	#		...
+	#	],
+	#	"durations": {
+	#		"status": { "buckets": { 0.005: 0, 0.01: 2, ..., "+Inf": 3 }, "count": 3, "sum": 0.031 },
+	#		...
+	#	}
+	# }
+	#
+	# Bucket counts are cumulative (as in Prometheus).
+	#
+	def toDict(self) -> dict:
+		with self.__lock:
+			counters = sorted([ (k, list(v)) for k, v in self.__counters.items() ], key=lambda x: (x[0][0], x[0][1] or ""))
+			histograms = sorted([ (k, list(v)) for k, v in self.__histograms.items() ])
+
+		invocations = []
+		for (verb, repository), c in counters:
+			invocations.append({
+				"verb": verb,
+				"repository": repository,
+				"count": c[0],
+				"errorCount": c[1],
+				"wallTime": c[2],
+				"queueDelay": c[3],
+				"stdOutBytes": c[4],
+				"stdErrBytes": c[5],
+			})
+
+		durations = {}
+		for verb, h in histograms:
+			buckets = {}
+			n = 0
+			for i, bound in enumerate(GitInstrumentation.DURATION_BUCKETS):
+				n += h[i]
+				buckets[bound] = n
+			buckets["+Inf"] = h[-2]
+			durations[verb] = {
+				"buckets": buckets,
+				"count": h[-2],
+				"sum": h[-1],
+			}
+
+		return {
+			"invocations": invocations,
+			"durations": durations,
+		}
+	#
+
+	#
+	# Returns the aggregated metrics in Prometheus text exposition format.
+	#
+	# @param		str prefix			The prefix of all metric names.
+	#
+	def toPrometheusText(self, prefix:str = "jk_git") -> str:
+		data = self.toDict()
+
+		lines = []
+		for key, name, helpText, metricType in [
+				( "count", "invocations_total", "Number of git invocations.", "counter" ),
+				( "errorCount", "invocation_errors_total", "Number of git invocations that terminated with a non-zero exit code.", "counter" ),
+				( "wallTime", "invocation_seconds_total", "Total wall time of git invocations in seconds.", "counter" ),
+				( "queueDelay", "queue_delay_seconds_total", "Total time git invocations have been waiting to be started in seconds.", "counter" ),
+				( "stdOutBytes", "stdout_bytes_total", "Number of bytes written to STDOUT by git.", "counter" ),
+				( "stdErrBytes", "stderr_bytes_total", "Number of bytes written to STDERR by git.", "counter" ),
+			]:
+			lines.append("# HELP " + prefix + "_" + name + " " + helpText)
+			lines.append("# TYPE " + prefix + "_" + name + " " + metricType)
+			for x in data["invocations"]:
+				lines.append("{}_{}{{verb=\"{}\",repository=\"{}\"}} {}".format(
+					prefix,
+					name,
+					GitInstrumentation.__escapeLabelValue(x["verb"]),
+					GitInstrumentation.__escapeLabelValue(x["repository"]),
+					GitInstrumentation.__formatValue(x[key]),
+				))
+
+		name = prefix + "_invocation_duration_seconds"
+		lines.append("# HELP " + name + " Wall time of git invocations in seconds.")
+		lines.append("# TYPE " + name + " histogram")
+		for verb, h in data["durations"].items():
+			verb = GitInstrumentation.__escapeLabelValue(verb)
+			for bound, n in h["buckets"].items():
+				lines.append("{}_bucket{{verb=\"{}\",le=\"{}\"}} {}".format(name, verb, bound, n))
+			lines.append("{}_sum{{verb=\"{}\"}} {}".format(name, verb, GitInstrumentation.__formatValue(h["sum"])))
+			lines.append("{}_count{{verb=\"{}\"}} {}".format(name, verb, h["count"]))
+
+		return "\n".join(lines) + "\n"
+	#
+
+	################################################################################################################################
+	## Static Methods
+	################################################################################################################################
+
+	#
+	# Specify the time the current task has been queued. The first invocation of git within this context will report the time passed
+	# since then as queueing delay. This way the time a task waited for a worker thread (or a semaphore) is attributed to git.
+	#
+	# @param		float t				The time the current task has been queued (as returned by `time.monotonic()`).
+	#
+	@staticmethod
+	@contextlib.contextmanager
+	def queuedSince(t:float):
+		token = GitInstrumentation.__QUEUED_SINCE.set([ t ])
+		try:
+			yield
+		finally:
+			GitInstrumentation.__QUEUED_SINCE.reset(token)
+	#
+
+	#
+	# Returns the time the current task has been queued (see `queuedSince()`) or `None`. Only the first invocation within a
+	# `queuedSince()` context receives the time.
+	#
+	@staticmethod
+	def _takeQueuedSince() -> typing.Union[float,None]:
+		box = GitInstrumentation.__QUEUED_SINCE.get()
+		if box is None:
+			return None
+		t = box[0]
+		box[0] = None
+		return t
+	#
+
+#
+
+
+
@@ -0,0 +1,143 @@
+
+
+
+import typing
+
+import jk_prettyprintobj
+
+
+
+
+
+#
+# Instances of this class describe a single invocation of git as recorded by `GitInstrumentation`.
+#
+class GitInvocation(jk_prettyprintobj.DumpMixin):
+
+	__slots__ = (
+		"_verb", "_arguments", "_repository", "_exitCode", "_timeStamp", "_wallTime", "_queueDelay", "_stdOutBytes", "_stdErrBytes",
+	)
+
+	#
+	# Constructor method.
+	#
+	# @param		str verb				The git command, e.g. "status" or "ls-remote". (`None` if there is no command.)
+	# @param		str[] arguments			All arguments passed to git.
+	# @param		str repository			The directory git has been run in or `None` if git has not been run in a repository.
+	# @param		int exitCode			The exit code of git. (Negative if git has been killed by a signal.)
+	# @param		float timeStamp			The time git has been started (seconds since the epoch).
+	# @param		float wallTime			The number of seconds git has been running.
+	# @param		float queueDelay		The number of seconds the invocation had to wait before git could be started (e.g. for a worker thread).
+	# @param		int stdOutBytes			The number of bytes git wrote to STDOUT (and that have been read).
+	# @param		int stdErrBytes			The number of bytes git wrote to STDERR.
+	#
+	def __init__(self,
+			verb:typing.Union[str,None],
+			arguments:typing.Sequence[str],
+			repository:typing.Union[str,None],
+			exitCode:typing.Union[int,None],
+			timeStamp:float,
+			wallTime:float,
+			queueDelay:float,
+			stdOutBytes:int,
+			stdErrBytes:int,
+		):
+
+		self._verb = verb
+		self._arguments = tuple(arguments)
+		self._repository = repository
+		self._exitCode = exitCode
+		self._timeStamp = timeStamp
+		self._wallTime = wallTime
+		self._queueDelay = queueDelay
+		self._stdOutBytes = stdOutBytes
+		self._stdErrBytes = stdErrBytes
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def verb(self) -> typing.Union[str,None]:
+		return self._verb
+	#
+
+	@property
+	def arguments(self) -> typing.Tuple[str]:
+		return self._arguments
+	#
+
+	@property
+	def repository(self) -> typing.Union[str,None]:
+		return self._repository
+	#
+
+	@property
+	def exitCode(self) -> typing.Union[int,None]:
+		return self._exitCode
+	#
+
+	@property
+	def isError(self) -> bool:
+		return self._exitCode != 0
+	#
+
+	@property
+	def timeStamp(self) -> float:
+		return self._timeStamp
+	#
+
+	@property
+	def wallTime(self) -> float:
+		return self._wallTime
+	#
+
+	@property
+	def queueDelay(self) -> float:
+		return self._queueDelay
+	#
+
+	@property
+	def stdOutBytes(self) -> int:
+		return self._stdOutBytes
+	#
+
+	@property
+	def stdErrBytes(self) -> int:
+		return self._stdErrBytes
+	#
+
+	################################################################################################################################
+	## Protected Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self):
+		return [
+			"verb",
+			"arguments",
+			"repository",
+			"exitCode",
+			"wallTime",
+			"queueDelay",
+			"stdOutBytes",
+			"stdErrBytes",
+		]
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def __str__(self):
+		return "GitInvocation<" + "{} {} rc={} {:.3f}s>".format(self._verb, repr(self._repository), self._exitCode, self._wallTime)
+	#
+
+	def __repr__(self):
+		return self.__str__()
+	#
+
+#
+
+
+
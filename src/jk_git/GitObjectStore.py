@@ -0,0 +1,542 @@
+
+
+
+import os
+import re
+import zlib
+import heapq
+import typing
+import threading
+import collections
+
+import jk_typing
+
+from .GitRefDatabase import GitRefDatabase
+from .impl.GitPackFile import GitPackFile
+
+
+
+
+#
+# This class reads objects directly from the object database of a repository without running git:
+#
+# * loose objects are inflated with zlib,
+# * packed objects are located by binary search in the memory mapped pack indices (version 2),
+# * delta chains (OFS_DELTA and REF_DELTA) are resolved. Resolved base objects are kept in a bounded LRU cache.
+#
+# This class is intended for read only workloads. Alternates, commit graphs and SHA-256 repositories are not supported.
+#
+class GitObjectStore(object):
+
+	DEFAULT_DELTA_BASE_CACHE_SIZE = 32 * 1024 * 1024
+
+	__HASH_LENGTH = 20
+	__TREE_MODE = "40000"
+	__TYPE_NUMS = {
+		b"commit": GitPackFile.OBJ_COMMIT,
+		b"tree": GitPackFile.OBJ_TREE,
+		b"blob": GitPackFile.OBJ_BLOB,
+		b"tag": GitPackFile.OBJ_TAG,
+	}
+	__RE_HEX_HASH = re.compile(r"^[0-9a-f]{40}$")
+	__RE_REVISION = re.compile(r"^(.*?)((?:[~^][0-9]*|\^\{[a-z]*\})*)$")
+	__RE_REVISION_SUFFIX = re.compile(r"~[0-9]*|\^\{[a-z]*\}|\^[0-9]*")
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str gitDirPath					The git directory: the ".git" directory of a working copy or the root directory of a bare repository.
+	# @param		GitRefDatabase refDatabase		(optional) The reference database to use for resolving revisions. If not specified a new one is created.
+	# @param		int deltaBaseCacheSize			(optional) The maximum number of bytes of resolved delta base objects to keep in memory.
+	#
+	@jk_typing.checkFunctionSignature()
+	def __init__(self, gitDirPath:str, refDatabase:GitRefDatabase = None, deltaBaseCacheSize:int = DEFAULT_DELTA_BASE_CACHE_SIZE):
+		self.__gitDirPath = gitDirPath
+		self.__objectsDirPath = os.path.join(gitDirPath, "objects")
+		self.__packDirPath = os.path.join(self.__objectsDirPath, "pack")
+		self.__refDatabase = refDatabase if refDatabase is not None else GitRefDatabase(gitDirPath)
+
+		self.__lock = threading.RLock()
+		self.__packs:typing.Dict[str,GitPackFile] = {}
+		self.__packDirMTime = None
+
+		self.__deltaBaseCacheSize = deltaBaseCacheSize
+		self.__deltaBaseCacheUsed = 0
+		self.__deltaBaseCache = collections.OrderedDict()
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def gitDirPath(self) -> str:
+		return self.__gitDirPath
+	#
+
+	@property
+	def refDatabase(self) -> GitRefDatabase:
+		return self.__refDatabase
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	#
+	# (Re)scan the pack directory if it has been modified. The caller must hold the lock.
+	#
+	# @return		bool			Returns `True` if the set of pack files has been updated.
+	#
+	def __updatePacks(self) -> bool:
+		try:
+			mtime = os.stat(self.__packDirPath).st_mtime_ns
+		except FileNotFoundError:
+			mtime = None
+		if mtime == self.__packDirMTime:
+			return False
+
+		packs = {}
+		if mtime is not None:
+			for fileName in sorted(os.listdir(self.__packDirPath)):
+				if fileName.endswith(".idx") and os.path.isfile(os.path.join(self.__packDirPath, fileName[:-4] + ".pack")):
+					filePath = os.path.join(self.__packDirPath, fileName)
+					packs[filePath] = self.__packs.pop(filePath, None) or GitPackFile(filePath, GitObjectStore.__HASH_LENGTH)
+		# pack files removed by "git gc" or "git repack"
+		for pack in self.__packs.values():
+			pack.close()
+
+		self.__packs = packs
+		self.__packDirMTime = mtime
+		self.__deltaBaseCache.clear()
+		self.__deltaBaseCacheUsed = 0
+		return True
+	#
+
+	def __cacheGet(self, key:tuple) -> typing.Union[typing.Tuple[int,bytes],None]:
+		ret = self.__deltaBaseCache.get(key)
+		if ret is not None:
+			self.__deltaBaseCache.move_to_end(key)
+		return ret
+	#
+
+	def __cachePut(self, key:tuple, typeNum:int, data:bytes):
+		if (len(data) > self.__deltaBaseCacheSize) or (key in self.__deltaBaseCache):
+			return
+		self.__deltaBaseCache[key] = (typeNum, data)
+		self.__deltaBaseCacheUsed += len(data)
+		while self.__deltaBaseCacheUsed > self.__deltaBaseCacheSize:
+			_, (_, d) = self.__deltaBaseCache.popitem(last=False)
+			self.__deltaBaseCacheUsed -= len(d)
+	#
+
+	def __readLoose(self, hexSha:str) -> typing.Union[typing.Tuple[int,bytes],None]:
+		filePath = os.path.join(self.__objectsDirPath, hexSha[:2], hexSha[2:])
+		try:
+			with open(filePath, "rb") as f:
+				raw = zlib.decompress(f.read())
+		except FileNotFoundError:
+			return None
+
+		i = raw.index(b"\0")
+		sType, sSize = raw[:i].split(b" ")
+		data = raw[i + 1:]
+		if len(data) != int(sSize):
+			raise Exception("Corrupt loose object: " + hexSha)
+		return GitObjectStore.__TYPE_NUMS[sType], data
+	#
+
+	#
+	# Read an object from a pack and resolve its delta chain. The caller must hold the lock.
+	#
+	def __readPacked(self, pack:GitPackFile, offset:int) -> typing.Tuple[int,bytes]:
+		# walk down the chain until a regular object or a cached base is found
+		chain = []
+		while True:
+			key = (pack.idxFilePath, offset)
+			cached = self.__cacheGet(key)
+			if cached is not None:
+				typeNum, data = cached
+				break
+			typeNum, data, base = pack.readEntry(offset)
+			if base is None:
+				if chain:
+					self.__cachePut(key, typeNum, data)
+				break
+			chain.append((key, data))
+			if isinstance(base, int):
+				offset = base
+			else:
+				r = self.__readObjectBin(base)
+				if r is None:
+					raise Exception("Missing delta base object: " + base.hex())
+				typeNum, data = r
+				break
+
+		# apply the deltas
+		for i in range(len(chain) - 1, -1, -1):
+			key, delta = chain[i]
+			data = GitPackFile.applyDelta(data, delta)
+			if i > 0:
+				self.__cachePut(key, typeNum, data)
+		return typeNum, data
+	#
+
+	def __readObjectBin(self, binSha:bytes) -> typing.Union[typing.Tuple[int,bytes],None]:
+		with self.__lock:
+			for bRescanned in (False, True):
+				if bRescanned and not self.__updatePacks():
+					break
+				for pack in self.__packs.values():
+					offset = pack.findOffset(binSha)
+					if offset is not None:
+						return self.__readPacked(pack, offset)
+				r = self.__readLoose(binSha.hex())
+				if r is not None:
+					return r
+		return None
+	#
+
+	#
+	# Check if an object exists without reading it: the pack indices are searched and the existence of the loose object file is checked.
+	#
+	def __hasObjectBin(self, binSha:bytes) -> bool:
+		with self.__lock:
+			for bRescanned in (False, True):
+				if bRescanned and not self.__updatePacks():
+					break
+				for pack in self.__packs.values():
+					if pack.findOffset(binSha) is not None:
+						return True
+				hexSha = binSha.hex()
+				if os.path.isfile(os.path.join(self.__objectsDirPath, hexSha[:2], hexSha[2:])):
+					return True
+		return False
+	#
+
+	def __readObjectE(self, hexSha:str, expectedType:str) -> bytes:
+		r = self.readObject(hexSha)
+		if r is None:
+			raise Exception("No such object: " + hexSha)
+		if r[0] != expectedType:
+			raise Exception("Not a " + expectedType + ": " + hexSha)
+		return r[1]
+	#
+
+	#
+	# Resolve a reference name the way git does: "X", "refs/X", "refs/tags/X", "refs/heads/X", "refs/remotes/X", "refs/remotes/X/HEAD".
+	#
+	def __resolveRefName(self, name:str) -> typing.Union[str,None]:
+		for pattern in ( "{}", "refs/{}", "refs/tags/{}", "refs/heads/{}", "refs/remotes/{}", "refs/remotes/{}/HEAD" ):
+			refName = pattern.format(name)
+			if ("/" not in refName) and (refName != "HEAD") and not refName.endswith("_HEAD"):
+				continue
+			h = self.__refDatabase.resolve(refName)
+			if h is not None:
+				return h
+		return None
+	#
+
+	#
+	# Peel tag objects until an object of a different type is reached.
+	#
+	def __peel(self, hexSha:str, targetType:str = None) -> typing.Union[str,None]:
+		while True:
+			r = self.readObject(hexSha)
+			if r is None:
+				return None
+			if r[0] != "tag":
+				break
+			hexSha = GitObjectStore.__parseHeaders(r[1])[0]["object"][0]
+		if (targetType is not None) and (r[0] != targetType):
+			if (targetType == "tree") and (r[0] == "commit"):
+				return GitObjectStore.__parseHeaders(r[1])[0]["tree"][0]
+			return None
+		return hexSha
+	#
+
+	@staticmethod
+	def __parseHeaders(data:bytes) -> typing.Tuple[typing.Dict[str,typing.List[str]],bytes]:
+		i = data.find(b"\n\n")
+		if i < 0:
+			headerData = data
+			message = b""
+		else:
+			headerData = data[:i]
+			message = data[i + 2:]
+
+		headers = {}
+		lastKey = None
+		for line in headerData.split(b"\n"):
+			if line.startswith(b" "):
+				# continuation line (e.g. "gpgsig")
+				if lastKey is not None:
+					headers[lastKey][-1] += "\n" + line[1:].decode("utf-8", "replace")
+				continue
+			k, _, v = line.partition(b" ")
+			lastKey = k.decode("ascii", "replace")
+			headers.setdefault(lastKey, []).append(v.decode("utf-8", "replace"))
+		return headers, message
+	#
+
+	#
+	# Parse an identity such as "John Doe <john@example.org> 1658649600 +0200".
+	#
+	@staticmethod
+	def __parseIdentity(s:str) -> typing.Tuple[str,str,int,str]:
+		i = s.find("<")
+		j = s.rfind(">")
+		if (i < 0) or (j < i):
+			return s.strip(), "", 0, "+0000"
+		parts = s[j + 1:].split()
+		return (
+			s[:i].strip(),
+			s[i + 1:j],
+			int(parts[0]) if parts else 0,
+			parts[1] if len(parts) > 1 else "+0000",
+		)
+	#
+
+	#
+	# Build the subject of a commit message the way `git log --pretty=format:%s` does: the first paragraph joined into a single line.
+	#
+	@staticmethod
+	def __getSubject(message:str) -> str:
+		lines = []
+		for line in message.split("\n"):
+			line = line.rstrip()
+			if not line:
+				if lines:
+					break
+				continue
+			lines.append(line)
+		return " ".join(lines)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Read an object.
+	#
+	# @param		str hexSha			The hash of the object (hexadecimal, 40 characters).
+	# @return		tuple				Returns a tuple `(typeName, data)` with `typeName` being one of "blob", "tree", "commit" or "tag"
+	#									or `None` if the object does not exist.
+	#
+	def readObject(self, hexSha:str) -> typing.Union[typing.Tuple[str,bytes],None]:
+		if not GitObjectStore.__RE_HEX_HASH.match(hexSha):
+			return None
+		r = self.__readObjectBin(bytes.fromhex(hexSha))
+		if r is None:
+			return None
+		return GitPackFile.TYPE_NAMES[r[0]], r[1]
+	#
+
+	#
+	# Check if an object exists. (The object is not read.)
+	#
+	def hasObject(self, hexSha:str) -> bool:
+		if not GitObjectStore.__RE_HEX_HASH.match(hexSha):
+			return False
+		return self.__hasObjectBin(bytes.fromhex(hexSha))
+	#
+
+	#
+	# Resolve a revision to an object hash. Supported are full hashes, "HEAD", branch names, tag names, full reference names
+	# as well as the suffixes "~<n>", "^<n>" and "^{<type>}".
+	#
+	# @return		str					Returns the hash of the object or `None` if the revision could not be resolved.
+	#									(Abbreviated hashes are not supported; `None` is returned for them.)
+	#
+	@jk_typing.checkFunctionSignature()
+	def resolveRevision(self, revision:str) -> typing.Union[str,None]:
+		m = GitObjectStore.__RE_REVISION.match(revision)
+		name = m.group(1)
+		if not name:
+			return None
+
+		if GitObjectStore.__RE_HEX_HASH.match(name):
+			h = name if self.hasObject(name) else None
+		else:
+			h = self.__resolveRefName(name)
+
+		for op in GitObjectStore.__RE_REVISION_SUFFIX.findall(m.group(2)):
+			if h is None:
+				break
+			if op.startswith("^{"):
+				targetType = op[2:-1]
+				h = self.__peel(h, targetType or None) if targetType != "object" else h
+			elif op.startswith("~"):
+				for _ in range(int(op[1:]) if len(op) > 1 else 1):
+					h = self.__peel(h, "commit")
+					parents = self.readCommit(h)["parents"] if h else None
+					h = parents[0] if parents else None
+					if h is None:
+						break
+			else:
+				n = int(op[1:]) if len(op) > 1 else 1
+				h = self.__peel(h, "commit")
+				if h and (n > 0):
+					parents = self.readCommit(h)["parents"]
+					h = parents[n - 1] if n <= len(parents) else None
+		return h
+	#
+
+	#
+	# Parse a commit object.
+	#
+	# @return		dict				A dictionary with the keys "hash", "tree", "parents", "author", "authorEMail", "authorTimestamp",
+	#									"committer", "committerEMail", "commitTimestamp", "commitTZ" (e.g. "+0200") and "message".
+	#
+	@jk_typing.checkFunctionSignature()
+	def readCommit(self, commitHash:str) -> dict:
+		headers, message = GitObjectStore.__parseHeaders(self.__readObjectE(commitHash, "commit"))
+		author = GitObjectStore.__parseIdentity(headers.get("author", [ "" ])[0])
+		committer = GitObjectStore.__parseIdentity(headers.get("committer", [ "" ])[0])
+		encoding = headers.get("encoding", [ "utf-8" ])[0]
+		try:
+			sMessage = message.decode(encoding, "replace")
+		except LookupError:
+			sMessage = message.decode("utf-8", "replace")
+		return {
+			"hash": commitHash,
+			"tree": headers["tree"][0],
+			"parents": headers.get("parent", []),
+			"author": author[0],
+			"authorEMail": author[1],
+			"authorTimestamp": author[2],
+			"committer": committer[0],
+			"committerEMail": committer[1],
+			"commitTimestamp": committer[2],
+			"commitTZ": committer[3],
+			"message": sMessage,
+		}
+	#
+
+	#
+	# Parse a tree object.
+	#
+	# @return		tuple[]				A list of tuples `(mode, name, hash)`, e.g. `("100644", "README.md", "e69de...")`.
+	#
+	@jk_typing.checkFunctionSignature()
+	def readTree(self, treeHash:str) -> typing.List[typing.Tuple[str,str,str]]:
+		data = self.__readObjectE(treeHash, "tree")
+		hl = GitObjectStore.__HASH_LENGTH
+		ret = []
+		pos = 0
+		n = len(data)
+		while pos < n:
+			i = data.index(b" ", pos)
+			j = data.index(b"\0", i)
+			ret.append((
+				data[pos:i].decode("ascii"),
+				data[i + 1:j].decode("utf-8", "surrogateescape"),
+				data[j + 1:j + 1 + hl].hex(),
+			))
+			pos = j + 1 + hl
+		return ret
+	#
+
+	#
+	# Find the hash of an object by its path within a revision.
+	#
+	# @param		str revision		The revision, e.g. "HEAD", a branch name, a tag name or a commit hash.
+	# @param		str path			The path of the file or directory relative to the repository root.
+	# @return		str					Returns the hash or `None` if the revision or path does not exist.
+	#
+	@jk_typing.checkFunctionSignature()
+	def resolvePath(self, revision:str, path:str) -> typing.Union[str,None]:
+		h = self.resolveRevision(revision)
+		h = self.__peel(h, "tree") if h else None
+		if h is None:
+			return None
+
+		# (the type of an entry is known from its mode: every tree is read only once)
+		mode = GitObjectStore.__TREE_MODE
+		for name in path.strip("/").split("/"):
+			if not name:
+				continue
+			if mode != GitObjectStore.__TREE_MODE:
+				return None
+			for mode, entryName, entryHash in self.readTree(h):
+				if entryName == name:
+					h = entryHash
+					break
+			else:
+				return None
+		return h
+	#
+
+	#
+	# Read a file from the specified revision.
+	#
+	# @return		bytes				Returns the file content or `None` if the revision or file does not exist.
+	#
+	@jk_typing.checkFunctionSignature()
+	def readBlob(self, revision:str, filePath:str) -> typing.Union[bytes,None]:
+		h = self.resolvePath(revision, filePath)
+		if h is None:
+			return None
+		r = self.readObject(h)
+		if r is None:
+			return None
+		if r[0] != "blob":
+			raise Exception("Not a file: " + filePath)
+		return r[1]
+	#
+
+	#
+	# Walk the commits reachable from the specified revision from the latest to the oldest commit. The records yielded have the
+	# same format as the records of `GitWrapper.iterLogParsable()`.
+	#
+	# @param		str revision		(optional) The revision to start with. Defaults to "HEAD".
+	#
+	def iterLogRecords(self, revision:str = "HEAD") -> typing.Iterator[typing.Tuple[str,str,str,str,str,str]]:
+		h = self.resolveRevision(revision)
+		h = self.__peel(h, "commit") if h else None
+		if h is None:
+			return
+
+		# like git: process commits ordered by their commit time
+		c = self.readCommit(h)
+		seen = { h }
+		heap = [ (-c["commitTimestamp"], 0, c) ]
+		counter = 1
+		while heap:
+			_, _, c = heapq.heappop(heap)
+			yield (
+				" ".join(c["parents"]),
+				c["hash"],
+				c["committer"],
+				c["committerEMail"],
+				str(c["commitTimestamp"]) + " " + c["commitTZ"],
+				GitObjectStore.__getSubject(c["message"]),
+			)
+			for p in c["parents"]:
+				if p not in seen:
+					seen.add(p)
+					pc = self.readCommit(p)
+					heapq.heappush(heap, (-pc["commitTimestamp"], counter, pc))
+					counter += 1
+	#
+
+	def close(self):
+		with self.__lock:
+			for pack in self.__packs.values():
+				pack.close()
+			self.__packs = {}
+			self.__packDirMTime = None
+			self.__deltaBaseCache.clear()
+			self.__deltaBaseCacheUsed = 0
+	#
+
+#
+
+
+
+
@@ -0,0 +1,296 @@
+
+
+
+import os
+import typing
+import threading
+
+import jk_typing
+
+
+
+
+
+#
+# This class reads the references (branches, tags, remote branches, ...) of a repository directly from disk without running git.
+# Loose references below "refs/" as well as "packed-refs" (including peeled tags) are supported. Symbolic references (like "HEAD")
+# are resolved.
+#
+# All data is cached. The cache is invalidated automatically if the modification time of "packed-refs" or of any directory below
+# "refs/" changes. (Git always replaces references by renaming a lock file which changes the modification time of the directory.)
+#
+class GitRefDatabase(object):
+
+	__MAX_SYMREF_DEPTH = 5
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str gitDirPath			The git directory: the ".git" directory of a working copy or the root directory of a bare repository.
+	#
+	@jk_typing.checkFunctionSignature()
+	def __init__(self, gitDirPath:str):
+		self.__gitDirPath = gitDirPath
+
+		self.__lock = threading.Lock()
+		self.__fingerprint = None
+		self.__refs:typing.Dict[str,str] = {}
+		self.__symRefs:typing.Dict[str,str] = {}
+		self.__peeledRefs:typing.Dict[str,str] = {}
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def gitDirPath(self) -> str:
+		return self.__gitDirPath
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __getMTime(path:str) -> typing.Union[int,None]:
+		try:
+			return os.stat(path).st_mtime_ns
+		except FileNotFoundError:
+			return None
+	#
+
+	#
+	# Walk all directories below "refs/" and collect their modification times as well as the paths of all files.
+	#
+	def __scanRefsDir(self) -> typing.Tuple[tuple,typing.List[typing.Tuple[str,str]]]:
+		mtimes = []
+		files = []
+		stack = [ "refs" ]
+		while stack:
+			refPrefix = stack.pop()
+			dirPath = os.path.join(self.__gitDirPath, refPrefix)
+			try:
+				mtimes.append((refPrefix, os.stat(dirPath).st_mtime_ns))
+				it = os.scandir(dirPath)
+			except (FileNotFoundError, NotADirectoryError):
+				continue
+			with it:
+				for fe in it:
+					refName = refPrefix + "/" + fe.name
+					if fe.is_dir(follow_symlinks=False):
+						stack.append(refName)
+					elif fe.is_file() and not fe.name.endswith(".lock"):
+						files.append((refName, fe.path))
+		mtimes.sort()
+		return tuple(mtimes), files
+	#
+
+	@staticmethod
+	def __parsePackedRefs(filePath:str, refs:typing.Dict[str,str], peeledRefs:typing.Dict[str,str]):
+		try:
+			with open(filePath, "r", encoding="utf-8") as f:
+				lines = f.read().split("\n")
+		except FileNotFoundError:
+			return
+
+		lastRefName = None
+		for line in lines:
+			if not line or line.startswith("#"):
+				continue
+			if line.startswith("^"):
+				# peeled value of the previous (annotated tag) reference
+				if lastRefName is not None:
+					peeledRefs[lastRefName] = line[1:].strip()
+				continue
+			parts = line.split(" ", 1)
+			if len(parts) != 2:
+				continue
+			lastRefName = parts[1].strip()
+			refs[lastRefName] = parts[0]
+	#
+
+	@staticmethod
+	def __readRefFile(filePath:str) -> typing.Union[str,None]:
+		try:
+			with open(filePath, "r", encoding="utf-8") as f:
+				return f.readline().strip()
+		except (FileNotFoundError, IsADirectoryError):
+			return None
+	#
+
+	#
+	# (Re)load all data if necessary. The caller must hold the lock.
+	#
+	def __update(self):
+		packedRefsMTime = GitRefDatabase.__getMTime(os.path.join(self.__gitDirPath, "packed-refs"))
+		dirMTimes, files = self.__scanRefsDir()
+		fingerprint = (packedRefsMTime, dirMTimes)
+		if fingerprint == self.__fingerprint:
+			return
+
+		refs = {}
+		peeledRefs = {}
+		symRefs = {}
+
+		GitRefDatabase.__parsePackedRefs(os.path.join(self.__gitDirPath, "packed-refs"), refs, peeledRefs)
+
+		# loose references take precedence over packed references
+		for refName, filePath in files:
+			content = GitRefDatabase.__readRefFile(filePath)
+			if not content:
+				continue
+			if content.startswith("ref:"):
+				symRefs[refName] = content[4:].strip()
+				refs.pop(refName, None)
+			else:
+				refs[refName] = content
+				peeledRefs.pop(refName, None)
+
+		self.__refs = refs
+		self.__peeledRefs = peeledRefs
+		self.__symRefs = symRefs
+		self.__fingerprint = fingerprint
+	#
+
+	#
+	# Resolve a reference. The caller must hold the lock.
+	#
+	def __resolve(self, refName:str) -> typing.Union[str,None]:
+		for _ in range(GitRefDatabase.__MAX_SYMREF_DEPTH):
+			if refName.startswith("refs/"):
+				h = self.__refs.get(refName)
+				if h is not None:
+					return h
+				target = self.__symRefs.get(refName)
+			else:
+				# pseudo references such as "HEAD" or "ORIG_HEAD" are stored directly in the git directory
+				content = GitRefDatabase.__readRefFile(os.path.join(self.__gitDirPath, refName))
+				if not content:
+					return None
+				if not content.startswith("ref:"):
+					return content.split()[0]
+				target = content[4:].strip()
+			if target is None:
+				return None
+			refName = target
+		return None
+	#
+
+	#
+	# Get the target of a symbolic reference. The caller must hold the lock.
+	#
+	def __readSymbolicRef(self, refName:str) -> typing.Union[str,None]:
+		if refName.startswith("refs/"):
+			return self.__symRefs.get(refName)
+
+		content = GitRefDatabase.__readRefFile(os.path.join(self.__gitDirPath, refName))
+		if content and content.startswith("ref:"):
+			return content[4:].strip()
+		return None
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Get all references below "refs/" with the hashes of the objects they point to. Symbolic references are resolved.
+	#
+	# @return		dict			A dictionary that maps full reference names (e.g. "refs/heads/master") to object hashes.
+	#
+	def getRefs(self) -> typing.Dict[str,str]:
+		with self.__lock:
+			self.__update()
+			ret = dict(self.__refs)
+			for refName in self.__symRefs:
+				h = self.__resolve(refName)
+				if h is not None:
+					ret[refName] = h
+			return ret
+	#
+
+	#
+	# Get the peeled values of all annotated tags (= the hashes of the objects the tags point to) as far as they are known
+	# from "packed-refs".
+	#
+	def getPeeledRefs(self) -> typing.Dict[str,str]:
+		with self.__lock:
+			self.__update()
+			return dict(self.__peeledRefs)
+	#
+
+	#
+	# Get all references with the specified prefix.
+	#
+	# @param		str prefix		A prefix such as "refs/heads/". The prefix is removed from the names returned.
+	# @return		dict			A dictionary that maps the (shortened) reference names to object hashes.
+	#
+	def getRefsWithPrefix(self, prefix:str) -> typing.Dict[str,str]:
+		n = len(prefix)
+		return {
+			k[n:]: v for k, v in self.getRefs().items() if k.startswith(prefix)
+		}
+	#
+
+	#
+	# Get all local branches.
+	#
+	# @return		dict			A dictionary that maps branch names (e.g. "feature/x") to commit hashes.
+	#
+	def getHeads(self) -> typing.Dict[str,str]:
+		return self.getRefsWithPrefix("refs/heads/")
+	#
+
+	#
+	# Get all tags.
+	#
+	# @return		dict			A dictionary that maps tag names to object hashes. (For annotated tags this is the hash of the tag object.)
+	#
+	def getTags(self) -> typing.Dict[str,str]:
+		return self.getRefsWithPrefix("refs/tags/")
+	#
+
+	#
+	# Resolve a reference.
+	#
+	# @param		str refName		A full reference name such as "HEAD" or "refs/heads/master".
+	# @return		str				The hash of the object the reference points to or `None` if the reference does not exist.
+	#
+	@jk_typing.checkFunctionSignature()
+	def resolve(self, refName:str) -> typing.Union[str,None]:
+		with self.__lock:
+			self.__update()
+			return self.__resolve(refName)
+	#
+
+	#
+	# Get the target of a symbolic reference.
+	#
+	# @param		str refName		A full reference name such as "HEAD".
+	# @return		str				The name of the reference this reference points to (e.g. "refs/heads/master") or `None` if this is not a symbolic reference.
+	#
+	@jk_typing.checkFunctionSignature()
+	def readSymbolicRef(self, refName:str) -> typing.Union[str,None]:
+		with self.__lock:
+			self.__update()
+			return self.__readSymbolicRef(refName)
+	#
+
+	#
+	# Discard all cached data.
+	#
+	def invalidate(self):
+		with self.__lock:
+			self.__fingerprint = None
+	#
+
+#
+
+
+
+
@@ -0,0 +1,124 @@
+
+
+
+import typing
+
+import jk_prettyprintobj
+
+
+
+
+
+#
+# Instances of this class describe the update of a single reference by `git fetch` (see `GitWrapper.fetch()`).
+#
+class GitRefUpdate(jk_prettyprintobj.DumpMixin):
+
+	# the kinds of updates (and the flags `git fetch --porcelain` uses for them)
+	KIND_FAST_FORWARD = "fastForward"		# " "
+	KIND_FORCED = "forced"					# "+"
+	KIND_PRUNED = "pruned"					# "-"
+	KIND_TAG = "tag"						# "t" (an existing tag has been changed)
+	KIND_NEW = "new"						# "*"
+	KIND_REJECTED = "rejected"				# "!"
+	KIND_UP_TO_DATE = "upToDate"			# "="
+
+	__slots__ = (
+		"_kind", "_refName", "_oldHash", "_newHash", "_remote",
+	)
+
+	#
+	# Constructor method.
+	#
+	# @param		str kind				The kind of the update (see `KIND_*`).
+	# @param		str refName				The local reference that has been updated, e.g. "refs/remotes/origin/master".
+	# @param		str oldHash				The hash the reference pointed to before or `None` if the reference is new.
+	# @param		str newHash				The hash the reference points to now or `None` if the reference has been pruned.
+	# @param		str remote				The remote the reference belongs to or `None` if not known (e.g. for tags).
+	#
+	def __init__(self,
+			kind:str,
+			refName:str,
+			oldHash:typing.Union[str,None],
+			newHash:typing.Union[str,None],
+			remote:typing.Union[str,None],
+		):
+
+		self._kind = kind
+		self._refName = refName
+		self._oldHash = oldHash
+		self._newHash = newHash
+		self._remote = remote
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def kind(self) -> str:
+		return self._kind
+	#
+
+	@property
+	def refName(self) -> str:
+		return self._refName
+	#
+
+	@property
+	def oldHash(self) -> typing.Union[str,None]:
+		return self._oldHash
+	#
+
+	@property
+	def newHash(self) -> typing.Union[str,None]:
+		return self._newHash
+	#
+
+	@property
+	def remote(self) -> typing.Union[str,None]:
+		return self._remote
+	#
+
+	################################################################################################################################
+	## Protected Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self):
+		return [
+			"kind",
+			"refName",
+			"oldHash",
+			"newHash",
+			"remote",
+		]
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def __str__(self):
+		return "GitRefUpdate<" + "{} {} {}..{}>".format(self._kind, self._refName, self._oldHash, self._newHash)
+	#
+
+	def __repr__(self):
+		return self.__str__()
+	#
+
+	def __eq__(self, other):
+		if not isinstance(other, GitRefUpdate):
+			return NotImplemented
+		return (self._kind, self._refName, self._oldHash, self._newHash, self._remote) \
+			== (other._kind, other._refName, other._oldHash, other._newHash, other._remote)
+	#
+
+	def __hash__(self):
+		return hash((self._kind, self._refName, self._oldHash, self._newHash))
+	#
+
+#
+
+
+
+
@@ -4,10 +4,11 @@ import typing
 import re
 import os
 
-import jk_utils
 import jk_prettyprintobj
 
 from .GitWrapper import GitWrapper
+from .GitDeadline import GitDeadline
+from .GitCancellationToken import GitCancellationToken
 from .GitCommitHistory import GitCommitHistory
 
 
@@ -24,13 +25,21 @@ class GitRemoteRepository(jk_prettyprintobj.DumpMixin):
 	## Constructors
 	################################################################################################################################
 
-	def __init__(self, url:str):
+	#
+	# Constructor method.
+	#
+	# @param		str url						The URL of the remote repository.
+	# @param		GitWrapper gitWrapper		(optional) The git wrapper to use, e.g. one with a `GitSSHMultiplexer`.
+	#
+	def __init__(self, url:str, gitWrapper:GitWrapper = None):
 		assert isinstance(url, str)
+		if gitWrapper is not None:
+			assert isinstance(gitWrapper, GitWrapper)
 
 		self.__url = url
-		self.__gitWrapper = GitWrapper()
+		self.__gitWrapper = gitWrapper if gitWrapper is not None else GitWrapper()
 
-		self.__volatileValue_lsRemote = jk_utils.VolatileValue(self.__lsRemote, 15)					# 15 seconds caching time
+		self.__volatileValue_lsRemote = None
 	#
 
 	################################################################################################################################
@@ -44,7 +53,7 @@ class GitRemoteRepository(jk_prettyprintobj.DumpMixin):
 
 	@property
 	def headRevisionID(self) -> str:
-		for revID, revName in self.__volatileValue_lsRemote.value:
+		for revID, revName in self.__lsRemoteCached():
 			if revName == "HEAD":
 				return revID
 		raise Exception("Head revision not found!")
@@ -65,6 +74,17 @@ class GitRemoteRepository(jk_prettyprintobj.DumpMixin):
 	## Helper Methods
 	################################################################################################################################
 
+	#
+	# Returns the output of `__lsRemote()`. The result is cached for 15 seconds.
+	#
+	def __lsRemoteCached(self) -> list:
+		# (jk_utils is imported on first use only as importing it is expensive)
+		if self.__volatileValue_lsRemote is None:
+			import jk_utils
+			self.__volatileValue_lsRemote = jk_utils.VolatileValue(self.__lsRemote, 15)				# 15 seconds caching time
+		return self.__volatileValue_lsRemote.value
+	#
+
 	#
 	# Returns something like:
 	# [
@@ -84,6 +104,7 @@ class GitRemoteRepository(jk_prettyprintobj.DumpMixin):
 	# Run a <c>git clone</c> request.
 	# The target directory must be empty. If it does not exist it will be created.
 	#
+	@GitDeadline.aware
 	def checkout(self, toDirPath:str):
 		assert isinstance(toDirPath, str)
 		os.makedirs(toDirPath, exist_ok=True)
@@ -99,5 +120,41 @@ class GitRemoteRepository(jk_prettyprintobj.DumpMixin):
 	## Static Methods
 	################################################################################################################################
 
+	#
+	# Retrieve the head revisions of many remote repositories concurrently. (See `GitWrapper.lsRemoteMany()`.)
+	#
+	# @param		GitWrapper gitWrapper		(optional) The git wrapper to use, e.g. one with a `GitSSHMultiplexer`.
+	# @return		dict				A dictionary that maps every URL to either the hash of the head revision or the exception that occurred.
+	#
+	@staticmethod
+	def getHeadRevisionIDs(
+			urls:typing.Iterable[str],
+			maxConcurrency:int = 16,
+			maxConcurrencyPerHost:int = 4,
+			timeout:typing.Union[float,int,None] = 60,
+			*,
+			deadline:typing.Union[float,int,None] = None,
+			cancellationToken:GitCancellationToken = None,
+			gitWrapper:GitWrapper = None,
+		) -> typing.Dict[str,typing.Union[str,Exception]]:
+
+		if gitWrapper is None:
+			gitWrapper = GitWrapper()
+
+		ret = {}
+		for url, refs in gitWrapper.lsRemoteMany(urls, maxConcurrency, maxConcurrencyPerHost, timeout,
+				deadline=deadline, cancellationToken=cancellationToken).items():
+			if isinstance(refs, Exception):
+				ret[url] = refs
+				continue
+			for revID, revName in refs:
+				if revName == "HEAD":
+					ret[url] = revID
+					break
+			else:
+				ret[url] = Exception("Head revision not found!")
+		return ret
+	#
+
 #
 
@@ -0,0 +1,286 @@
+
+
+
+import os
+import stat
+import shlex
+import atexit
+import socket
+import typing
+import threading
+import subprocess
+
+import jk_prettyprintobj
+
+
+
+
+
+#
+# This class makes git reuse SSH connections: instead of performing a full SSH handshake for every `ls-remote`, `fetch`, `pull` or
+# `clone` a single master connection per remote host (and user and port) is established and kept open for `controlPersist` seconds
+# after its last use. All subsequent invocations of git talking to the same host are multiplexed over this connection.
+#
+# This is done by means of the OpenSSH options `ControlMaster`, `ControlPersist` and `ControlPath` that are added to the SSH command
+# git uses (`GIT_SSH_COMMAND`). The control sockets are kept in a private directory. Use it with a `GitWrapper`:
+#
+#	with GitSSHMultiplexer() as sshMultiplexer:
+#		git = GitWrapper(sshMultiplexer=sshMultiplexer)
+#		for url in urls:
+#			git.lsRemote_url(url)
+#
+# `close()` terminates all master connections and removes the control sockets. It is invoked automatically on exit.
+#
+class GitSSHMultiplexer(jk_prettyprintobj.DumpMixin):
+
+	DEFAULT_CONTROL_PERSIST = 60
+
+	# the maximum length of the path of a UNIX domain socket (the smallest limit of all platforms: 104 bytes on BSD/macOS)
+	__MAX_SOCKET_PATH_LENGTH = 103
+	# the control socket name: `%C` is a hash of the local host name, the remote host name, the port and the user (40 characters)
+	__SOCKET_NAME_PATTERN = "%C"
+	__SOCKET_NAME_LENGTH = 40
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str controlDirPath			(optional) The directory to keep the control sockets in. If not specified a private temporary
+	#											directory is created (and removed by `close()`). Control sockets of a directory specified here
+	#											survive this object if `bCloseAtExit` is `False`; stale sockets are removed on first use.
+	# @param		int controlPersist			(optional) The number of seconds an idle master connection is kept open.
+	# @param		str sshCommand				(optional) The SSH command to extend. If not specified the value of `GIT_SSH_COMMAND`
+	#											(or `GIT_SSH`) is used at the time git is invoked, `ssh` otherwise.
+	# @param		bool bCloseAtExit			(optional) If `True` `close()` is invoked automatically when the interpreter exits.
+	#
+	def __init__(self,
+			controlDirPath:str = None,
+			controlPersist:int = DEFAULT_CONTROL_PERSIST,
+			sshCommand:str = None,
+			bCloseAtExit:bool = True,
+		):
+
+		assert isinstance(controlPersist, int) and (controlPersist > 0)
+		if controlDirPath is not None:
+			controlDirPath = os.path.abspath(controlDirPath)
+			if len(os.path.join(controlDirPath, "x" * GitSSHMultiplexer.__SOCKET_NAME_LENGTH)) > GitSSHMultiplexer.__MAX_SOCKET_PATH_LENGTH:
+				raise Exception("Path too long for control sockets: " + repr(controlDirPath))
+
+		self.__controlDirPath = controlDirPath
+		self.__bOwnsControlDir = controlDirPath is None
+		self.__bControlDirPrepared = False
+		self.__controlPersist = controlPersist
+		self.__sshCommand = sshCommand
+		self.__bCloseAtExit = bCloseAtExit
+		self.__bClosed = False
+		self.__lock = threading.Lock()
+
+		if bCloseAtExit:
+			atexit.register(self.close)
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	#
+	# The directory the control sockets are kept in. (It is created on first access.)
+	#
+	@property
+	def controlDirPath(self) -> str:
+		self.__prepareControlDir()
+		return self.__controlDirPath
+	#
+
+	@property
+	def controlPersist(self) -> int:
+		return self.__controlPersist
+	#
+
+	@property
+	def isClosed(self) -> bool:
+		return self.__bClosed
+	#
+
+	#
+	# The paths of the control sockets that currently exist, one for each master connection.
+	#
+	@property
+	def controlSocketPaths(self) -> typing.List[str]:
+		if self.__controlDirPath is None:
+			return []
+		ret = []
+		try:
+			with os.scandir(self.__controlDirPath) as it:
+				for entry in it:
+					if stat.S_ISSOCK(entry.stat(follow_symlinks=False).st_mode):
+						ret.append(entry.path)
+		except FileNotFoundError:
+			pass
+		return sorted(ret)
+	#
+
+	################################################################################################################################
+	## Protected Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self):
+		return [
+			"controlDirPath",
+			"controlPersist",
+			"isClosed",
+			"controlSocketPaths",
+		]
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	#
+	# Create the control directory (if required) and remove stale control sockets left behind by a previous process.
+	#
+	def __prepareControlDir(self):
+		with self.__lock:
+			if self.__bClosed:
+				raise Exception("This SSH multiplexer has been closed!")
+			if self.__bControlDirPrepared:
+				return
+
+			if self.__controlDirPath is None:
+				import tempfile
+				# (tempfile.mkdtemp() creates the directory with mode 0700: no other user can connect to the control sockets)
+				self.__controlDirPath = tempfile.mkdtemp(prefix="jk_git-ssh-")
+			else:
+				os.makedirs(self.__controlDirPath, mode=0o700, exist_ok=True)
+				self.removeStaleSockets()
+			self.__bControlDirPrepared = True
+	#
+
+	#
+	# Returns the SSH command to extend: either the one specified or the one configured in the specified environment.
+	#
+	def __getBaseSSHCommand(self, environment:typing.Mapping[str,str]) -> str:
+		if self.__sshCommand is not None:
+			return self.__sshCommand
+		s = environment.get("GIT_SSH_COMMAND")
+		if s:
+			return s
+		s = environment.get("GIT_SSH")
+		if s:
+			return shlex.quote(s)
+		return "ssh"
+	#
+
+	@staticmethod
+	def __isSocketAlive(socketPath:str) -> bool:
+		s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		try:
+			s.connect(socketPath)
+			return True
+		except OSError:
+			return False
+		finally:
+			s.close()
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Returns the SSH command git should use (the value for `GIT_SSH_COMMAND`).
+	#
+	# @param		dict environment		(optional) The environment to take the SSH command to extend from. Defaults to `os.environ`.
+	#
+	def getSSHCommand(self, environment:typing.Mapping[str,str] = None) -> str:
+		controlPath = os.path.join(self.controlDirPath, GitSSHMultiplexer.__SOCKET_NAME_PATTERN)
+		options = " -o ControlMaster=auto -o ControlPersist={} -o ControlPath={}".format(self.__controlPersist, shlex.quote(controlPath))
+
+		baseCommand = self.__getBaseSSHCommand(os.environ if environment is None else environment)
+		if baseCommand.endswith(options):
+			# (the environment has been prepared by this object already)
+			return baseCommand
+		return baseCommand + options
+	#
+
+	#
+	# Returns the environment to run git with.
+	#
+	# @param		dict environment		(optional) The environment to extend. Defaults to `os.environ`.
+	# @return		dict					A copy of the environment with `GIT_SSH_COMMAND` set.
+	#
+	def getEnvironment(self, environment:typing.Mapping[str,str] = None) -> typing.Dict[str,str]:
+		ret = dict(os.environ if environment is None else environment)
+		ret["GIT_SSH_COMMAND"] = self.getSSHCommand(ret)
+		return ret
+	#
+
+	#
+	# Remove control sockets no master connection is listening on any more (e.g. because the master has been killed).
+	#
+	# @return		int				The number of sockets removed.
+	#
+	def removeStaleSockets(self) -> int:
+		n = 0
+		for socketPath in self.controlSocketPaths:
+			if not GitSSHMultiplexer.__isSocketAlive(socketPath):
+				try:
+					os.unlink(socketPath)
+					n += 1
+				except FileNotFoundError:
+					pass
+		return n
+	#
+
+	#
+	# Terminate all master connections and remove the control sockets (and the control directory if it has been created by this
+	# object). Git processes still using a connection are disconnected. Invoking this method more than once has no effect.
+	#
+	def close(self):
+		with self.__lock:
+			if self.__bClosed:
+				return
+			self.__bClosed = True
+		if self.__bCloseAtExit:
+			atexit.unregister(self.close)
+
+		if self.__controlDirPath is None:
+			return
+
+		baseCommand = self.__getBaseSSHCommand(os.environ)
+		for socketPath in self.controlSocketPaths:
+			# ask the master to exit; the destination is required by ssh but not used as the control socket is specified explicitly
+			try:
+				subprocess.run(baseCommand + " -o ControlPath=" + shlex.quote(socketPath) + " -O exit jk_git-control",
+					shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10)
+			except subprocess.TimeoutExpired:
+				pass
+			try:
+				os.unlink(socketPath)
+			except FileNotFoundError:
+				pass
+
+		if self.__bOwnsControlDir:
+			try:
+				os.rmdir(self.__controlDirPath)
+			except OSError:
+				pass
+	#
+
+	def __enter__(self):
+		return self
+	#
+
+	def __exit__(self, exType, exObj, exStackTrace):
+		self.close()
+	#
+
+#
+
+
+
+
@@ -2,13 +2,18 @@
 
 import re
 import os
+import typing
 
 import jk_logging
-import jk_utils
 import jk_prettyprintobj
 
 from .GitWrapper import GitWrapper
 from .GitCommitHistory import GitCommitHistory
+from .GitCommitHistoryCache import GitCommitHistoryCache
+from .GitRefDatabase import GitRefDatabase
+from .GitObjectStore import GitObjectStore
+from .GitDeadline import GitDeadline
+from .impl._GitOutputParser import _GitOutputParser
 #from .GitConfigFile import GitConfigFile			# not needed
 
 
@@ -23,7 +28,14 @@ class GitServerRepository(jk_prettyprintobj.DumpMixin):
 	## Constructors
 	################################################################################################################################
 
-	def __init__(self, rootDir:str, log:jk_logging.AbstractLogger):
+	#
+	# Constructor method.
+	#
+	# @param		str rootDir						The root directory of the bare repository.
+	# @param		bool bUseNativeObjectStore		(optional) If `True` files and commits are read directly from the object database
+	#												(see `GitObjectStore`) instead of running git.
+	#
+	def __init__(self, rootDir:str, log:jk_logging.AbstractLogger, bUseNativeObjectStore:bool = False):
 		self.__gitWrapper = GitWrapper(log)
 		bIsGitRoot = GitServerRepository.__isRootDir(os.path.abspath(rootDir))
 		if bIsGitRoot:
@@ -31,14 +43,15 @@ class GitServerRepository(jk_prettyprintobj.DumpMixin):
 		else:
 			raise Exception("Can't find git root directory: " + rootDir)
 
-		self.__gitHeadsDirPath = os.path.join(rootDir, "refs", "heads")
-		self.__gitTagsDirPath = os.path.join(rootDir, "refs", "tags")
 		#self.__gitCfgFile = GitConfigFile(os.path.join(rootDir, "config"))		# not needed
 
-		self.__volatileValue_getSize = jk_utils.VolatileValue(self.__getSizeInBytes, 15)			# 15 seconds caching time
-		self.__volatileValue_getHeadName = jk_utils.VolatileValue(self.__getHeadName, 15)			# 15 seconds caching time
-		self.__volatileValue_getHeads = jk_utils.VolatileValue(self.__getHeads, 15)					# 15 seconds caching time
-		self.__volatileValue_getTags = jk_utils.VolatileValue(self.__getTags, 15)					# 15 seconds caching time
+		self.__refDatabase = GitRefDatabase(rootDir)
+		self.__bUseNativeObjectStore = bUseNativeObjectStore
+		self.__objectStore = None
+
+		self.__volatileValue_getSize = None
+
+		self.__historyCache = None
 	#
 
 	################################################################################################################################
@@ -55,7 +68,7 @@ class GitServerRepository(jk_prettyprintobj.DumpMixin):
 	#
 	@property
 	def headName(self) -> str:
-		return self.__volatileValue_getHeadName.value
+		return self.__getHeadName()
 	#
 
 	#
@@ -63,22 +76,50 @@ class GitServerRepository(jk_prettyprintobj.DumpMixin):
 	#
 	@property
 	def sizeInBytes(self) -> int:
+		# (jk_utils is imported on first use only as importing it is expensive)
+		if self.__volatileValue_getSize is None:
+			import jk_utils
+			self.__volatileValue_getSize = jk_utils.VolatileValue(self.__getSizeInBytes, 15)		# 15 seconds caching time
 		return self.__volatileValue_getSize.value
 	#
 
 	@property
 	def isEmpty(self) -> bool:
-		return not self.__volatileValue_getHeads.value					# return True if we have no heads
+		return not self.__refDatabase.getHeads()						# return True if we have no heads
 	#
 
+	#
+	# The names of all branches (sorted)
+	#
 	@property
 	def heads(self) -> list:
-		return self.__volatileValue_getHeads.value
+		return sorted(self.__refDatabase.getHeads().keys())
 	#
 
+	#
+	# The names of all tags (sorted)
+	#
 	@property
 	def tags(self) -> list:
-		return self.__volatileValue_getTags.value
+		return sorted(self.__refDatabase.getTags().keys())
+	#
+
+	#
+	# The reference database of this repository. Use this to retrieve references together with the commit hashes they point to.
+	#
+	@property
+	def refDatabase(self) -> GitRefDatabase:
+		return self.__refDatabase
+	#
+
+	#
+	# The native object store of this repository. It is created on first access.
+	#
+	@property
+	def objectStore(self) -> GitObjectStore:
+		if self.__objectStore is None:
+			self.__objectStore = GitObjectStore(self.__gitRootDir, self.__refDatabase)
+		return self.__objectStore
 	#
 
 	################################################################################################################################
@@ -100,45 +141,21 @@ class GitServerRepository(jk_prettyprintobj.DumpMixin):
 	## Helper Methods
 	################################################################################################################################
 
-	def __getTags(self) -> list:
-		ret = []
-		for fe in os.scandir(self.__gitTagsDirPath):
-			if fe.is_file:
-				ret.append(fe.name)
-		return sorted(ret)
-	#
-
-	def __getHeads(self) -> list:
-		ret = []
-		for fe in os.scandir(self.__gitHeadsDirPath):
-			if fe.is_file:
-				ret.append(fe.name)
-		return sorted(ret)
-	#
-
 	#
 	# Load the name of the head revision
 	#
 	def __getHeadName(self) -> str:
-		p = os.path.join(self.__gitRootDir, "HEAD")
-		if not os.path.isfile(p):
-			raise Exception(repr(p))
-
-		with open(p, "r") as f:
-			lines = f.read().split("\n")
-			line = lines[0]
-
-		m = re.match("^ref:\s+refs/heads/(\w+)$", line)
-		if not m:
-			raise Exception(repr(line))
-
-		return m.group(1)
+		target = self.__refDatabase.readSymbolicRef("HEAD")
+		if (target is None) or not target.startswith("refs/heads/"):
+			raise Exception("HEAD does not refer to a branch: " + repr(target))
+		return target[11:]
 	#
 
 	#
 	# Get the size of the repository folder in bytes
 	#
 	def __getSizeInBytes(self) -> int:
+		import jk_utils
 		return jk_utils.fsutils.getFolderSize(self.__gitRootDir)
 	#
 
@@ -146,11 +163,49 @@ class GitServerRepository(jk_prettyprintobj.DumpMixin):
 	## Public Methods
 	################################################################################################################################
 
+	#
+	# Download a single file from the head revision.
+	# The text is normalized the way `GitWrapper.downloadFromHead()` does; use `downloadFromRevision()` to retrieve the content unchanged.
+	#
+	# @return		str			Either returns the file content if the file exists or `None` if the file does not exist.
+	#
+	@GitDeadline.aware
+	def downloadFromHead(self, filePath:str, log:jk_logging.AbstractLogger = None) -> typing.Union[str,None]:
+		return _GitOutputParser.toDownloadedText(self.downloadFromRevision("HEAD", filePath, log))
+	#
+
+	#
+	# Download a single file from the specified revision.
+	#
+	# @return		str			Either returns the file content if the file exists or `None` if the file does not exist.
+	#
+	@GitDeadline.aware
+	def downloadFromRevision(self, revision:str, filePath:str, log:jk_logging.AbstractLogger = None) -> typing.Union[str,None]:
+		if self.__bUseNativeObjectStore:
+			# revisions the object store can't resolve (e.g. abbreviated hashes) are passed on to git
+			if self.objectStore.resolveRevision(revision) is not None:
+				data = self.objectStore.readBlob(revision, filePath)
+				return None if data is None else data.decode("utf-8")
+		return self.__gitWrapper.downloadFromRevision(self.__gitRootDir, revision, filePath, log)
+	#
+
 	#
 	# Retrieve the commit history.
 	#
-	def getCommitHistory(self) -> GitCommitHistory:
-		return GitCommitHistory.create(self.__gitRootDir, self.__gitWrapper)
+	# @param		bool bUseCache			(optional) If `True` the history is cached on disk and only new commits are retrieved from git on subsequent calls.
+	# @param		str cacheDirPath		(optional) The directory to store the cache file in. If not specified the git directory is used.
+	#
+	@GitDeadline.aware
+	def getCommitHistory(self, bUseCache:bool = False, cacheDirPath:str = None, log:jk_logging.AbstractLogger = None) -> GitCommitHistory:
+		if not bUseCache:
+			if self.__bUseNativeObjectStore:
+				return GitCommitHistory.createFromLogRecords(self.objectStore.iterLogRecords("HEAD"))
+			return GitCommitHistory.create(self.__gitRootDir, self.__gitWrapper)
+
+		if (self.__historyCache is None) \
+			or (os.path.dirname(os.path.abspath(self.__historyCache.cacheFilePath)) != os.path.abspath(cacheDirPath or self.__gitRootDir)):
+			self.__historyCache = GitCommitHistoryCache.forRepository(self.__gitRootDir, self.__gitRootDir, cacheDirPath, self.__refDatabase)
+		return self.__historyCache.getCommitHistory(self.__gitWrapper, log)
 	#
 
 	################################################################################################################################
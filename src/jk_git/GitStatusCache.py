@@ -0,0 +1,209 @@
+import os
+import time
+import typing
+import threading
+
+import jk_typing
+import jk_prettyprintobj
+
+from .GitFileInfo import GitFileInfo
+from .GitRefDatabase import GitRefDatabase
+
+
+
+
+
+#
+# This class caches the status of a working copy in memory. A cached status is reused as long as a cheap fingerprint of the repository
+# does not change. The fingerprint consists of:
+#
+# * modification time, size and inode of the index file,
+# * the content of HEAD and the commit the current branch points to,
+# * modification time and size of the top level ".gitignore" file and of ".git/info/exclude",
+# * (optional) the modification times of the root directory and all top level directories.
+#
+# Please note: modifications of the content of tracked files and files created in subdirectories are NOT detected by this fingerprint.
+# Use a maximum age to limit how long a cached status may be reused.
+#
+class GitStatusCache(jk_prettyprintobj.DumpMixin):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str rootDir						The root directory of the working copy.
+	# @param		GitRefDatabase refDatabase		(optional) The reference database of the working copy.
+	# @param		bool bIncludeTopLevelDirs		If `True` the modification times of the top level directories are part of the fingerprint.
+	#												This detects files created or deleted directly within these directories.
+	# @param		float maxAge					(optional) The maximum number of seconds a cached status is reused. `None` means: no limit.
+	#
+	@jk_typing.checkFunctionSignature()
+	def __init__(self,
+			rootDir:str,
+			refDatabase:GitRefDatabase = None,
+			bIncludeTopLevelDirs:bool = False,
+			maxAge:typing.Union[int,float,None] = None,
+		):
+
+		self.__rootDir = rootDir
+		self.__gitDirPath = os.path.join(rootDir, ".git")
+		self.__refDatabase = refDatabase if refDatabase is not None else GitRefDatabase(self.__gitDirPath)
+		self.__bIncludeTopLevelDirs = bIncludeTopLevelDirs
+		self.__maxAge = maxAge
+
+		self.__lock = threading.Lock()
+		# bIncludeIgnored -> (fingerprint, timeStamp, fileInfos)
+		self.__entries:typing.Dict[bool,tuple] = {}
+
+		self.__hitCount = 0
+		self.__missCount = 0
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def rootDir(self) -> str:
+		return self.__rootDir
+	#
+
+	@property
+	def includeTopLevelDirs(self) -> bool:
+		return self.__bIncludeTopLevelDirs
+	#
+
+	@property
+	def maxAge(self) -> typing.Union[int,float,None]:
+		return self.__maxAge
+	#
+
+	@property
+	def hitCount(self) -> int:
+		return self.__hitCount
+	#
+
+	@property
+	def missCount(self) -> int:
+		return self.__missCount
+	#
+
+	@property
+	def hitRatio(self) -> float:
+		n = self.__hitCount + self.__missCount
+		return self.__hitCount / n if n else 0.0
+	#
+
+	################################################################################################################################
+	## Protected Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self):
+		return [
+			"rootDir",
+			"includeTopLevelDirs",
+			"maxAge",
+			"hitCount",
+			"missCount",
+			"hitRatio",
+		]
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __statOf(filePath:str) -> typing.Union[tuple,None]:
+		try:
+			st = os.stat(filePath)
+		except (FileNotFoundError, NotADirectoryError):
+			return None
+		return (st.st_mtime_ns, st.st_size, st.st_ino)
+	#
+
+	@staticmethod
+	def __readFile(filePath:str) -> typing.Union[bytes,None]:
+		try:
+			with open(filePath, "rb") as f:
+				return f.read()
+		except FileNotFoundError:
+			return None
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Calculate the fingerprint of the repository.
+	#
+	def getFingerprint(self) -> tuple:
+		ret = [
+			GitStatusCache.__statOf(os.path.join(self.__gitDirPath, "index")),
+			GitStatusCache.__readFile(os.path.join(self.__gitDirPath, "HEAD")),
+			self.__refDatabase.resolve("HEAD"),
+			GitStatusCache.__statOf(os.path.join(self.__rootDir, ".gitignore")),
+			GitStatusCache.__statOf(os.path.join(self.__gitDirPath, "info", "exclude")),
+		]
+		if self.__bIncludeTopLevelDirs:
+			ret.append(os.stat(self.__rootDir).st_mtime_ns)
+			with os.scandir(self.__rootDir) as it:
+				ret.extend(sorted([
+					(entry.name, entry.stat(follow_symlinks=False).st_mtime_ns)
+					for entry in it
+					if entry.is_dir(follow_symlinks=False) and (entry.name != ".git")
+				]))
+		return tuple(ret)
+	#
+
+	#
+	# Get the status of the working copy: either from the cache or by invoking the specified function.
+	#
+	# @param		bool bIncludeIgnored			Whether ignored files are included. (Results are cached separately.)
+	# @param		callable retrieveStatus			A callable that retrieves the status from git.
+	# @return		GitFileInfo[]					A list of file information objects.
+	#
+	def getStatus(self, bIncludeIgnored:bool, retrieveStatus:typing.Callable[[],typing.List[GitFileInfo]]) -> typing.List[GitFileInfo]:
+		with self.__lock:
+			entry = self.__entries.get(bIncludeIgnored)
+			if entry is not None:
+				fingerprint, timeStamp, fileInfos = entry
+				if ((self.__maxAge is None) or (time.monotonic() - timeStamp <= self.__maxAge)) and (fingerprint == self.getFingerprint()):
+					self.__hitCount += 1
+					return list(fileInfos)
+
+			self.__missCount += 1
+			timeStamp = time.monotonic()
+			# (the fingerprint is calculated before git runs: if anything changes while git is running the entry is not used. This includes the
+			# index file refreshed by git status itself which costs one extra miss.)
+			fingerprint = self.getFingerprint()
+			fileInfos = retrieveStatus()
+			self.__entries[bIncludeIgnored] = (fingerprint, timeStamp, list(fileInfos))
+			return fileInfos
+	#
+
+	#
+	# Remove all cached data.
+	#
+	def invalidate(self):
+		with self.__lock:
+			self.__entries.clear()
+	#
+
+	#
+	# Reset the hit and miss counters.
+	#
+	def resetCounters(self):
+		with self.__lock:
+			self.__hitCount = 0
+			self.__missCount = 0
+	#
+
+#
+
+
+
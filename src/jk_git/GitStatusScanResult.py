@@ -0,0 +1,120 @@
+
+
+
+import typing
+
+import jk_prettyprintobj
+
+from .GitFileInfo import GitFileInfo
+
+
+
+
+
+#
+# This class represents the result of retrieving the status of a single working copy during a fleet scan (see `GitWorkingCopyFleet`).
+#
+class GitStatusScanResult(jk_prettyprintobj.DumpMixin):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str rootDir						The directory of the working copy as specified.
+	# @param		GitFileInfo[] fileInfos			The status of the working copy or `None` if the status could not be retrieved.
+	# @param		Exception error					The error that occurred or `None` on success.
+	# @param		float queueDelay				The time in seconds the task has waited for a worker.
+	# @param		float duration					The time in seconds required to retrieve the status.
+	#
+	def __init__(self,
+			rootDir:str,
+			fileInfos:typing.Union[typing.List[GitFileInfo],None],
+			error:typing.Union[BaseException,None],
+			queueDelay:float,
+			duration:float,
+		):
+
+		self.__rootDir = rootDir
+		self.__fileInfos = fileInfos
+		self.__error = error
+		self.__queueDelay = queueDelay
+		self.__duration = duration
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def rootDir(self) -> str:
+		return self.__rootDir
+	#
+
+	#
+	# The status of the working copy or `None` if an error occurred.
+	#
+	@property
+	def fileInfos(self) -> typing.Union[typing.List[GitFileInfo],None]:
+		return self.__fileInfos
+	#
+
+	@property
+	def error(self) -> typing.Union[BaseException,None]:
+		return self.__error
+	#
+
+	@property
+	def isError(self) -> bool:
+		return self.__error is not None
+	#
+
+	@property
+	def isClean(self) -> bool:
+		return (self.__error is None) and not self.__fileInfos
+	#
+
+	@property
+	def isDirty(self) -> bool:
+		return (self.__error is None) and bool(self.__fileInfos)
+	#
+
+	#
+	# The time in seconds the scan of this working copy has waited for a free worker.
+	#
+	@property
+	def queueDelay(self) -> float:
+		return self.__queueDelay
+	#
+
+	#
+	# The time in seconds the scan of this working copy took.
+	#
+	@property
+	def duration(self) -> float:
+		return self.__duration
+	#
+
+	################################################################################################################################
+	## Protected Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self):
+		return [
+			"rootDir",
+			"isError",
+			"error",
+			"isDirty",
+			"queueDelay",
+			"duration",
+			"fileInfos",
+		]
+	#
+
+#
+
+
+
+
@@ -0,0 +1,52 @@
+
+
+
+import typing
+
+from .GitExecutionException import GitExecutionException
+
+
+
+
+
+#
+# This exception is raised if a call did not complete within its timeout (or before its deadline). All git processes started by the
+# call have been killed.
+#
+class GitTimeoutException(GitExecutionException):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str[] cmdArgs				The arguments of the git invocation that has been killed (or that has not been started).
+	# @param		float timeout				The number of seconds the call was allowed to run.
+	# @param		float elapsed				The number of seconds the call actually ran.
+	# @param		str[] stdErrLines			The output git has written to STDERR before it has been killed.
+	#
+	def __init__(self,
+			cmdArgs:typing.Union[typing.List[str],typing.Tuple[str],None],
+			timeout:float,
+			elapsed:float,
+			stdErrLines:typing.Union[typing.List[str],None] = None,
+		):
+
+		super().__init__(
+			"git did not terminate within {:.1f} seconds! (The call ran for {:.1f} seconds.)".format(timeout, elapsed),
+			cmdArgs,
+			None,
+			stdErrLines,
+		)
+
+		self.timeout = timeout
+		self.elapsed = elapsed
+	#
+
+#
+
+
+
+
@@ -6,7 +6,6 @@ import os
 
 import jk_typing
 import jk_prettyprintobj
-import jk_utils
 import jk_logging
 
 from .GitWrapper import GitWrapper
@@ -14,6 +13,14 @@ from .GitFileInfo import AbstractRepositoryFile, GitFileInfo
 from .impl.GitConfigFileSection import GitConfigFileSection
 from .impl.GitConfigFile import GitConfigFile
 from .GitCommitHistory import GitCommitHistory
+from .GitCommitHistoryCache import GitCommitHistoryCache
+from .GitRefDatabase import GitRefDatabase
+from .GitObjectStore import GitObjectStore
+from .GitIndex import GitIndex
+from .GitWorkingCopyWatcher import GitWorkingCopyWatcher
+from .GitStatusCache import GitStatusCache
+from .GitDeadline import GitDeadline
+from .GitRefUpdate import GitRefUpdate
 from .workingcopy._GitStatusOutputParser import _GitStatusOutputParser
 
 
@@ -26,6 +33,12 @@ from .workingcopy._GitStatusOutputParser import _GitStatusOutputParser
 
 class GitWorkingCopy(jk_prettyprintobj.DumpMixin):
 
+	#
+	# Up to this number of tracked files the index is inspected directly by `checkIsDirty()`, `isDirty` and `isClean`: this is faster than
+	# starting git. (50,000 tracked files take ~290 ms in Python versus ~115 ms for two `git diff --quiet`; the break even is ~2,000 files.)
+	#
+	QUICK_CHECK_MAX_ENTRIES = 1000
+
 	def __init__(self,
 			rootDir:str,
 			gitWrapper:GitWrapper = None,
@@ -47,7 +60,14 @@ class GitWorkingCopy(jk_prettyprintobj.DumpMixin):
 			raise Exception("Can't find git root directory: " + rootDir)
 
 		# TODO: improve this - maybe just storing a value for a certain amount of time is not the best idea
-		self.__volatileValue_lsRemote = jk_utils.VolatileValue(self.__lsRemote, 15)					# 15 seconds caching time
+		self.__volatileValue_lsRemote = None
+
+		self.__historyCache = None
+		self.__refDatabase = GitRefDatabase(os.path.join(self.__gitRootDir, ".git"))
+		self.__objectStore = None
+		self.__index = None
+		self.__watcher = None
+		self.__statusCache = None
 	#
 
 	################################################################################################################################
@@ -61,12 +81,12 @@ class GitWorkingCopy(jk_prettyprintobj.DumpMixin):
 
 	@property
 	def isClean(self) -> bool:
-		return len(self.status(bIncludeIgnored = False)) == 0
+		return not self.checkIsDirty()
 	#
 
 	@property
 	def isDirty(self) -> bool:
-		return len(self.status(bIncludeIgnored = False)) > 0
+		return self.checkIsDirty()
 	#
 
 	@property
@@ -110,9 +130,58 @@ class GitWorkingCopy(jk_prettyprintobj.DumpMixin):
 		return ret
 	#
 
+	#
+	# The reference database of this working copy. Use this to retrieve local references together with the commit hashes they point to.
+	#
+	@property
+	def refDatabase(self) -> GitRefDatabase:
+		return self.__refDatabase
+	#
+
+	#
+	# The object database of this working copy. Use this to read objects without running git.
+	#
+	@property
+	def objectStore(self) -> GitObjectStore:
+		if self.__objectStore is None:
+			self.__objectStore = GitObjectStore(os.path.join(self.__gitRootDir, ".git"), self.__refDatabase)
+		return self.__objectStore
+	#
+
+	#
+	# The index of this working copy (or `None` if there is no index yet). The index is reloaded automatically if the index file has been modified.
+	#
+	@property
+	def index(self) -> typing.Union[GitIndex,None]:
+		index = self.__index
+		if (index is None) or index.isOutdated():
+			indexFilePath = os.path.join(self.__gitRootDir, ".git", "index")
+			if not os.path.isfile(indexFilePath):
+				return None
+			index = GitIndex.loadFromFile(indexFilePath)
+			self.__index = index
+		return index
+	#
+
+	#
+	# The watcher of this working copy or `None` if the working copy is not watched. (See `startWatching()`.)
+	#
+	@property
+	def watcher(self) -> typing.Union[GitWorkingCopyWatcher,None]:
+		return self.__watcher
+	#
+
+	#
+	# The status cache of this working copy or `None` if status results are not cached. (See `enableStatusCache()`.)
+	#
+	@property
+	def statusCache(self) -> typing.Union[GitStatusCache,None]:
+		return self.__statusCache
+	#
+
 	@property
 	def headRevisionID(self) -> typing.Union[str,None]:
-		for revID, revName in self.__volatileValue_lsRemote.value:
+		for revID, revName in self.__lsRemoteCached():
 			if revName == "HEAD":
 				return revID
 		return None
@@ -140,6 +209,17 @@ class GitWorkingCopy(jk_prettyprintobj.DumpMixin):
 	## Helper Methods
 	################################################################################################################################
 
+	#
+	# Returns the output of `__lsRemote()`. The result is cached for 15 seconds.
+	#
+	def __lsRemoteCached(self) -> list:
+		# (jk_utils is imported on first use only as importing it is expensive)
+		if self.__volatileValue_lsRemote is None:
+			import jk_utils
+			self.__volatileValue_lsRemote = jk_utils.VolatileValue(self.__lsRemote, 15)				# 15 seconds caching time
+		return self.__volatileValue_lsRemote.value
+	#
+
 	#
 	# Returns something like:
 	# [
@@ -153,6 +233,45 @@ class GitWorkingCopy(jk_prettyprintobj.DumpMixin):
 		return self.__gitWrapper.lsRemote_dir(self.__gitRootDir)
 	#
 
+	#
+	# Get a value of the "core" section of the configuration. (Keys are case insensitive: git writes "filemode" while users write "fileMode".)
+	#
+	def __getConfigValue(self, key:str, defaultValue:str) -> str:
+		section = self.__gitCfgFile.getSection("core")
+		if section:
+			for k, v in section.properties.items():
+				if k.lower() == key:
+					return v.strip().lower()
+		return defaultValue
+	#
+
+	def __getConfigBool(self, key:str, defaultValue:bool) -> bool:
+		value = self.__getConfigValue(key, None)
+		if value is None:
+			return defaultValue
+		return value in ( "true", "yes", "on", "1", "" )
+	#
+
+	#
+	# Check with `quickCheckIsDirty()` if all tracked files are unmodified. This is done only if the index is small enough and (unless
+	# submodules are ignored) does not contain submodules.
+	#
+	# @return		bool			Returns `True` if the tracked files are unmodified and `False` if they are modified or if this could
+	#								not be determined. (Clean filters are not applied: modifications reported need to be confirmed by git.)
+	#
+	def __quickCheckIsTrackedClean(self, bIgnoreSubmodules:bool) -> bool:
+		try:
+			index = self.index
+			if (index is None) or (len(index) > GitWorkingCopy.QUICK_CHECK_MAX_ENTRIES):
+				return False
+			if not bIgnoreSubmodules and any([ e.isSubmodule for e in index ]):
+				return False
+			return not self.quickCheckIsDirty()
+		except Exception:
+			# e.g. a split index or objects that can't be read: let git decide
+			return False
+	#
+
 	@staticmethod
 	def __findRootDir(rootDir:str, bRecursive:bool = True):
 		if len(rootDir) <= 1:
@@ -176,11 +295,34 @@ class GitWorkingCopy(jk_prettyprintobj.DumpMixin):
 	#
 	# Run a <c>git pull</c> request.
 	#
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def pull(self, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
 		return self.__gitWrapper.pull(self.__gitRootDir, log)
 	#
 
+	#
+	# Fetch multiple remotes in parallel. (See `GitWrapper.fetch()`.)
+	#
+	# @param		str[] remotes			(optional) The names of the remotes to fetch. If not specified all remotes are fetched.
+	# @param		int jobs				(optional) The number of remotes to fetch in parallel.
+	# @param		bool bPrune				(optional) If `True` remote tracking branches no longer existing on the remote are removed.
+	# @return		GitRefUpdate[]			The references that have been updated.
+	#
+	@GitDeadline.aware
+	@jk_typing.checkFunctionSignature()
+	def fetch(self,
+			remotes:typing.List[str] = None,
+			jobs:int = GitWrapper.DEFAULT_FETCH_JOBS,
+			bPrune:bool = True,
+			log:jk_logging.AbstractLogger = None,
+		) -> typing.List[GitRefUpdate]:
+
+		# (if no remotes are specified git is asked for them: `self.remotes` does not contain remotes added after construction)
+		return self.__gitWrapper.fetch(self.__gitRootDir, remotes, jobs, bPrune, log)
+	#
+
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def addFile(self, filePath:str, log:jk_logging.AbstractLogger = None):
 		lines = self.__gitWrapper.add(self.__gitRootDir, filePath, log)
@@ -188,69 +330,215 @@ class GitWorkingCopy(jk_prettyprintobj.DumpMixin):
 			raise Exception("Unexpected output received: " + repr(lines))
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def flowInit(self, log:jk_logging.AbstractLogger = None) -> None:
 		self.__gitWrapper.flowInit(self.__gitRootDir, log)
 	#
 
+	#
+	# Check if this working copy contains changes. In contrast to `status()` this stops as soon as the first change is found.
+	# (See `GitWrapper.isDirty()`.)
+	#
+	# If there are no more than `QUICK_CHECK_MAX_ENTRIES` tracked files these are checked without running git (see `quickCheckIsDirty()`):
+	# only the check for untracked files remains to be done by git. Modifications detected this way are confirmed by git.
+	#
+	# @param		bool bIgnoreUntracked		If `True` untracked files are not considered as changes.
+	# @param		bool bIgnoreSubmodules		If `True` changes of submodules are not considered.
+	#
+	@GitDeadline.aware
+	@jk_typing.checkFunctionSignature()
+	def checkIsDirty(self, bIgnoreUntracked:bool = False, bIgnoreSubmodules:bool = False, log:jk_logging.AbstractLogger = None) -> bool:
+		if self.__quickCheckIsTrackedClean(bIgnoreSubmodules):
+			return (not bIgnoreUntracked) and self.__gitWrapper.hasUntrackedFiles(self.__gitRootDir, log)
+		return self.__gitWrapper.isDirty(self.__gitRootDir, bIgnoreUntracked, bIgnoreSubmodules, log)
+	#
+
+	#
+	# Check for changes of tracked files without running git: staged changes are detected by comparing the index with the tree of HEAD,
+	# modifications in the working tree by comparing the stat data of all tracked files with the index. (See `GitIndex`.)
+	#
+	# Untracked files are not considered and submodules are not inspected. If this method returns `True` use `status()` to retrieve the details.
+	#
+	# @return		bool			Returns `True` if tracked files have been modified, added or deleted or if there are merge conflicts.
+	#
+	def quickCheckIsDirty(self) -> bool:
+		index = self.index
+		headCommitHash = self.__refDatabase.resolve("HEAD")
+
+		if headCommitHash is None:
+			return (index is not None) and (len(index) > 0)
+		if index is None:
+			return True
+
+		if index.hasConflicts:
+			return True
+		treeHash = self.objectStore.readCommit(headCommitHash)["tree"]
+		if not index.matchesTree(self.objectStore, treeHash):
+			return True
+
+		for _ in index.iterModifiedEntries(
+				self.__gitRootDir,
+				bTrustCTime=self.__getConfigBool("trustctime", True),
+				bCheckStat=self.__getConfigValue("checkstat", "default") != "minimal",
+				bFileMode=self.__getConfigBool("filemode", True),
+			):
+			return True
+		return False
+	#
+
+	#
+	# Watch the directory tree of this working copy with inotify (Linux only). While the working copy is watched `status()` checks only the
+	# paths that have been modified since the last invocation. (See `GitWorkingCopyWatcher`.)
+	#
+	# @param		callable callback				(optional) A callable that is invoked with the set of modified paths (or `None` if
+	#												events have been lost).
+	# @param		bool bBackgroundThread			If `True` events are processed by a background thread. Otherwise events are processed
+	#												whenever `status()` is invoked.
+	# @return		GitWorkingCopyWatcher			The watcher.
+	#
+	def startWatching(self,
+			callback:typing.Callable[[typing.Union[typing.Set[str],None]],None] = None,
+			bBackgroundThread:bool = True,
+			log:jk_logging.AbstractLogger = None,
+		) -> GitWorkingCopyWatcher:
+
+		if self.__watcher is not None:
+			raise Exception("This working copy is already watched!")
+		if not self.__gitWrapper.supportsStatusZ:
+			raise Exception("Watching requires git 2.11 or later!")
+
+		self.__watcher = GitWorkingCopyWatcher(self, self.__gitWrapper, callback, log)
+		if bBackgroundThread:
+			self.__watcher.start()
+		return self.__watcher
+	#
+
+	def stopWatching(self):
+		if self.__watcher is not None:
+			self.__watcher.close()
+			self.__watcher = None
+	#
+
+	#
+	# Cache the results of `status()`. A cached result is reused as long as the index, HEAD and the current branch have not been modified.
+	# (See `GitStatusCache` for details.)
+	#
+	# @param		bool bIncludeTopLevelDirs		If `True` files created or deleted in the root directory or in top level directories are detected as well.
+	# @param		float maxAge					(optional) The maximum number of seconds a cached result is reused.
+	# @return		GitStatusCache					The cache.
+	#
+	@jk_typing.checkFunctionSignature()
+	def enableStatusCache(self, bIncludeTopLevelDirs:bool = False, maxAge:typing.Union[int,float,None] = None) -> GitStatusCache:
+		self.__statusCache = GitStatusCache(self.__gitRootDir, self.__refDatabase, bIncludeTopLevelDirs, maxAge)
+		return self.__statusCache
+	#
+
+	def disableStatusCache(self):
+		self.__statusCache = None
+	#
+
 	#
 	# Retrieve the status of this working copy
 	#
 	# @return	GitFileInfo[]	A list of file information objects.
 	#
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def status(self, bIncludeIgnored:bool = False, log:jk_logging.AbstractLogger = None) -> typing.List[GitFileInfo]:
+		if (self.__watcher is not None) and not bIncludeIgnored:
+			return self.__watcher.status(log)
+		if self.__statusCache is not None:
+			return self.__statusCache.getStatus(bIncludeIgnored, lambda: self.__retrieveStatus(bIncludeIgnored, log))
+		return self.__retrieveStatus(bIncludeIgnored, log)
+	#
+
+	def __retrieveStatus(self, bIncludeIgnored:bool, log:jk_logging.AbstractLogger) -> typing.List[GitFileInfo]:
+		if self.__gitWrapper.supportsStatusZ:
+			records = self.__gitWrapper.iterStatusRecords(self.__gitRootDir, bIncludeIgnored, log)
+			return _GitStatusOutputParser.parseZ(records, bIncludeIgnored, self)
+
 		lines = self.__gitWrapper.status(self.__gitRootDir, bIncludeIgnored, log)
 		return _GitStatusOutputParser.parse(lines, self.__gitWrapper.porcelainVersion, bIncludeIgnored, self)
 	#
 
 	#
 	# Download a single file from the HEAD revision.
+	# The text is normalized the way `GitWrapper.downloadFromHead()` does; use `downloadFromRevision()` to retrieve the content unchanged.
 	#
 	# @return		str			Either returns the file content if the file exists or `None` if the file does not exist.
 	#
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
-	def downloadFromHead(self, filePath:str, log:jk_logging.AbstractLogger = None) -> str:
+	def downloadFromHead(self, filePath:str, log:jk_logging.AbstractLogger = None) -> typing.Union[str,None]:
 		return self.__gitWrapper.downloadFromHead(self.__gitRootDir, filePath, log)
 	#
 
+	#
+	# Download a single file from the specified revision.
+	#
+	# @return		str			Either returns the file content if the file exists or `None` if the file does not exist.
+	#
+	@GitDeadline.aware
+	@jk_typing.checkFunctionSignature()
+	def downloadFromRevision(self, revision:str, filePath:str, log:jk_logging.AbstractLogger = None) -> typing.Union[str,None]:
+		return self.__gitWrapper.downloadFromRevision(self.__gitRootDir, revision, filePath, log)
+	#
+
 	#
 	# Retrieve the commit history.
 	#
-	def getCommitHistory(self) -> GitCommitHistory:
-		return GitCommitHistory.create(self.__gitRootDir, self.__gitWrapper)
+	# @param		bool bUseCache			(optional) If `True` the history is cached on disk and only new commits are retrieved from git on subsequent calls.
+	# @param		str cacheDirPath		(optional) The directory to store the cache file in. If not specified the git directory is used.
+	#
+	@GitDeadline.aware
+	def getCommitHistory(self, bUseCache:bool = False, cacheDirPath:str = None, log:jk_logging.AbstractLogger = None) -> GitCommitHistory:
+		if not bUseCache:
+			return GitCommitHistory.create(self.__gitRootDir, self.__gitWrapper)
+
+		if (self.__historyCache is None) \
+			or (os.path.dirname(os.path.abspath(self.__historyCache.cacheFilePath)) != os.path.abspath(cacheDirPath or os.path.join(self.__gitRootDir, ".git"))):
+			self.__historyCache = GitCommitHistoryCache.forRepository(self.__gitRootDir, os.path.join(self.__gitRootDir, ".git"), cacheDirPath, self.__refDatabase)
+		return self.__historyCache.getCommitHistory(self.__gitWrapper, log)
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def commit(self, commitMsg:str, log:jk_logging.AbstractLogger = None) -> None:
 		self.__gitWrapper.commit(self.__gitRootDir, commitMsg, log)
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def listTags(self, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
 		return self.__gitWrapper.listTags(self.__gitRootDir, log)
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def createTag(self, tagName:str, commitMsg:str, log:jk_logging.AbstractLogger = None) -> None:
 		self.__gitWrapper.createTag(self.__gitRootDir, tagName, commitMsg, log)
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def deleteTag(self, tagName:str, log:jk_logging.AbstractLogger = None) -> None:
 		self.__gitWrapper.deleteTag(self.__gitRootDir, tagName, log)
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def listBranches(self, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
 		return self.__gitWrapper.listBranches(self.__gitRootDir, log)
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def createBranch(self, branchName:str, log:jk_logging.AbstractLogger = None):
 		self.__gitWrapper.createBranch(self.__gitRootDir, branchName, log)
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def switchToBranch(self, branchName:str, log:jk_logging.AbstractLogger = None):
 		self.__gitWrapper.switchToBranch(self.__gitRootDir, branchName, log)
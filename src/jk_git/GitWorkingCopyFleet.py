@@ -0,0 +1,155 @@
+
+
+
+import time
+import typing
+import contextvars
+import concurrent.futures
+
+import jk_typing
+import jk_logging
+
+from .GitWrapper import GitWrapper
+from .GitWorkingCopy import GitWorkingCopy
+from .GitStatusScanResult import GitStatusScanResult
+from .GitInstrumentation import GitInstrumentation
+
+
+
+
+
+#
+# This class manages a (large) set of working copies and retrieves their status in parallel.
+#
+# git is run by a bounded pool of worker threads. Results are returned as soon as the status of a working copy is known.
+# A failure to retrieve the status of a single working copy does not affect the other working copies: the error is reported
+# in the corresponding result.
+#
+class GitWorkingCopyFleet(object):
+
+	DEFAULT_JOBS = 8
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str[] rootDirs				The directories of the working copies.
+	# @param		GitWrapper gitWrapper		(optional) The git wrapper to use.
+	#
+	@jk_typing.checkFunctionSignature()
+	def __init__(self,
+			rootDirs:typing.Iterable[str],
+			gitWrapper:GitWrapper = None,
+			log:jk_logging.AbstractLogger = None,
+		):
+
+		self.__rootDirs = list(rootDirs)
+		self.__gitWrapper = gitWrapper if gitWrapper is not None else GitWrapper(log)
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def rootDirs(self) -> typing.List[str]:
+		return list(self.__rootDirs)
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __scanOne(self, rootDir:str, tSubmitted:float, bIncludeIgnored:bool) -> GitStatusScanResult:
+		tStart = time.monotonic()
+		try:
+			wc = GitWorkingCopy(rootDir, gitWrapper=self.__gitWrapper)
+			with GitInstrumentation.queuedSince(tSubmitted):
+				fileInfos = wc.status(bIncludeIgnored=bIncludeIgnored)
+			error = None
+		except Exception as ee:
+			fileInfos = None
+			error = ee
+		return GitStatusScanResult(rootDir, fileInfos, error, tStart - tSubmitted, time.monotonic() - tStart)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Retrieve the status of all working copies.
+	#
+	# @param		int jobs					(optional) The number of working copies to process in parallel.
+	# @param		bool bIncludeIgnored		(optional) Include ignored files in the status.
+	# @return		iterable					Yields a `GitStatusScanResult` object for every working copy in the order the scans complete.
+	#											If iteration is stopped early no further scans are started.
+	#
+	def scanStatus(self,
+			jobs:int = DEFAULT_JOBS,
+			bIncludeIgnored:bool = False,
+			log:jk_logging.AbstractLogger = None,
+		) -> typing.Iterator[GitStatusScanResult]:
+
+		assert jobs > 0
+
+		if not self.__rootDirs:
+			return
+
+		executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="git-status")
+		try:
+			futures = [
+				# (every scan runs in a copy of the current context so that the limits of the current `GitDeadline` scope apply)
+				executor.submit(contextvars.copy_context().run, self.__scanOne, rootDir, time.monotonic(), bIncludeIgnored)
+				for rootDir in self.__rootDirs
+			]
+			for future in concurrent.futures.as_completed(futures):
+				r = future.result()
+				if log and r.isError:
+					log.warn("Failed to retrieve status of " + r.rootDir + ": " + str(r.error))
+				yield r
+		finally:
+			executor.shutdown(wait=True, cancel_futures=True)
+	#
+
+	#
+	# Retrieve the status of all working copies.
+	#
+	# @return		dict						A dictionary that maps the directories of the working copies to `GitStatusScanResult` objects.
+	#
+	def getStatus(self,
+			jobs:int = DEFAULT_JOBS,
+			bIncludeIgnored:bool = False,
+			log:jk_logging.AbstractLogger = None,
+		) -> typing.Dict[str,GitStatusScanResult]:
+
+		return { r.rootDir: r for r in self.scanStatus(jobs, bIncludeIgnored, log) }
+	#
+
+	################################################################################################################################
+	## Static Methods
+	################################################################################################################################
+
+	#
+	# Retrieve the status of the specified working copies. (See `scanStatus()`.)
+	#
+	@staticmethod
+	def scanStatusOf(
+			rootDirs:typing.Iterable[str],
+			jobs:int = DEFAULT_JOBS,
+			bIncludeIgnored:bool = False,
+			gitWrapper:GitWrapper = None,
+			log:jk_logging.AbstractLogger = None,
+		) -> typing.Iterator[GitStatusScanResult]:
+
+		return GitWorkingCopyFleet(rootDirs, gitWrapper, log).scanStatus(jobs, bIncludeIgnored, log)
+	#
+
+#
+
+
+
+
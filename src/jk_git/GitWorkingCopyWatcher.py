@@ -0,0 +1,436 @@
+
+
+
+import os
+import typing
+import threading
+
+import jk_typing
+import jk_logging
+import jk_prettyprintobj
+
+from .GitWrapper import GitWrapper
+from .GitFileInfo import GitFileInfo
+from .impl._Inotify import _Inotify
+from .workingcopy._GitStatusOutputParser import _GitStatusOutputParser
+
+
+
+
+
+#
+# This class watches the directory tree of a working copy with Linux inotify and keeps track of the paths that have been modified.
+# `status()` then runs `git status` limited to these paths instead of scanning the whole working tree.
+#
+# A full scan is performed if:
+#
+# * this is the first scan,
+# * the kernel event queue overflowed (some events have been lost),
+# * HEAD or the index have been modified (e.g. by `git commit`, `git add` or `git reset`),
+# * ignore rules have been modified (any `.gitignore`, `.git/info/exclude` or the file configured as `core.excludesFile`),
+# * too many paths have been modified,
+# * not all directories could be watched (e.g. because the limit of inotify watches has been reached).
+#
+# Don't create instances of this class directly: use `GitWorkingCopy.startWatching()`.
+#
+class GitWorkingCopyWatcher(jk_prettyprintobj.DumpMixin):
+
+	#
+	# If more paths have been modified a full scan is performed.
+	#
+	MAX_INCREMENTAL_PATHS = 1000
+
+	__DIR_MASK = _Inotify.IN_MODIFY | _Inotify.IN_ATTRIB | _Inotify.IN_CLOSE_WRITE | _Inotify.IN_MOVED_FROM | _Inotify.IN_MOVED_TO \
+		| _Inotify.IN_CREATE | _Inotify.IN_DELETE | _Inotify.IN_DELETE_SELF | _Inotify.IN_MOVE_SELF | _Inotify.IN_ONLYDIR | _Inotify.IN_DONT_FOLLOW
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		GitWorkingCopy workingCopy		The working copy to watch.
+	# @param		GitWrapper gitWrapper			The git wrapper to use.
+	# @param		callable callback				(optional) A callable that is invoked with a set of modified paths (relative to the root
+	#												directory of the working copy) whenever changes have been detected. If events have been lost
+	#												`None` is passed instead. If a background thread is used the callback is invoked by this thread.
+	#
+	def __init__(self,
+			workingCopy,
+			gitWrapper:GitWrapper,
+			callback:typing.Callable[[typing.Union[typing.Set[str],None]],None] = None,
+			log:jk_logging.AbstractLogger = None,
+		):
+
+		if not _Inotify.isAvailable():
+			raise Exception("inotify is not available on this platform!")
+
+		self.__workingCopy = workingCopy
+		self.__rootDir = workingCopy.rootDir
+		self.__gitWrapper = gitWrapper
+		self.__callback = callback
+		self.__log = log
+
+		self.__lock = threading.RLock()
+		self.__inotify = _Inotify()
+		self.__dirsByWD:typing.Dict[int,str] = {}
+		self.__wdsByDir:typing.Dict[str,int] = {}
+		self.__bWatchesComplete = True
+
+		self.__dirtyPaths:typing.Set[str] = set()
+		self.__bFullScanRequired = True
+		self.__fileInfos:typing.Dict[str,GitFileInfo] = {}
+		self.__fingerprint = None
+		self.__excludeFilePaths = [
+			os.path.join(self.__rootDir, ".git", "info", "exclude"),
+			self.__getExcludesFilePath(),
+		]
+
+		self.__fullScanCount = 0
+		self.__incrementalScanCount = 0
+		self.__overflowCount = 0
+
+		self.__thread = None
+		self.__bStop = False
+
+		self.__addWatches("")
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def rootDir(self) -> str:
+		return self.__rootDir
+	#
+
+	#
+	# The number of directories watched
+	#
+	@property
+	def watchCount(self) -> int:
+		return len(self.__dirsByWD)
+	#
+
+	#
+	# `False` if some directories could not be watched. In this case every scan is a full scan.
+	#
+	@property
+	def areWatchesComplete(self) -> bool:
+		return self.__bWatchesComplete
+	#
+
+	#
+	# The paths modified since the last scan (relative to the root directory of the working copy)
+	#
+	@property
+	def dirtyPaths(self) -> typing.Set[str]:
+		with self.__lock:
+			return set(self.__dirtyPaths)
+	#
+
+	@property
+	def fullScanCount(self) -> int:
+		return self.__fullScanCount
+	#
+
+	@property
+	def incrementalScanCount(self) -> int:
+		return self.__incrementalScanCount
+	#
+
+	@property
+	def overflowCount(self) -> int:
+		return self.__overflowCount
+	#
+
+	@property
+	def isRunning(self) -> bool:
+		return self.__thread is not None
+	#
+
+	################################################################################################################################
+	## Protected Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self):
+		return [
+			"rootDir",
+			"watchCount",
+			"areWatchesComplete",
+			"isRunning",
+			"fullScanCount",
+			"incrementalScanCount",
+			"overflowCount",
+		]
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	#
+	# Watch a directory and all of its subdirectories. Each watch is added before the directory is listed so that no subdirectory is missed.
+	#
+	def __addWatches(self, relDirPath:str):
+		stack = [ relDirPath ]
+		while stack:
+			relDirPath = stack.pop()
+			absDirPath = os.path.join(self.__rootDir, relDirPath) if relDirPath else self.__rootDir
+			try:
+				wd = self.__inotify.addWatch(absDirPath, GitWorkingCopyWatcher.__DIR_MASK)
+			except FileNotFoundError:
+				continue
+			except NotADirectoryError:
+				continue
+			except OSError as ee:
+				# most likely the limit of watches has been reached (see: /proc/sys/fs/inotify/max_user_watches)
+				if self.__bWatchesComplete and self.__log:
+					self.__log.warn("Failed to watch " + repr(absDirPath) + ": " + str(ee) + " (falling back to full scans)")
+				self.__bWatchesComplete = False
+				continue
+			self.__dirsByWD[wd] = relDirPath
+			self.__wdsByDir[relDirPath] = wd
+
+			try:
+				with os.scandir(absDirPath) as it:
+					for entry in it:
+						if entry.is_dir(follow_symlinks=False) and (entry.name != ".git"):
+							stack.append(relDirPath + "/" + entry.name if relDirPath else entry.name)
+			except (FileNotFoundError, NotADirectoryError):
+				pass
+	#
+
+	#
+	# Stop watching a directory that has been moved away together with all of its subdirectories.
+	#
+	def __removeWatches(self, relDirPath:str):
+		prefix = relDirPath + "/"
+		for dirPath in [ d for d in self.__wdsByDir if (d == relDirPath) or d.startswith(prefix) ]:
+			wd = self.__wdsByDir.pop(dirPath)
+			del self.__dirsByWD[wd]
+			self.__inotify.removeWatch(wd)
+	#
+
+	#
+	# Determine the global excludes file: either the one configured as `core.excludesFile` or git's default.
+	#
+	def __getExcludesFilePath(self) -> str:
+		r = self.__gitWrapper.runGit(cmdArgs=[ "config", "--path", "--get", "core.excludesFile" ], workingDirectory=self.__rootDir,
+			bRaiseExceptionOnError=False)
+		if (r.returnCode == 0) and r.stdOutLines and r.stdOutLines[0]:
+			return os.path.join(self.__rootDir, os.path.expanduser(r.stdOutLines[0]))
+		configDirPath = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+		return os.path.join(configDirPath, "git", "ignore")
+	#
+
+	@staticmethod
+	def __getFileStamp(filePath:str) -> typing.Union[tuple,None]:
+		try:
+			st = os.stat(filePath)
+			return (st.st_mtime_ns, st.st_size)
+		except OSError:
+			return None
+	#
+
+	#
+	# HEAD, the index and the files with ignore rules outside of the working tree determine the status of all files: if any of them changes
+	# a full scan is required. (The index is reloaded only if the index file has been modified. Changes of the stat data only - as written by
+	# `git status` - are ignored.)
+	#
+	def __getFingerprint(self) -> tuple:
+		refDatabase = self.__workingCopy.refDatabase
+		index = self.__workingCopy.index
+		return (
+			refDatabase.readSymbolicRef("HEAD"),
+			refDatabase.resolve("HEAD"),
+			index.contentHash if index is not None else None,
+			tuple([ GitWorkingCopyWatcher.__getFileStamp(x) for x in self.__excludeFilePaths ]),
+		)
+	#
+
+	#
+	# Check if a path or any of its parent directories is contained in the specified set of paths.
+	#
+	@staticmethod
+	def __isAffected(filePath:str, paths:typing.Set[str]) -> bool:
+		if filePath in paths:
+			return True
+		pos = filePath.find("/")
+		while pos > 0:
+			if filePath[:pos] in paths:
+				return True
+			pos = filePath.find("/", pos + 1)
+		return False
+	#
+
+	def __run(self):
+		while not self.__bStop:
+			try:
+				self.processEvents(0.5)
+			except Exception as ee:
+				if self.__log:
+					self.__log.error(ee)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Read all pending inotify events and update the set of modified paths.
+	#
+	# @param		float timeout		The number of seconds to wait for events.
+	# @return		set					The paths modified (relative to the root directory of the working copy). `None` if events have been lost.
+	#
+	def processEvents(self, timeout:float = 0) -> typing.Union[typing.Set[str],None]:
+		events = self.__inotify.readEvents(timeout)
+		if not events:
+			return set()
+
+		changedPaths = set()
+		bOverflow = False
+		bIgnoreRulesChanged = False
+		with self.__lock:
+			for wd, mask, _, name in events:
+				if mask & _Inotify.IN_Q_OVERFLOW:
+					bOverflow = True
+					continue
+
+				relDirPath = self.__dirsByWD.get(wd)
+				if mask & _Inotify.IN_IGNORED:
+					# the watch has been removed by the kernel (e.g. because the directory has been deleted)
+					if relDirPath is not None:
+						del self.__dirsByWD[wd]
+						if self.__wdsByDir.get(relDirPath) == wd:
+							del self.__wdsByDir[relDirPath]
+					continue
+				if relDirPath is None:
+					continue
+
+				if not name:
+					# the watched directory itself has been deleted or moved
+					if not relDirPath:
+						bOverflow = True
+					else:
+						changedPaths.add(relDirPath)
+					continue
+				if not relDirPath and (name == ".git"):
+					continue
+
+				relPath = relDirPath + "/" + name if relDirPath else name
+				changedPaths.add(relPath)
+				if name == ".gitignore":
+					# files not touched may become ignored (or not ignored any more)
+					bIgnoreRulesChanged = True
+				if mask & _Inotify.IN_ISDIR:
+					if mask & (_Inotify.IN_CREATE | _Inotify.IN_MOVED_TO):
+						self.__addWatches(relPath)
+					elif mask & _Inotify.IN_MOVED_FROM:
+						self.__removeWatches(relPath)
+
+			if bOverflow:
+				self.__bFullScanRequired = True
+				self.__overflowCount += 1
+			if bIgnoreRulesChanged:
+				self.__bFullScanRequired = True
+			self.__dirtyPaths.update(changedPaths)
+
+		ret = None if bOverflow else changedPaths
+		if self.__callback and (bOverflow or changedPaths):
+			self.__callback(ret)
+		return ret
+	#
+
+	#
+	# Retrieve the status of the working copy. Only paths modified since the last scan are checked by git (if possible).
+	#
+	# @return		GitFileInfo[]		A list of file information objects (sorted by path). Ignored files are not included.
+	#
+	@jk_typing.checkFunctionSignature()
+	def status(self, log:jk_logging.AbstractLogger = None) -> typing.List[GitFileInfo]:
+		self.processEvents(0)
+
+		with self.__lock:
+			fingerprint = self.__getFingerprint()
+			dirtyPaths = self.__dirtyPaths
+			if self.__bFullScanRequired or not self.__bWatchesComplete or (fingerprint != self.__fingerprint) \
+				or (len(dirtyPaths) > GitWorkingCopyWatcher.MAX_INCREMENTAL_PATHS):
+				filePaths = None
+			elif not dirtyPaths:
+				return sorted(self.__fileInfos.values(), key=lambda x: x.filePath())
+			else:
+				# renamed files are reported as renamed only if both paths are included
+				filePaths = set(dirtyPaths)
+				for x in self.__fileInfos.values():
+					origFilePath = x.origFilePath()
+					if origFilePath and (GitWorkingCopyWatcher.__isAffected(x.filePath(), dirtyPaths)
+						or GitWorkingCopyWatcher.__isAffected(origFilePath, dirtyPaths)):
+						filePaths.add(x.filePath())
+						filePaths.add(origFilePath)
+
+			# events received while git is running are collected for the next scan
+			self.__dirtyPaths = set()
+			self.__bFullScanRequired = False
+			try:
+				records = self.__gitWrapper.iterStatusRecords(self.__rootDir, False, log, sorted(filePaths) if filePaths is not None else None)
+				fileInfos = _GitStatusOutputParser.parseZ(records, False, self.__workingCopy)
+			except BaseException:
+				self.__bFullScanRequired = True
+				raise
+
+			if filePaths is None:
+				self.__fileInfos = { x.filePath(): x for x in fileInfos }
+				self.__fullScanCount += 1
+			else:
+				for filePath in [ p for p in self.__fileInfos if GitWorkingCopyWatcher.__isAffected(p, filePaths) ]:
+					del self.__fileInfos[filePath]
+				for x in fileInfos:
+					self.__fileInfos[x.filePath()] = x
+				self.__incrementalScanCount += 1
+			self.__fingerprint = self.__getFingerprint()
+
+			return sorted(self.__fileInfos.values(), key=lambda x: x.filePath())
+	#
+
+	#
+	# Process events in a background thread. (Otherwise events are processed only if `processEvents()` or `status()` is invoked.)
+	#
+	def start(self):
+		with self.__lock:
+			if self.__thread is not None:
+				return
+			self.__bStop = False
+			self.__thread = threading.Thread(target=self.__run, name="GitWorkingCopyWatcher", daemon=True)
+			self.__thread.start()
+	#
+
+	#
+	# Stop watching and release all resources.
+	#
+	def close(self):
+		thread = self.__thread
+		if thread is not None:
+			self.__bStop = True
+			thread.join()
+			self.__thread = None
+		with self.__lock:
+			self.__inotify.close()
+			self.__dirsByWD.clear()
+			self.__wdsByDir.clear()
+	#
+
+	def __enter__(self):
+		return self
+	#
+
+	def __exit__(self, ex_type, ex_value, ex_traceback):
+		self.close()
+	#
+
+#
+
+
+
@@ -2,8 +2,12 @@
 
 
 import os
+import time
 import typing
 import re
+import threading
+import contextvars
+import concurrent.futures
 
 import jk_typing
 import jk_logging
@@ -12,6 +16,15 @@ import jk_simpleexec
 import jk_version
 
 from .impl.GitHelper import GitHelper
+from .impl.GitCatFileBatch import GitCatFileBatch
+from .impl.GitOutputStream import GitOutputStream
+from .impl._GitOutputParser import _GitOutputParser
+from .GitExecutionException import GitExecutionException
+from .GitInstrumentation import GitInstrumentation
+from .GitDeadline import GitDeadline
+from .GitCancellationToken import GitCancellationToken
+from .GitSSHMultiplexer import GitSSHMultiplexer
+from .GitRefUpdate import GitRefUpdate
 
 
 
@@ -26,9 +39,18 @@ from .impl.GitHelper import GitHelper
 #
 # This class wraps around the program 'git'.
 #
+# All public methods accept the keyword arguments `timeout`, `deadline` and `cancellationToken`. If the call does not complete in
+# time or gets cancelled all git processes started are killed and a `GitTimeoutException` or `GitCancelledException` is raised.
+# (See `GitDeadline`.)
+#
 class GitWrapper(jk_prettyprintobj.DumpMixin):
 
-	__GIT_HELPER = None
+	# git binary path (or `None` for the binary detected automatically) -> GitHelper
+	__GIT_HELPERS:typing.Dict[typing.Union[str,None],GitHelper] = {}
+	__GIT_HELPERS_LOCK = threading.Lock()
+
+	# the number of remotes `fetch()` fetches in parallel by default
+	DEFAULT_FETCH_JOBS = 8
 
 	################################################################################################################################
 	## Constructor
@@ -37,10 +59,23 @@ class GitWrapper(jk_prettyprintobj.DumpMixin):
 	#
 	# Constructor method.
 	#
+	# @param		AbstractLogger log		(optional) A logger.
+	# @param		str gitBinPath			(optional) The git binary to use. If not specified git is searched for: the environment
+	#										variables `JK_GIT_BINARY` and `GIT_EXEC_PATH` are considered first, then `PATH`.
+	# @param		GitSSHMultiplexer sshMultiplexer	(optional) If specified SSH connections are reused by all invocations of git.
+	#
 	@jk_typing.checkFunctionSignature()
-	def __init__(self, log:jk_logging.AbstractLogger = None):
-		if GitWrapper.__GIT_HELPER is None:
-			GitWrapper.__GIT_HELPER = GitHelper(log)
+	def __init__(self, log:jk_logging.AbstractLogger = None, gitBinPath:str = None, sshMultiplexer:GitSSHMultiplexer = None):
+		key = None if gitBinPath is None else os.path.abspath(gitBinPath)
+		with GitWrapper.__GIT_HELPERS_LOCK:
+			self.__gitHelper = GitWrapper.__GIT_HELPERS.get(key)
+			if self.__gitHelper is None:
+				self.__gitHelper = GitHelper(log, key)
+				GitWrapper.__GIT_HELPERS[key] = self.__gitHelper
+
+		self.__sshMultiplexer = sshMultiplexer
+		if sshMultiplexer is not None:
+			self.__gitHelper = self.__gitHelper._withEnvironment(sshMultiplexer.getEnvironment)
 	#
 
 	################################################################################################################################
@@ -49,17 +84,43 @@ class GitWrapper(jk_prettyprintobj.DumpMixin):
 
 	@property
 	def version(self) -> jk_version.Version:
-		return GitWrapper.__GIT_HELPER.version
+		return self.__gitHelper.version
 	#
 
 	@property
 	def porcelainVersion(self):
-		return GitWrapper.__GIT_HELPER.porcelainVersion
+		return self.__gitHelper.porcelainVersion
+	#
+
+	@property
+	def supportsStatusZ(self) -> bool:
+		return self.__gitHelper.supportsStatusZ
+	#
+
+	@property
+	def supportsFetchPorcelain(self) -> bool:
+		return self.__gitHelper.supportsFetchPorcelain
 	#
 
 	@property
 	def gitBinPath(self) -> str:
-		return GitWrapper.__GIT_HELPER.gitBinPath
+		return self.__gitHelper.gitBinPath
+	#
+
+	#
+	# The instrumentation object recording all invocations of git. (This object is shared by all wrappers using the same git binary.)
+	#
+	@property
+	def instrumentation(self) -> GitInstrumentation:
+		return self.__gitHelper.instrumentation
+	#
+
+	#
+	# The SSH multiplexer used by this wrapper (or `None`).
+	#
+	@property
+	def sshMultiplexer(self) -> typing.Union[GitSSHMultiplexer,None]:
+		return self.__sshMultiplexer
 	#
 
 	################################################################################################################################
@@ -74,10 +135,33 @@ class GitWrapper(jk_prettyprintobj.DumpMixin):
 		]
 	#
 
+	#
+	# Returns the tags and remote tracking branches of the specified remotes. (Used by `fetch()` with git before 2.41.)
+	#
+	def __getRefSnapshot(self, gitRootDir:str, remotes:typing.List[str], log:jk_logging.AbstractLogger) -> typing.Dict[str,str]:
+		r = self.__gitHelper.runGitWD(gitRootDir, _GitOutputParser.refSnapshotArgs(remotes), log)
+		_GitOutputParser.checkResult(r, log, bCheckRCOnly=True)
+		return _GitOutputParser.parseRefSnapshot(_GitOutputParser.stdOutLines(r))
+	#
+
+	def __isAncestor(self, gitRootDir:str, oldHash:str, newHash:str, log:jk_logging.AbstractLogger) -> bool:
+		r = self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "merge-base", "--is-ancestor", oldHash, newHash ], log,
+			bRaiseExceptionOnError=False)
+		if r.returnCode == 0:
+			return True
+		if r.returnCode == 1:
+			return False
+		# (e.g. one of the commits does not exist)
+		if log:
+			r.dump(printFunc=log.warn)
+		raise GitExecutionException("Running git failed!", r.commandArguments, r.returnCode, r.stdErrLines)
+	#
+
 	################################################################################################################################
 	## Public Methods
 	################################################################################################################################
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature(logDescend="Executing git ...", logLevel=jk_logging.EnumLogLevel.NOTICE)
 	def runGit(self,
 			*args,
@@ -93,11 +177,47 @@ class GitWrapper(jk_prettyprintobj.DumpMixin):
 
 		# ---
 
-		return GitWrapper.__GIT_HELPER.runGitWD(
+		return self.__gitHelper.runGitWD(
+			workingDirectory,
+			cmdArgs,
+			log,
+			bRaiseExceptionOnError=bRaiseExceptionOnError,
+		)
+	#
+
+	#
+	# Run git and process its output while git is still running. In contrast to `runGit()` the output is not buffered: it can be
+	# iterated as chunks of bytes, lines or records. (See `GitOutputStream`.)
+	#
+	# @param		str[] cmdArgs						The arguments to pass to git.
+	# @param		str workingDirectory				(optional) The directory to run git in.
+	# @param		bool bRaiseExceptionOnError			If `True` an exception is raised after all output has been consumed if git failed.
+	# @param		int maxStdErrSize					(optional) The maximum number of bytes of STDERR to keep.
+	# @return		GitOutputStream						The stream. Use it as a context manager.
+	#
+	@GitDeadline.aware
+	@jk_typing.checkFunctionSignature()
+	def streamGit(self,
+			*args,
+			cmdArgs:typing.Union[typing.List[str],typing.Tuple[str]],
+			workingDirectory:str = None,
+			bRaiseExceptionOnError:bool = True,
+			maxStdErrSize:int = GitOutputStream.DEFAULT_MAX_STDERR_SIZE,
+			log:jk_logging.AbstractLogger = None,
+			**kwargs,
+		) -> GitOutputStream:
+
+		assert not args
+		assert not kwargs
+
+		# ---
+
+		return self.__gitHelper.streamGitWD(
 			workingDirectory,
 			cmdArgs,
 			log,
 			bRaiseExceptionOnError=bRaiseExceptionOnError,
+			maxStdErrSize=maxStdErrSize,
 		)
 	#
 
@@ -110,67 +230,168 @@ class GitWrapper(jk_prettyprintobj.DumpMixin):
 	#
 	# @return	str[]		Text output of the 'status' command
 	#
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def status(self, gitRootDir:str, bIncludeIgnored:bool = False, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
-		if GitWrapper.__GIT_HELPER.porcelainVersion == 1:
-
-			if bIncludeIgnored:
-				_cmdArgs = [ "-C", ".", "status", "--porcelain", "-uall", "--ignored" ]
-			else:
-				_cmdArgs = [ "-C", ".", "status", "--porcelain", "-uall" ]
+		_cmdArgs = _GitOutputParser.statusArgs(self.__gitHelper.porcelainVersion, bIncludeIgnored)
+		r = self.__gitHelper.runGitWD(gitRootDir, _cmdArgs, log)
+		_GitOutputParser.checkResult(r, log)
+		return _GitOutputParser.stdOutLines(r)
+	#
 
-			r = GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, _cmdArgs, log)
+	#
+	# Retrieve the references of a remote repository.
+	#
+	# @param		str url				The URL of the remote repository.
+	# @param		float timeout		(optional) The maximum number of seconds to wait for git. If git does not terminate in time it is killed.
+	# @param		float deadline		(optional) The time git must have terminated by (a value of `time.monotonic()`).
+	# @param		GitCancellationToken cancellationToken		(optional) A token to cancel the call with.
+	#
+	@jk_typing.checkFunctionSignature()
+	def lsRemote_url(self,
+			url:str,
+			log:jk_logging.AbstractLogger = None,
+			timeout:typing.Union[float,int,None] = None,
+			*,
+			deadline:typing.Union[float,int,None] = None,
+			cancellationToken:GitCancellationToken = None,
+		) -> list:
 
-		elif GitWrapper.__GIT_HELPER.porcelainVersion == 2:
+		with GitDeadline.scope(timeout, deadline, cancellationToken):
+			r = self.__gitHelper.runGitNoWD([ "ls-remote", url ], log)
+		_GitOutputParser.checkResult(r, log)
+		return _GitOutputParser.parseLsRemoteOutput(r.stdOutLines)
+	#
 
-			if bIncludeIgnored:
-				#	_cmdArgs = [ "-C", gitRootDir, "status", "--porcelain=2", "-uall", "--ignored=traditional" ],
-				_cmdArgs = [ "-C", ".", "status", "--porcelain=2", "-uall", "--ignored" ]
-			else:
-				_cmdArgs = [ "-C", ".", "status", "--porcelain=2", "-uall" ]
+	#
+	# Retrieve the references of many remote repositories concurrently.
+	#
+	# @param		str[] urls						The URLs of the remote repositories.
+	# @param		int maxConcurrency				(optional) The maximum number of git processes to run at the same time.
+	# @param		int maxConcurrencyPerHost		(optional) The maximum number of git processes to run at the same time for the same host.
+	# @param		float timeout					(optional) The maximum number of seconds to wait for a single git process.
+	# @param		float deadline					(optional) The time all git processes must have terminated by (a value of `time.monotonic()`).
+	# @param		GitCancellationToken cancellationToken		(optional) A token to cancel all git processes with.
+	# @return		dict							A dictionary that maps every URL to either the references (see `lsRemote_url()`) or
+	#												the exception that occurred.
+	#
+	@jk_typing.checkFunctionSignature()
+	def lsRemoteMany(self,
+			urls:typing.Iterable[str],
+			maxConcurrency:int = 16,
+			maxConcurrencyPerHost:int = 4,
+			timeout:typing.Union[float,int,None] = 60,
+			log:jk_logging.AbstractLogger = None,
+			*,
+			deadline:typing.Union[float,int,None] = None,
+			cancellationToken:GitCancellationToken = None,
+		) -> typing.Dict[str,typing.Union[list,Exception]]:
+
+		assert maxConcurrency > 0
+		assert maxConcurrencyPerHost > 0
+
+		# as workers are blocked while waiting for a host, URLs of the same host are spread over the whole queue
+		urls = _GitOutputParser.interleaveURLsByHost(set(urls))
+		hostSemaphores = {}
+		for url in urls:
+			host = _GitOutputParser.getHostOfURL(url)
+			if host not in hostSemaphores:
+				hostSemaphores[host] = threading.BoundedSemaphore(maxConcurrencyPerHost)
+
+		def _lsRemote(url:str, tSubmitted:float) -> list:
+			with GitInstrumentation.queuedSince(tSubmitted):
+				with hostSemaphores[_GitOutputParser.getHostOfURL(url)]:
+					return self.lsRemote_url(url, timeout=timeout)
+
+		ret = {}
+		with GitDeadline.scope(deadline=deadline, cancellationToken=cancellationToken), \
+			concurrent.futures.ThreadPoolExecutor(max_workers=maxConcurrency, thread_name_prefix="git-ls-remote") as executor:
+			# (every task runs in a copy of the current context so that the limits apply to the worker threads as well)
+			futures = { executor.submit(contextvars.copy_context().run, _lsRemote, url, time.monotonic()): url for url in urls }
+			for future in concurrent.futures.as_completed(futures):
+				url = futures[future]
+				try:
+					ret[url] = future.result()
+				except Exception as ee:
+					if log:
+						log.warn("ls-remote failed for " + url + ": " + str(ee))
+					ret[url] = ee
+		return ret
+	#
 
-			r = GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, _cmdArgs, log)
+	#
+	# Retrieve the status of a working copy in porcelain format version 2 (with `-z`). The records are yielded while git is still running.
+	#
+	# @param	str[] filePaths		(optional) Limit the status to these files and directories (relative to the root directory of the working copy).
+	# @return	bytes[]				The NUL separated records written by git. (Parse them with `_GitStatusOutputParser.parseZ()`.)
+	#
+	@GitDeadline.aware
+	def iterStatusRecords(self,
+			gitRootDir:str,
+			bIncludeIgnored:bool = False,
+			log:jk_logging.AbstractLogger = None,
+			filePaths:typing.List[str] = None,
+		) -> typing.Iterator[bytes]:
 
-		else:
-			raise Exception()
-		if (r is None) or r.isError:
-			if log:
-				r.dump(printFunc=log.warn)
-			raise Exception("Running git failed!")
-		if r.stdOutLines:
-			return r.stdOutLines
-		else:
-			return []
+		_cmdArgs = _GitOutputParser.statusZArgs(bIncludeIgnored, filePaths)
+		return self.__gitHelper.iterGitRecordsWD(gitRootDir, _cmdArgs, log, separator=b"\0")
 	#
 
+	#
+	# Check if a working copy contains changes. In contrast to `status()` this stops as soon as the first change is found:
+	#
+	# 1) staged changes: `git diff --cached --quiet`
+	# 2) unstaged changes: `git diff --quiet`
+	# 3) untracked files: `git ls-files --others`, which is terminated as soon as the first untracked file is reported
+	#
+	# @param		bool bIgnoreUntracked		If `True` untracked files are not considered as changes.
+	# @param		bool bIgnoreSubmodules		If `True` changes of submodules (new commits as well as modified content) are not considered.
+	# @return		bool						Returns `True` if the working copy is dirty.
+	#
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
-	def lsRemote_url(self, url:str, log:jk_logging.AbstractLogger = None) -> list:
-		r = GitWrapper.__GIT_HELPER.runGitNoWD(None, [ "ls-remote", url ], log)
-		if (r is None) or r.isError:
-			if log:
-				r.dump(printFunc=log.warn)
-			raise Exception("Running git failed!")
-		ret = []
-		for line in r.stdOutLines:
-			m = re.match("^([a-zA-Z0-9]+)\s+(.*)$", line.strip())
-			if m:
-				ret.append([ m.group(1), m.group(2) ])
-		return ret
+	def isDirty(self,
+			gitRootDir:str,
+			bIgnoreUntracked:bool = False,
+			bIgnoreSubmodules:bool = False,
+			log:jk_logging.AbstractLogger = None,
+		) -> bool:
+
+		for bCached in [ True, False ]:
+			r = self.__gitHelper.runGitWD(gitRootDir, _GitOutputParser.diffQuietArgs(bCached, bIgnoreSubmodules), log,
+				bRaiseExceptionOnError=False)
+			if _GitOutputParser.evalDiffQuietResult(r, log):
+				return True
+
+		if not bIgnoreUntracked:
+			return self.hasUntrackedFiles(gitRootDir, log)
+
+		return False
 	#
 
+	#
+	# Check if a working copy contains untracked files (that are not ignored). `git ls-files --others` is terminated as soon as the first
+	# untracked file is reported.
+	#
+	@GitDeadline.aware
+	@jk_typing.checkFunctionSignature()
+	def hasUntrackedFiles(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> bool:
+		records = self.__gitHelper.iterGitRecordsWD(gitRootDir, _GitOutputParser.untrackedProbeArgs(), log)
+		try:
+			for _ in records:
+				return True
+		finally:
+			# terminates git if it is still running
+			records.close()
+		return False
+	#
+
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def lsRemote_dir(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> list:
-		r = GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "-C", ".", "ls-remote" ], log)
-		if (r is None) or (r.returnCode != 0):
-			if log:
-				r.dump(printFunc=log.warn)
-			raise Exception("Running git failed!")
-		ret = []
-		for line in r.stdOutLines:
-			m = re.match("^([a-zA-Z0-9]+)\s+(.*)$", line.strip())
-			if m:
-				ret.append([ m.group(1), m.group(2) ])
-		return ret
+		r = self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "ls-remote" ], log)
+		_GitOutputParser.checkResult(r, log, bCheckRCOnly=True)
+		return _GitOutputParser.parseLsRemoteOutput(r.stdOutLines)
 	#
 
 	#
@@ -178,6 +399,7 @@ class GitWrapper(jk_prettyprintobj.DumpMixin):
 	#
 	# @return	str[]		Text output of the 'add' command
 	#
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def add(self, gitRootDir:str, filePath:str, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
 		assert os.path.isabs(filePath)
@@ -188,22 +410,17 @@ class GitWrapper(jk_prettyprintobj.DumpMixin):
 		if not filePath.startswith(s):
 			raise Exception("File does not seem to be part of the git tree: " + filePath)
 
-		r = GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "-C", ".", "add", filePath ], log)
-		if (r is None) or r.isError:
-			if log:
-				r.dump(printFunc=log.warn)
-			raise Exception("Running git failed!")
-		if r.stdOutLines:
-			return r.stdOutLines
-		else:
-			return []
+		r = self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "add", filePath ], log)
+		_GitOutputParser.checkResult(r, log)
+		return _GitOutputParser.stdOutLines(r)
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def pull(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
 		assert os.path.isdir(gitRootDir)
 
-		r = GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "-C", ".", "pull" ], log)
+		r = self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "pull" ], log)
 
 		# STDOUT: 'Updating 293bc22..81ad022'
 		# STDOUT: 'Fast-forward'
@@ -213,19 +430,67 @@ class GitWrapper(jk_prettyprintobj.DumpMixin):
 		# STDERR: '   293bc22..81ad022  master     -> origin/master'
 		# RETURNCODE: 0
 
-		if (r is None) or (r.returnCode != 0):
-			if log:
-				r.dump(printFunc=log.warn)
-			raise Exception("Running git failed!")
+		_GitOutputParser.checkResult(r, log, bCheckRCOnly=True)
+		return _GitOutputParser.allOutputLines(r)
+	#
 
-		ret = []
-		if r.stdOutLines:
-			ret.extend(r.stdOutLines)
-		if r.stdErrLines:
-			ret.extend(r.stdErrLines)
-		return ret
 	#
+	# Fetch multiple remotes at once. A single `git fetch --multiple` is run that fetches up to `jobs` remotes in parallel.
+	#
+	# The references updated are returned. With git 2.41 or later they are taken from the output of `git fetch --porcelain`.
+	# With older versions of git the remote tracking branches and tags are compared before and after fetching; references
+	# rejected by git are not reported then.
+	#
+	# @param		str[] remotes			(optional) The names of the remotes to fetch. If not specified all remotes are fetched.
+	# @param		int jobs				(optional) The number of remotes to fetch in parallel. (Ignored by git before 2.24.)
+	# @param		bool bPrune				(optional) If `True` remote tracking branches no longer existing on the remote are removed.
+	# @return		GitRefUpdate[]			The references that have been updated (or rejected) by git.
+	#
+	@GitDeadline.aware
+	@jk_typing.checkFunctionSignature()
+	def fetch(self,
+			gitRootDir:str,
+			remotes:typing.List[str] = None,
+			jobs:int = DEFAULT_FETCH_JOBS,
+			bPrune:bool = True,
+			log:jk_logging.AbstractLogger = None,
+		) -> typing.List[GitRefUpdate]:
 
+		assert os.path.isdir(gitRootDir)
+		assert jobs > 0
+
+		if remotes is None:
+			r = self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "remote" ], log)
+			_GitOutputParser.checkResult(r, log, bCheckRCOnly=True)
+			remotes = _GitOutputParser.stdOutLines(r)
+		if not remotes:
+			return []
+
+		if self.__gitHelper.version < jk_version.Version("2.24"):
+			jobs = None
+		bPorcelain = self.__gitHelper.supportsFetchPorcelain
+
+		if bPorcelain:
+			r = self.__gitHelper.runGitWD(gitRootDir, _GitOutputParser.fetchArgs(remotes, jobs, bPrune, True), log,
+				bRaiseExceptionOnError=False)
+			if (r is not None) and (r.returnCode == 1):
+				# git exits with 1 if references have been rejected: the remaining ones have been updated nevertheless
+				ret = _GitOutputParser.parseFetchPorcelainOutput(_GitOutputParser.stdOutLines(r), remotes)
+				if any([ x.kind == GitRefUpdate.KIND_REJECTED for x in ret ]):
+					return ret
+			_GitOutputParser.checkResult(r, log, bCheckRCOnly=True)
+			return _GitOutputParser.parseFetchPorcelainOutput(_GitOutputParser.stdOutLines(r), remotes)
+
+		before = self.__getRefSnapshot(gitRootDir, remotes, log)
+		r = self.__gitHelper.runGitWD(gitRootDir, _GitOutputParser.fetchArgs(remotes, jobs, bPrune, False), log)
+		_GitOutputParser.checkResult(r, log, bCheckRCOnly=True)
+		after = self.__getRefSnapshot(gitRootDir, remotes, log)
+
+		return _GitOutputParser.diffRefSnapshots(before, after, remotes,
+			lambda oldHash, newHash: self.__isAncestor(gitRootDir, oldHash, newHash, log))
+	#
+
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def clone(self, gitRootDir:str, url:str, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
 		assert os.path.isdir(gitRootDir)
@@ -236,49 +501,167 @@ class GitWrapper(jk_prettyprintobj.DumpMixin):
 		for something in os.listdir(gitRootDir):
 			raise Exception("Target directory is not empty: " + gitRootDir)
 
-		r = GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "clone", url, "." ], log)
-		if (r is None) or (r.returnCode != 0):
-			if log:
-				r.dump(printFunc=log.warn)
-			raise Exception("Running git failed!")
-		if r.stdErrLines:
-			return r.stdErrLines
-		else:
-			return []
+		r = self.__gitHelper.runGitWD(gitRootDir, [ "clone", url, "." ], log)
+		_GitOutputParser.checkResult(r, log, bCheckRCOnly=True)
+		return r.stdErrLines if r.stdErrLines else []
 	#
 
 	#
 	# Download a single file from the HEAD revision.
+	# For compatibility the text is normalized: lines are right trimmed, leading and trailing empty lines are removed.
+	# Use `downloadFromRevision()` to retrieve the content unchanged.
 	#
 	# @return		str			Either returns the file content if the file exists or `None` if the file does not exist.
 	#
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
-	def downloadFromHead(self, gitRootDir:str, filePath:str, log:jk_logging.AbstractLogger = None) -> str:
-		r = GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "-C", ".", "show", "HEAD:" + filePath ], log, bRaiseExceptionOnError=False)
-		if (r is None) or r.isError:
-			if (r.returnCode == 128) and r.stdErrLines and r.stdErrLines[0].startswith("fatal:"):
-				if ("does not exist" in r.stdErrLines[0]) or ("but not in 'HEAD'" in r.stdErrLines[0]):
-					return None
-			if log:
-				r.dump(printFunc=log.warn)
-			raise Exception("Running git failed!")
-		if r.stdOutLines:
-			return "\n".join(r.stdOutLines)
-		else:
-			return ""
+	def downloadFromHead(self, gitRootDir:str, filePath:str, log:jk_logging.AbstractLogger = None) -> typing.Union[str,None]:
+		return _GitOutputParser.toDownloadedText(self.downloadFromRevision(gitRootDir, "HEAD", filePath, log))
 	#
 
+	#
+	# Download a single file from the specified revision.
+	# This method uses a long running `git cat-file --batch` process that is shared between all calls for the same repository.
+	#
+	# @param		str gitRootDir		The root directory of the repository.
+	# @param		str revision		The revision to retrieve the file from, e.g. "HEAD", a branch name, a tag name or a commit hash.
+	# @param		str filePath		The path of the file relative to the repository root.
+	# @return		str					Either returns the file content if the file exists or `None` if the file does not exist.
+	#
+	@GitDeadline.aware
+	@jk_typing.checkFunctionSignature()
+	def downloadFromRevision(self, gitRootDir:str, revision:str, filePath:str, log:jk_logging.AbstractLogger = None) -> typing.Union[str,None]:
+		data = self.__gitHelper.getCatFileBatch(gitRootDir).readBlob(revision, filePath, log)
+		if data is None:
+			return None
+		return data.decode("utf-8")
+	#
+
+	#
+	# Download multiple files from the specified revision using a single git process.
+	#
+	# @param		str gitRootDir		The root directory of the repository.
+	# @param		str revision		The revision to retrieve the files from, e.g. "HEAD", a branch name, a tag name or a commit hash.
+	# @param		str[] filePaths		The paths of the files relative to the repository root.
+	# @return		dict				A dictionary that maps each file path to the raw file content or `None` if the file does not exist.
+	#
+	@GitDeadline.aware
+	@jk_typing.checkFunctionSignature()
+	def downloadMany(self,
+			gitRootDir:str,
+			revision:str,
+			filePaths:typing.Union[typing.List[str],typing.Tuple[str]],
+			log:jk_logging.AbstractLogger = None,
+		) -> typing.Dict[str,typing.Union[bytes,None]]:
+
+		return dict(self.iterDownloadMany(gitRootDir, revision, filePaths, log))
+	#
+
+	#
+	# Download multiple files from the specified revision using a single git process. In contrast to `downloadMany()` the files
+	# are returned lazily one by one so that only a single file is held in memory at any time.
+	#
+	# @param		str gitRootDir		The root directory of the repository.
+	# @param		str revision		The revision to retrieve the files from, e.g. "HEAD", a branch name, a tag name or a commit hash.
+	# @param		str[] filePaths		The paths of the files relative to the repository root.
+	# @return		iterable			Yields tuples of `(filePath, data)` in the order specified. `data` is `None` if the file does not exist.
+	#
+	@GitDeadline.aware
+	def iterDownloadMany(self,
+			gitRootDir:str,
+			revision:str,
+			filePaths:typing.Iterable[str],
+			log:jk_logging.AbstractLogger = None,
+		) -> typing.Iterator[typing.Tuple[str,typing.Union[bytes,None]]]:
+
+		filePaths = list(filePaths)
+		it = GitCatFileBatch.iterObjects(
+			self.__gitHelper.gitBinPath,
+			gitRootDir,
+			[ revision + ":" + filePath for filePath in filePaths ],
+			log,
+		)
+		try:
+			for filePath, r in zip(filePaths, it):
+				if r is None:
+					yield filePath, None
+				elif r[1] != "blob":
+					raise Exception("Not a file: " + repr(filePath))
+				else:
+					yield filePath, r[2]
+		finally:
+			it.close()
+	#
+
+	#
+	# Write a single file of the specified revision to disk. The content is copied chunk by chunk: it is neither decoded nor held in
+	# memory as a whole. This method uses the long running `git cat-file --batch` process shared between all calls for the same repository.
+	#
+	# The destination file is replaced atomically; missing parent directories are created. (File modes are not applied.)
+	#
+	# @param		str gitRootDir		The root directory of the repository.
+	# @param		str revision		The revision to retrieve the file from, e.g. "HEAD", a branch name, a tag name or a commit hash.
+	# @param		str filePath		The path of the file relative to the repository root.
+	# @param		str destFilePath	The file to write.
+	# @return		bool				Returns `True` if the file has been written and `False` if the file does not exist in the revision.
+	#
+	@GitDeadline.aware
+	@jk_typing.checkFunctionSignature()
+	def exportBlob(self, gitRootDir:str, revision:str, filePath:str, destFilePath:str, log:jk_logging.AbstractLogger = None) -> bool:
+		return self.__gitHelper.getCatFileBatch(gitRootDir).exportBlob(revision, filePath, destFilePath, log)
+	#
+
+	#
+	# Write multiple files of the specified revision to disk using a single git process. (See `exportBlob()`.)
+	#
+	# @param		str gitRootDir		The root directory of the repository.
+	# @param		str revision		The revision to retrieve the files from, e.g. "HEAD", a branch name, a tag name or a commit hash.
+	# @param		dict exports		Maps the paths of the files (relative to the repository root) to the files to write. Alternatively
+	#									an iterable of `(filePath, destFilePath)` tuples can be specified.
+	# @return		dict				Maps each file path to `True` if the file has been written or `False` if it does not exist in the revision.
+	#
+	@GitDeadline.aware
+	def exportBlobs(self,
+			gitRootDir:str,
+			revision:str,
+			exports:typing.Union[typing.Dict[str,str],typing.Iterable[typing.Tuple[str,str]]],
+			log:jk_logging.AbstractLogger = None,
+		) -> typing.Dict[str,bool]:
+
+		exports = list(exports.items()) if isinstance(exports, dict) else list(exports)
+		it = GitCatFileBatch.exportObjects(
+			self.__gitHelper.gitBinPath,
+			gitRootDir,
+			[ (revision + ":" + filePath, destFilePath) for filePath, destFilePath in exports ],
+			log,
+		)
+		ret = {}
+		try:
+			for (filePath, _), r in zip(exports, it):
+				if r is None:
+					ret[filePath] = False
+				elif r[1] != "blob":
+					raise Exception("Not a file: " + repr(filePath))
+				else:
+					ret[filePath] = True
+		finally:
+			it.close()
+		return ret
+	#
+
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def init(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> None:
-		GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "init" ], log)
+		self.__gitHelper.runGitWD(gitRootDir, [ "init" ], log)
 	#
 
 	#
 	# Run 'git flow init' with using all default settings.
 	#
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def flowInit(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> None:
-		r = GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "flow", "init", "-d" ], log, bRaiseExceptionOnError=False)
+		r = self.__gitHelper.runGitWD(gitRootDir, [ "flow", "init", "-d" ], log, bRaiseExceptionOnError=False)
 		if "'flow' is not a git command" in r.stdErrStr:
 			raise Exception("git-flow is not installed!")
 		if r.isErrorRC:
@@ -287,70 +670,75 @@ class GitWrapper(jk_prettyprintobj.DumpMixin):
 			raise Exception("Running git failed!")
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def commit(self, gitRootDir:str, commitMsg:str, log:jk_logging.AbstractLogger = None) -> None:
 		assert commitMsg
 
-		GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "commit", "-m", commitMsg ], log)
+		self.__gitHelper.runGitWD(gitRootDir, [ "commit", "-m", commitMsg ], log)
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def listTags(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
-		r = GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "-C", ".", "tag", "--list" ], log)
+		r = self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "tag", "--list" ], log)
 		return r.stdOutLines
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def createTag(self, gitRootDir:str, tagName:str, commitMsg:str, log:jk_logging.AbstractLogger = None) -> None:
 		assert tagName
 		assert commitMsg
 
-		GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "-C", ".", "tag", "-a", tagName, "-m", commitMsg ], log)
+		self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "tag", "-a", tagName, "-m", commitMsg ], log)
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def deleteTag(self, gitRootDir:str, tagName:str, log:jk_logging.AbstractLogger = None) -> None:
 		assert tagName
 
-		GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "-C", ".", "tag", "-d", tagName ], log)
+		self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "tag", "-d", tagName ], log)
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def listBranches(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
-		r = GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "-C", ".", "branch", "--all" ], log)
-		if r.isError:
-			if log:
-				r.dump(printFunc=log.warn)
-			raise Exception("Running git failed!")
+		r = self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "branch", "--all" ], log)
+		_GitOutputParser.checkResult(r, log)
 		return r.stdOutLines
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def createBranch(self, gitRootDir:str, branchName:str, log:jk_logging.AbstractLogger = None) -> None:
 		assert branchName
 
-		GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "-C", ".", "checkout", "-b", branchName ], log)
+		self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "checkout", "-b", branchName ], log)
 		# NOTE: STDERR is something like "Switched to a new branch '....'"
 	#
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def switchToBranch(self, gitRootDir:str, branchName:str, log:jk_logging.AbstractLogger = None) -> None:
 		assert branchName
 
-		GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "-C", ".", "checkout", branchName ], log)
+		self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "checkout", branchName ], log)
 		# NOTE: STDERR is something like "Switched to a branch '....'"
 	#
 
 	#@jk_typing.checkFunctionSignature()
 	#def describeAll(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
-	#	r = GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "-C", ".", "describe", "--tags", "--all" ], log)
+	#	r = self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "describe", "--tags", "--all" ], log)
 	#	r.dump()
 	#	return r.stdOutLines
 	##
 
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def showLog(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
-		r = GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "-C", ".", "log" ], log)
+		r = self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "log" ], log)
 		return r.stdOutLines
 	#
 
@@ -359,6 +747,7 @@ class GitWrapper(jk_prettyprintobj.DumpMixin):
 	#
 	# @return	str[]		Text output of the 'log' command
 	#
+	@GitDeadline.aware
 	@jk_typing.checkFunctionSignature()
 	def showLogParsable(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> typing.List[str]:
 		# %P	parent hashes
@@ -367,25 +756,63 @@ class GitWrapper(jk_prettyprintobj.DumpMixin):
 		# %ce	committer email
 		# %cd	committer date
 		# %s	subject (= commit message)
-		r = GitWrapper.__GIT_HELPER.runGitWD(gitRootDir, [ "-C", ".", "log", "--pretty=format:\"%P|%H|%cn|%ce|%cd|%s\"" ], log)
-		if (r is None) or r.isError:
-			if r.stdErrLines \
-				and (r.stdErrLines[0].find("fatal: your current branch") >= 0) \
-				and (r.stdErrLines[0].find("does not have any commits yet") >= 0):
-				return []
-			else:
-				if log:
-					r.dump(printFunc=log.warn)
-				raise Exception("Running git failed!")
-		if r.stdOutLines:
-			ret = []
-			for line in r.stdOutLines:
-				assert line[0] == "\""
-				assert line[-1] == "\""
-				ret.append(line[1:-1])
-			return ret
-		else:
+		r = self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "log", "--pretty=format:\"%P|%H|%cn|%ce|%cd|%s\"" ], log)
+		if (r is not None) and r.isError and _GitOutputParser.isNoCommitsYetError(r.stdErrLines):
 			return []
+		_GitOutputParser.checkResult(r, log)
+		return _GitOutputParser.parseShowLogParsableOutput(r.stdOutLines)
+	#
+
+	#
+	# Get the hash of the commit HEAD refers to.
+	#
+	# @return		str			Returns the commit hash or `None` if there are no commits yet.
+	#
+	@GitDeadline.aware
+	@jk_typing.checkFunctionSignature()
+	def getHeadCommitHash(self, gitRootDir:str, log:jk_logging.AbstractLogger = None) -> typing.Union[str,None]:
+		r = self.__gitHelper.runGitWD(gitRootDir, [ "-C", ".", "rev-parse", "--verify", "-q", "HEAD^{commit}" ], log, bRaiseExceptionOnError=False)
+		if r.returnCode == 0:
+			return r.stdOutLines[0].strip()
+		if (r.returnCode == 1) and not r.stdOutLines:
+			return None
+		if log:
+			r.dump(printFunc=log.warn)
+		raise GitExecutionException("Running git failed!", r.commandArguments, r.returnCode, r.stdErrLines)
+	#
+
+	#
+	# Run `git log` and yield the commits while git is still writing its output. Commits are yielded from the latest to
+	# the oldest commit.
+	#
+	# @param		str gitRootDir			The root directory of the repository.
+	# @param		str revisionRange		(optional) A revision or revision range such as "HEAD" or "abc123..HEAD". Defaults to the current HEAD.
+	# @return		iterable				Yields a tuple of six strings for every commit:
+	#										* the parent hashes (separated by space)
+	#										* the commit hash
+	#										* the committer name
+	#										* the committer email
+	#										* the commit time: seconds since the epoch and the time zone offset, e.g. "1658649600 +0200"
+	#										* the subject
+	#
+	@GitDeadline.aware
+	def iterLogParsable(self,
+			gitRootDir:str,
+			revisionRange:str = None,
+			log:jk_logging.AbstractLogger = None,
+		) -> typing.Iterator[typing.Tuple[str,str,str,str,str,str]]:
+
+		_cmdArgs = _GitOutputParser.logParsableArgs(revisionRange)
+
+		bAnyYielded = False
+		try:
+			for fields in _GitOutputParser.iterLogRecords(self.__gitHelper.iterGitRecordsWD(gitRootDir, _cmdArgs, log, separator=b"\0")):
+				yield fields
+				bAnyYielded = True
+		except GitExecutionException as ee:
+			if not bAnyYielded and _GitOutputParser.isNoCommitsYetError(ee.stdErrLines):
+				return
+			raise
 	#
 
 #
@@ -1,19 +1,47 @@
-
-
-
 __author__ = "Jürgen Knauth"
 __version__ = "0.2022.7.24"
 
 
 
-from .AbstractRepositoryFile import AbstractRepositoryFile
-from .GitFileInfo import GitFileInfo
-from .GitCommitHistoryEntry import GitCommitHistoryEntry
-from .GitCommitHistory import GitCommitHistory
-
-from .GitWrapper import GitWrapper
-from .GitServerRepository import GitServerRepository
-from .GitWorkingCopy import GitWorkingCopy
-from .GitRemoteRepository import GitRemoteRepository
-
-
+#
+# All classes are imported on first access: `import jk_git` itself does not load any of the (partially heavy) dependencies.
+#
+
+from .impl._LazyModule import _LazyModule
+
+_LazyModule.install(__name__, {
+	"GitExecutionException": ".GitExecutionException",
+	"GitTimeoutException": ".GitTimeoutException",
+	"GitCancelledException": ".GitCancelledException",
+	"GitCancellationToken": ".GitCancellationToken",
+	"GitDeadline": ".GitDeadline",
+	"AbstractRepositoryFile": ".AbstractRepositoryFile",
+	"GitFileInfo": ".GitFileInfo",
+	"GitCommitHistoryEntry": ".GitCommitHistoryEntry",
+	"GitCommitGraph": ".GitCommitGraph",
+	"GitCommitHistorySlice": ".GitCommitHistorySlice",
+	"GitCommitHistory": ".GitCommitHistory",
+	"GitCommitHistoryCache": ".GitCommitHistoryCache",
+
+	"GitRefDatabase": ".GitRefDatabase",
+	"GitObjectStore": ".GitObjectStore",
+	"GitIndexEntry": ".GitIndexEntry",
+	"GitIndex": ".GitIndex",
+	"GitInvocation": ".GitInvocation",
+	"GitInstrumentation": ".GitInstrumentation",
+	"GitSSHMultiplexer": ".GitSSHMultiplexer",
+	"GitRefUpdate": ".GitRefUpdate",
+	"GitWrapper": ".GitWrapper",
+	"GitServerRepository": ".GitServerRepository",
+	"GitWorkingCopyWatcher": ".GitWorkingCopyWatcher",
+	"GitStatusCache": ".GitStatusCache",
+	"GitWorkingCopy": ".GitWorkingCopy",
+	"GitStatusScanResult": ".GitStatusScanResult",
+	"GitWorkingCopyFleet": ".GitWorkingCopyFleet",
+	"GitRemoteRepository": ".GitRemoteRepository",
+	"AsyncGitWrapper": ".AsyncGitWrapper",
+	"AsyncGitWorkingCopy": ".AsyncGitWorkingCopy",
+
+	"impl": ".impl",
+	"workingcopy": ".workingcopy",
+})
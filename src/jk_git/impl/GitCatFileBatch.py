@@ -0,0 +1,576 @@
+
+
+
+import os
+import time
+import typing
+import tempfile
+import threading
+import subprocess
+
+import jk_typing
+import jk_logging
+
+from ..GitDeadline import GitDeadline
+from ._GitProcessWatch import _GitProcessWatch
+
+
+
+
+#
+# This class manages a long running `git cat-file --batch` process for a single repository.
+# Objects can be requested from multiple threads: requests are serialized internally. If the process dies it is restarted
+# automatically on the next request. If the process is not used for `idleTimeout` seconds it is terminated.
+#
+# The limits of the current `GitDeadline` scope apply to every request: if a request does not complete in time (or gets cancelled)
+# the process is killed (and restarted on the next request).
+#
+class GitCatFileBatch(object):
+
+	# the size of the buffer used to copy objects to files
+	EXPORT_BUFFER_SIZE = 65536
+
+	__CMD_ARGS = ( "cat-file", "--batch" )
+
+	# while waiting for the lock the limits are checked at this interval (in seconds)
+	__LOCK_POLL_INTERVAL = 0.05
+
+	# the mode of exported files (determined on first use)
+	__fileMode = None
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str gitBinPath			The path to the git binary.
+	# @param		str gitRootDir			The root directory of the repository (working copy or bare repository).
+	# @param		float idleTimeout		The number of seconds after which an unused process is terminated.
+	#
+	@jk_typing.checkFunctionSignature()
+	def __init__(self, gitBinPath:str, gitRootDir:str, idleTimeout:typing.Union[int,float] = 60):
+		assert idleTimeout > 0
+
+		self.__gitBinPath = gitBinPath
+		self.__gitRootDir = gitRootDir
+		self.__idleTimeout = idleTimeout
+
+		self.__lock = threading.Lock()
+		self.__idleCondition = threading.Condition(self.__lock)
+		self.__process = None
+		self.__idleThread = None
+		self.__lastUsed = 0
+		self.__countStarts = 0
+		self.__exportBuffer = None
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def gitRootDir(self) -> str:
+		return self.__gitRootDir
+	#
+
+	@property
+	def idleTimeout(self) -> float:
+		return self.__idleTimeout
+	#
+
+	#
+	# Indicates if a `git cat-file` process is running right now.
+	#
+	@property
+	def isRunning(self) -> bool:
+		p = self.__process
+		return (p is not None) and (p.poll() is None)
+	#
+
+	#
+	# The number of times a `git cat-file` process has been started by this object.
+	#
+	@property
+	def countStarts(self) -> int:
+		return self.__countStarts
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __startProcess(self, log:jk_logging.AbstractLogger = None):
+		cmd = [ self.__gitBinPath, "-C", self.__gitRootDir, *GitCatFileBatch.__CMD_ARGS ]
+		if log:
+			log.notice("run: " + str(cmd))
+
+		self.__process = subprocess.Popen(cmd, shell=False, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+		self.__countStarts += 1
+
+		# (the idle watcher clears this reference while holding the lock before it exits: checking `is_alive()` instead would miss a
+		# watcher that has just stopped the previous process)
+		if self.__idleThread is None:
+			self.__idleThread = threading.Thread(target=self.__idleWatchLoop, daemon=True)
+			self.__idleThread.start()
+	#
+
+	#
+	# Terminate the process. The caller must hold the lock.
+	#
+	def __stopProcess(self):
+		p = self.__process
+		self.__process = None
+		if p is None:
+			return
+
+		try:
+			p.stdin.close()
+		except Exception as ee:
+			pass
+		try:
+			p.wait(2)
+		except subprocess.TimeoutExpired:
+			p.kill()
+			p.wait()
+		p.stdout.close()
+
+		self.__idleCondition.notify_all()
+	#
+
+	#
+	# Runs in a background thread and terminates the process if it has not been used for a while.
+	#
+	def __idleWatchLoop(self):
+		with self.__lock:
+			try:
+				while self.__process is not None:
+					tRemaining = self.__lastUsed + self.__idleTimeout - time.monotonic()
+					if tRemaining <= 0:
+						self.__stopProcess()
+						break
+					self.__idleCondition.wait(tRemaining)
+			finally:
+				self.__idleThread = None
+	#
+
+	#
+	# Send a single request and read the response. The caller must hold the lock.
+	#
+	def __request(self, objectName:str) -> typing.Union[typing.Tuple[str,str,bytes],None]:
+		p = self.__process
+		p.stdin.write(objectName.encode("utf-8") + b"\n")
+		p.stdin.flush()
+		return GitCatFileBatch._readRecord(p.stdout)
+	#
+
+	#
+	# Send a single request and write the object to the specified file. The caller must hold the lock.
+	#
+	def __requestExport(self, objectName:str, destFilePath:str) -> typing.Union[typing.Tuple[str,str,int],None]:
+		if self.__exportBuffer is None:
+			self.__exportBuffer = memoryview(bytearray(GitCatFileBatch.EXPORT_BUFFER_SIZE))
+		p = self.__process
+		p.stdin.write(objectName.encode("utf-8") + b"\n")
+		p.stdin.flush()
+		return GitCatFileBatch._exportRecord(p.stdout, destFilePath, self.__exportBuffer)
+	#
+
+	#
+	# Kill the process currently running (if any). This method is invoked without holding the lock.
+	#
+	def __killProcess(self):
+		p = self.__process
+		if p is not None:
+			_GitProcessWatch.killProcess(p, False)
+	#
+
+	#
+	# Kill and then stop the process. (git might be blocked writing output nobody is going to read.) The caller must hold the lock.
+	#
+	def __abortProcess(self):
+		self.__killProcess()
+		self.__stopProcess()
+	#
+
+	#
+	# Acquire the lock. Requests are serialized: a request waiting for another one to complete gives up if its deadline passes or it gets
+	# cancelled. (A cancellation token does not wake up a thread waiting for a lock: the limits are checked periodically.)
+	#
+	def __acquireLockE(self):
+		limits = GitDeadline.current()
+		if limits is None:
+			self.__lock.acquire()
+			return
+
+		while True:
+			limits.checkE(GitCatFileBatch.__CMD_ARGS)
+			remainingTime = limits.remainingTime
+			t = GitCatFileBatch.__LOCK_POLL_INTERVAL if remainingTime is None else min(remainingTime, GitCatFileBatch.__LOCK_POLL_INTERVAL)
+			if self.__lock.acquire(timeout=t):
+				return
+	#
+
+	#
+	# Run the specified request function. The process is started if required and restarted once if it died. The caller must hold the lock.
+	#
+	def __runRequest(self, requestFunction, log:jk_logging.AbstractLogger, *args):
+		limits = GitDeadline.current()
+		if limits is not None:
+			limits.checkE(GitCatFileBatch.__CMD_ARGS)
+
+		self.__lastUsed = time.monotonic()
+
+		if not self.isRunning:
+			self.__stopProcess()
+			self.__startProcess(log)
+
+		with _GitProcessWatch(limits, self.__killProcess) as watch:
+			try:
+				return requestFunction(*args)
+			except (BrokenPipeError, EOFError, OSError) as ee:
+				self.__stopProcess()
+				if watch.isTriggered:
+					raise watch.exception(GitCatFileBatch.__CMD_ARGS) from ee
+				if isinstance(ee, OSError) and (ee.filename is not None):
+					# failed to write the destination file: as the output has not been consumed completely the process had to be stopped
+					raise
+				# the process seems to have died; restart it once and try again
+				if log:
+					log.warn("git cat-file died, restarting it: " + str(ee))
+				self.__startProcess(log)
+				try:
+					return requestFunction(*args)
+				except (BrokenPipeError, EOFError, OSError) as ee:
+					self.__stopProcess()
+					if watch.isTriggered:
+						raise watch.exception(GitCatFileBatch.__CMD_ARGS) from ee
+					raise
+				except BaseException:
+					self.__abortProcess()
+					raise
+			except BaseException:
+				# the response might not have been consumed completely (e.g. on a `KeyboardInterrupt` or a malformed header): the next
+				# request would read the rest of it, so the process must be stopped
+				self.__abortProcess()
+				raise
+			finally:
+				self.__lastUsed = time.monotonic()
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Read an object from the repository.
+	#
+	# @param		str objectName			Any object name git understands, e.g. a hash or something like "HEAD:some/file.txt".
+	# @return		tuple					Returns `None` if the object does not exist or a tuple of `(objectHash, objectType, data)` otherwise.
+	#
+	@jk_typing.checkFunctionSignature()
+	def readObject(self, objectName:str, log:jk_logging.AbstractLogger = None) -> typing.Union[typing.Tuple[str,str,bytes],None]:
+		if ("\n" in objectName) or not objectName:
+			raise Exception("Invalid object name: " + repr(objectName))
+
+		self.__acquireLockE()
+		try:
+			return self.__runRequest(self.__request, log, objectName)
+		finally:
+			self.__lock.release()
+	#
+
+	#
+	# Read the content of a file in the specified revision.
+	#
+	# @param		str revision			The revision to use, e.g. "HEAD".
+	# @param		str filePath			The path of the file relative to the repository root.
+	# @return		bytes					Returns the raw file content or `None` if the file does not exist.
+	#
+	@jk_typing.checkFunctionSignature()
+	def readBlob(self, revision:str, filePath:str, log:jk_logging.AbstractLogger = None) -> typing.Union[bytes,None]:
+		r = self.readObject(revision + ":" + filePath, log)
+		if r is None:
+			return None
+		if r[1] != "blob":
+			raise Exception("Not a file: " + repr(filePath))
+		return r[2]
+	#
+
+	#
+	# Write the content of a file in the specified revision to a file. The data is copied in chunks: it is never held in memory as a whole.
+	# The destination file is replaced atomically. (File modes are not applied.)
+	#
+	# @param		str revision			The revision to use, e.g. "HEAD".
+	# @param		str filePath			The path of the file relative to the repository root.
+	# @param		str destFilePath		The file to write.
+	# @return		bool					Returns `True` if the file has been written and `False` if the file does not exist in the revision.
+	#
+	@jk_typing.checkFunctionSignature()
+	def exportBlob(self, revision:str, filePath:str, destFilePath:str, log:jk_logging.AbstractLogger = None) -> bool:
+		objectName = revision + ":" + filePath
+		if "\n" in objectName:
+			raise Exception("Invalid object name: " + repr(objectName))
+
+		self.__acquireLockE()
+		try:
+			r = self.__runRequest(self.__requestExport, log, objectName, destFilePath)
+		finally:
+			self.__lock.release()
+		if r is None:
+			return False
+		if r[1] != "blob":
+			raise Exception("Not a file: " + repr(filePath))
+		return True
+	#
+
+	#
+	# Terminate the background process (if it is running). It will be restarted automatically on the next request.
+	#
+	def close(self):
+		with self.__lock:
+			self.__stopProcess()
+	#
+
+	################################################################################################################################
+	## Static Methods
+	################################################################################################################################
+
+	#
+	# Run a dedicated `git cat-file --batch` process, request all specified objects and yield the responses one by one in the order
+	# the objects have been specified. Only a single object is held in memory at any time. If the caller stops iterating early
+	# the process is terminated. The limits of the current `GitDeadline` scope (at the time this method is invoked) apply.
+	#
+	# @param		str gitBinPath			The path to the git binary.
+	# @param		str gitRootDir			The root directory of the repository (working copy or bare repository).
+	# @param		str[] objectNames		The names of the objects to retrieve, e.g. "HEAD:some/file.txt".
+	# @return		iterable				Yields `None` for every object that does not exist and a tuple of `(objectHash, objectType, data)` otherwise.
+	#
+	@staticmethod
+	def iterObjects(
+			gitBinPath:str,
+			gitRootDir:str,
+			objectNames:typing.Iterable[str],
+			log:jk_logging.AbstractLogger = None,
+		) -> typing.Iterator[typing.Union[typing.Tuple[str,str,bytes],None]]:
+
+		objectNames = list(objectNames)
+		return GitCatFileBatch.__iterResponses(gitBinPath, gitRootDir, objectNames, log, GitDeadline.current(),
+			lambda stream, i: GitCatFileBatch._readRecord(stream))
+	#
+
+	#
+	# Run a dedicated `git cat-file --batch` process and write the specified blobs to files. The data is copied chunk by chunk using
+	# a single buffer: memory consumption does not depend on the size of the blobs. Destination files are replaced atomically; their
+	# parent directories are created if required. If the caller stops iterating early the process is terminated. The limits of
+	# the current `GitDeadline` scope (at the time this method is invoked) apply.
+	#
+	# @param		str gitBinPath			The path to the git binary.
+	# @param		str gitRootDir			The root directory of the repository (working copy or bare repository).
+	# @param		tuple[] exports			Tuples of `(objectName, destFilePath)`, e.g. `("HEAD:some/file.txt", "/tmp/file.txt")`.
+	# @return		iterable				Yields `None` for every object that does not exist and a tuple of `(objectHash, objectType, size)`
+	#										otherwise. (Objects that are not blobs are not written.)
+	#
+	@staticmethod
+	def exportObjects(
+			gitBinPath:str,
+			gitRootDir:str,
+			exports:typing.Iterable[typing.Tuple[str,str]],
+			log:jk_logging.AbstractLogger = None,
+		) -> typing.Iterator[typing.Union[typing.Tuple[str,str,int],None]]:
+
+		exports = list(exports)
+		buffer = memoryview(bytearray(GitCatFileBatch.EXPORT_BUFFER_SIZE))
+		return GitCatFileBatch.__iterResponses(gitBinPath, gitRootDir, [ x[0] for x in exports ], log, GitDeadline.current(),
+			lambda stream, i: GitCatFileBatch._exportRecord(stream, exports[i][1], buffer))
+	#
+
+	#
+	# Run a dedicated `git cat-file --batch` process, request all specified objects and yield the results of reading the responses.
+	#
+	# @param		GitDeadline limits		The limits to enforce (or `None`).
+	# @param		callable readResponse	A callable that reads the response to the i-th request: `readResponse(stream, i)`
+	#
+	@staticmethod
+	def __iterResponses(
+			gitBinPath:str,
+			gitRootDir:str,
+			objectNames:typing.List[str],
+			log:jk_logging.AbstractLogger,
+			limits:typing.Union[GitDeadline,None],
+			readResponse,
+		):
+
+		for objectName in objectNames:
+			if ("\n" in objectName) or not objectName:
+				raise Exception("Invalid object name: " + repr(objectName))
+		if not objectNames:
+			return
+		if limits is not None:
+			limits.checkE(GitCatFileBatch.__CMD_ARGS)
+
+		cmd = [ gitBinPath, "-C", gitRootDir, *GitCatFileBatch.__CMD_ARGS ]
+		if log:
+			log.notice("run: " + str(cmd))
+		p = subprocess.Popen(cmd, shell=False, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+		watch = _GitProcessWatch(limits, lambda: _GitProcessWatch.killProcess(p, False))
+		watch.__enter__()
+
+		# write the requests in a separate thread: otherwise we might dead lock if git fills the output pipe
+		def _writeRequests():
+			try:
+				for objectName in objectNames:
+					p.stdin.write(objectName.encode("utf-8") + b"\n")
+				p.stdin.close()
+			except (BrokenPipeError, OSError, ValueError):
+				pass
+		writerThread = threading.Thread(target=_writeRequests, daemon=True)
+		writerThread.start()
+
+		try:
+			for i in range(len(objectNames)):
+				try:
+					r = readResponse(p.stdout, i)
+				except EOFError as ee:
+					if watch.isTriggered:
+						raise watch.exception(GitCatFileBatch.__CMD_ARGS) from ee
+					raise
+				yield r
+		finally:
+			watch.__exit__(None, None, None)
+			if p.poll() is None:
+				p.kill()
+			p.wait()
+			writerThread.join()
+			p.stdout.close()
+	#
+
+	#
+	# Reads a single response of `git cat-file --batch` from the specified stream.
+	#
+	# @return		tuple					Returns `None` if the object does not exist or a tuple of `(objectHash, objectType, data)` otherwise.
+	#
+	@staticmethod
+	def _readRecord(stream) -> typing.Union[typing.Tuple[str,str,bytes],None]:
+		header = GitCatFileBatch.__readHeader(stream)
+		if header is None:
+			return None
+
+		data = stream.read(header[2])
+		if len(data) != header[2]:
+			raise EOFError("Unexpected end of output of git cat-file!")
+		GitCatFileBatch.__readTerminator(stream)
+		return header[0], header[1], data
+	#
+
+	#
+	# Reads a single response of `git cat-file --batch` from the specified stream and writes the object data to a file. The data is
+	# copied chunk by chunk using the specified buffer. The file is written only if the object is a blob; it is replaced atomically.
+	#
+	# @param		stream stream			The output of `git cat-file --batch`.
+	# @param		str destFilePath		The file to write.
+	# @param		memoryview buffer		The buffer to use for copying.
+	# @return		tuple					Returns `None` if the object does not exist or a tuple of `(objectHash, objectType, size)` otherwise.
+	#
+	@staticmethod
+	def _exportRecord(stream, destFilePath:str, buffer:memoryview) -> typing.Union[typing.Tuple[str,str,int],None]:
+		header = GitCatFileBatch.__readHeader(stream)
+		if header is None:
+			return None
+
+		if header[1] != "blob":
+			GitCatFileBatch.__copyData(stream, header[2], buffer)
+		else:
+			dirPath, fileName = os.path.split(destFilePath)
+			if dirPath:
+				os.makedirs(dirPath, exist_ok=True)
+			# (the temporary file name must be unique: other threads might export to the same destination at the same time)
+			fd, tempFilePath = tempfile.mkstemp(dir=dirPath or ".", prefix=fileName + ".", suffix=".tmp")
+			try:
+				try:
+					if hasattr(os, "fchmod"):
+						try:
+							os.fchmod(fd, GitCatFileBatch.__getFileMode())
+						except OSError as ee:
+							raise OSError(ee.errno, ee.strerror, destFilePath) from ee
+					GitCatFileBatch.__copyData(stream, header[2], buffer, fd, destFilePath)
+				finally:
+					os.close(fd)
+				os.replace(tempFilePath, destFilePath)
+			except BaseException:
+				try:
+					os.unlink(tempFilePath)
+				except OSError:
+					pass
+				raise
+
+		GitCatFileBatch.__readTerminator(stream)
+		return header
+	#
+
+	#
+	# Temporary files are created with mode 0600: exported files get the mode a newly created file would have (0666 minus umask).
+	#
+	@staticmethod
+	def __getFileMode() -> int:
+		if GitCatFileBatch.__fileMode is None:
+			umask = os.umask(0o022)
+			os.umask(umask)
+			GitCatFileBatch.__fileMode = 0o666 & ~umask
+		return GitCatFileBatch.__fileMode
+	#
+
+	#
+	# Reads the header of a single response of `git cat-file --batch`.
+	#
+	# @return		tuple					Returns `None` if the object does not exist or a tuple of `(objectHash, objectType, size)` otherwise.
+	#
+	@staticmethod
+	def __readHeader(stream) -> typing.Union[typing.Tuple[str,str,int],None]:
+		header = stream.readline()
+		if not header.endswith(b"\n"):
+			raise EOFError("Unexpected end of output of git cat-file!")
+
+		parts = header[:-1].decode("utf-8").split(" ")
+		if parts[-1] in ("missing", "ambiguous"):
+			# "<name> missing" or "<name> ambiguous"; note: <name> might contain spaces
+			return None
+		if len(parts) != 3:
+			raise Exception("Failed to parse output of git cat-file: " + repr(header))
+
+		return parts[0], parts[1], int(parts[2])
+	#
+
+	@staticmethod
+	def __readTerminator(stream):
+		if stream.read(1) != b"\n":
+			raise EOFError("Unexpected end of output of git cat-file!")
+	#
+
+	#
+	# Copy the specified number of bytes from the stream to a file descriptor (or discard them if `fd` is `None`).
+	#
+	@staticmethod
+	def __copyData(stream, size:int, buffer:memoryview, fd:typing.Union[int,None] = None, destFilePath:str = None):
+		bufferSize = len(buffer)
+		while size > 0:
+			n = stream.readinto(buffer[:size] if size < bufferSize else buffer)
+			if not n:
+				raise EOFError("Unexpected end of output of git cat-file!")
+			size -= n
+			if fd is not None:
+				pos = 0
+				while pos < n:
+					try:
+						pos += os.write(fd, buffer[pos:n])
+					except OSError as ee:
+						# (the file name indicates that the destination file caused the error and not git)
+						raise OSError(ee.errno, ee.strerror, destFilePath) from ee
+	#
+
+#
+
+
+
+
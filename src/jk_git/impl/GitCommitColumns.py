@@ -0,0 +1,193 @@
+
+
+
+import typing
+from array import array
+
+
+
+
+
+#
+# This class stores commit data column by column in compact containers:
+#
+# * commit hashes and parent hashes are packed as binary values into byte arrays,
+# * timestamps and time zone offsets are stored in typed arrays,
+# * committer names and email addresses are interned and stored as indices into a shared string table.
+#
+# Commits are identified by their index in the order they have been appended.
+#
+class GitCommitColumns(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	def __init__(self):
+		self.__hashLength = 0
+		self.__hashes = bytearray()
+		self.__parentOffsets = array("I", [ 0 ])
+		self.__parentHashes = bytearray()
+		self.__timestamps = array("q")
+		self.__tzOffsets = array("h")
+		self.__names = array("I")
+		self.__emails = array("I")
+		self.__texts:typing.List[typing.Union[str,None]] = []
+
+		self.__strings:typing.List[typing.Union[str,None]] = []
+		self.__stringIndices:typing.Dict[typing.Union[str,None],int] = {}
+
+		self.__hashIndex = None
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	#
+	# The length of a binary commit hash in bytes: 20 for SHA-1 repositories, 32 for SHA-256 repositories (and 0 if no commits are stored).
+	#
+	@property
+	def hashLength(self) -> int:
+		return self.__hashLength
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __intern(self, s:typing.Union[str,None]) -> int:
+		i = self.__stringIndices.get(s)
+		if i is None:
+			i = len(self.__strings)
+			self.__strings.append(s)
+			self.__stringIndices[s] = i
+		return i
+	#
+
+	def __packHash(self, hexHash:str) -> bytes:
+		b = bytes.fromhex(hexHash)
+		if len(b) != self.__hashLength:
+			raise Exception("Invalid commit hash: " + repr(hexHash))
+		return b
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def __len__(self):
+		return len(self.__timestamps)
+	#
+
+	#
+	# Append a commit.
+	#
+	# @param		str parentHashes		The hashes of the parent commits (separated by space) or `None`.
+	# @param		str commitHash			The commit hash (hexadecimal).
+	# @param		str committerName		The committer name.
+	# @param		str committerEMail		The committer email address.
+	# @param		int timestamp			The commit time in seconds since the epoch.
+	# @param		int tzOffsetMinutes		The offset of the committer's time zone in minutes.
+	# @param		str text				The subject.
+	#
+	def append(self,
+			parentHashes:typing.Union[str,None],
+			commitHash:str,
+			committerName:typing.Union[str,None],
+			committerEMail:typing.Union[str,None],
+			timestamp:int,
+			tzOffsetMinutes:int,
+			text:typing.Union[str,None],
+		):
+
+		if not self.__hashLength:
+			self.__hashLength = len(commitHash) // 2
+		self.__hashes += self.__packHash(commitHash)
+		if parentHashes:
+			for h in parentHashes.split():
+				self.__parentHashes += self.__packHash(h)
+		self.__parentOffsets.append(len(self.__parentHashes))
+		self.__timestamps.append(timestamp)
+		self.__tzOffsets.append(tzOffsetMinutes)
+		self.__names.append(self.__intern(committerName))
+		self.__emails.append(self.__intern(committerEMail))
+		self.__texts.append(text)
+
+		self.__hashIndex = None
+	#
+
+	def getHashBin(self, i:int) -> bytes:
+		n = self.__hashLength
+		return bytes(self.__hashes[i * n:(i + 1) * n])
+	#
+
+	def getHash(self, i:int) -> str:
+		n = self.__hashLength
+		return self.__hashes[i * n:(i + 1) * n].hex()
+	#
+
+	def getParentHashes(self, i:int) -> typing.Tuple[str]:
+		n = self.__hashLength
+		start = self.__parentOffsets[i]
+		end = self.__parentOffsets[i + 1]
+		return tuple([ self.__parentHashes[j:j + n].hex() for j in range(start, end, n) ])
+	#
+
+	def getParentCount(self, i:int) -> int:
+		return (self.__parentOffsets[i + 1] - self.__parentOffsets[i]) // self.__hashLength
+	#
+
+	def getTimestamp(self, i:int) -> int:
+		return self.__timestamps[i]
+	#
+
+	def getTZOffsetMinutes(self, i:int) -> int:
+		return self.__tzOffsets[i]
+	#
+
+	def getCommitterName(self, i:int) -> typing.Union[str,None]:
+		return self.__strings[self.__names[i]]
+	#
+
+	def getCommitterEMail(self, i:int) -> typing.Union[str,None]:
+		return self.__strings[self.__emails[i]]
+	#
+
+	def getText(self, i:int) -> typing.Union[str,None]:
+		return self.__texts[i]
+	#
+
+	#
+	# Get the index of the specified commit. The lookup table required for this is built on first use.
+	#
+	# @return		int				Returns the index or `None` if there is no such commit.
+	#
+	def indexOf(self, commitHash:str) -> typing.Union[int,None]:
+		if self.__hashIndex is None:
+			n = self.__hashLength
+			h = bytes(self.__hashes)
+			self.__hashIndex = { h[j:j + n]: i for i, j in enumerate(range(0, len(h), n)) }
+		try:
+			return self.__hashIndex.get(bytes.fromhex(commitHash))
+		except ValueError:
+			return None
+	#
+
+	#
+	# Iterate over the hashes of all commits.
+	#
+	def iterHashes(self) -> typing.Iterator[str]:
+		n = self.__hashLength
+		for j in range(0, len(self.__hashes), n):
+			yield self.__hashes[j:j + n].hex()
+	#
+
+#
+
+
+
+
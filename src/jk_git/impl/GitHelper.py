@@ -2,13 +2,27 @@
 
 
 import os
+import copy
+import time
+import shutil
 import typing
+import threading
+import subprocess
 
 import jk_typing
 import jk_version
 import jk_logging
 import jk_simpleexec
 
+from .GitCatFileBatch import GitCatFileBatch
+from .GitOutputStream import GitOutputStream
+from ._GitOutputParser import _GitOutputParser
+from ._GitVersionCache import _GitVersionCache
+from ._GitProcessWatch import _GitProcessWatch
+from ..GitExecutionException import GitExecutionException
+from ..GitInstrumentation import GitInstrumentation
+from ..GitDeadline import GitDeadline
+
 
 
 
@@ -22,11 +36,27 @@ class GitHelper(object):
 	#
 	# Constructor method.
 	#
+	# @param		AbstractLogger log		(optional) A logger.
+	# @param		str gitBinPath			(optional) The git binary to use. If not specified the binary is searched for. (See `_detectGitBinaryE()`.)
+	#
 	@jk_typing.checkFunctionSignature()
-	def __init__(self, log:jk_logging.AbstractLogger):
-		self.__gitBinPath = GitHelper._detectGitBinaryE()
+	def __init__(self, log:jk_logging.AbstractLogger = None, gitBinPath:str = None):
+		if gitBinPath is None:
+			self.__gitBinPath = GitHelper._detectGitBinaryE()
+		else:
+			if not GitHelper.__isExecutable(gitBinPath):
+				raise Exception("Not an executable: " + repr(gitBinPath))
+			self.__gitBinPath = os.path.abspath(gitBinPath)
 		self.__gitVersion = GitHelper._getVersion(self.__gitBinPath, log)
 		self.__gitPorcelainVersion = 1 if self.__gitVersion < jk_version.Version("2.8") else 2
+		self.__bSupportsStatusZ = self.__gitVersion >= jk_version.Version("2.11")
+		self.__bSupportsFetchPorcelain = self.__gitVersion >= jk_version.Version("2.41")
+
+		self.__catFileBatchesLock = threading.Lock()
+		self.__catFileBatches:typing.Dict[str,GitCatFileBatch] = {}
+
+		self.__instrumentation = GitInstrumentation()
+		self.__getEnvironment = None
 	#
 	################################################################################################################################
 	## Public Properties
@@ -42,36 +72,103 @@ class GitHelper(object):
 		return self.__gitPorcelainVersion
 	#
 
+	#
+	# Returns `True` if git supports `git status --porcelain=v2 -z`.
+	#
+	@property
+	def supportsStatusZ(self) -> bool:
+		return self.__bSupportsStatusZ
+	#
+
+	#
+	# Returns `True` if git supports `git fetch --porcelain`.
+	#
+	@property
+	def supportsFetchPorcelain(self) -> bool:
+		return self.__bSupportsFetchPorcelain
+	#
+
 	@property
 	def gitBinPath(self) -> str:
 		return self.__gitBinPath
 	#
 
+	#
+	# The instrumentation object recording all invocations of this git binary.
+	#
+	@property
+	def instrumentation(self) -> GitInstrumentation:
+		return self.__instrumentation
+	#
+
 	################################################################################################################################
 	## Helper Methods
 	################################################################################################################################
 
+	@staticmethod
+	def __isExecutable(filePath:str) -> bool:
+		return os.path.isfile(filePath) and os.access(filePath, os.X_OK)
+	#
+
+	#
+	# Locate the git binary. The following locations are tried in this order:
+	#
+	# * the binary specified by the environment variable `JK_GIT_BINARY`,
+	# * `git` in the directory specified by the environment variable `GIT_EXEC_PATH`,
+	# * `git` found by searching `PATH`,
+	# * the default installation directory of git on this platform.
+	#
 	@staticmethod
 	def _detectGitBinaryE() -> str:
-		_pathcandidates = None
+		binName = "git.exe" if os.name == "nt" else "git"
+
+		_pathcandidates = []
+		s = os.environ.get("JK_GIT_BINARY")
+		if s:
+			_pathcandidates.append(s)
+		s = os.environ.get("GIT_EXEC_PATH")
+		if s:
+			_pathcandidates.append(os.path.join(s, binName))
+		s = shutil.which("git")
+		if s:
+			_pathcandidates.append(s)
 		if os.name == "nt":
-			_pathcandidates = [ "C:\\Program Files\\Git\\cmd\\git.exe" ]
+			_pathcandidates.append("C:\\Program Files\\Git\\cmd\\git.exe")
 		else:
-			_pathcandidates = [ "/usr/bin/git" ]
+			_pathcandidates.append("/usr/bin/git")
 
 		# ----
 
 		for pc in _pathcandidates:
-			if os.path.isfile(pc):
-				return pc
+			if GitHelper.__isExecutable(pc):
+				return os.path.abspath(pc)
 
 		# ----
 
 		raise Exception("Git seems not to be installed!")
 	#
 
+	#
+	# Determine the version of git. The version is looked up in the on-disk version cache first: `git --version` is only run if the
+	# binary is not yet known (or has been modified since).
+	#
 	@staticmethod
 	def _getVersion(gitBinPath:str, log:jk_logging.AbstractLogger) -> jk_version.Version:
+		s = _GitVersionCache.get(gitBinPath)
+		if s is not None:
+			try:
+				return jk_version.Version(s)
+			except Exception:
+				pass
+
+		s = GitHelper.__runGitVersion(gitBinPath, log)
+		ret = jk_version.Version(s)
+		_GitVersionCache.put(gitBinPath, s, log)
+		return ret
+	#
+
+	@staticmethod
+	def __runGitVersion(gitBinPath:str, log:jk_logging.AbstractLogger) -> str:
 		r = jk_simpleexec.invokeCmd2(
 			cmdPath = gitBinPath,
 			cmdArgs = [ "--version" ],
@@ -84,15 +181,94 @@ class GitHelper(object):
 
 		lines = r.stdOutLines
 		if lines[0].startswith("git version "):
-			return jk_version.Version(lines[0][12:].strip())
+			return lines[0][12:].strip()
 		else:
 			raise Exception("Failed to parse version! ({})".format(repr(lines[0])))
 	#
 
+	@staticmethod
+	def __kill(p:subprocess.Popen, bProcessGroup:bool):
+		_GitProcessWatch.killProcess(p, bProcessGroup)
+		p.communicate()
+	#
+
+	#
+	# Run git and wait for it to terminate. In contrast to `jk_simpleexec.invokeCmd2()` this does not change the current directory
+	# of the process: git is started in the working directory directly. This way git can be run by multiple threads at the same time.
+	#
+	# The limits of the current `GitDeadline` scope apply. If a timeout is specified as well the earlier deadline applies. If git
+	# is killed because of these limits a `GitTimeoutException` or `GitCancelledException` is raised.
+	#
+	def __runGit(self,
+			workingDirectory:typing.Union[str,None],
+			arguments:typing.Union[typing.List[str],typing.Tuple[str]],
+			log:jk_logging.AbstractLogger,
+			timeout:typing.Union[float,None] = None,
+		) -> jk_simpleexec.CommandResult:
+
+		cmd = [ self.__gitBinPath ]
+		cmd.extend(arguments)
+		if log:
+			log.notice("run: " + str(cmd))
+
+		with GitDeadline.scope(timeout=timeout) as limits:
+			if limits is not None:
+				limits.checkE(arguments)
+
+			tQueued = GitInstrumentation._takeQueuedSince()
+			tStart = time.monotonic()
+			# with limits git runs in a process group of its own so that helper processes (e.g. ssh) can be killed as well
+			bNewSession = _GitProcessWatch.needsNewSession(limits)
+			p = subprocess.Popen(cmd, shell=False, cwd=workingDirectory or None, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+				start_new_session=bNewSession, env=self.__getEnvironment() if self.__getEnvironment is not None else None)
+			stdOutData = stdErrData = b""
+			try:
+				with _GitProcessWatch(limits, lambda: _GitProcessWatch.killProcess(p, bNewSession)) as watch:
+					stdOutData, stdErrData = p.communicate()
+			except BaseException:
+				GitHelper.__kill(p, bNewSession)
+				raise
+			finally:
+				if self.__instrumentation.isActive:
+					self.__instrumentation._recordRun(workingDirectory, arguments, tQueued, tStart, p.returncode, len(stdOutData), len(stdErrData))
+
+			if watch.isTriggered:
+				s = stdErrData.decode("utf-8", errors="replace").rstrip()
+				raise watch.exception(arguments, s.split("\n") if s else None)
+
+		return _GitOutputParser.createCommandResult(self.__gitBinPath, arguments, stdOutData, stdErrData, p.returncode, time.monotonic() - tStart)
+	#
+
 	################################################################################################################################
 	## Public Methods
 	################################################################################################################################
 
+	#
+	# Returns a helper for the same git binary that runs git with a different environment. Both helpers share all state (version,
+	# instrumentation, `git cat-file --batch` readers).
+	#
+	# @param		callable getEnvironment		Returns the complete environment to run git with. Invoked every time git is started.
+	#
+	def _withEnvironment(self, getEnvironment:typing.Callable[[],typing.Dict[str,str]]) -> "GitHelper":
+		ret = copy.copy(self)
+		ret.__getEnvironment = getEnvironment
+		return ret
+	#
+
+	#
+	# Get the shared `git cat-file --batch` reader for the specified repository. The reader is created on first use.
+	#
+	@jk_typing.checkFunctionSignature()
+	def getCatFileBatch(self, gitRootDir:str) -> GitCatFileBatch:
+		gitRootDir = os.path.abspath(gitRootDir)
+		with self.__catFileBatchesLock:
+			ret = self.__catFileBatches.get(gitRootDir)
+			if ret is None:
+				ret = GitCatFileBatch(self.__gitBinPath, gitRootDir)
+				self.__catFileBatches[gitRootDir] = ret
+			return ret
+	#
+
 	@jk_typing.checkFunctionSignature()
 	def runGitWD(self,
 			workingDirectory:typing.Union[str,None],
@@ -100,41 +276,106 @@ class GitHelper(object):
 			log:jk_logging.AbstractLogger = None,
 			*,
 			bRaiseExceptionOnError:bool = True,
+			timeout:float = None,
 		) -> jk_simpleexec.CommandResult:
 
-		ret = jk_simpleexec.invokeCmd2(
-			cmdPath = self.__gitBinPath,
-			cmdArgs = arguments,
-			workingDirectory = workingDirectory,
-			log = log,
-		)
+		ret = self.__runGit(workingDirectory, arguments, log, timeout)
 
 		if bRaiseExceptionOnError and ret.isErrorRC:
 			if log:
 				ret.dump(printFunc = log.notice)
-			raise Exception("Failed to run git!")
+			raise GitExecutionException("Failed to run git!", arguments, ret.returnCode, ret.stdErrLines)
 
 		return ret
 	#
 
+	#
+	# Run git and provide its output while git is still running. (See `GitOutputStream`.)
+	#
+	# @param		str workingDirectory				The directory to run git in.
+	# @param		str[] arguments						The arguments to pass to git.
+	# @param		bool bRaiseExceptionOnError			If `True` an exception is raised after all output has been consumed if git failed.
+	# @param		int bufferSize						The maximum number of bytes to read from STDOUT at once.
+	# @param		int maxStdErrSize					The maximum number of bytes of STDERR to keep.
+	# @param		GitDeadline limits					(optional) The limits to apply. Defaults to the limits of the current scope.
+	# @return		GitOutputStream						The stream. Use it as a context manager.
+	#
+	def streamGitWD(self,
+			workingDirectory:typing.Union[str,None],
+			arguments:typing.Union[typing.List[str],typing.Tuple[str]],
+			log:jk_logging.AbstractLogger = None,
+			*,
+			bRaiseExceptionOnError:bool = True,
+			bufferSize:int = GitOutputStream.DEFAULT_BUFFER_SIZE,
+			maxStdErrSize:int = GitOutputStream.DEFAULT_MAX_STDERR_SIZE,
+			limits:GitDeadline = None,
+		) -> GitOutputStream:
+
+		return GitOutputStream(
+			self.__gitBinPath,
+			workingDirectory,
+			arguments,
+			log,
+			bRaiseExceptionOnError=bRaiseExceptionOnError,
+			bufferSize=bufferSize,
+			maxStdErrSize=maxStdErrSize,
+			instrumentation=self.__instrumentation,
+			limits=limits if limits is not None else GitDeadline.current(),
+			environment=self.__getEnvironment() if self.__getEnvironment is not None else None,
+		)
+	#
+
+	#
+	# Run git and yield its output record by record while git is still running. Records are separated by the specified separator
+	# (which is not part of the records returned). If the caller stops iterating early the git process is terminated.
+	#
+	# @param		str workingDirectory		The directory to run git in.
+	# @param		str[] arguments				The arguments to pass to git.
+	# @param		bytes separator				The record separator. Specify `b"\0"` for output of git commands run with `-z`.
+	# @return		iterable					Yields `bytes` objects, one for each record.
+	#
+	# (git is started on first iteration. The limits of the current `GitDeadline` scope are captured when this method is invoked.)
+	#
+	def iterGitRecordsWD(self,
+			workingDirectory:typing.Union[str,None],
+			arguments:typing.Union[typing.List[str],typing.Tuple[str]],
+			log:jk_logging.AbstractLogger = None,
+			*,
+			separator:bytes = b"\0",
+			bufferSize:int = GitOutputStream.DEFAULT_BUFFER_SIZE,
+		) -> typing.Iterator[bytes]:
+
+		return self.__iterGitRecordsWD(workingDirectory, arguments, log, separator, bufferSize, GitDeadline.current())
+	#
+
+	def __iterGitRecordsWD(self,
+			workingDirectory:typing.Union[str,None],
+			arguments:typing.Union[typing.List[str],typing.Tuple[str]],
+			log:typing.Union[jk_logging.AbstractLogger,None],
+			separator:bytes,
+			bufferSize:int,
+			limits:typing.Union[GitDeadline,None],
+		) -> typing.Iterator[bytes]:
+
+		with self.streamGitWD(workingDirectory, arguments, log, bufferSize=bufferSize, limits=limits) as s:
+			yield from s.iterRecords(separator)
+	#
+
 	@jk_typing.checkFunctionSignature()
 	def runGitNoWD(self,
 			arguments:typing.Union[typing.List[str],typing.Tuple[str]],
 			log:jk_logging.AbstractLogger = None,
 			*,
 			bRaiseExceptionOnError:bool = True,
+			timeout:float = None,
 		) -> jk_simpleexec.CommandResult:
 
-		ret = jk_simpleexec.invokeCmd2(
-			cmdPath = self.__gitBinPath,
-			cmdArgs = arguments,
-			log = log,
-		)
+		ret = self.__runGit(None, arguments, log, timeout)
 
 		if bRaiseExceptionOnError and ret.isErrorRC:
 			if log:
 				ret.dump(printFunc = log.notice)
-			raise Exception("Failed to run git!")
+			raise GitExecutionException("Failed to run git!", arguments, ret.returnCode, ret.stdErrLines)
 
 		return ret
 	#
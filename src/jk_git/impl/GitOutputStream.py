@@ -0,0 +1,302 @@
+import time
+import typing
+import threading
+import subprocess
+
+import jk_logging
+
+from ..GitExecutionException import GitExecutionException
+from ..GitInstrumentation import GitInstrumentation
+from ..GitDeadline import GitDeadline
+from ._GitProcessWatch import _GitProcessWatch
+
+
+
+
+
+#
+# This class runs git and provides its output while git is still running: as chunks of bytes, as lines or as records separated by
+# a specific byte sequence (e.g. NUL for commands run with `-z`). The output is never buffered as a whole:
+#
+# * STDOUT is read only when the consumer requests the next item. If the consumer is slow git blocks as soon as the pipe is full.
+# * STDERR is read by a background thread (so that git can't block on it). Only the last `maxStdErrSize` bytes are kept.
+#
+# The output can be iterated once only. If the consumer stops iterating early (or calls `close()`) git is killed. If git terminates
+# with an error an exception is raised after all output has been consumed.
+#
+# If limits are specified (see `GitDeadline`) git is killed as soon as the deadline passes or the call gets cancelled. Iteration
+# then ends with a `GitTimeoutException` or `GitCancelledException`.
+#
+# Use instances as context managers to ensure the process gets cleaned up:
+#
+#	with wrapper.streamGit(cmdArgs=[ "log", "-z" ], workingDirectory=rootDir) as s:
+#		for record in s.iterRecords(b"\0"):
+#			...
+#
+class GitOutputStream(object):
+
+	DEFAULT_BUFFER_SIZE = 65536
+	DEFAULT_MAX_STDERR_SIZE = 65536
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method. This starts git.
+	#
+	# @param		str gitBinPath						The path to the git binary.
+	# @param		str workingDirectory				(optional) The directory to run git in.
+	# @param		str[] arguments						The arguments to pass to git.
+	# @param		AbstractLogger log					(optional) A logger.
+	# @param		bool bRaiseExceptionOnError			If `True` a `GitExecutionException` is raised if git reports an error.
+	# @param		int bufferSize						The maximum number of bytes to read from STDOUT at once.
+	# @param		int maxStdErrSize					The maximum number of bytes of STDERR to keep.
+	# @param		GitInstrumentation instrumentation	(optional) The instrumentation object to record the invocation with.
+	# @param		GitDeadline limits					(optional) The limits to enforce.
+	# @param		dict environment					(optional) The environment to run git with. Defaults to the environment of this process.
+	#
+	def __init__(self,
+			gitBinPath:str,
+			workingDirectory:typing.Union[str,None],
+			arguments:typing.Union[typing.List[str],typing.Tuple[str]],
+			log:jk_logging.AbstractLogger = None,
+			*,
+			bRaiseExceptionOnError:bool = True,
+			bufferSize:int = DEFAULT_BUFFER_SIZE,
+			maxStdErrSize:int = DEFAULT_MAX_STDERR_SIZE,
+			instrumentation:GitInstrumentation = None,
+			limits:GitDeadline = None,
+			environment:typing.Dict[str,str] = None,
+		):
+
+		assert bufferSize > 0
+		assert maxStdErrSize >= 0
+
+		self.__workingDirectory = workingDirectory
+		self.__arguments = list(arguments)
+		self.__log = log
+		self.__bRaiseExceptionOnError = bRaiseExceptionOnError
+		self.__bufferSize = bufferSize
+		self.__maxStdErrSize = maxStdErrSize
+		self.__instrumentation = instrumentation
+
+		self.__bConsumed = False
+		self.__bFinished = False
+		self.__stdOutSize = 0
+		self.__stdErrSize = 0
+		self.__stdErrBuffer = bytearray()
+
+		cmd = [ gitBinPath ]
+		if workingDirectory is not None:
+			cmd.extend([ "-C", workingDirectory ])
+		cmd.extend(arguments)
+		if log:
+			log.notice("run: " + str(cmd))
+
+		if limits is not None:
+			limits.checkE(self.__arguments)
+
+		self.__tQueued = GitInstrumentation._takeQueuedSince()
+		self.__tStart = time.monotonic()
+		self.__bNewSession = _GitProcessWatch.needsNewSession(limits)
+		self.__p = subprocess.Popen(cmd, shell=False, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+			start_new_session=self.__bNewSession, env=environment)
+
+		self.__stdErrThread = threading.Thread(target=self.__drainStdErr, daemon=True, name="git-stderr")
+		self.__stdErrThread.start()
+
+		self.__watch = _GitProcessWatch(limits, lambda: _GitProcessWatch.killProcess(self.__p, self.__bNewSession))
+		self.__watch.__enter__()
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def arguments(self) -> typing.List[str]:
+		return list(self.__arguments)
+	#
+
+	#
+	# The exit code of git or `None` if git is still running.
+	#
+	@property
+	def returnCode(self) -> typing.Union[int,None]:
+		return self.__p.poll()
+	#
+
+	#
+	# The number of bytes read from STDOUT so far.
+	#
+	@property
+	def stdOutSize(self) -> int:
+		return self.__stdOutSize
+	#
+
+	#
+	# The number of bytes git has written to STDERR so far (including the bytes discarded).
+	#
+	@property
+	def stdErrSize(self) -> int:
+		return self.__stdErrSize
+	#
+
+	#
+	# The (last `maxStdErrSize` bytes of the) data git has written to STDERR so far.
+	#
+	@property
+	def stdErrData(self) -> bytes:
+		return bytes(self.__stdErrBuffer)
+	#
+
+	@property
+	def stdErrLines(self) -> typing.List[str]:
+		s = self.stdErrData.decode("utf-8", errors="replace").rstrip()
+		return s.split("\n") if s else []
+	#
+
+	#
+	# Indicates if some of the data git has written to STDERR has been discarded.
+	#
+	@property
+	def isStdErrTruncated(self) -> bool:
+		return self.__stdErrSize > len(self.__stdErrBuffer)
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __drainStdErr(self):
+		f = self.__p.stderr
+		while True:
+			chunk = f.read1(8192)
+			if not chunk:
+				break
+			self.__stdErrSize += len(chunk)
+			self.__stdErrBuffer += chunk
+			n = len(self.__stdErrBuffer) - self.__maxStdErrSize
+			if n > 0:
+				del self.__stdErrBuffer[:n]
+	#
+
+	#
+	# Wait for git to terminate (or kill it if `bCompleted` is `False`) and release all resources. If git has been killed because of
+	# the limits specified an exception is raised (unless iteration has been stopped early).
+	#
+	def __finish(self, bCompleted:bool):
+		if self.__bFinished:
+			return
+		self.__bFinished = True
+
+		p = self.__p
+		if p.poll() is None:
+			if bCompleted:
+				p.wait()
+			else:
+				_GitProcessWatch.killProcess(p, self.__bNewSession)
+				p.wait()
+		self.__watch.__exit__(None, None, None)
+		self.__stdErrThread.join()
+		p.stdout.close()
+		p.stderr.close()
+
+		if (self.__instrumentation is not None) and self.__instrumentation.isActive:
+			self.__instrumentation._recordRun(self.__workingDirectory, self.__arguments, self.__tQueued, self.__tStart, p.returncode,
+				self.__stdOutSize, self.__stdErrSize)
+
+		if bCompleted and self.__watch.isTriggered:
+			raise self.__watch.exception(self.__arguments, self.stdErrLines)
+		if bCompleted and (p.returncode != 0) and self.__bRaiseExceptionOnError:
+			stdErrLines = self.stdErrLines
+			if self.__log:
+				for line in stdErrLines:
+					self.__log.notice("STDERR: " + line)
+			raise GitExecutionException("Failed to run git!", self.__arguments, p.returncode, stdErrLines)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Yield the output of git as chunks of bytes (of at most `bufferSize` bytes each) as soon as they are available.
+	#
+	def iterChunks(self) -> typing.Iterator[bytes]:
+		if self.__bConsumed:
+			raise Exception("The output of git has already been consumed!")
+		self.__bConsumed = True
+
+		bCompleted = False
+		try:
+			read1 = self.__p.stdout.read1
+			bufferSize = self.__bufferSize
+			while True:
+				chunk = read1(bufferSize)
+				if not chunk:
+					break
+				self.__stdOutSize += len(chunk)
+				yield chunk
+			bCompleted = True
+		finally:
+			self.__finish(bCompleted)
+	#
+
+	#
+	# Yield the output of git record by record. The separator is not part of the records returned. A trailing separator does not
+	# produce an empty record.
+	#
+	# @param		bytes separator			The record separator. Specify `b"\0"` for output of git commands run with `-z`.
+	#
+	def iterRecords(self, separator:bytes = b"\0") -> typing.Iterator[bytes]:
+		assert separator
+
+		# (each byte is scanned once: a record spanning many chunks must not be copied and scanned again for every chunk)
+		buffer = bytearray()
+		separatorLength = len(separator)
+		for chunk in self.iterChunks():
+			# the end of the data scanned already might contain the beginning of a separator
+			pos = max(0, len(buffer) - separatorLength + 1)
+			buffer += chunk
+			start = 0
+			while True:
+				pos = buffer.find(separator, pos)
+				if pos < 0:
+					break
+				yield bytes(buffer[start:pos])
+				start = pos = pos + separatorLength
+			if start:
+				del buffer[:start]
+		if buffer:
+			yield bytes(buffer)
+	#
+
+	#
+	# Yield the output of git line by line (without line breaks).
+	#
+	def iterLines(self, encoding:str = "utf-8", errors:str = "replace") -> typing.Iterator[str]:
+		for record in self.iterRecords(b"\n"):
+			yield record.decode(encoding, errors)
+	#
+
+	#
+	# Kill git if it is still running and release all resources.
+	#
+	def close(self):
+		self.__finish(False)
+	#
+
+	def __enter__(self):
+		return self
+	#
+
+	def __exit__(self, exType, exObj, exStackTrace):
+		self.close()
+	#
+
+#
+
+
+
@@ -0,0 +1,300 @@
+
+
+
+import os
+import mmap
+import zlib
+import struct
+import typing
+import threading
+
+
+
+
+
+#
+# This class provides read access to a single pack file and its index (version 2).
+# Both files are memory mapped; objects are located by binary search in the index.
+#
+# Delta objects are not resolved by this class: `readEntry()` returns the raw delta data together with information about the base
+# object. (See `GitObjectStore` for delta resolution.)
+#
+class GitPackFile(object):
+
+	OBJ_COMMIT = 1
+	OBJ_TREE = 2
+	OBJ_BLOB = 3
+	OBJ_TAG = 4
+	OBJ_OFS_DELTA = 6
+	OBJ_REF_DELTA = 7
+
+	TYPE_NAMES = {
+		1: "commit",
+		2: "tree",
+		3: "blob",
+		4: "tag",
+	}
+
+	__IDX_MAGIC = b"\xfftOc"
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str idxFilePath			The path of the pack index file (".idx").
+	# @param		int hashLength			The length of object hashes in bytes (20 for SHA-1, 32 for SHA-256).
+	#
+	def __init__(self, idxFilePath:str, hashLength:int = 20):
+		assert idxFilePath.endswith(".idx")
+
+		self.__idxFilePath = idxFilePath
+		self.__packFilePath = idxFilePath[:-4] + ".pack"
+		self.__hashLength = hashLength
+
+		self.__lock = threading.Lock()
+		self.__idx = None
+		self.__pack = None
+		self.__count = 0
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def idxFilePath(self) -> str:
+		return self.__idxFilePath
+	#
+
+	@property
+	def packFilePath(self) -> str:
+		return self.__packFilePath
+	#
+
+	#
+	# The number of objects in this pack
+	#
+	@property
+	def count(self) -> int:
+		self.__open()
+		return self.__count
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __mmapFile(filePath:str) -> mmap.mmap:
+		with open(filePath, "rb") as f:
+			return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+	#
+
+	def __open(self):
+		if self.__idx is not None:
+			return
+
+		with self.__lock:
+			if self.__idx is not None:
+				return
+
+			idx = GitPackFile.__mmapFile(self.__idxFilePath)
+			if idx[0:4] != GitPackFile.__IDX_MAGIC:
+				idx.close()
+				raise Exception("Unsupported pack index format (version 1): " + self.__idxFilePath)
+			version = struct.unpack(">I", idx[4:8])[0]
+			if version != 2:
+				idx.close()
+				raise Exception("Unsupported pack index version " + str(version) + ": " + self.__idxFilePath)
+
+			pack = GitPackFile.__mmapFile(self.__packFilePath)
+			if pack[0:4] != b"PACK":
+				idx.close()
+				pack.close()
+				raise Exception("Not a pack file: " + self.__packFilePath)
+
+			self.__count = struct.unpack(">I", idx[8 + 255 * 4:8 + 256 * 4])[0]
+			self.__pack = pack
+			self.__idx = idx
+	#
+
+	#
+	# Get the offset of the i-th object in the pack file.
+	#
+	def __getOffset(self, i:int) -> int:
+		n = self.__count
+		offsetsPos = 8 + 256 * 4 + n * self.__hashLength + n * 4
+		offset = struct.unpack(">I", self.__idx[offsetsPos + i * 4:offsetsPos + i * 4 + 4])[0]
+		if offset & 0x80000000:
+			largeOffsetsPos = offsetsPos + n * 4
+			j = offset & 0x7fffffff
+			offset = struct.unpack(">Q", self.__idx[largeOffsetsPos + j * 8:largeOffsetsPos + j * 8 + 8])[0]
+		return offset
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Find an object in this pack.
+	#
+	# @param		bytes binSha			The binary object hash.
+	# @return		int						Returns the offset of the object in the pack file or `None` if the object is not contained in this pack.
+	#
+	def findOffset(self, binSha:bytes) -> typing.Union[int,None]:
+		self.__open()
+		idx = self.__idx
+		hl = self.__hashLength
+
+		first = binSha[0]
+		lo = struct.unpack(">I", idx[8 + (first - 1) * 4:8 + first * 4])[0] if first > 0 else 0
+		hi = struct.unpack(">I", idx[8 + first * 4:8 + (first + 1) * 4])[0]
+
+		hashesPos = 8 + 256 * 4
+		while lo < hi:
+			mid = (lo + hi) // 2
+			pos = hashesPos + mid * hl
+			h = idx[pos:pos + hl]
+			if h < binSha:
+				lo = mid + 1
+			elif h > binSha:
+				hi = mid
+			else:
+				return self.__getOffset(mid)
+		return None
+	#
+
+	#
+	# Read a raw pack entry.
+	#
+	# @param		int offset				The offset of the entry in the pack file.
+	# @return		tuple					Returns a tuple `(typeNum, data, base)`:
+	#										* for regular objects `base` is `None`,
+	#										* for OFS_DELTA entries `base` is the offset of the base object,
+	#										* for REF_DELTA entries `base` is the binary hash of the base object.
+	#										For delta entries `data` is the (inflated) delta data.
+	#
+	def readEntry(self, offset:int) -> typing.Tuple[int,bytes,typing.Union[int,bytes,None]]:
+		self.__open()
+		pack = self.__pack
+
+		pos = offset
+		c = pack[pos]
+		pos += 1
+		typeNum = (c >> 4) & 7
+		size = c & 0x0f
+		shift = 4
+		while c & 0x80:
+			c = pack[pos]
+			pos += 1
+			size |= (c & 0x7f) << shift
+			shift += 7
+
+		base = None
+		if typeNum == GitPackFile.OBJ_OFS_DELTA:
+			c = pack[pos]
+			pos += 1
+			relOffset = c & 0x7f
+			while c & 0x80:
+				c = pack[pos]
+				pos += 1
+				relOffset = ((relOffset + 1) << 7) | (c & 0x7f)
+			base = offset - relOffset
+		elif typeNum == GitPackFile.OBJ_REF_DELTA:
+			base = bytes(pack[pos:pos + self.__hashLength])
+			pos += self.__hashLength
+
+		# inflate: feed the memory mapped data in chunks until the stream is complete
+		d = zlib.decompressobj()
+		chunks = []
+		chunkSize = max(4096, size + 64)
+		while not d.eof:
+			if pos >= len(pack):
+				raise Exception("Unexpected end of pack file: " + self.__packFilePath)
+			chunks.append(d.decompress(pack[pos:pos + chunkSize]))
+			pos += chunkSize
+		data = b"".join(chunks)
+		if len(data) != size:
+			raise Exception("Corrupt pack entry at offset " + str(offset) + ": " + self.__packFilePath)
+
+		return typeNum, data, base
+	#
+
+	def close(self):
+		with self.__lock:
+			if self.__idx is not None:
+				self.__idx.close()
+				self.__pack.close()
+				self.__idx = None
+				self.__pack = None
+	#
+
+	################################################################################################################################
+	## Static Methods
+	################################################################################################################################
+
+	#
+	# Apply delta data to a base object.
+	#
+	@staticmethod
+	def applyDelta(base:bytes, delta:bytes) -> bytes:
+		pos = 0
+
+		def _readVarInt():
+			nonlocal pos
+			ret = 0
+			shift = 0
+			while True:
+				c = delta[pos]
+				pos += 1
+				ret |= (c & 0x7f) << shift
+				shift += 7
+				if not (c & 0x80):
+					return ret
+
+		baseSize = _readVarInt()
+		if baseSize != len(base):
+			raise Exception("Delta does not match its base object!")
+		targetSize = _readVarInt()
+
+		out = bytearray()
+		n = len(delta)
+		while pos < n:
+			c = delta[pos]
+			pos += 1
+			if c & 0x80:
+				# copy from base
+				copyOffset = 0
+				for i in range(4):
+					if c & (1 << i):
+						copyOffset |= delta[pos] << (8 * i)
+						pos += 1
+				copySize = 0
+				for i in range(3):
+					if c & (0x10 << i):
+						copySize |= delta[pos] << (8 * i)
+						pos += 1
+				if copySize == 0:
+					copySize = 0x10000
+				out += base[copyOffset:copyOffset + copySize]
+			elif c:
+				# insert literal data
+				out += delta[pos:pos + c]
+				pos += c
+			else:
+				raise Exception("Invalid delta instruction!")
+
+		if len(out) != targetSize:
+			raise Exception("Delta result has an invalid size!")
+		return bytes(out)
+	#
+
+#
+
+
+
+
@@ -0,0 +1,463 @@
+
+
+
+import re
+import typing
+import urllib.parse
+
+import jk_simpleexec
+
+from ..GitExecutionException import GitExecutionException
+from ..GitRefUpdate import GitRefUpdate
+
+
+
+
+
+#
+# This class builds the arguments of git commands and parses their output. It does not run git itself: it is shared by
+# `GitWrapper` and `AsyncGitWrapper`.
+#
+class _GitOutputParser(object):
+
+	__RE_LS_REMOTE_LINE = re.compile(r"^([a-zA-Z0-9]+)\s+(.*)$")
+	__RE_SCP_LIKE_URL = re.compile(r"^(?:[^@/]+@)?([^:/]+):(?!//)")
+
+	# flag used by `git fetch --porcelain` -> kind of update
+	__FETCH_PORCELAIN_FLAGS = {
+		" ": GitRefUpdate.KIND_FAST_FORWARD,
+		"+": GitRefUpdate.KIND_FORCED,
+		"-": GitRefUpdate.KIND_PRUNED,
+		"t": GitRefUpdate.KIND_TAG,
+		"*": GitRefUpdate.KIND_NEW,
+		"!": GitRefUpdate.KIND_REJECTED,
+		"=": GitRefUpdate.KIND_UP_TO_DATE,
+	}
+	__NULL_HASH_CHARS = frozenset("0")
+
+	# global options of git that take a separate value
+	__GLOBAL_OPTIONS_WITH_VALUE = frozenset([ "-C", "-c", "--git-dir", "--work-tree", "--namespace", "--config-env", "--super-prefix" ])
+
+	#
+	# The arguments for `git log` to produce NUL separated records with six fields per commit:
+	#
+	# %P	parent hashes
+	# %H	commit hash
+	# %cn	committer name
+	# %ce	committer email
+	# %ct	committer date (seconds since the epoch)
+	# %cd	committer date (here: only the time zone offset, see "--date")
+	# %s	subject (= commit message)
+	#
+	LOG_PARSABLE_FIELD_COUNT = 6
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	@staticmethod
+	def statusArgs(porcelainVersion:int, bIncludeIgnored:bool) -> typing.List[str]:
+		if porcelainVersion == 1:
+			if bIncludeIgnored:
+				return [ "-C", ".", "status", "--porcelain", "-uall", "--ignored" ]
+			else:
+				return [ "-C", ".", "status", "--porcelain", "-uall" ]
+		elif porcelainVersion == 2:
+			if bIncludeIgnored:
+				#	[ "-C", gitRootDir, "status", "--porcelain=2", "-uall", "--ignored=traditional" ],
+				return [ "-C", ".", "status", "--porcelain=2", "-uall", "--ignored" ]
+			else:
+				return [ "-C", ".", "status", "--porcelain=2", "-uall" ]
+		else:
+			raise Exception()
+	#
+
+	#
+	# The arguments for `git status` to produce NUL separated records in porcelain format version 2. (Requires git 2.11 or later.)
+	#
+	# @param		str[] filePaths			(optional) Limit the status to these files and directories (relative to the root directory of the working copy).
+	#
+	@staticmethod
+	def statusZArgs(bIncludeIgnored:bool, filePaths:typing.Union[typing.List[str],None] = None) -> typing.List[str]:
+		ret = [ "-C", ".", "--literal-pathspecs", "status", "--porcelain=v2", "-z", "-uall" ]
+		if bIncludeIgnored:
+			ret.append("--ignored")
+		if filePaths is not None:
+			ret.append("--")
+			ret.extend(filePaths)
+		return ret
+	#
+
+	#
+	# The arguments for `git diff` to check for differences between the index and HEAD (`bCached`) or between the working tree and the index.
+	# If there are no commits yet `git diff --cached` compares against the empty tree.
+	#
+	@staticmethod
+	def diffQuietArgs(bCached:bool, bIgnoreSubmodules:bool) -> typing.List[str]:
+		ret = [ "-C", ".", "diff", "--quiet", "--no-ext-diff" ]
+		if bCached:
+			ret.append("--cached")
+		if bIgnoreSubmodules:
+			ret.append("--ignore-submodules")
+		return ret
+	#
+
+	#
+	# The arguments for `git ls-files` to list untracked files. Directories that contain untracked files only are reported as a single entry.
+	#
+	@staticmethod
+	def untrackedProbeArgs() -> typing.List[str]:
+		return [ "-C", ".", "ls-files", "-z", "--others", "--exclude-standard", "--directory", "--no-empty-directory" ]
+	#
+
+	@staticmethod
+	def logParsableArgs(revisionRange:typing.Union[str,None]) -> typing.List[str]:
+		# Fields are separated by NUL, commits are separated by NUL as well (-z).
+		ret = [ "-C", ".", "log", "-z", "--date=format:%z", "--pretty=format:%P%x00%H%x00%cn%x00%ce%x00%ct %cd%x00%s" ]
+		if revisionRange:
+			ret.append(revisionRange)
+			ret.append("--")
+		return ret
+	#
+
+	#
+	# The arguments for `git fetch` to fetch multiple remotes in parallel.
+	#
+	# @param		str[] remotes			The names of the remotes to fetch.
+	# @param		int jobs				The number of remotes to fetch in parallel (`None` to use the configuration of git).
+	# @param		bool bPorcelain			If `True` the updated references are written to STDOUT (requires git 2.41).
+	#
+	@staticmethod
+	def fetchArgs(remotes:typing.List[str], jobs:typing.Union[int,None], bPrune:bool, bPorcelain:bool) -> typing.List[str]:
+		for remote in remotes:
+			if not remote or remote.startswith("-"):
+				raise Exception("Invalid remote name: " + repr(remote))
+
+		ret = [ "-C", ".", "fetch", "--multiple" ]
+		if jobs is not None:
+			ret.append("--jobs=" + str(jobs))
+		ret.append("--prune" if bPrune else "--no-prune")
+		if bPorcelain:
+			ret.append("--porcelain")
+		ret.extend(remotes)
+		return ret
+	#
+
+	#
+	# The arguments for `git for-each-ref` to list the tags and the remote tracking branches of the specified remotes.
+	# (See `parseRefSnapshot()`.)
+	#
+	@staticmethod
+	def refSnapshotArgs(remotes:typing.List[str]) -> typing.List[str]:
+		return [ "-C", ".", "for-each-ref", "--format=%(objectname) %(refname)", "refs/tags/" ] + [ "refs/remotes/" + r + "/" for r in remotes ]
+	#
+
+	#
+	# Raise an exception if the specified command result indicates an error.
+	#
+	@staticmethod
+	def checkResult(r:jk_simpleexec.CommandResult, log, bCheckRCOnly:bool = False):
+		if (r is None) or (r.isErrorRC if bCheckRCOnly else r.isError):
+			if log and (r is not None):
+				r.dump(printFunc=log.warn)
+			raise GitExecutionException(
+				"Running git failed!",
+				r.commandArguments if r is not None else None,
+				r.returnCode if r is not None else None,
+				r.stdErrLines if r is not None else None,
+			)
+	#
+
+	#
+	# Evaluate the result of `git diff --quiet`.
+	#
+	# @return		bool			Returns `True` if differences have been found.
+	#
+	@staticmethod
+	def evalDiffQuietResult(r:jk_simpleexec.CommandResult, log) -> bool:
+		if r.returnCode == 0:
+			return False
+		if r.returnCode == 1:
+			return True
+		_GitOutputParser.checkResult(r, log, bCheckRCOnly=True)
+	#
+
+	#
+	# Returns the lines written to STDOUT or an empty list.
+	#
+	@staticmethod
+	def stdOutLines(r:jk_simpleexec.CommandResult) -> typing.List[str]:
+		return r.stdOutLines if r.stdOutLines else []
+	#
+
+	#
+	# Returns the lines written to STDOUT followed by the lines written to STDERR. (git pull writes progress information to STDERR.)
+	#
+	@staticmethod
+	def allOutputLines(r:jk_simpleexec.CommandResult) -> typing.List[str]:
+		ret = []
+		if r.stdOutLines:
+			ret.extend(r.stdOutLines)
+		if r.stdErrLines:
+			ret.extend(r.stdErrLines)
+		return ret
+	#
+
+	#
+	# Parse the output of `git ls-remote`.
+	#
+	# @return		list			Returns something like:
+	#								[
+	#									[	"293bc22fa252a86039060986460275df3f5f0331",	"HEAD"	],
+	#									[	"293bc22fa252a86039060986460275df3f5f0331",	"refs/heads/master"	]
+	#								]
+	#
+	@staticmethod
+	def parseLsRemoteOutput(lines:typing.List[str]) -> list:
+		ret = []
+		for line in lines:
+			m = _GitOutputParser.__RE_LS_REMOTE_LINE.match(line.strip())
+			if m:
+				ret.append([ m.group(1), m.group(2) ])
+		return ret
+	#
+
+	#
+	# Parse the output of `git fetch --porcelain`: one line per reference, e.g. "* 0000000000000000000000000000000000000000
+	# 9f1c0ce4d2e3c0b1f0e1b5d4a6c3f2e1d0c9b8a7 refs/remotes/origin/feature".
+	#
+	# @param		str[] remotes			The remotes fetched. (Used to determine the remote each reference belongs to.)
+	#
+	@staticmethod
+	def parseFetchPorcelainOutput(lines:typing.List[str], remotes:typing.List[str]) -> typing.List[GitRefUpdate]:
+		ret = []
+		for line in lines:
+			if len(line) < 3:
+				continue
+			kind = _GitOutputParser.__FETCH_PORCELAIN_FLAGS.get(line[0])
+			fields = line[2:].split(" ", 2)
+			if (kind is None) or (line[1] != " ") or (len(fields) != 3):
+				raise Exception("Failed to parse output of git fetch: " + repr(line))
+			oldHash, newHash, refName = fields
+			ret.append(GitRefUpdate(
+				kind,
+				refName,
+				None if set(oldHash) <= _GitOutputParser.__NULL_HASH_CHARS else oldHash,
+				None if set(newHash) <= _GitOutputParser.__NULL_HASH_CHARS else newHash,
+				_GitOutputParser.getRemoteOfRef(refName, remotes),
+			))
+		return ret
+	#
+
+	#
+	# Parse the output of `git for-each-ref` run with the arguments built by `refSnapshotArgs()`.
+	#
+	# @return		dict					Maps reference names to hashes.
+	#
+	@staticmethod
+	def parseRefSnapshot(lines:typing.List[str]) -> typing.Dict[str,str]:
+		ret = {}
+		for line in lines:
+			if line:
+				objectHash, refName = line.split(" ", 1)
+				ret[refName] = objectHash
+		return ret
+	#
+
+	#
+	# Determine the updates `git fetch` performed by comparing the references before and after.
+	#
+	# @param		dict before				The references before fetching (see `parseRefSnapshot()`).
+	# @param		dict after				The references after fetching.
+	# @param		str[] remotes			The remotes fetched.
+	# @param		callable isAncestor		Invoked as `isAncestor(oldHash, newHash)` for changed branches to tell fast forward updates from forced ones.
+	#
+	@staticmethod
+	def diffRefSnapshots(
+			before:typing.Dict[str,str],
+			after:typing.Dict[str,str],
+			remotes:typing.List[str],
+			isAncestor:typing.Callable[[str,str],bool],
+		) -> typing.List[GitRefUpdate]:
+
+		ret = []
+		for refName in sorted(set(before) | set(after)):
+			oldHash = before.get(refName)
+			newHash = after.get(refName)
+			if oldHash == newHash:
+				continue
+			if oldHash is None:
+				kind = GitRefUpdate.KIND_NEW
+			elif newHash is None:
+				kind = GitRefUpdate.KIND_PRUNED
+			elif refName.startswith("refs/tags/"):
+				kind = GitRefUpdate.KIND_TAG
+			elif isAncestor(oldHash, newHash):
+				kind = GitRefUpdate.KIND_FAST_FORWARD
+			else:
+				kind = GitRefUpdate.KIND_FORCED
+			ret.append(GitRefUpdate(kind, refName, oldHash, newHash, _GitOutputParser.getRemoteOfRef(refName, remotes)))
+		return ret
+	#
+
+	#
+	# Determine the remote a remote tracking branch such as "refs/remotes/origin/master" belongs to.
+	#
+	# @return		str						The name of the remote or `None` if the reference does not belong to any of the remotes specified.
+	#
+	@staticmethod
+	def getRemoteOfRef(refName:str, remotes:typing.List[str]) -> typing.Union[str,None]:
+		ret = None
+		for remote in remotes:
+			# (remote names may contain slashes: the longest match wins)
+			if refName.startswith("refs/remotes/" + remote + "/") and ((ret is None) or (len(remote) > len(ret))):
+				ret = remote
+		return ret
+	#
+
+	#
+	# Determine the host a remote repository URL refers to. This is used to limit the number of concurrent connections per host.
+	#
+	# @param		str url			A URL such as "https://example.org/foo.git", "ssh://git@example.org:2222/foo.git" or "git@example.org:foo.git".
+	# @return		str				The host name in lower case or an empty string for local repositories.
+	#
+	@staticmethod
+	def getHostOfURL(url:str) -> str:
+		if "://" in url:
+			u = urllib.parse.urlsplit(url)
+			return (u.hostname or "").lower()
+		m = _GitOutputParser.__RE_SCP_LIKE_URL.match(url)
+		if m:
+			return m.group(1).lower()
+		return ""
+	#
+
+	#
+	# Sort URLs so that URLs of the same host are spread as evenly as possible: the first URL of each host comes first, followed by
+	# the second URL of each host and so on.
+	#
+	@staticmethod
+	def interleaveURLsByHost(urls:typing.Iterable[str]) -> typing.List[str]:
+		urlsByHost = {}
+		for url in urls:
+			urlsByHost.setdefault(_GitOutputParser.getHostOfURL(url), []).append(url)
+		ret = []
+		queues = list(urlsByHost.values())
+		i = 0
+		while queues:
+			queues = [ q for q in queues if len(q) > i ]
+			ret.extend([ q[i] for q in queues ])
+			i += 1
+		return ret
+	#
+
+	#
+	# Determine the git command (e.g. "status") from the arguments passed to git. Global options such as `-C <dir>` are skipped.
+	#
+	# @return		str				The command or `None` if only options have been specified (e.g. `--version`).
+	#
+	@staticmethod
+	def getVerb(arguments:typing.Sequence[str]) -> typing.Union[str,None]:
+		i = 0
+		while i < len(arguments):
+			a = arguments[i]
+			if a in _GitOutputParser.__GLOBAL_OPTIONS_WITH_VALUE:
+				i += 2
+			elif a.startswith("-"):
+				i += 1
+			else:
+				return a
+		return None
+	#
+
+	#
+	# Check if git failed because the current branch does not have any commits yet.
+	#
+	@staticmethod
+	def isNoCommitsYetError(stdErrLines:typing.Union[typing.List[str],None]) -> bool:
+		return bool(stdErrLines) \
+			and (stdErrLines[0].find("fatal: your current branch") >= 0) \
+			and (stdErrLines[0].find("does not have any commits yet") >= 0)
+	#
+
+	#
+	# Parse the output of `git log --pretty=format:"%P|%H|%cn|%ce|%cd|%s"`.
+	#
+	@staticmethod
+	def parseShowLogParsableOutput(lines:typing.Union[typing.List[str],None]) -> typing.List[str]:
+		ret = []
+		if lines:
+			for line in lines:
+				assert line[0] == "\""
+				assert line[-1] == "\""
+				ret.append(line[1:-1])
+		return ret
+	#
+
+	#
+	# Group NUL separated records written by `git log` (see `logParsableArgs()`) into tuples of fields.
+	#
+	@staticmethod
+	def iterLogRecords(records:typing.Iterable[bytes]) -> typing.Iterator[typing.Tuple[str,str,str,str,str,str]]:
+		fields = []
+		for record in records:
+			fields.append(record.decode("utf-8", errors="replace"))
+			if len(fields) == _GitOutputParser.LOG_PARSABLE_FIELD_COUNT:
+				yield tuple(fields)
+				fields = []
+
+		if fields:
+			raise Exception("Failed to parse output of git log: " + repr(fields))
+	#
+
+	#
+	# Build a command result the way `jk_simpleexec.invokeCmd2()` does: lines are right trimmed, leading and trailing empty lines are removed.
+	#
+	@staticmethod
+	def createCommandResult(
+			cmdPath:str,
+			cmdArgs:typing.List[str],
+			stdOutData:bytes,
+			stdErrData:bytes,
+			returnCode:int,
+			duration:float,
+		) -> jk_simpleexec.CommandResult:
+
+		return jk_simpleexec.CommandResult(
+			cmdPath,
+			cmdArgs,
+			_GitOutputParser.__toLines(stdOutData.decode("utf-8")),
+			_GitOutputParser.__toLines(stdErrData.decode("utf-8")),
+			returnCode,
+			duration,
+		)
+	#
+
+	#
+	# Normalize the content of a file the way `downloadFromHead()` always did (as it was built from the output lines of `git show`):
+	# lines are right trimmed, leading and trailing empty lines are removed and there is no line break at the end.
+	#
+	@staticmethod
+	def toDownloadedText(text:typing.Union[str,None]) -> typing.Union[str,None]:
+		if text is None:
+			return None
+		return "\n".join(_GitOutputParser.__toLines(text))
+	#
+
+	@staticmethod
+	def __toLines(text:str) -> typing.List[str]:
+		lines = [ line.rstrip() for line in text.split("\n") ]
+		i = 0
+		while (i < len(lines)) and not lines[i]:
+			i += 1
+		j = len(lines)
+		while (j > i) and not lines[j - 1]:
+			j -= 1
+		return lines[i:j]
+	#
+
+#
+
+
+
+
@@ -0,0 +1,157 @@
+
+
+
+import os
+import signal
+import typing
+import threading
+import subprocess
+
+from ..GitDeadline import GitDeadline
+from ..GitExecutionException import GitExecutionException
+
+
+
+
+
+#
+# Enforces the limits of a `GitDeadline` on a running process: the process is killed if the deadline passes or a cancellation
+# token gets cancelled. Use it as a context manager around the code that waits for the process:
+#
+#	with _GitProcessWatch(limits, lambda: _GitProcessWatch.killProcess(p, True)) as watch:
+#		stdOutData, stdErrData = p.communicate()
+#	if watch.isTriggered:
+#		raise watch.exception(arguments)
+#
+# If `limits` is `None` nothing is watched.
+#
+class _GitProcessWatch(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		GitDeadline limits				The limits to enforce (or `None`).
+	# @param		callable killFunction			Kills the process. Invoked by a background thread (or the thread cancelling the token).
+	#
+	def __init__(self, limits:typing.Union[GitDeadline,None], killFunction:typing.Callable[[],None]):
+		self.__limits = limits
+		self.__killFunction = killFunction
+		self.__lock = threading.Lock()
+		self.__bActive = False
+		self.__timer = None
+		self.__callbackIDs = []
+		self.__reason = None
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	#
+	# Indicates if the process has been killed by this watch.
+	#
+	@property
+	def isTriggered(self) -> bool:
+		return self.__reason is not None
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __trigger(self, reason:str):
+		with self.__lock:
+			if not self.__bActive or (self.__reason is not None):
+				return
+			self.__reason = reason
+			try:
+				self.__killFunction()
+			except Exception:
+				pass
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Build the exception to raise after the watch has killed the process.
+	#
+	def exception(self, cmdArgs:typing.Sequence[str], stdErrLines:typing.List[str] = None) -> GitExecutionException:
+		assert self.__reason is not None
+		if self.__reason == "cancelled":
+			return self.__limits.cancelledException(cmdArgs, stdErrLines)
+		return self.__limits.timeoutException(cmdArgs, stdErrLines)
+	#
+
+	def __enter__(self):
+		limits = self.__limits
+		if limits is None:
+			return self
+
+		self.__bActive = True
+		for token in limits.cancellationTokens:
+			self.__callbackIDs.append((token, token._addCallback(lambda: self.__trigger("cancelled"))))
+		t = limits.remainingTime
+		if (t is not None) and (self.__reason is None):
+			self.__timer = threading.Timer(t, self.__trigger, ( "timeout", ))
+			self.__timer.daemon = True
+			self.__timer.start()
+		return self
+	#
+
+	def __exit__(self, exType, exObj, exStackTrace):
+		if self.__limits is None:
+			return
+
+		with self.__lock:
+			self.__bActive = False
+		if self.__timer is not None:
+			self.__timer.cancel()
+			self.__timer = None
+		for token, callbackID in self.__callbackIDs:
+			token._removeCallback(callbackID)
+		self.__callbackIDs.clear()
+	#
+
+	################################################################################################################################
+	## Static Methods
+	################################################################################################################################
+
+	#
+	# Indicates if a process should be started in a session (and thus a process group) of its own so that it can be killed together
+	# with its child processes.
+	#
+	@staticmethod
+	def needsNewSession(limits:typing.Union[GitDeadline,None]) -> bool:
+		return (limits is not None) and (os.name == "posix")
+	#
+
+	#
+	# Kill the specified process. If it has been started in a session of its own the whole process group is killed.
+	#
+	@staticmethod
+	def killProcess(p:subprocess.Popen, bProcessGroup:bool):
+		if p.returncode is not None:
+			return
+		if bProcessGroup:
+			try:
+				os.killpg(p.pid, signal.SIGKILL)
+			except ProcessLookupError:
+				pass
+		else:
+			try:
+				p.kill()
+			except OSError:
+				pass
+	#
+
+#
+
+
+
+
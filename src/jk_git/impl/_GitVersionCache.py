@@ -0,0 +1,136 @@
+
+
+
+import os
+import typing
+import tempfile
+
+import jk_logging
+
+
+
+
+
+#
+# This class persists the version numbers of git binaries on disk, so that short lived processes don't need to run `git --version`.
+# An entry is keyed by the (real) path of the binary, its inode and its modification time: if git gets updated the entry no longer
+# matches and the version is determined again.
+#
+# The cache file is located at `$XDG_CACHE_HOME/jk_git/git-versions` (or `~/.cache/jk_git/git-versions`). The environment variable
+# `JK_GIT_VERSION_CACHE` overrides this path; set it to an empty string to disable the cache.
+#
+class _GitVersionCache(object):
+
+	__MAGIC = "jk_git-versions 1"
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __keyOf(gitBinPath:str) -> typing.Union[typing.Tuple[str,str,str],None]:
+		realPath = os.path.realpath(gitBinPath)
+		try:
+			st = os.stat(realPath)
+		except OSError:
+			return None
+		return realPath, str(st.st_ino), str(st.st_mtime_ns)
+	#
+
+	@staticmethod
+	def __load(cacheFilePath:str) -> typing.Dict[typing.Tuple[str,str,str],str]:
+		try:
+			with open(cacheFilePath, "r", encoding="utf-8") as f:
+				lines = f.read().split("\n")
+		except (OSError, UnicodeDecodeError):
+			return {}
+
+		if lines[0] != _GitVersionCache.__MAGIC:
+			return {}
+
+		ret = {}
+		for line in lines[1:]:
+			fields = line.split("\t")
+			if len(fields) == 4:
+				ret[tuple(fields[:3])] = fields[3]
+		return ret
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Returns the path of the cache file or `None` if caching is disabled.
+	#
+	@staticmethod
+	def getCacheFilePath() -> typing.Union[str,None]:
+		ret = os.environ.get("JK_GIT_VERSION_CACHE")
+		if ret is not None:
+			return ret or None
+
+		cacheDirPath = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+		return os.path.join(cacheDirPath, "jk_git", "git-versions")
+	#
+
+	#
+	# Look up the version of the specified git binary.
+	#
+	# @return		str				The version string as printed by `git --version` or `None` if the binary is not in the cache.
+	#
+	@staticmethod
+	def get(gitBinPath:str) -> typing.Union[str,None]:
+		cacheFilePath = _GitVersionCache.getCacheFilePath()
+		if cacheFilePath is None:
+			return None
+		key = _GitVersionCache.__keyOf(gitBinPath)
+		if key is None:
+			return None
+		return _GitVersionCache.__load(cacheFilePath).get(key)
+	#
+
+	#
+	# Store the version of the specified git binary. The cache file is replaced atomically.
+	#
+	@staticmethod
+	def put(gitBinPath:str, version:str, log:jk_logging.AbstractLogger = None):
+		cacheFilePath = _GitVersionCache.getCacheFilePath()
+		if cacheFilePath is None:
+			return
+		key = _GitVersionCache.__keyOf(gitBinPath)
+		if key is None:
+			return
+
+		entries = _GitVersionCache.__load(cacheFilePath)
+		# drop outdated entries of the same binary
+		entries = { k:v for k, v in entries.items() if k[0] != key[0] }
+		entries[key] = version
+
+		lines = [ _GitVersionCache.__MAGIC ]
+		for k, v in entries.items():
+			lines.append("\t".join(k) + "\t" + v)
+
+		dirPath, fileName = os.path.split(cacheFilePath)
+		tempFilePath = None
+		try:
+			os.makedirs(dirPath, exist_ok=True)
+			# (the temporary file name must be unique: other threads might write the cache file at the same time)
+			fd, tempFilePath = tempfile.mkstemp(dir=dirPath, prefix=fileName + ".", suffix=".tmp")
+			with open(fd, "w", encoding="utf-8") as f:
+				f.write("\n".join(lines))
+			os.replace(tempFilePath, cacheFilePath)
+		except OSError as ee:
+			if tempFilePath is not None:
+				try:
+					os.unlink(tempFilePath)
+				except OSError:
+					pass
+			# caching is an optimization only: if the cache file can't be written we simply continue without it
+			if log:
+				log.warn("Failed to write git version cache file " + repr(cacheFilePath) + ": " + str(ee))
+	#
+
+#
+
+
+
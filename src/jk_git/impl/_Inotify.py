@@ -0,0 +1,154 @@
+
+
+
+import os
+import errno
+import ctypes
+import select
+import struct
+import typing
+
+
+
+
+
+#
+# A minimal wrapper around the Linux inotify API based on `ctypes`.
+#
+class _Inotify(object):
+
+	IN_MODIFY = 0x00000002
+	IN_ATTRIB = 0x00000004
+	IN_CLOSE_WRITE = 0x00000008
+	IN_MOVED_FROM = 0x00000040
+	IN_MOVED_TO = 0x00000080
+	IN_CREATE = 0x00000100
+	IN_DELETE = 0x00000200
+	IN_DELETE_SELF = 0x00000400
+	IN_MOVE_SELF = 0x00000800
+
+	IN_Q_OVERFLOW = 0x00004000
+	IN_IGNORED = 0x00008000
+
+	IN_ONLYDIR = 0x01000000
+	IN_DONT_FOLLOW = 0x02000000
+	IN_ISDIR = 0x40000000
+
+	__EVENT_STRUCT = struct.Struct("iIII")
+
+	__libc = None
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	def __init__(self):
+		libc = _Inotify.__getLibC()
+		fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+		if fd < 0:
+			e = ctypes.get_errno()
+			raise OSError(e, "inotify_init1() failed: " + os.strerror(e))
+		self.__fd = fd
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def fd(self) -> int:
+		return self.__fd
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __getLibC():
+		if _Inotify.__libc is None:
+			libc = ctypes.CDLL(None, use_errno=True)
+			for name in [ "inotify_init1", "inotify_add_watch", "inotify_rm_watch" ]:
+				if not hasattr(libc, name):
+					raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+			libc.inotify_add_watch.argtypes = [ ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32 ]
+			libc.inotify_rm_watch.argtypes = [ ctypes.c_int, ctypes.c_int ]
+			_Inotify.__libc = libc
+		return _Inotify.__libc
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Returns `True` if inotify can be used on this platform.
+	#
+	@staticmethod
+	def isAvailable() -> bool:
+		try:
+			_Inotify.__getLibC()
+			return True
+		except OSError:
+			return False
+	#
+
+	#
+	# Add a watch.
+	#
+	# @return		int			The watch descriptor.
+	#
+	def addWatch(self, path:str, mask:int) -> int:
+		wd = _Inotify.__getLibC().inotify_add_watch(self.__fd, os.fsencode(path), mask)
+		if wd < 0:
+			e = ctypes.get_errno()
+			raise OSError(e, "inotify_add_watch() failed: " + os.strerror(e), path)
+		return wd
+	#
+
+	def removeWatch(self, wd:int):
+		# (fails if the watch has already been removed by the kernel: this is ignored)
+		_Inotify.__getLibC().inotify_rm_watch(self.__fd, wd)
+	#
+
+	#
+	# Read all pending events.
+	#
+	# @param		float timeout		The number of seconds to wait for events. Specify `0` to return immediately and `None` to wait indefinitely.
+	# @return		list				A list of tuples: (watch descriptor, mask, cookie, name)
+	#
+	def readEvents(self, timeout:typing.Union[float,None] = 0) -> typing.List[typing.Tuple[int,int,int,str]]:
+		if timeout != 0:
+			# (poll() instead of select(): select() fails for file descriptors >= FD_SETSIZE as found in processes with many open files)
+			poller = select.poll()
+			poller.register(self.__fd, select.POLLIN)
+			if not poller.poll(None if timeout is None else timeout * 1000):
+				return []
+
+		ret = []
+		eventStruct = _Inotify.__EVENT_STRUCT
+		while True:
+			try:
+				data = os.read(self.__fd, 65536)
+			except BlockingIOError:
+				break
+			pos = 0
+			while pos < len(data):
+				wd, mask, cookie, nameLength = eventStruct.unpack_from(data, pos)
+				pos += 16
+				name = data[pos:pos + nameLength].rstrip(b"\0").decode("utf-8", "surrogateescape")
+				pos += nameLength
+				ret.append((wd, mask, cookie, name))
+		return ret
+	#
+
+	def close(self):
+		if self.__fd >= 0:
+			os.close(self.__fd)
+			self.__fd = -1
+	#
+
+#
+
+
+
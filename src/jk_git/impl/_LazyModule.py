@@ -0,0 +1,72 @@
+
+
+
+import sys
+import types
+import importlib
+
+
+
+
+
+#
+# A package module whose exports are imported on first access (see PEP 562). Install it at the top of the `__init__.py` of a package:
+#
+#	_LazyModule.install(__name__, {
+#		"SomeClass": ".SomeClass",		# class `SomeClass` defined in the submodule `SomeClass`
+#		"impl": ".impl",				# the subpackage `impl` itself
+#	})
+#
+# (This module does not import `typing`: `import jk_git` is kept as cheap as possible.)
+#
+# By convention classes are defined in submodules of the same name. When such a submodule is imported the import system stores the
+# submodule as an attribute of the package, shadowing the class. This class replaces the submodule by the class in that case.
+#
+class _LazyModule(types.ModuleType):
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def __setattr__(self, name:str, value):
+		exports = self.__dict__.get("_lazyExports")
+		if exports and isinstance(value, types.ModuleType) and (value.__name__ == self.__name__ + "." + name) \
+			and (exports.get(name) == "." + name) and hasattr(value, name):
+			value = getattr(value, name)
+		super().__setattr__(name, value)
+	#
+
+	def __getattr__(self, name:str):
+		exports = self.__dict__.get("_lazyExports")
+		if not exports or (name not in exports):
+			raise AttributeError("module " + repr(self.__name__) + " has no attribute " + repr(name))
+
+		module = importlib.import_module(exports[name], self.__name__)
+		# (a subpackage is exported as the module itself)
+		value = getattr(module, name, module)
+		super().__setattr__(name, value)
+		return value
+	#
+
+	def __dir__(self) -> list:
+		return sorted(set(self.__dict__) | set(self.__dict__.get("_lazyExports", ())))
+	#
+
+	#
+	# Turn the specified (already loaded) module into a lazy module.
+	#
+	# @param		str moduleName			The name of the package (`__name__`).
+	# @param		dict exports			Maps exported names to (relative) module names.
+	#
+	@staticmethod
+	def install(moduleName:str, exports:dict):
+		module = sys.modules[moduleName]
+		module.__class__ = _LazyModule
+		module.__dict__["_lazyExports"] = exports
+		module.__dict__["__all__"] = list(exports)
+	#
+
+#
+
+
+
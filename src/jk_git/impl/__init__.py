@@ -1,7 +1,11 @@
-
-
-
-from .GitHelper import GitHelper
-from .GitConfigFileSection import GitConfigFileSection
-from .GitConfigFile import GitConfigFile
-
+from ._LazyModule import _LazyModule
+
+_LazyModule.install(__name__, {
+	"GitHelper": ".GitHelper",
+	"GitCatFileBatch": ".GitCatFileBatch",
+	"GitOutputStream": ".GitOutputStream",
+	"GitCommitColumns": ".GitCommitColumns",
+	"GitPackFile": ".GitPackFile",
+	"GitConfigFileSection": ".GitConfigFileSection",
+	"GitConfigFile": ".GitConfigFile",
+})
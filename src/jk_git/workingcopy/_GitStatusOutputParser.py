@@ -214,6 +214,100 @@ class _GitStatusOutputParser(object):
 		return ret
 	#
 
+	@staticmethod
+	def __decodeHeaderZ(record:bytes) -> tuple:
+		parts = record.split(b" ", 6)
+		xy = parts[1].decode("ascii")
+		if "A" in xy:
+			status = GitFileInfo.ADDED
+		elif "D" in xy:
+			status = GitFileInfo.DELETED
+		else:
+			status = GitFileInfo.MODIFIED
+		return status, xy, parts[2].decode("ascii"), (parts[3].decode("ascii"), parts[4].decode("ascii"), parts[5].decode("ascii"))
+	#
+
+	#
+	# Parse the output of `git status --porcelain=v2 -z`.
+	#
+	# Records are separated by NUL; paths are neither quoted nor escaped. The type of each record is determined by its first byte:
+	#
+	# * `1 XY sub mH mI mW hH hI path`						ordinary changed entry
+	# * `2 XY sub mH mI mW hH hI Xscore path<NUL>origPath`	renamed or copied entry
+	# * `u XY sub m1 m2 m3 mW h1 h2 h3 path`				unmerged entry
+	# * `? path`											untracked file
+	# * `! path`											ignored file
+	# * `# ...`												header (ignored)
+	#
+	# @param		bytes[] records			The NUL separated records written by git (e.g. `data.split(b"\0")`).
+	# @param		bool bIncludeIgnored	If `False` ignored files are omitted.
+	# @return		GitFileInfo[]			A list of file information objects.
+	#
+	@staticmethod
+	def parseZ(records:typing.Iterable[bytes], bIncludeIgnored:bool, parent) -> typing.List[GitFileInfo]:
+		ret = []
+		# the header of ordinary and renamed entries ("XY sub mH mI mW") has a fixed length; in a working copy there are only few
+		# different headers, so they are decoded only once
+		headers = {}
+		it = iter(records)
+		for record in it:
+			if not record:
+				continue
+
+			c = record[0]
+			if c == 49:			# "1 XY sub mH mI mW hH hI path"
+				header = headers.get(record[2:30])
+				if header is None:
+					header = _GitStatusOutputParser.__decodeHeaderZ(record)
+					headers[record[2:30]] = header
+				status, xy, submoduleState, modes = header
+				pos = record.index(b" ", record.index(b" ", 31) + 1) + 1
+				ret.append(GitFileInfo(parent, status, record[pos:].decode("utf-8", "surrogateescape"),
+					xy=xy,
+					modes=modes,
+					submoduleState=submoduleState,
+				))
+
+			elif c == 50:		# "2 XY sub mH mI mW hH hI Xscore path", followed by the original path
+				header = headers.get(record[2:30])
+				if header is None:
+					header = _GitStatusOutputParser.__decodeHeaderZ(record)
+					headers[record[2:30]] = header
+				_, xy, submoduleState, modes = header
+				pos = record.index(b" ", record.index(b" ", record.index(b" ", 31) + 1) + 1) + 1
+				origPath = next(it, None)
+				if origPath is None:
+					raise Exception("Failed to parse record: " + repr(record))
+				ret.append(GitFileInfo(parent, GitFileInfo.RENAMED, record[pos:].decode("utf-8", "surrogateescape"),
+					origFilePath=origPath.decode("utf-8", "surrogateescape"),
+					xy=xy,
+					modes=modes,
+					submoduleState=submoduleState,
+				))
+			elif c == 117:		# "u"
+				parts = record.split(b" ", 10)
+				ret.append(GitFileInfo(parent, GitFileInfo.CONFLICTED, parts[10].decode("utf-8", "surrogateescape"),
+					xy=parts[1].decode("ascii"),
+					modes=(parts[3].decode("ascii"), parts[4].decode("ascii"), parts[6].decode("ascii")),
+					submoduleState=parts[2].decode("ascii"),
+				))
+
+			elif c == 63:		# "?"
+				ret.append(GitFileInfo(parent, GitFileInfo.UNVERSIONED, record[2:].decode("utf-8", "surrogateescape")))
+
+			elif c == 33:		# "!"
+				if bIncludeIgnored:
+					ret.append(GitFileInfo(parent, GitFileInfo.IGNORED, record[2:].decode("utf-8", "surrogateescape")))
+
+			elif c == 35:		# "#"
+				pass
+
+			else:
+				raise Exception("Failed to parse record: " + repr(record))
+
+		return ret
+	#
+
 #
 
 
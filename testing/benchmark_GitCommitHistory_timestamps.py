@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+
+#
+# Benchmark: building a GitCommitHistory from a synthetic log of 200,000 commits.
+#
+#	* legacy:	"%P|%H|%cn|%ce|%cd|%s" with the default date format parsed by `dateutil`
+#	* current:	records as provided by `GitWrapper.iterLogParsable()` with "%ct %cd" (--date=format:%z)
+#
+
+
+
+import time
+import datetime
+import tracemalloc
+
+import jk_git
+
+
+
+
+
+NUMBER_OF_COMMITS = 200000
+
+
+
+def createSyntheticLogs(n:int) -> tuple:
+	legacyLines = []
+	records = []
+	tz = datetime.timezone(datetime.timedelta(hours=2))
+	t0 = 1500000000
+	parentHash = ""
+	for i in range(n):
+		commitHash = "%040x" % (i + 1)
+		t = t0 + i * 60
+		dt = datetime.datetime.fromtimestamp(t, tz)
+		legacyLines.append("|".join([ parentHash, commitHash, "Some Name", "some@example.com", dt.strftime("%a %b %d %H:%M:%S %Y %z"), "commit " + str(i) ]))
+		records.append(( parentHash, commitHash, "Some Name", "some@example.com", str(t) + " +0200", "commit " + str(i) ))
+		parentHash = commitHash
+	legacyLines.reverse()
+	records.reverse()
+	return legacyLines, records
+#
+
+def measure(name:str, f) -> float:
+	t = time.time()
+	h = f()
+	duration = time.time() - t
+	print("{:<40} {:8.3f}s {:>12,.0f} entries/s".format(name, duration, NUMBER_OF_COMMITS / duration))
+	return h
+#
+
+
+
+legacyLines, records = createSyntheticLogs(NUMBER_OF_COMMITS)
+
+h1 = measure("legacy (dateutil)", lambda: jk_git.GitCommitHistory.createFromGitLogOutput(legacyLines))
+h2 = measure("current (lazy)", lambda: jk_git.GitCommitHistory.createFromLogRecords(records))
+measure("current (+ access commitDateTime)", lambda: [ e.commitDateTime for e in h2 ])
+
+tracemalloc.start()
+h3 = jk_git.GitCommitHistory.createFromLogRecords(records)
+size, peak = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+print("{:<40} {:8.1f} MB ({:.0f} bytes per commit)".format("memory of the history", size / 1048576, size / NUMBER_OF_COMMITS))
+
+assert h1.latestEntry.commitDateTime == h2.latestEntry.commitDateTime
+assert h1.oldestEntry.commitDateTime == h2.oldestEntry.commitDateTime
+
+
+
+
+
@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+
+#
+# Benchmark: startup cost of a new Python process using jk_git.
+#
+#	* import:				`import jk_git` (wall clock time of the process minus an empty interpreter run)
+#	* first call (cold):	the first `GitWrapper()` in a process; the version of git is not yet cached: `git --version` is run
+#	* first call (warm):	the first `GitWrapper()` in a process; the version of git is taken from the on-disk version cache
+#
+# Additionally the modules with the highest cumulative import time are listed (as reported by `python -X importtime`; nesting is
+# indicated by indentation).
+#
+
+
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+
+
+
+
+NUMBER_OF_RUNS = 20
+
+CODE_IMPORT = "import jk_git"
+CODE_FIRST_CALL = "import time, jk_git; t = time.perf_counter(); jk_git.GitWrapper(); print(time.perf_counter() - t)"
+
+
+
+def runPython(code:str, env:dict, *extraArgs) -> subprocess.CompletedProcess:
+	return subprocess.run([ sys.executable, *extraArgs, "-c", code ], env=env, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+#
+
+def median(values:list) -> float:
+	values = sorted(values)
+	return values[len(values) // 2]
+#
+
+def measureProcess(code:str, env:dict) -> float:
+	durations = []
+	for _ in range(NUMBER_OF_RUNS):
+		t = time.perf_counter()
+		runPython(code, env)
+		durations.append(time.perf_counter() - t)
+	return median(durations)
+#
+
+# (the duration is measured within the process: the variance of the import time would hide it otherwise)
+def measureFirstCall(env:dict, beforeEachRun) -> float:
+	durations = []
+	for _ in range(NUMBER_OF_RUNS):
+		beforeEachRun()
+		durations.append(float(runPython(CODE_FIRST_CALL, env).stdout))
+	return median(durations)
+#
+
+def removeFile(filePath:str):
+	try:
+		os.unlink(filePath)
+	except FileNotFoundError:
+		pass
+#
+
+
+
+with tempfile.TemporaryDirectory() as tempDirPath:
+	cacheFilePath = os.path.join(tempDirPath, "git-versions")
+	env = dict(os.environ)
+	env["JK_GIT_VERSION_CACHE"] = cacheFilePath
+
+	tBase = measureProcess("pass", env)
+	tImport = measureProcess(CODE_IMPORT, env)
+	tCold = measureFirstCall(env, lambda: removeFile(cacheFilePath))
+	tWarm = measureFirstCall(env, lambda: None)
+
+	print("{:<40} {:8.1f}ms".format("interpreter", tBase * 1000))
+	print("{:<40} {:8.1f}ms".format("import", (tImport - tBase) * 1000))
+	print("{:<40} {:8.1f}ms".format("first call (cold version cache)", tCold * 1000))
+	print("{:<40} {:8.1f}ms".format("first call (warm version cache)", tWarm * 1000))
+
+	# ----
+
+	stdErr = runPython(CODE_IMPORT, env, "-X", "importtime").stderr
+	entries = []
+	for line in stdErr.split("\n"):
+		if not line.startswith("import time:") or ("cumulative" in line):
+			continue
+		_, cumulative, moduleName = line[12:].split("|")
+		entries.append((int(cumulative), moduleName.rstrip()))
+	entries.sort(reverse=True)
+	print()
+	print("imports with the highest cumulative import time:")
+	for cumulative, moduleName in entries[:10]:
+		print("\t{:<50} {:8.1f}ms".format(moduleName, cumulative / 1000))
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+
+#
+# Benchmark: parsing the output of `git status` for a synthetic working copy with 1,000,000 entries.
+#
+#	* line based:	`git status --porcelain=2` parsed line by line (`_GitStatusOutputParser.parse()`, 200,000 entries only)
+#	* -z:			`git status --porcelain=v2 -z` split on NUL (`_GitStatusOutputParser.parseZ()`)
+#
+
+
+
+import time
+
+from jk_git.workingcopy._GitStatusOutputParser import _GitStatusOutputParser
+
+
+
+
+
+NUMBER_OF_ENTRIES = 1000000
+NUMBER_OF_ENTRIES_LINE_BASED = 200000
+
+HASH1 = b"%040x" % 1
+HASH2 = b"%040x" % 2
+
+
+
+def createSyntheticStatus(n:int) -> list:
+	records = []
+	for i in range(n):
+		path = b"some/directory %d/file %d.txt" % (i // 100, i)
+		k = i % 5
+		if k == 0:
+			records.append(b"1 .M N... 100644 100644 100644 " + HASH1 + b" " + HASH1 + b" " + path)
+		elif k == 1:
+			records.append(b"1 A. N... 000000 100644 100644 " + b"0" * 40 + b" " + HASH2 + b" " + path)
+		elif k == 2:
+			records.append(b"2 R. N... 100644 100644 100644 " + HASH1 + b" " + HASH1 + b" R100 " + path)
+			records.append(path + b".orig")
+		elif k == 3:
+			records.append(b"1 .M N... 100644 100644 100755 " + HASH1 + b" " + HASH1 + b" " + path)
+		else:
+			records.append(b"? " + path)
+	return records
+#
+
+def measure(name:str, n:int, f):
+	t = time.time()
+	ret = f()
+	duration = time.time() - t
+	print("{:<40} {:8.3f}s {:>12,.0f} entries/s".format(name, duration, n / duration))
+	assert len(ret) == n
+	return ret
+#
+
+
+
+records = createSyntheticStatus(NUMBER_OF_ENTRIES)
+dataZ = b"\0".join(records) + b"\0"
+
+# the line based format is identical for all entries except for renamed files (where the two paths are separated by TAB)
+linesRecords = createSyntheticStatus(NUMBER_OF_ENTRIES_LINE_BASED)
+lines = []
+i = 0
+while i < len(linesRecords):
+	if linesRecords[i].startswith(b"2 "):
+		lines.append((linesRecords[i] + b"\t" + linesRecords[i + 1]).decode("utf-8"))
+		i += 2
+	else:
+		lines.append(linesRecords[i].decode("utf-8"))
+		i += 1
+
+measure("line based ({:,} entries)".format(NUMBER_OF_ENTRIES_LINE_BASED), NUMBER_OF_ENTRIES_LINE_BASED,
+	lambda: _GitStatusOutputParser.parse(lines, 2, False, None))
+measure("-z (incl. split)", NUMBER_OF_ENTRIES, lambda: _GitStatusOutputParser.parseZ(dataZ.split(b"\0"), False, None))
+
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+
+
+
+import os
+import asyncio
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+async def runTests(th:TestHelper, log:jk_logging.AbstractLogger):
+	asyncGit = jk_git.AsyncGitWrapper(log, maxConcurrentProcesses=16)
+	wc = jk_git.AsyncGitWorkingCopy(th.tempDirPath, asyncGit)
+
+	with log.descend("Comparing with GitWrapper ...") as log2:
+		assert await asyncGit.status(th.tempDirPath) == th.git.status(th.tempDirPath)
+		assert await asyncGit.listTags(th.tempDirPath) == th.git.listTags(th.tempDirPath)
+		assert await asyncGit.listBranches(th.tempDirPath) == th.git.listBranches(th.tempDirPath)
+		assert await asyncGit.getLogParsable(th.tempDirPath) == list(th.git.iterLogParsable(th.tempDirPath))
+		assert await asyncGit.getHeadCommitHash(th.tempDirPath) == th.git.getHeadCommitHash(th.tempDirPath)
+		assert await wc.downloadFromHead("foo1.txt") == th.git.downloadFromHead(th.tempDirPath, "foo1.txt")
+		assert await wc.downloadFromHead("does-not-exist.txt") is None
+		assert await asyncGit.downloadMany(th.tempDirPath, "HEAD", [ "foo1.txt", "foo2.txt", "missing.txt" ]) \
+			== th.git.downloadMany(th.tempDirPath, "HEAD", [ "foo1.txt", "foo2.txt", "missing.txt" ])
+
+		history = await wc.getCommitHistory()
+		assert len(history) == 2
+
+	with log.descend("Running many operations concurrently ...") as log2:
+		results = await asyncio.gather(*[ wc.status() for i in range(100) ])
+		assert all([ len(r) == 1 for r in results ])
+		assert results[0][0].status() == jk_git.GitFileInfo.UNVERSIONED
+		assert await wc.isDirty()
+
+	with log.descend("Error handling ...") as log2:
+		try:
+			await asyncGit.runGit(cmdArgs=[ "rev-parse", "does-not-exist" ], workingDirectory=th.tempDirPath)
+			assert False
+		except jk_git.GitExecutionException as ee:
+			assert ee.returnCode != 0
+
+#
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+
+		th.createRepository(log)
+		th.createSingleFileAndCommitIt("foo1.txt", "commit 1", log)
+		th.createSingleFileAndCommitIt("foo2.txt", "commit 2", log)
+		th.git.createTag(th.tempDirPath, "v1", "a tag", log=log)
+		with open(os.path.join(th.tempDirPath, "untracked.txt"), "w") as f:
+			f.write("untracked")
+
+		asyncio.run(runTests(th, log))
+
+#
+
+
+
+
+
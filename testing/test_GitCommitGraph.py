@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+
+
+
+import os
+import time
+import random
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+with jk_logging.wrapMain() as log:
+
+	with log.descend("Testing a synthetic graph ...") as log2:
+		#
+		#	a - b - c - f - g
+		#	     \     /
+		#	      d - e
+		#
+		g = jk_git.GitCommitGraph(
+			[ "a", "b", "c", "d", "e", "f", "g", "x" ],
+			[ [], ["a"], ["b"], ["b"], ["d"], ["c", "e"], ["f"], ["outside"] ],
+		)
+		assert g.getGeneration("a") == 1
+		assert g.getGeneration("f") == 5
+		assert g.getGeneration("x") == 1
+		assert sorted(g.getChildren("b")) == [ "c", "d" ]
+		assert g.getParents("x") == []
+		assert g.isAncestor("a", "g")
+		assert g.isAncestor("e", "f")
+		assert g.isAncestor("g", "g")
+		assert not g.isAncestor("g", "a")
+		assert not g.isAncestor("c", "e")
+		assert not g.isAncestor("x", "g")
+		assert g.mergeBase("c", "e") == "b"
+		assert g.mergeBase("g", "e") == "e"
+		assert g.mergeBase("g", "x") is None
+		assert list(g.iterFirstParents("g")) == [ "g", "f", "c", "b", "a" ]
+
+		# criss-cross merge: two best common ancestors
+		g = jk_git.GitCommitGraph(
+			[ "r", "p", "q", "m1", "m2" ],
+			[ [], ["r"], ["r"], ["p", "q"], ["q", "p"] ],
+		)
+		assert sorted(g.mergeBases("m1", "m2")) == [ "p", "q" ]
+
+	with log.descend("Comparing random graphs with brute force results ...") as log2:
+		rng = random.Random(42)
+		for n in range(1, 40):
+			parents = [ [] ] + [ list(set([ rng.randrange(i) for j in range(rng.choice([ 0, 1, 1, 2, 2, 3 ])) ])) for i in range(1, n) ]
+			ancestors = []
+			for i in range(n):
+				s = { i }
+				for p in parents[i]:
+					s |= ancestors[p]
+				ancestors.append(s)
+			hashes = [ "c" + str(i) for i in range(n) ]
+			order = list(range(n))
+			rng.shuffle(order)
+			g = jk_git.GitCommitGraph([ hashes[i] for i in order ], [ [ hashes[p] for p in parents[i] ] for i in order ])
+			for a in range(n):
+				for b in range(n):
+					assert g.isAncestor(hashes[a], hashes[b]) == (a in ancestors[b]), (n, a, b)
+					common = ancestors[a] & ancestors[b]
+					best = [ hashes[c] for c in common if not any((c != d) and (c in ancestors[d]) for d in common) ]
+					assert sorted(g.mergeBases(hashes[a], hashes[b])) == sorted(best), (n, a, b)
+
+	with log.descend("Testing a large linear graph ...") as log2:
+		n = 100000
+		hashes = [ "%040x" % i for i in range(n) ]
+		g = jk_git.GitCommitGraph(hashes, [ [] ] + [ [ hashes[i - 1] ] for i in range(1, n) ])
+		t = time.time()
+		for i in range(1000):
+			assert g.isAncestor(hashes[n - 10], hashes[n - 1])
+			assert not g.isAncestor(hashes[n - 1], hashes[n - 10])
+			assert g.mergeBase(hashes[n - 10], hashes[n - 1]) == hashes[n - 10]
+		log2.info("3000 queries: {:.3f}s".format(time.time() - t))
+
+	with log.descend("Testing a large graph with merged branches ...") as log2:
+		rng = random.Random(42)
+		parents = [ [] ]
+		mainLine = [ 0 ]
+		while len(parents) < 100000:
+			if rng.random() < 0.1:
+				tip = mainLine[-1]
+				for i in range(rng.randint(1, 20)):
+					parents.append([ tip ])
+					tip = len(parents) - 1
+				parents.append([ mainLine[-1], tip ])
+			else:
+				parents.append([ mainLine[-1] ])
+			mainLine.append(len(parents) - 1)
+		hashes = [ "%040x" % i for i in range(len(parents)) ]
+		g = jk_git.GitCommitGraph(hashes, [ [ hashes[p] for p in x ] for x in parents ])
+		root = hashes[0]
+		tip = hashes[mainLine[-1]]
+		t = time.time()
+		for i in range(1000):
+			assert g.isAncestor(root, tip)
+			assert not g.isAncestor(tip, root)
+			assert g.mergeBase(tip, root) == root
+		log2.info("3000 queries: {:.3f}s".format(time.time() - t))
+		assert time.time() - t < 1
+		pairs = [ (hashes[rng.randrange(len(hashes))], hashes[rng.randrange(len(hashes))]) for i in range(1000) ]
+		t = time.time()
+		for a, b in pairs:
+			g.isAncestor(a, b)
+		log2.info("1000 random queries: {:.3f}s".format(time.time() - t))
+		assert time.time() - t < 1
+
+	with TestHelper(log) as th:
+
+		th.createRepository(log)
+		th.createSingleFileAndCommitIt("foo1.txt", "commit 1", log)
+		th.git.createBranch(th.tempDirPath, "feature", log=log)
+		th.createSingleFileAndCommitIt("foo2.txt", "commit 2", log)
+		th.git.switchToBranch(th.tempDirPath, "master", log=log)
+		th.createSingleFileAndCommitIt("foo3.txt", "commit 3", log)
+		th.git.runGit(cmdArgs=[ "merge", "--no-ff", "-m", "merge", "feature" ], workingDirectory=th.tempDirPath, log=log)
+
+		with log.descend("Testing the graph of a repository ...") as log2:
+			h = jk_git.GitCommitHistory.create(th.tempDirPath, th.git)
+			byText = { e.text: e for e in h.entriesList }
+
+			merge = byText["merge"]
+			assert merge.isMerge
+			assert merge.parentCommitHash == byText["commit 3"].commitHash
+			assert [ e.text for e in merge.predecessors ] == [ "commit 3", "commit 2" ]
+			assert sorted([ e.text for e in byText["commit 1"].successors ]) == [ "commit 2", "commit 3" ]
+			assert byText["commit 2"].predecessor == byText["commit 1"]
+
+			assert h.mergeBase(byText["commit 2"].commitHash, byText["commit 3"].commitHash) == byText["commit 1"]
+			assert h.isAncestor(byText["commit 2"].commitHash, merge.commitHash)
+			assert [ e.text for e in h.iterFirstParents() ] == [ "merge", "commit 3", "commit 1" ]
+
+#
+
+
+
+
+
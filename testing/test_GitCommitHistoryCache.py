@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+
+
+
+import os
+import tempfile
+import threading
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+def texts(gitHistory) -> list:
+	return [ e.text for e in gitHistory.entriesList ]
+#
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+
+		th.createRepository(log)
+		wc = jk_git.GitWorkingCopy(th.tempDirPath, log=log)
+		cacheFilePath = os.path.join(th.tempDirPath, ".git", jk_git.GitCommitHistoryCache.FILE_NAME)
+
+		with log.descend("Using the cache on an empty repository ...") as log2:
+			assert wc.getCommitHistory(bUseCache=True, log=log2) is None
+			assert not os.path.isfile(cacheFilePath)
+
+		th.createSingleFileAndCommitIt("foo1.txt", "commit 1", log)
+		th.createSingleFileAndCommitIt("foo2.txt", "commit 2", log)
+
+		with log.descend("Building the cache ...") as log2:
+			h = wc.getCommitHistory(bUseCache=True, log=log2)
+			assert texts(h) == [ "commit 1", "commit 2" ]
+			assert os.path.isfile(cacheFilePath)
+			# nothing changed: the very same object is returned
+			assert wc.getCommitHistory(bUseCache=True, log=log2) is h
+
+		th.createSingleFileAndCommitIt("foo3.txt", "commit 3", log)
+
+		with log.descend("Updating the cache incrementally ...") as log2:
+			h = wc.getCommitHistory(bUseCache=True, log=log2)
+			assert texts(h) == [ "commit 1", "commit 2", "commit 3" ]
+			assert texts(h) == texts(wc.getCommitHistory())
+
+			# a fresh object must be able to use the data written to disk
+			wc2 = jk_git.GitWorkingCopy(th.tempDirPath, log=log2)
+			assert texts(wc2.getCommitHistory(bUseCache=True, log=log2)) == [ "commit 1", "commit 2", "commit 3" ]
+
+		with log.descend("Rewriting the history ...") as log2:
+			th.git.runGit(cmdArgs=[ "reset", "--hard", "HEAD~2" ], workingDirectory=th.tempDirPath, log=log2)
+			th.createSingleFileAndCommitIt("foo4.txt", "commit 4", log2)
+			h = wc.getCommitHistory(bUseCache=True, log=log2)
+			assert texts(h) == [ "commit 1", "commit 4" ]
+
+		with log.descend("Using a separate cache directory ...") as log2:
+			with tempfile.TemporaryDirectory() as cacheDirPath:
+				h = wc.getCommitHistory(bUseCache=True, cacheDirPath=cacheDirPath, log=log2)
+				assert texts(h) == [ "commit 1", "commit 4" ]
+				assert len(os.listdir(cacheDirPath)) == 1
+				# the same directory specified differently: the cache object is reused
+				assert wc.getCommitHistory(bUseCache=True, cacheDirPath=cacheDirPath + "/", log=log2) is h
+				assert wc.getCommitHistory(bUseCache=True, cacheDirPath=os.path.relpath(cacheDirPath), log=log2) is h
+
+		with log.descend("Writing the same cache file concurrently ...") as log2:
+			with tempfile.TemporaryDirectory() as cacheDirPath:
+				filePath = os.path.join(cacheDirPath, jk_git.GitCommitHistoryCache.FILE_NAME)
+				tipHash = th.git.getHeadCommitHash(th.tempDirPath)
+				records = list(th.git.iterLogParsable(th.tempDirPath, tipHash))
+				warnings = []
+				class WarningCollector(object):
+					def warn(self, text):
+						warnings.append(text)
+				def worker():
+					cache = jk_git.GitCommitHistoryCache(th.tempDirPath, filePath)
+					for i in range(200):
+						cache._GitCommitHistoryCache__save(tipHash, records, WarningCollector())
+				threads = [ threading.Thread(target=worker) for i in range(4) ]
+				for t in threads:
+					t.start()
+				for t in threads:
+					t.join()
+				assert not warnings, warnings
+				assert os.listdir(cacheDirPath) == [ jk_git.GitCommitHistoryCache.FILE_NAME ]
+
+#
+
+
+
+
+
@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+
+
+
+import datetime
+
+import jk_logging
+
+import jk_git
+
+
+
+
+
+with jk_logging.wrapMain() as log:
+
+	records = []
+	parentHash = ""
+	for i in range(10):
+		commitHash = "%040x" % (i + 1)
+		records.append(( parentHash, commitHash, "Name " + str(i % 2), "mail" + str(i % 2) + "@example.com", str(1500000000 + i) + " -0130", "commit " + str(i) ))
+		parentHash = commitHash
+	records.reverse()
+
+	h = jk_git.GitCommitHistory.createFromLogRecords(records)
+
+	with log.descend("Checking entries ...") as log2:
+		assert len(h) == 10
+		assert h.oldestEntry.text == "commit 0"
+		assert h.oldestEntry.isOldest
+		assert not h.oldestEntry.isLatest
+		assert h.latestEntry.text == "commit 9"
+		assert h.latestEntry.isLatest
+		assert h[0] == h.oldestEntry
+		assert h[-1] == h.latestEntry
+		assert h[3].commitHash == "%040x" % 4
+		assert h[3].parentCommitHash == "%040x" % 3
+		assert h[0].parentCommitHash is None
+		assert h[0].parentCommitHashes == ()
+		assert h[5].committerName == "Name 1"
+		assert h[5].committerEMail == "mail1@example.com"
+		assert h[5].commitTimestamp == 1500000005
+		assert h[5].tzOffsetMinutes == -90
+		assert h[5].commitDateTime.utcoffset().total_seconds() == -90 * 60
+		assert h.getEntry("%040x" % 6) == h[5]
+		assert h.getEntry("%040x" % 99) is None
+		assert h.getEntry("not a hash") is None
+
+	with log.descend("Checking iteration and slicing ...") as log2:
+		assert [ e.text for e in h ] == [ "commit " + str(i) for i in range(10) ]
+		assert [ e.text for e in reversed(h) ] == [ "commit " + str(i) for i in range(9, -1, -1) ]
+		s = h[2:8:2]
+		assert len(s) == 3
+		assert [ e.text for e in s ] == [ "commit 2", "commit 4", "commit 6" ]
+		assert s[-1].text == "commit 6"
+		assert [ e.text for e in s[1:] ] == [ "commit 4", "commit 6" ]
+		assert len(h.entriesList) == 10
+		assert len(h.entriesMap) == 10
+
+	with log.descend("Checking the constructors of previous versions ...") as log2:
+		e0 = jk_git.GitCommitHistoryEntry(None, "%040x" % 1, "Name 0", "mail0@example.com", 1500000000, "commit 0", -90)
+		e1 = jk_git.GitCommitHistoryEntry("%040x" % 1, "%040x" % 2, "Name 1", "mail1@example.com",
+			datetime.datetime(2017, 7, 14, 2, 40, 1, tzinfo=datetime.timezone(datetime.timedelta(hours=2))), "commit 1")
+		assert e1.parentCommitHash == "%040x" % 1
+		assert e1.tzOffsetMinutes == 120
+		assert e0.tzOffsetMinutes == -90
+		assert e0.predecessor is None
+		assert not e0.isOldest
+		h2 = jk_git.GitCommitHistory([ e0, e1 ])
+		assert len(h2) == 2
+		# the entries are attached to the history
+		assert e0 == h2.oldestEntry
+		assert e1 == h2.latestEntry
+		assert e1.predecessor == e0
+		assert e0.isOldest
+		assert [ e.text for e in h2 ] == [ "commit 0", "commit 1" ]
+		h3 = jk_git.GitCommitHistory.createFromEntries(reversed(h.entriesList))
+		assert [ e.commitHash for e in h3 ] == [ e.commitHash for e in h ]
+
+	with log.descend("Checking the dump ...") as log2:
+		h[1:3][0].dump(printFunc=log2.info)
+
+#
+
+
+
+
+
@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+
+
+
+import os
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+
+		th.createRepository(log)
+
+		with log.descend("Reading the history of an empty repository ...") as log2:
+			assert list(th.git.iterLogParsable(th.tempDirPath, log=log2)) == []
+			assert jk_git.GitCommitHistory.create(th.tempDirPath, th.git) is None
+
+		th.createSingleFileAndCommitIt("foo1.txt", "first | commit with separators", log)
+		th.createSingleFileAndCommitIt("foo2.txt", "second commit", log)
+		th.createSingleFileAndCommitIt("foo3.txt", "third commit", log)
+
+		with log.descend("Streaming the history ...") as log2:
+			it = jk_git.GitCommitHistory.iterEntries(th.tempDirPath, th.git)
+			entry = next(it)
+			assert entry.text == "third commit"
+			it.close()
+
+			entries = list(jk_git.GitCommitHistory.iterEntries(th.tempDirPath, th.git))
+			assert [ e.text for e in entries ] == [ "third commit", "second commit", "first | commit with separators" ]
+			assert entries[-1].parentCommitHash is None
+			assert entries[0].parentCommitHash == entries[1].commitHash
+
+		with log.descend("Creating the history ...") as log2:
+			gitHistory = jk_git.GitCommitHistory.create(th.tempDirPath, th.git)
+			assert gitHistory.oldestEntry.text == "first | commit with separators"
+			assert gitHistory.latestEntry.text == "third commit"
+			assert len(gitHistory.entriesList) == 3
+
+			entries = list(jk_git.GitCommitHistory.iterEntries(th.tempDirPath, th.git, gitHistory.oldestEntry.commitHash + "..HEAD"))
+			assert len(entries) == 2
+
+#
+
+
+
+
+
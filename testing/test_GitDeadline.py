@@ -0,0 +1,202 @@
+#!/usr/bin/python3
+
+
+
+import os
+import time
+import threading
+
+import jk_logging
+
+import jk_git
+from jk_git.impl.GitCatFileBatch import GitCatFileBatch
+
+from TestHelper import TestHelper
+
+
+
+
+
+def waitForProcessToTerminate(pidFilePath:str) -> bool:
+	for i in range(50):
+		if os.path.isfile(pidFilePath):
+			break
+		time.sleep(0.1)
+	with open(pidFilePath, "r") as f:
+		pid = int(f.read().strip())
+	for i in range(50):
+		try:
+			with open("/proc/" + str(pid) + "/stat", "r") as f:
+				# (a zombie has been killed already; it just has not been reaped yet)
+				if f.read().rsplit(")", 1)[1].split()[0] == "Z":
+					return True
+		except FileNotFoundError:
+			return True
+		time.sleep(0.1)
+	return False
+#
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+
+		th.createRepository(log)
+		th.createSingleFileAndCommitIt("foo1.txt", "commit 1", log)
+		th.createSingleFileAndCommitIt("foo2.txt", "commit 2", log)
+
+		# a remote that never answers: the "ssh" command used by git records its PID and sleeps
+		pidFilePath = os.path.join(th.tempDirPath, "..", "ssh-" + str(os.getpid()) + ".pid")
+		os.environ["GIT_SSH_COMMAND"] = "sh -c 'echo $$ > " + pidFilePath + "; exec sleep 30'"
+		slowURL = "ssh://slow.example.org/foo.git"
+
+		with log.descend("Nesting scopes ...") as log2:
+			assert jk_git.GitDeadline.current() is None
+			with jk_git.GitDeadline.scope(timeout=100):
+				with jk_git.GitDeadline.scope(timeout=1) as limits:
+					assert 0.9 < limits.timeout <= 1
+				with jk_git.GitDeadline.scope(cancellationToken=jk_git.GitCancellationToken()) as limits:
+					assert 99 < limits.timeout <= 100
+					assert len(limits.cancellationTokens) == 1
+			assert jk_git.GitDeadline.current() is None
+
+		with log.descend("Limits that don't apply ...") as log2:
+			expected = list(th.git.iterLogParsable(th.tempDirPath))
+			assert len(expected) == 2
+			assert list(th.git.iterLogParsable(th.tempDirPath, timeout=30, cancellationToken=jk_git.GitCancellationToken())) == expected
+			assert th.git.status(th.tempDirPath, deadline=time.monotonic() + 30) == []
+			assert th.git.getHeadCommitHash(th.tempDirPath, timeout=30) == expected[0][1]
+			assert th.git.downloadFromHead(th.tempDirPath, "foo1.txt", timeout=30) is not None
+
+		with log.descend("Timeout of ls-remote ...") as log2:
+			t = time.monotonic()
+			try:
+				th.git.lsRemote_url(slowURL, timeout=1)
+				assert False
+			except jk_git.GitTimeoutException as ee:
+				assert 0.9 < ee.elapsed < 5, ee.elapsed
+				assert ee.timeout == 1
+				assert "did not terminate" in str(ee)
+				assert ee.cmdArgs == [ "ls-remote", slowURL ]
+			assert time.monotonic() - t < 5
+			# the whole process group has been killed (including "ssh")
+			assert waitForProcessToTerminate(pidFilePath)
+			os.unlink(pidFilePath)
+
+		with log.descend("Timeout of clone ...") as log2:
+			try:
+				jk_git.GitRemoteRepository(slowURL).checkout(os.path.join(th.tempDirPath, "clone"), timeout=1)
+				assert False
+			except jk_git.GitTimeoutException as ee:
+				assert 0.9 < ee.elapsed < 5, ee.elapsed
+			assert waitForProcessToTerminate(pidFilePath)
+			os.unlink(pidFilePath)
+
+		with log.descend("Cancelling clone ...") as log2:
+			token = jk_git.GitCancellationToken()
+			threading.Timer(0.5, token.cancel).start()
+			t = time.monotonic()
+			try:
+				os.makedirs(os.path.join(th.tempDirPath, "clone2"))
+				th.git.clone(os.path.join(th.tempDirPath, "clone2"), slowURL, cancellationToken=token)
+				assert False
+			except jk_git.GitCancelledException as ee:
+				assert 0.4 < ee.elapsed < 5, ee.elapsed
+			assert time.monotonic() - t < 5
+			assert token.isCancelled
+			assert waitForProcessToTerminate(pidFilePath)
+			os.unlink(pidFilePath)
+
+		with log.descend("Calls fail immediately if the limits are exceeded already ...") as log2:
+			try:
+				th.git.status(th.tempDirPath, cancellationToken=token)
+				assert False
+			except jk_git.GitCancelledException as ee:
+				pass
+			try:
+				th.git.status(th.tempDirPath, deadline=time.monotonic() - 1)
+				assert False
+			except jk_git.GitTimeoutException as ee:
+				pass
+			try:
+				th.git.exportBlob(th.tempDirPath, "HEAD", "foo1.txt", os.path.join(th.tempDirPath, "export.txt"), cancellationToken=token)
+				assert False
+			except jk_git.GitCancelledException as ee:
+				pass
+			assert not os.path.exists(os.path.join(th.tempDirPath, "export.txt"))
+			try:
+				th.git.downloadMany(th.tempDirPath, "HEAD", [ "foo1.txt" ], cancellationToken=token)
+				assert False
+			except jk_git.GitCancelledException as ee:
+				pass
+
+			result = th.git.lsRemoteMany([ th.tempDirPath, slowURL ], cancellationToken=token)
+			assert all([ isinstance(x, jk_git.GitCancelledException) for x in result.values() ]), result
+
+		with log.descend("Waiting for a busy cat-file process ...") as log2:
+			batch = GitCatFileBatch(th.git.gitBinPath, th.tempDirPath)
+			assert batch.readBlob("HEAD", "foo1.txt") == b""
+			# (simulate a long running request of another thread)
+			lock = batch._GitCatFileBatch__lock
+			lock.acquire()
+			try:
+				t = time.monotonic()
+				try:
+					with jk_git.GitDeadline.scope(timeout=0.5):
+						batch.readBlob("HEAD", "foo1.txt")
+					assert False
+				except jk_git.GitTimeoutException as ee:
+					pass
+				assert 0.4 < time.monotonic() - t < 2
+				token2 = jk_git.GitCancellationToken()
+				threading.Timer(0.3, token2.cancel).start()
+				try:
+					with jk_git.GitDeadline.scope(cancellationToken=token2):
+						batch.exportBlob("HEAD", "foo1.txt", os.path.join(th.tempDirPath, "export.txt"))
+					assert False
+				except jk_git.GitCancelledException as ee:
+					pass
+				assert time.monotonic() - t < 3
+			finally:
+				lock.release()
+			with jk_git.GitDeadline.scope(timeout=10):
+				assert batch.readBlob("HEAD", "foo1.txt") == b""
+			batch.close()
+
+		with log.descend("Streaming ...") as log2:
+			with jk_git.GitDeadline.scope(timeout=1):
+				s = th.git.streamGit(cmdArgs=[ "ls-remote", slowURL ])
+			t = time.monotonic()
+			try:
+				with s:
+					for line in s.iterLines():
+						pass
+				assert False
+			except jk_git.GitTimeoutException as ee:
+				pass
+			assert time.monotonic() - t < 5
+			assert waitForProcessToTerminate(pidFilePath)
+			os.unlink(pidFilePath)
+
+		with log.descend("Working copies ...") as log2:
+			wc = jk_git.GitWorkingCopy(th.tempDirPath, gitWrapper=th.git)
+			assert len(wc.status(timeout=30)) == len(wc.status())
+			assert wc.checkIsDirty(timeout=30) == wc.checkIsDirty()
+			try:
+				wc.checkIsDirty(cancellationToken=token)
+				assert False
+			except jk_git.GitCancelledException as ee:
+				pass
+			with jk_git.GitDeadline.scope(cancellationToken=token):
+				try:
+					wc.listBranches()
+					assert False
+				except jk_git.GitCancelledException as ee:
+					pass
+
+			fleet = jk_git.GitWorkingCopyFleet([ th.tempDirPath ], th.git)
+			with jk_git.GitDeadline.scope(cancellationToken=token):
+				r = fleet.getStatus(jobs=1)[os.path.abspath(th.tempDirPath)]
+			assert isinstance(r.error, jk_git.GitCancelledException), r.error
+
+		log.notice("Success.")
@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+
+#
+# Tests locating the git binary and caching its version on disk. Every check runs in a new Python process as `GitWrapper` shares the
+# `GitHelper` instances within a process.
+#
+
+
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+import jk_logging
+
+
+
+
+
+PROBE = "import jk_git; print(jk_git.GitWrapper().gitBinPath); print(jk_git.GitWrapper().version)"
+
+
+
+def createStub(dirPath:str, logFilePath:str) -> str:
+	os.makedirs(dirPath, exist_ok=True)
+	filePath = os.path.join(dirPath, "git")
+	with open(filePath, "w") as f:
+		f.write("#!/bin/sh\necho \"$@\" >> " + logFilePath + "\nexec /usr/bin/git \"$@\"\n")
+	os.chmod(filePath, 0o755)
+	return filePath
+#
+
+def countVersionProbes(logFilePath:str) -> int:
+	try:
+		with open(logFilePath, "r") as f:
+			return f.read().split("\n").count("--version")
+	except FileNotFoundError:
+		return 0
+#
+
+
+
+with jk_logging.wrapMain() as log:
+	with tempfile.TemporaryDirectory() as tempDirPath:
+		logFilePath = os.path.join(tempDirPath, "calls.log")
+		stubPath = createStub(os.path.join(tempDirPath, "bin"), logFilePath)
+		otherStubPath = createStub(os.path.join(tempDirPath, "exec"), logFilePath)
+		cacheFilePath = os.path.join(tempDirPath, "cache", "git-versions")
+
+		baseEnv = dict(os.environ)
+		baseEnv.pop("JK_GIT_BINARY", None)
+		baseEnv.pop("GIT_EXEC_PATH", None)
+		baseEnv["JK_GIT_VERSION_CACHE"] = cacheFilePath
+		baseEnv["PATH"] = os.path.dirname(stubPath) + os.pathsep + baseEnv.get("PATH", "")
+
+		def probe(**kwargs) -> str:
+			env = dict(baseEnv)
+			env.update(kwargs)
+			return subprocess.run([ sys.executable, "-c", PROBE ], env=env, check=True, stdout=subprocess.PIPE, text=True).stdout.split("\n")[0]
+		#
+
+		# git is searched in PATH; the version is probed once and then taken from the cache
+		assert probe() == stubPath
+		assert countVersionProbes(logFilePath) == 1
+		assert os.path.isfile(cacheFilePath)
+		assert probe() == stubPath
+		assert countVersionProbes(logFilePath) == 1
+
+		# modifying the binary invalidates the cache entry
+		time.sleep(0.01)
+		os.utime(stubPath)
+		assert probe() == stubPath
+		assert countVersionProbes(logFilePath) == 2
+		assert probe() == stubPath
+		assert countVersionProbes(logFilePath) == 2
+
+		# GIT_EXEC_PATH and JK_GIT_BINARY take precedence over PATH
+		assert probe(GIT_EXEC_PATH=os.path.dirname(otherStubPath)) == otherStubPath
+		assert countVersionProbes(logFilePath) == 3
+		assert probe(JK_GIT_BINARY=otherStubPath) == otherStubPath
+		assert countVersionProbes(logFilePath) == 3
+
+		# the cache can be disabled
+		assert probe(JK_GIT_VERSION_CACHE="") == stubPath
+		assert countVersionProbes(logFilePath) == 4
+		assert probe(JK_GIT_VERSION_CACHE="") == stubPath
+		assert countVersionProbes(logFilePath) == 5
+
+		# explicit binary
+		env = dict(baseEnv)
+		code = "import jk_git; g = jk_git.GitWrapper(gitBinPath=" + repr(otherStubPath) + "); print(g.gitBinPath, jk_git.GitWrapper().gitBinPath)"
+		out = subprocess.run([ sys.executable, "-c", code ], env=env, check=True, stdout=subprocess.PIPE, text=True).stdout.split()
+		assert out == [ otherStubPath, stubPath ], out
+
+		log.notice("Success.")
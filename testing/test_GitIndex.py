@@ -0,0 +1,187 @@
+#!/usr/bin/python3
+
+
+
+import os
+import subprocess
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+def writeFile(filePath:str, text:str):
+	os.makedirs(os.path.dirname(filePath), exist_ok=True)
+	with open(filePath, "w") as f:
+		f.write(text)
+#
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+		th.createRepository(log)
+		root = th.tempDirPath
+		git = th.git
+
+		def runGit(*args) -> str:
+			return subprocess.run([ git.gitBinPath, "-C", root ] + list(args), check=True, capture_output=True).stdout.decode("utf-8")
+		#
+
+		wc = jk_git.GitWorkingCopy(root, gitWrapper=git)
+
+		def check():
+			bExpected = git.isDirty(root, bIgnoreUntracked=True)
+			bQuick = wc.quickCheckIsDirty()
+			log.notice("expected: " + str(bExpected) + ", quick check: " + str(bQuick))
+			assert bQuick == bExpected
+			for bIgnoreUntracked in [ True, False ]:
+				assert wc.checkIsDirty(bIgnoreUntracked=bIgnoreUntracked) == git.isDirty(root, bIgnoreUntracked=bIgnoreUntracked)
+			assert wc.isDirty == (not wc.isClean)
+		#
+
+		# no commits yet
+		assert wc.index is None
+		check()
+		writeFile(os.path.join(root, "a.txt"), "a\n")
+		git.add(root, os.path.join(root, "a.txt"), log=log)
+		check()
+		git.commit(root, "initial commit", log=log)
+		check()
+
+		with log.descend("Comparing with 'git ls-files' ...") as log2:
+			for i in range(20):
+				writeFile(os.path.join(root, "some directory", "sub" + str(i % 3), "a rather long file name äöü " + str(i) + ".txt"), str(i) + "\n")
+			os.symlink("a.txt", os.path.join(root, "link"))
+			runGit("add", ".")
+			runGit("commit", "-m", "more files")
+			runGit("add", "--intent-to-add", "--", "some directory/sub0/a rather long file name äöü 0.txt")	# (no effect: already tracked)
+			writeFile(os.path.join(root, "intent.txt"), "intent\n")
+			for version in [ 2, 3, 4 ]:
+				runGit("update-index", "--index-version", str(version))
+				index = jk_git.GitIndex.loadFromFile(os.path.join(root, ".git", "index"), bVerifyChecksum=True)
+				log2.notice("version " + str(index.version) + ": " + str(len(index)) + " entries")
+				expected = [ line.split("\t", 1) for line in runGit("-c", "core.quotePath=false", "ls-files", "-s").splitlines() ]
+				actual = [ [ "{:06o} {} {}".format(e.mode, e.objectHash, e.stage), e.filePath ] for e in index ]
+				assert actual == expected
+				# (git writes version 2 if no entry requires the extended flags of version 3)
+				assert index.version == (2 if version == 3 else version)
+				assert not index.hasConflicts
+				assert index.getEntry("link").isSymLink
+				assert index.getEntry("a.txt").size == 2
+				assert list(index.iterModifiedEntries(root)) == []
+			runGit("add", "--intent-to-add", "intent.txt")
+			for version in [ 3, 4 ]:
+				runGit("update-index", "--index-version", str(version))
+				index = jk_git.GitIndex.loadFromFile(os.path.join(root, ".git", "index"), bVerifyChecksum=True)
+				assert index.version == version
+				assert index.getEntry("intent.txt").isIntentToAdd
+				assert not index.getEntry("a.txt").isIntentToAdd
+				assert [ e.filePath for e in index.iterModifiedEntries(root) ] == [ "intent.txt" ]
+			runGit("update-index", "--index-version", "2")
+
+		check()
+		runGit("rm", "-q", "--cached", "intent.txt")
+		os.unlink(os.path.join(root, "intent.txt"))
+		check()
+
+		# without a valid cache tree the index is compared with the tree of HEAD entry by entry; "git read-tree" writes a valid cache tree
+		assert wc.index.cacheTreeRootHash is None
+		runGit("read-tree", "HEAD")
+		index = wc.index
+		assert index.cacheTreeRootHash == runGit("rev-parse", "HEAD^{tree}").strip()
+		check()
+
+		# racily clean: a modification of the same size immediately after the index has been written
+		writeFile(os.path.join(root, "a.txt"), "b\n")
+		runGit("add", "a.txt")
+		writeFile(os.path.join(root, "a.txt"), "c\n")
+		check()
+		runGit("add", "a.txt")
+		check()
+		runGit("commit", "-q", "-m", "c")
+		check()
+
+		# the index file has been rewritten: it is reloaded automatically
+		assert wc.index is not index
+
+		# stat data changes without content changes
+		os.utime(os.path.join(root, "a.txt"), (0, 0))
+		check()
+
+		# deletion, type change, mode change
+		os.unlink(os.path.join(root, "link"))
+		check()
+		writeFile(os.path.join(root, "link"), "a.txt")
+		check()
+		os.unlink(os.path.join(root, "link"))
+		os.symlink("a.txt", os.path.join(root, "link"))
+		check()
+		os.chmod(os.path.join(root, "a.txt"), 0o755)
+		check()
+		os.chmod(os.path.join(root, "a.txt"), 0o644)
+		check()
+
+		# staged change that is reverted in the working tree
+		writeFile(os.path.join(root, "a.txt"), "d\n")
+		runGit("add", "a.txt")
+		writeFile(os.path.join(root, "a.txt"), "c\n")
+		check()
+		runGit("reset", "-q")
+		check()
+
+		with log.descend("Checking without running git ...") as log2:
+			invocations = []
+			git.instrumentation.addCallback(invocations.append)
+			assert not wc.checkIsDirty(bIgnoreUntracked=True)
+			assert invocations == []
+			assert wc.isClean
+			assert [ x.verb for x in invocations ] == [ "ls-files" ]
+			writeFile(os.path.join(root, "untracked.txt"), "u\n")
+			assert wc.isDirty
+			os.unlink(os.path.join(root, "untracked.txt"))
+
+			# too many tracked files: git is used
+			n = jk_git.GitWorkingCopy.QUICK_CHECK_MAX_ENTRIES
+			jk_git.GitWorkingCopy.QUICK_CHECK_MAX_ENTRIES = 1
+			del invocations[:]
+			assert not wc.checkIsDirty(bIgnoreUntracked=True)
+			assert [ x.verb for x in invocations ] == [ "diff", "diff" ]
+			jk_git.GitWorkingCopy.QUICK_CHECK_MAX_ENTRIES = n
+			git.instrumentation.removeCallback(invocations.append)
+
+		with log.descend("Clean filters ...") as log2:
+			runGit("config", "filter.upper.clean", "tr a-z A-Z")
+			runGit("config", "filter.upper.smudge", "cat")
+			writeFile(os.path.join(root, ".gitattributes"), "*.dat filter=upper\n")
+			writeFile(os.path.join(root, "filtered.dat"), "x\n")
+			runGit("add", ".")
+			runGit("commit", "-q", "-m", "filtered")
+			os.utime(os.path.join(root, "filtered.dat"), (0, 0))
+			# the content differs from the blob: a false positive that is corrected by git
+			assert wc.quickCheckIsDirty()
+			assert not git.isDirty(root, bIgnoreUntracked=True)
+			assert not wc.checkIsDirty(bIgnoreUntracked=True)
+
+		# merge conflict
+		with log.descend("Creating a merge conflict ...") as log2:
+			runGit("checkout", "-q", "-b", "other")
+			writeFile(os.path.join(root, "a.txt"), "other\n")
+			runGit("commit", "-q", "-a", "-m", "other")
+			runGit("checkout", "-q", "-")
+			writeFile(os.path.join(root, "a.txt"), "this\n")
+			runGit("commit", "-q", "-a", "-m", "this")
+			subprocess.run([ git.gitBinPath, "-C", root, "merge", "other" ], capture_output=True)
+		index = wc.index
+		assert index.hasConflicts
+		assert [ e.stage for e in index if e.filePath == "a.txt" ] == [ 1, 2, 3 ]
+		assert index.getEntry("a.txt") is None
+		assert wc.quickCheckIsDirty()
+
+		log.success("Success.")
+
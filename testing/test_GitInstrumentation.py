@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+
+
+
+import os
+import asyncio
+import tempfile
+
+import jk_logging
+
+import jk_git
+from jk_git.impl._GitOutputParser import _GitOutputParser
+
+from TestHelper import TestHelper
+
+
+
+
+
+def writeFile(filePath:str, text:str):
+	os.makedirs(os.path.dirname(filePath), exist_ok=True)
+	with open(filePath, "w") as f:
+		f.write(text)
+#
+
+
+
+with jk_logging.wrapMain() as log:
+
+	assert _GitOutputParser.getVerb([ "status", "-z" ]) == "status"
+	assert _GitOutputParser.getVerb([ "-C", ".", "-c", "a=b", "--no-pager", "log" ]) == "log"
+	assert _GitOutputParser.getVerb([ "--version" ]) is None
+
+	with TestHelper(log) as th:
+		git = th.git
+		instr = git.instrumentation
+		assert instr is jk_git.AsyncGitWrapper().instrumentation
+		assert not instr.isActive
+
+		invocations = []
+		instr.addCallback(invocations.append)
+		instr.enableMetrics()
+		assert instr.isActive
+
+		th.createRepository(log)
+		root = os.path.abspath(th.tempDirPath)
+		writeFile(os.path.join(root, "a.txt"), "a\n")
+		wc = jk_git.GitWorkingCopy(root, gitWrapper=git)
+		assert len(wc.status()) == 1
+		r = git.runGit(cmdArgs=[ "-C", ".", "rev-parse", "--verify", "does-not-exist" ], workingDirectory=root, bRaiseExceptionOnError=False)
+		assert r.returnCode != 0
+
+		verbs = [ x.verb for x in invocations ]
+		assert verbs == [ "init", "status", "rev-parse" ], verbs
+		for x in invocations:
+			assert x.repository == root
+			assert x.wallTime > 0
+			assert x.queueDelay == 0
+		assert invocations[1].exitCode == 0
+		assert invocations[1].stdOutBytes > len("a.txt")
+		assert invocations[2].isError
+		assert invocations[2].stdErrBytes > 0
+
+		# ----
+
+		d = instr.toDict()
+		byVerb = { x["verb"]: x for x in d["invocations"] }
+		assert byVerb["status"]["count"] == 1
+		assert byVerb["rev-parse"]["errorCount"] == 1
+		assert byVerb["status"]["stdOutBytes"] == invocations[1].stdOutBytes
+		assert d["durations"]["status"]["count"] == 1
+		assert d["durations"]["status"]["buckets"]["+Inf"] == 1
+
+		text = instr.toPrometheusText()
+		assert "# TYPE jk_git_invocations_total counter\n" in text
+		assert "jk_git_invocations_total{verb=\"status\",repository=\"" + root + "\"} 1\n" in text
+		assert "jk_git_invocation_errors_total{verb=\"rev-parse\",repository=\"" + root + "\"} 1\n" in text
+		assert "# TYPE jk_git_invocation_duration_seconds histogram\n" in text
+		assert "jk_git_invocation_duration_seconds_bucket{verb=\"status\",le=\"+Inf\"} 1\n" in text
+		assert "jk_git_invocation_duration_seconds_count{verb=\"status\"} 1\n" in text
+
+		# ----
+
+		# queueing delay: with a single worker the working copies have to wait for each other
+		with tempfile.TemporaryDirectory() as tempDirPath:
+			rootDirs = []
+			for i in range(4):
+				rootDir = os.path.join(tempDirPath, str(i))
+				os.makedirs(rootDir)
+				git.init(rootDir)
+				rootDirs.append(rootDir)
+
+			del invocations[:]
+			results = jk_git.GitWorkingCopyFleet(rootDirs, git).getStatus(jobs=1)
+			assert not any(r.isError for r in results.values())
+			statusInvocations = [ x for x in invocations if x.verb == "status" ]
+			assert len(statusInvocations) == 4
+			assert max(x.queueDelay for x in statusInvocations) > 0
+
+			# asyncio: waiting for the semaphore limiting the number of processes
+			del invocations[:]
+			awrapper = jk_git.AsyncGitWrapper(log, maxConcurrentProcesses=1)
+			async def runAll():
+				return await asyncio.gather(*[ jk_git.AsyncGitWorkingCopy(d, awrapper).isDirty() for d in rootDirs ])
+			assert asyncio.run(runAll()) == [ False ] * 4
+			assert len(invocations) >= 4
+			assert max(x.queueDelay for x in invocations) > 0
+
+		# ----
+
+		def failingCallback(x):
+			raise Exception("failure")
+		instr.addCallback(failingCallback)
+		wc.status()
+		assert instr.callbackErrorCount == 1
+
+		instr.removeCallback(failingCallback)
+		instr.removeCallback(invocations.append)
+		instr.disableMetrics()
+		instr.resetMetrics()
+		assert not instr.isActive
+		assert instr.toDict() == { "invocations": [], "durations": {} }
+
+		log.notice("Success.")
@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+
+
+
+import os
+
+import jk_logging
+
+import jk_git
+from jk_git.impl import GitCatFileBatch
+
+from TestHelper import TestHelper
+
+
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+
+		th.createRepository(log)
+
+		# create a file that changes slightly with every commit so that "git gc" stores deltas
+		lines = [ "line " + str(i) + " " + "x" * 40 for i in range(2000) ]
+		for n in range(8):
+			lines[n * 100] = "changed in commit " + str(n)
+			with open(os.path.join(th.tempDirPath, "big.txt"), "w") as f:
+				f.write("\n".join(lines))
+			th.git.add(th.tempDirPath, os.path.join(th.tempDirPath, "big.txt"), log=log)
+			th.git.commit(th.tempDirPath, "commit " + str(n) + "\n\nbody text", log=log)
+		os.makedirs(os.path.join(th.tempDirPath, "sub", "dir"))
+		with open(os.path.join(th.tempDirPath, "sub", "dir", "nested.txt"), "w") as f:
+			f.write("nested")
+		th.git.add(th.tempDirPath, os.path.join(th.tempDirPath, "sub", "dir", "nested.txt"), log=log)
+		th.git.commit(th.tempDirPath, "nested file", log=log)
+		th.git.createTag(th.tempDirPath, "v1", "annotated tag", log=log)
+
+		def listAllObjects(gitDir:str) -> list:
+			r = th.git.runGit(cmdArgs=[ "cat-file", "--batch-all-objects", "--batch-check=%(objectname)" ], workingDirectory=gitDir, log=log)
+			return [ x for x in r.stdOutLines if x ]
+
+		def compareAllObjects(gitDir:str, store:jk_git.GitObjectStore):
+			objectNames = listAllObjects(gitDir)
+			assert objectNames
+			for expected in GitCatFileBatch.iterObjects(th.git.gitBinPath, gitDir, objectNames, log):
+				assert store.readObject(expected[0]) == (expected[1], expected[2]), expected[0]
+			return len(objectNames)
+
+		def compareLog(gitDir:str, store:jk_git.GitObjectStore):
+			expected = list(th.git.iterLogParsable(gitDir, log=log))
+			assert list(store.iterLogRecords("HEAD")) == [ tuple(x) for x in expected ]
+
+		with log.descend("Reading loose objects ...") as log2:
+			store = jk_git.GitObjectStore(os.path.join(th.tempDirPath, ".git"))
+			n = compareAllObjects(th.tempDirPath, store)
+			log2.info(str(n) + " objects")
+			compareLog(th.tempDirPath, store)
+			assert store.readObject("0" * 40) is None
+			assert store.hasObject(listAllObjects(th.tempDirPath)[0])
+			assert not store.hasObject("0" * 40)
+
+		with log.descend("Reading packed objects ...") as log2:
+			bareDirPath = os.path.join(th.tempDirPath, "bare.git")
+			th.git.runGit(cmdArgs=[ "clone", "--bare", "-q", th.tempDirPath, bareDirPath ], workingDirectory=th.tempDirPath, log=log2)
+			th.git.runGit(cmdArgs=[ "gc", "-q", "--aggressive" ], workingDirectory=bareDirPath, log=log2)
+			r = th.git.runGit(cmdArgs=[ "count-objects", "-v" ], workingDirectory=bareDirPath, log=log2)
+			assert "count: 0" in r.stdOutLines
+
+			store = jk_git.GitObjectStore(bareDirPath)
+			n = compareAllObjects(bareDirPath, store)
+			log2.info(str(n) + " objects")
+			compareLog(bareDirPath, store)
+
+		with log.descend("Resolving revisions and paths ...") as log2:
+			def revParse(rev:str) -> str:
+				return th.git.runGit(cmdArgs=[ "rev-parse", rev ], workingDirectory=bareDirPath, log=log2).stdOutLines[0]
+
+			for rev in [ "HEAD", "master", "v1", "v1^{commit}", "HEAD~3", "HEAD^", "HEAD^0", "refs/heads/master", "HEAD^{tree}" ]:
+				assert store.resolveRevision(rev) == revParse(rev), rev
+			assert store.resolveRevision("does-not-exist") is None
+			assert store.resolveRevision("HEAD~100") is None
+
+			assert store.readBlob("HEAD", "sub/dir/nested.txt") == b"nested"
+			assert store.readBlob("HEAD~1", "sub/dir/nested.txt") is None
+			assert store.readBlob("HEAD", "does/not/exist.txt") is None
+			assert store.resolvePath("HEAD", "sub/dir/nested.txt/x") is None
+			assert store.resolvePath("HEAD", "sub/dir") == revParse("HEAD:sub/dir")
+
+			# every tree is read once; existence checks don't read objects
+			countReads = [ 0 ]
+			readObject = store.readObject
+			def countingReadObject(hexSha:str):
+				countReads[0] += 1
+				return readObject(hexSha)
+			store.readObject = countingReadObject
+			assert store.resolvePath("HEAD", "sub/dir/nested.txt") == revParse("HEAD:sub/dir/nested.txt")
+			assert countReads[0] == 4, countReads			# commit + 3 trees
+			countReads[0] = 0
+			assert store.hasObject(revParse("HEAD"))
+			assert store.hasObject(revParse("HEAD:sub/dir/nested.txt"))
+			assert not store.hasObject("0" * 40)
+			assert not store.hasObject("xyz")
+			assert store.resolveRevision(revParse("HEAD~1")) == revParse("HEAD~1")
+			assert countReads[0] == 0, countReads
+			del store.readObject
+
+			commit = store.readCommit(revParse("HEAD~1"))
+			assert commit["message"] == "commit 7\n\nbody text\n"
+			assert len(commit["parents"]) == 1
+
+		with log.descend("Using the native backend of GitServerRepository ...") as log2:
+			repo = jk_git.GitServerRepository(bareDirPath, log2, bUseNativeObjectStore=True)
+			assert repo.downloadFromHead("sub/dir/nested.txt", log2) == "nested"
+			assert repo.downloadFromRevision("HEAD~1", "big.txt", log2) == "\n".join(lines)
+			assert repo.downloadFromRevision("HEAD", "missing.txt", log2) is None
+
+			history = repo.getCommitHistory(log=log2)
+			assert len(history) == 9
+			assert history.latestEntry.text == "nested file"
+			assert history.oldestEntry.text == "commit 0"
+
+#
+
+
+
+
+
@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+
+
+
+import os
+import time
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+NUMBER_OF_LINES = 200000
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+		th.createRepository(log)
+		root = th.tempDirPath
+		git = th.git
+
+		lines = [ "line {} {}".format(i, "x" * (i % 50)) for i in range(NUMBER_OF_LINES) ]
+		content = ("\n".join(lines) + "\n").encode("utf-8")
+		with open(os.path.join(root, "big.txt"), "wb") as f:
+			f.write(content)
+		git.add(root, os.path.join(root, "big.txt"), log=log)
+		git.commit(root, "big file", log=log)
+
+		cmdArgs = [ "cat-file", "blob", "HEAD:big.txt" ]
+
+		# chunks
+		with git.streamGit(cmdArgs=cmdArgs, workingDirectory=root) as s:
+			chunks = list(s.iterChunks())
+			assert b"".join(chunks) == content
+			assert max(len(c) for c in chunks) <= jk_git.impl.GitOutputStream.DEFAULT_BUFFER_SIZE
+			assert s.returnCode == 0
+			assert s.stdOutSize == len(content)
+			assert s.stdErrSize == 0
+
+			# the output can be consumed only once
+			try:
+				list(s.iterChunks())
+				assert False
+			except Exception as ee:
+				assert "consumed" in str(ee)
+
+		# lines and records
+		with git.streamGit(cmdArgs=cmdArgs, workingDirectory=root) as s:
+			assert list(s.iterLines()) == lines
+		with git.streamGit(cmdArgs=[ "ls-files", "-z" ], workingDirectory=root) as s:
+			assert list(s.iterRecords(b"\0")) == [ b"big.txt" ]
+		# a single record spanning many chunks; separators spanning chunk boundaries
+		with git.streamGit(cmdArgs=cmdArgs, workingDirectory=root) as s:
+			assert list(s.iterRecords(b"\0")) == [ content ]
+		with git.streamGit(cmdArgs=cmdArgs, workingDirectory=root) as s:
+			assert list(s.iterRecords(b"\nline ")) == content.split(b"\nline ")
+
+		# backpressure: git is blocked as long as the output is not consumed
+		with git.streamGit(cmdArgs=cmdArgs, workingDirectory=root) as s:
+			it = s.iterChunks()
+			next(it)
+			time.sleep(0.3)
+			assert s.returnCode is None
+			assert s.stdOutSize < len(content)
+
+			# stopping early kills git without raising an exception
+			it.close()
+			assert s.returnCode is not None
+
+		s = git.streamGit(cmdArgs=cmdArgs, workingDirectory=root)
+		s.close()
+		assert s.returnCode is not None
+
+		# errors are raised after the output has been consumed; STDERR is bounded
+		with git.streamGit(cmdArgs=[ "cat-file", "blob", "HEAD:does-not-exist.txt" ], workingDirectory=root, maxStdErrSize=10) as s:
+			try:
+				list(s.iterChunks())
+				assert False
+			except jk_git.GitExecutionException as ee:
+				assert ee.returnCode == s.returnCode != 0
+				assert ee.stdErrLines
+			assert len(s.stdErrData) == 10
+			assert s.stdErrSize > 10
+			assert s.isStdErrTruncated
+		with git.streamGit(cmdArgs=[ "cat-file", "blob", "HEAD:does-not-exist.txt" ], workingDirectory=root, bRaiseExceptionOnError=False) as s:
+			assert list(s.iterChunks()) == []
+			assert s.returnCode != 0
+			assert s.stdErrLines[0].startswith("fatal:")
+			assert not s.isStdErrTruncated
+
+		log.notice("Success.")
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+
+
+
+import os
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+
+		th.createRepository(log)
+		th.createSingleFileAndCommitIt("foo1.txt", "commit 1", log)
+		th.git.createBranch(th.tempDirPath, "feature/x", log=log)
+		th.createSingleFileAndCommitIt("foo2.txt", "commit 2", log)
+		th.git.switchToBranch(th.tempDirPath, "master", log=log)
+		th.git.createTag(th.tempDirPath, "v1", "annotated tag", log=log)
+		th.git.runGit(cmdArgs=[ "tag", "v1-light" ], workingDirectory=th.tempDirPath, log=log)
+
+		def revParse(rev:str) -> str:
+			return th.git.runGit(cmdArgs=[ "rev-parse", rev ], workingDirectory=th.tempDirPath, log=log).stdOutLines[0]
+
+		masterHash = revParse("master")
+		featureHash = revParse("feature/x")
+		tagHash = revParse("v1")
+
+		bareDirPath = os.path.join(th.tempDirPath, "bare.git")
+		th.git.runGit(cmdArgs=[ "clone", "--bare", "-q", th.tempDirPath, bareDirPath ], workingDirectory=th.tempDirPath, log=log)
+
+		with log.descend("Reading loose references ...") as log2:
+			wc = jk_git.GitWorkingCopy(th.tempDirPath, log=log2)
+			refDB = wc.refDatabase
+			assert refDB.getHeads() == { "master": masterHash, "feature/x": featureHash }
+			assert refDB.getTags() == { "v1": tagHash, "v1-light": masterHash }
+			assert refDB.resolve("HEAD") == masterHash
+			assert refDB.readSymbolicRef("HEAD") == "refs/heads/master"
+			assert refDB.resolve("refs/heads/does-not-exist") is None
+
+		with log.descend("Reading packed references ...") as log2:
+			repo = jk_git.GitServerRepository(bareDirPath, log2)
+			assert repo.heads == [ "feature/x", "master" ]
+			assert repo.tags == [ "v1", "v1-light" ]
+			assert repo.headName == "master"
+			assert not repo.isEmpty
+			refDB = repo.refDatabase
+			assert refDB.getPeeledRefs()["refs/tags/v1"] == masterHash
+			assert refDB.resolve("HEAD") == masterHash
+
+			# loose references must take precedence and changes must be detected
+			th.git.runGit(cmdArgs=[ "update-ref", "refs/heads/master", featureHash ], workingDirectory=bareDirPath, log=log2)
+			th.git.runGit(cmdArgs=[ "update-ref", "refs/heads/deep/nested/branch", featureHash ], workingDirectory=bareDirPath, log=log2)
+			assert refDB.resolve("HEAD") == featureHash
+			assert repo.heads == [ "deep/nested/branch", "feature/x", "master" ]
+
+			th.git.runGit(cmdArgs=[ "update-ref", "-d", "refs/heads/deep/nested/branch" ], workingDirectory=bareDirPath, log=log2)
+			assert repo.heads == [ "feature/x", "master" ]
+
+			# detached HEAD
+			th.git.runGit(cmdArgs=[ "update-ref", "--no-deref", "HEAD", masterHash ], workingDirectory=bareDirPath, log=log2)
+			assert refDB.resolve("HEAD") == masterHash
+			assert refDB.readSymbolicRef("HEAD") is None
+
+#
+
+
+
+
+
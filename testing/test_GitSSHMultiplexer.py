@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+
+
+
+import os
+import shlex
+import shutil
+import socket
+import asyncio
+import tempfile
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+#
+# A stub for ssh: it records its arguments and runs the remote command (e.g. "git-upload-pack '/some/repo.git'") locally.
+#
+STUB_SSH = """#!/bin/sh
+echo "$@" >> {logFilePath}
+for arg in "$@"; do
+	if [ "$arg" = "-O" ]; then
+		exit 0
+	fi
+	last="$arg"
+done
+exec sh -c "$last"
+"""
+
+def readLog(logFilePath:str) -> list:
+	if not os.path.isfile(logFilePath):
+		return []
+	with open(logFilePath, "r") as f:
+		lines = f.read().splitlines()
+	os.unlink(logFilePath)
+	return lines
+#
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+
+		th.createRepository(log)
+		th.createSingleFileAndCommitIt("foo1.txt", "commit 1", log)
+		headHash = th.git.getHeadCommitHash(th.tempDirPath)
+
+		stubDirPath = tempfile.mkdtemp()
+		logFilePath = os.path.join(stubDirPath, "ssh.log")
+		stubFilePath = os.path.join(stubDirPath, "ssh-stub")
+		with open(stubFilePath, "w") as f:
+			f.write(STUB_SSH.format(logFilePath=shlex.quote(logFilePath)))
+		os.chmod(stubFilePath, 0o755)
+		os.environ["GIT_SSH_COMMAND"] = shlex.quote(stubFilePath)
+		os.environ["GIT_SSH_VARIANT"] = "ssh"
+
+		bareDirPath = os.path.join(stubDirPath, "bare.git")
+		th.git.runGit(cmdArgs=[ "clone", "--bare", "-q", th.tempDirPath, bareDirPath ], workingDirectory=th.tempDirPath, log=log)
+		url = "ssh://git.example.org" + bareDirPath
+
+		with log.descend("Running git without multiplexing ...") as log2:
+			assert th.git.lsRemote_url(url)[0] == [ headHash, "HEAD" ]
+			lines = readLog(logFilePath)
+			assert len(lines) == 1, lines
+			assert "ControlMaster" not in lines[0]
+
+		mux = jk_git.GitSSHMultiplexer()
+		git = jk_git.GitWrapper(sshMultiplexer=mux)
+		options = "-o ControlMaster=auto -o ControlPersist=60 -o ControlPath=" + os.path.join(mux.controlDirPath, "%C")
+
+		with log.descend("Running git with multiplexing ...") as log2:
+			assert git.sshMultiplexer is mux
+			assert git.instrumentation is th.git.instrumentation
+			assert mux.getSSHCommand() == shlex.quote(stubFilePath) + " " + options
+			assert mux.getEnvironment({ "GIT_SSH_COMMAND": mux.getSSHCommand() })["GIT_SSH_COMMAND"] == mux.getSSHCommand()
+			assert mux.getSSHCommand({ "GIT_SSH": "/opt/my ssh" }) == "'/opt/my ssh' " + options
+			assert jk_git.GitSSHMultiplexer(sshCommand="ssh -v").getSSHCommand().startswith("ssh -v -o ControlMaster=auto ")
+
+			assert git.lsRemote_url(url)[0] == [ headHash, "HEAD" ]
+			result = git.lsRemoteMany([ url, url + "/", url + "/." ], timeout=10)
+			for refs in result.values():
+				assert refs[0] == [ headHash, "HEAD" ], refs
+			cloneDirPath = os.path.join(stubDirPath, "clone")
+			jk_git.GitRemoteRepository(url, git).checkout(cloneDirPath)
+			jk_git.GitWorkingCopy(cloneDirPath, gitWrapper=git).pull()
+
+			lines = readLog(logFilePath)
+			assert len(lines) == 6, lines
+			for line in lines:
+				assert options in line, line
+
+			# the shared git helper is not affected
+			th.git.lsRemote_url(url)
+			assert "ControlMaster" not in readLog(logFilePath)[0]
+
+		with log.descend("Running git with multiplexing (asyncio) ...") as log2:
+			asyncGit = jk_git.AsyncGitWrapper(sshMultiplexer=mux)
+			assert asyncio.run(asyncGit.lsRemote_url(url))[0] == [ headHash, "HEAD" ]
+			assert options in readLog(logFilePath)[0]
+
+		with log.descend("Closing ...") as log2:
+			# simulate a master connection and a master that died
+			liveSocket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			liveSocket.bind(os.path.join(mux.controlDirPath, "a" * 40))
+			liveSocket.listen(1)
+			deadSocket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			deadSocket.bind(os.path.join(mux.controlDirPath, "b" * 40))
+			deadSocket.close()
+			assert len(mux.controlSocketPaths) == 2
+
+			assert mux.removeStaleSockets() == 1
+			assert mux.controlSocketPaths == [ os.path.join(mux.controlDirPath, "a" * 40) ]
+
+			controlDirPath = mux.controlDirPath
+			mux.close()
+			liveSocket.close()
+			assert mux.isClosed
+			lines = readLog(logFilePath)
+			assert len(lines) == 1, lines
+			assert "-O exit" in lines[0]
+			assert "ControlPath=" + os.path.join(controlDirPath, "a" * 40) in lines[0]
+			assert not os.path.exists(controlDirPath)
+			try:
+				git.lsRemote_url(url)
+				assert False
+			except Exception as ee:
+				assert "closed" in str(ee)
+			mux.close()
+
+		with log.descend("Using a control directory of our own ...") as log2:
+			controlDirPath = os.path.join(stubDirPath, "control")
+			os.makedirs(controlDirPath)
+			deadSocket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			deadSocket.bind(os.path.join(controlDirPath, "c" * 40))
+			deadSocket.close()
+
+			with jk_git.GitSSHMultiplexer(controlDirPath, controlPersist=5, bCloseAtExit=False) as mux:
+				git = jk_git.GitWrapper(sshMultiplexer=mux)
+				assert git.lsRemote_url(url)[0] == [ headHash, "HEAD" ]
+				assert "ControlPersist=5 " in readLog(logFilePath)[0]
+				# stale sockets have been removed on first use
+				assert mux.controlSocketPaths == []
+			# the directory has not been created by the multiplexer: it is kept
+			assert os.path.isdir(controlDirPath)
+
+			try:
+				jk_git.GitSSHMultiplexer("/tmp/" + "x" * 80)
+				assert False
+			except Exception as ee:
+				assert "too long" in str(ee)
+
+		shutil.rmtree(stubDirPath)
+
+		log.notice("Success.")
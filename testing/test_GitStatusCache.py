@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+
+
+
+import os
+import time
+import subprocess
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+def writeFile(filePath:str, text:str):
+	os.makedirs(os.path.dirname(filePath), exist_ok=True)
+	with open(filePath, "w") as f:
+		f.write(text)
+	# (files modified within the same second as the index are "racily clean": git status would then rewrite the index on every call)
+	t = time.time() - 10
+	os.utime(filePath, (t, t))
+#
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+		th.createRepository(log)
+		root = th.tempDirPath
+		git = th.git
+
+		os.makedirs(os.path.join(root, "sub"))
+		writeFile(os.path.join(root, "a.txt"), "a\n")
+		git.add(root, os.path.join(root, "a.txt"), log=log)
+		git.commit(root, "initial commit", log=log)
+
+		wc = jk_git.GitWorkingCopy(root, gitWrapper=git)
+		assert wc.statusCache is None
+		cache = wc.enableStatusCache(bIncludeTopLevelDirs=True)
+		assert wc.statusCache is cache
+
+		def expect(nHits:int, nMisses:int, filePaths:list):
+			assert sorted([ x.filePath() for x in wc.status() ]) == sorted(filePaths)
+			assert (cache.hitCount, cache.missCount) == (nHits, nMisses), (cache.hitCount, cache.missCount)
+		#
+
+		# first call: miss, then hit
+		expect(0, 1, [])
+		expect(1, 1, [])
+
+		# new file in the root directory: detected by the top level directory fingerprint
+		time.sleep(0.01)
+		writeFile(os.path.join(root, "b.txt"), "b\n")
+		expect(1, 2, [ "b.txt" ])
+		expect(2, 2, [ "b.txt" ])
+
+		# new file in a top level directory
+		time.sleep(0.01)
+		writeFile(os.path.join(root, "sub", "c.txt"), "c\n")
+		expect(2, 3, [ "b.txt", "sub/c.txt" ])
+
+		# modification of the index
+		git.add(root, os.path.join(root, "b.txt"), log=log)
+		expect(2, 4, [ "b.txt", "sub/c.txt" ])
+		expect(3, 4, [ "b.txt", "sub/c.txt" ])
+
+		# commit: HEAD moves
+		git.commit(root, "second commit", log=log)
+		expect(3, 5, [ "sub/c.txt" ])
+
+		# branch switch: HEAD changes
+		subprocess.run([ "git", "-C", root, "checkout", "-q", "-b", "other" ], check=True)
+		expect(3, 6, [ "sub/c.txt" ])
+
+		# content modifications of tracked files are not part of the fingerprint: invalidate explicitely
+		writeFile(os.path.join(root, "a.txt"), "modified\n")
+		expect(4, 6, [ "sub/c.txt" ])
+		cache.invalidate()
+		expect(4, 7, [ "a.txt", "sub/c.txt" ])
+
+		# the index changes while git status is running: the result must not be cached under the new fingerprint
+		wcUncached = jk_git.GitWorkingCopy(root, gitWrapper=git)
+		writeFile(os.path.join(root, "d.txt"), "d\n")
+		def retrieveStatusAndStage():
+			ret = wcUncached.status()
+			git.add(root, os.path.join(root, "d.txt"), log=log)
+			return ret
+		#
+		assert "d.txt" in [ x.filePath() for x in cache.getStatus(False, retrieveStatusAndStage) ]
+		assert cache.missCount == 8
+		expect(4, 9, [ "a.txt", "d.txt", "sub/c.txt" ])
+		assert [ x.indexStatus() for x in wc.status() if x.filePath() == "d.txt" ] == [ "A" ]
+		assert (cache.hitCount, cache.missCount) == (5, 9)
+
+		# ignored files are cached separately
+		assert len(wc.status(bIncludeIgnored=True)) == 3
+		assert cache.missCount == 10
+
+		cache.resetCounters()
+		assert (cache.hitCount, cache.missCount, cache.hitRatio) == (0, 0, 0.0)
+
+		# maximum age
+		cache = wc.enableStatusCache(maxAge=0.05)
+		expect(0, 1, [ "a.txt", "d.txt", "sub/c.txt" ])
+		expect(1, 1, [ "a.txt", "d.txt", "sub/c.txt" ])
+		time.sleep(0.1)
+		expect(1, 2, [ "a.txt", "d.txt", "sub/c.txt" ])
+		assert abs(cache.hitRatio - 1/3) < 1e-9
+
+		wc.disableStatusCache()
+		assert wc.statusCache is None
+		assert len(wc.status()) == 3
+
+		log.notice("Success.")
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+
+
+
+import os
+import tempfile
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+
+		COUNT = 24
+
+		with log.descend("Creating working copies ...") as log2:
+			rootDirs = []
+			for i in range(COUNT):
+				rootDir = os.path.join(th.tempDirPath, "wc" + str(i))
+				os.makedirs(rootDir)
+				th.git.init(rootDir)
+				with open(os.path.join(rootDir, "file.txt"), "w") as f:
+					f.write("content")
+				if i % 2 == 0:
+					th.git.add(rootDir, os.path.join(rootDir, "file.txt"))
+					th.git.commit(rootDir, "initial commit")
+				rootDirs.append(rootDir)
+
+		# a directory that is not a working copy (outside of the temporary repository directories)
+		with tempfile.TemporaryDirectory() as notAWorkingCopyDir:
+			rootDirs.append(notAWorkingCopyDir)
+
+			with log.descend("Scanning ...") as log2:
+				fleet = jk_git.GitWorkingCopyFleet(rootDirs, th.git)
+				results = list(fleet.scanStatus(jobs=6, log=log2))
+
+		assert len(results) == COUNT + 1
+		resultsByDir = { r.rootDir: r for r in results }
+		assert resultsByDir[notAWorkingCopyDir].isError
+		assert resultsByDir[notAWorkingCopyDir].fileInfos is None
+		for i in range(COUNT):
+			r = resultsByDir[rootDirs[i]]
+			assert not r.isError, r.error
+			assert r.duration > 0
+			assert r.queueDelay >= 0
+			if i % 2 == 0:
+				assert r.isClean
+			else:
+				assert r.isDirty
+				assert [ (x.status(), x.filePath()) for x in r.fileInfos ] == [ (jk_git.GitFileInfo.UNVERSIONED, "file.txt") ]
+
+		# the results must be the same as the results of sequential calls
+		for i in range(COUNT):
+			wc = jk_git.GitWorkingCopy(rootDirs[i], th.git)
+			assert len(wc.status()) == len(resultsByDir[rootDirs[i]].fileInfos)
+
+		# stopping early must not block
+		for r in jk_git.GitWorkingCopyFleet.scanStatusOf(rootDirs[:COUNT], jobs=2, gitWrapper=th.git):
+			break
+
+#
+
+
+
+
+
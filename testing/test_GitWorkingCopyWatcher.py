@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+
+
+
+import os
+import shutil
+import subprocess
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+def writeFile(filePath:str, text:str):
+	os.makedirs(os.path.dirname(filePath), exist_ok=True)
+	with open(filePath, "w") as f:
+		f.write(text)
+#
+
+def summarize(fileInfos:list) -> list:
+	return sorted([ (x.status(), x.filePath(), x.origFilePath()) for x in fileInfos ])
+#
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+		th.createRepository(log)
+		root = th.tempDirPath
+		git = th.git
+
+		def runGit(*args):
+			subprocess.run([ git.gitBinPath, "-C", root ] + list(args), check=True, capture_output=True)
+		#
+
+		for i in range(10):
+			writeFile(os.path.join(root, "dir" + str(i % 2), "file" + str(i) + ".txt"), str(i) + "\n")
+		runGit("add", ".")
+		runGit("commit", "-m", "initial commit")
+
+		wc = jk_git.GitWorkingCopy(root, gitWrapper=git)
+		wcReference = jk_git.GitWorkingCopy(root, gitWrapper=git)
+
+		callbackValues = []
+		watcher = wc.startWatching(callbackValues.append, bBackgroundThread=False, log=log)
+		assert wc.watcher is watcher
+		assert watcher.watchCount == 3
+		assert watcher.areWatchesComplete
+
+		def check(bExpectFullScan:bool):
+			nFull = watcher.fullScanCount
+			nIncremental = watcher.incrementalScanCount
+			actual = summarize(wc.status())
+			expected = summarize(wcReference.status())
+			log.notice(repr(actual))
+			assert actual == expected, (actual, expected)
+			if bExpectFullScan:
+				assert watcher.fullScanCount == nFull + 1
+			else:
+				assert watcher.fullScanCount == nFull
+				assert watcher.incrementalScanCount == nIncremental + 1
+		#
+
+		check(True)
+		assert summarize(wc.status()) == []
+
+		# modifications, new files, new directories
+		writeFile(os.path.join(root, "dir0", "file0.txt"), "modified\n")
+		assert watcher.processEvents() == { "dir0/file0.txt" }
+		assert callbackValues[-1] == { "dir0/file0.txt" }
+		check(False)
+		writeFile(os.path.join(root, "new dir", "sub", "new file.txt"), "new\n")
+		check(False)
+		assert watcher.watchCount == 5
+		os.unlink(os.path.join(root, "dir1", "file1.txt"))
+		check(False)
+
+		# reverting a modification
+		writeFile(os.path.join(root, "dir0", "file0.txt"), "0\n")
+		check(False)
+
+		# moving and deleting directories
+		os.rename(os.path.join(root, "new dir"), os.path.join(root, "dir0", "moved"))
+		check(False)
+		writeFile(os.path.join(root, "dir0", "moved", "sub", "another file.txt"), "another\n")
+		check(False)
+		shutil.rmtree(os.path.join(root, "dir0", "moved"))
+		check(False)
+		assert watcher.watchCount == 3
+
+		# changes of the index or HEAD require a full scan
+		runGit("mv", "dir0/file2.txt", "dir0/renamed.txt")
+		check(True)
+		writeFile(os.path.join(root, "dir0", "renamed.txt"), "renamed and modified\n")
+		check(False)
+		runGit("commit", "-a", "-m", "second commit")
+		check(True)
+		runGit("reset", "--soft", "HEAD~1")
+		check(True)
+
+		# event queue overflow (identical consecutive events are merged by the kernel, so two files are touched alternately)
+		with open("/proc/sys/fs/inotify/max_queued_events") as f:
+			maxQueuedEvents = int(f.read())
+		fileA = os.path.join(root, "dir0", "file0.txt")
+		fileB = os.path.join(root, "dir0", "file4.txt")
+		for i in range(maxQueuedEvents // 2 + 10):
+			os.utime(fileA, None)
+			os.utime(fileB, None)
+		writeFile(os.path.join(root, "dir1", "file3.txt"), "modified\n")
+		assert watcher.processEvents() is None
+		assert callbackValues[-1] is None
+		assert watcher.overflowCount == 1
+		check(True)
+
+		# changes of ignore rules require a full scan
+		writeFile(os.path.join(root, "bar.log"), "log\n")
+		writeFile(os.path.join(root, "sub", "foo.log"), "log\n")
+		check(False)
+		writeFile(os.path.join(root, ".gitignore"), "*.log\n")
+		check(True)
+		assert [ x.filePath() for x in wc.status() if x.filePath().endswith(".log") ] == []
+		writeFile(os.path.join(root, ".gitignore"), "foo.log\n")
+		check(True)
+		assert [ x.filePath() for x in wc.status() if x.filePath().endswith(".log") ] == [ "bar.log" ]
+		os.unlink(os.path.join(root, ".gitignore"))
+		check(True)
+		# (.git is not watched)
+		with open(os.path.join(root, ".git", "info", "exclude"), "a") as f:
+			f.write("*.log\n")
+		check(True)
+		assert [ x.filePath() for x in wc.status() if x.filePath().endswith(".log") ] == []
+
+		# background thread
+		wc.stopWatching()
+		assert wc.watcher is None
+		watcher = wc.startWatching(log=log)
+		assert watcher.isRunning
+		check(True)
+		writeFile(os.path.join(root, "dir1", "file5.txt"), "modified\n")
+		check(False)
+		wc.stopWatching()
+		assert not watcher.isRunning
+
+		log.success("Success.")
+
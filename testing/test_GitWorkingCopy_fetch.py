@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+
+
+
+import os
+import shutil
+import tempfile
+
+import jk_logging
+
+import jk_git
+from jk_git.impl._GitOutputParser import _GitOutputParser
+
+from TestHelper import TestHelper
+
+
+
+
+
+def git(th:TestHelper, dirPath:str, *args) -> list:
+	r = th.git.runGit(cmdArgs=[ "-C", dirPath ] + list(args), workingDirectory=dirPath)
+	assert r.returnCode == 0, r.stdErrLines
+	return r.stdOutLines
+#
+
+def commit(th:TestHelper, dirPath:str, fileName:str) -> str:
+	with open(os.path.join(dirPath, fileName), "w") as f:
+		f.write(fileName)
+	git(th, dirPath, "add", fileName)
+	git(th, dirPath, "commit", "-q", "-m", fileName)
+	return git(th, dirPath, "rev-parse", "HEAD")[0]
+#
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+
+		with log.descend("Parsing porcelain output ...") as log2:
+			h1 = "1" * 40
+			h2 = "2" * 40
+			h0 = "0" * 40
+			updates = _GitOutputParser.parseFetchPorcelainOutput([
+				"  " + h1 + " " + h2 + " refs/remotes/origin/master",
+				"+ " + h1 + " " + h2 + " refs/remotes/mirror/a/dev",
+				"* " + h0 + " " + h2 + " refs/remotes/mirror/a/new",
+				"- " + h1 + " " + h0 + " refs/remotes/mirror/gone",
+				"t " + h1 + " " + h2 + " refs/tags/v1",
+				"! " + h1 + " " + h2 + " refs/tags/v2",
+				"= " + h2 + " " + h2 + " refs/remotes/origin/stable",
+			], [ "origin", "mirror", "mirror/a" ])
+			assert updates == [
+				jk_git.GitRefUpdate(jk_git.GitRefUpdate.KIND_FAST_FORWARD, "refs/remotes/origin/master", h1, h2, "origin"),
+				jk_git.GitRefUpdate(jk_git.GitRefUpdate.KIND_FORCED, "refs/remotes/mirror/a/dev", h1, h2, "mirror/a"),
+				jk_git.GitRefUpdate(jk_git.GitRefUpdate.KIND_NEW, "refs/remotes/mirror/a/new", None, h2, "mirror/a"),
+				jk_git.GitRefUpdate(jk_git.GitRefUpdate.KIND_PRUNED, "refs/remotes/mirror/gone", h1, None, "mirror"),
+				jk_git.GitRefUpdate(jk_git.GitRefUpdate.KIND_TAG, "refs/tags/v1", h1, h2, None),
+				jk_git.GitRefUpdate(jk_git.GitRefUpdate.KIND_REJECTED, "refs/tags/v2", h1, h2, None),
+				jk_git.GitRefUpdate(jk_git.GitRefUpdate.KIND_UP_TO_DATE, "refs/remotes/origin/stable", h2, h2, "origin"),
+			], updates
+			try:
+				_GitOutputParser.parseFetchPorcelainOutput([ "? " + h1 + " " + h2 + " refs/tags/v1" ], [])
+				assert False
+			except Exception as ee:
+				assert "Failed to parse" in str(ee)
+			try:
+				_GitOutputParser.fetchArgs([ "--upload-pack=evil" ], 4, True, False)
+				assert False
+			except Exception as ee:
+				assert "Invalid remote name" in str(ee)
+
+		# an upstream repository, three mirrors of it and a working copy tracking all of them
+		baseDirPath = tempfile.mkdtemp()
+		upstreamDirPath = os.path.join(baseDirPath, "upstream")
+		os.makedirs(upstreamDirPath)
+		git(th, upstreamDirPath, "init", "-q", "-b", "master")
+		git(th, upstreamDirPath, "config", "user.email", "test@example.org")
+		git(th, upstreamDirPath, "config", "user.name", "test")
+		c1 = commit(th, upstreamDirPath, "foo1.txt")
+		git(th, upstreamDirPath, "branch", "doomed")
+		git(th, upstreamDirPath, "branch", "rewritten")
+
+		remoteNames = [ "m1", "m2", "m3" ]
+		for remoteName in remoteNames:
+			git(th, baseDirPath, "clone", "-q", "--bare", upstreamDirPath, os.path.join(baseDirPath, remoteName + ".git"))
+
+		wcDirPath = os.path.join(baseDirPath, "wc")
+		os.makedirs(wcDirPath)
+		git(th, wcDirPath, "init", "-q")
+		for remoteName in remoteNames:
+			git(th, wcDirPath, "remote", "add", remoteName, os.path.join(baseDirPath, remoteName + ".git"))
+		wc = jk_git.GitWorkingCopy(wcDirPath, gitWrapper=th.git)
+		assert wc.remotes == remoteNames
+
+		with log.descend("Initial fetch ...") as log2:
+			invocations = []
+			th.git.instrumentation.addCallback(invocations.append)
+			updates = wc.fetch(jobs=3, log=log2)
+			th.git.instrumentation.removeCallback(invocations.append)
+
+			fetchArgs = [ x.arguments for x in invocations if x.verb == "fetch" ]
+			assert len(fetchArgs) == 1, fetchArgs
+			assert "--multiple" in fetchArgs[0]
+			assert "--jobs=3" in fetchArgs[0]
+			assert "--prune" in fetchArgs[0]
+			assert list(fetchArgs[0][-3:]) == remoteNames
+
+			assert len(updates) == 9, updates
+			for u in updates:
+				assert u.kind == jk_git.GitRefUpdate.KIND_NEW, u
+				assert u.oldHash is None
+				assert u.newHash == c1
+				assert u.remote in remoteNames
+
+			assert wc.fetch() == []
+
+		with log.descend("Fetching changes ...") as log2:
+			c2 = commit(th, upstreamDirPath, "foo2.txt")
+			git(th, upstreamDirPath, "checkout", "-q", "-b", "feature")
+			c3 = commit(th, upstreamDirPath, "foo3.txt")
+			git(th, upstreamDirPath, "tag", "v1.0")
+			git(th, upstreamDirPath, "checkout", "-q", "rewritten")
+			git(th, upstreamDirPath, "commit", "-q", "--amend", "-m", "rewritten")
+			c4 = git(th, upstreamDirPath, "rev-parse", "HEAD")[0]
+			git(th, upstreamDirPath, "checkout", "-q", "master")
+			git(th, upstreamDirPath, "branch", "-D", "doomed")
+
+			# only m1 and m2 mirror the changes
+			for remoteName in [ "m1", "m2" ]:
+				git(th, baseDirPath, "-C", os.path.join(baseDirPath, remoteName + ".git"), "fetch", "-q", "--prune", "--force", upstreamDirPath,
+					"+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*")
+
+			updates = wc.fetch([ "m1", "m2" ])
+			byRef = {}
+			for u in updates:
+				assert u.refName not in byRef
+				byRef[u.refName] = u
+
+			for remoteName in [ "m1", "m2" ]:
+				prefix = "refs/remotes/" + remoteName + "/"
+				assert byRef.pop(prefix + "master") == jk_git.GitRefUpdate(jk_git.GitRefUpdate.KIND_FAST_FORWARD, prefix + "master", c1, c2, remoteName)
+				assert byRef.pop(prefix + "rewritten") == jk_git.GitRefUpdate(jk_git.GitRefUpdate.KIND_FORCED, prefix + "rewritten", c1, c4, remoteName)
+				assert byRef.pop(prefix + "feature") == jk_git.GitRefUpdate(jk_git.GitRefUpdate.KIND_NEW, prefix + "feature", None, c3, remoteName)
+				assert byRef.pop(prefix + "doomed") == jk_git.GitRefUpdate(jk_git.GitRefUpdate.KIND_PRUNED, prefix + "doomed", c1, None, remoteName)
+			u = byRef.pop("refs/tags/v1.0")
+			assert (u.kind, u.oldHash, u.newHash, u.remote) == (jk_git.GitRefUpdate.KIND_NEW, None, c3, None), u
+			assert byRef == {}, byRef
+
+			# m3 is still at the old state
+			assert git(th, wcDirPath, "rev-parse", "refs/remotes/m3/master")[0] == c1
+
+		with log.descend("Fetching without pruning ...") as log2:
+			git(th, baseDirPath, "-C", os.path.join(baseDirPath, "m3.git"), "branch", "-D", "doomed")
+			assert wc.fetch([ "m3" ], bPrune=False) == []
+			assert git(th, wcDirPath, "rev-parse", "refs/remotes/m3/doomed")[0] == c1
+			updates = wc.fetch([ "m3" ], jobs=1)
+			assert [ (u.kind, u.refName) for u in updates ] == [ (jk_git.GitRefUpdate.KIND_PRUNED, "refs/remotes/m3/doomed") ], updates
+
+		with log.descend("Fetching a remote added later ...") as log2:
+			git(th, baseDirPath, "clone", "-q", "--bare", upstreamDirPath, os.path.join(baseDirPath, "m4.git"))
+			git(th, wcDirPath, "remote", "add", "m4", os.path.join(baseDirPath, "m4.git"))
+			updates = wc.fetch()
+			assert sorted([ (u.kind, u.refName, u.remote) for u in updates ]) == [
+				(jk_git.GitRefUpdate.KIND_NEW, "refs/remotes/m4/" + branchName, "m4")
+				for branchName in [ "feature", "master", "rewritten" ]
+			], updates
+
+		with log.descend("Errors ...") as log2:
+			try:
+				wc.fetch([ "m1", "nonexisting" ])
+				assert False
+			except jk_git.GitExecutionException as ee:
+				pass
+			assert th.git.fetch(wcDirPath, []) == []
+			# fast forward or forced update can't be determined
+			try:
+				th.git._GitWrapper__isAncestor(wcDirPath, "1" * 40, c1, None)
+				assert False
+			except jk_git.GitExecutionException as ee:
+				assert ee.returnCode not in (0, 1)
+
+		shutil.rmtree(baseDirPath)
+
+		log.notice("Success.")
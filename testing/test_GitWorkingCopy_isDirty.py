@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+
+
+
+import os
+import asyncio
+import tempfile
+import subprocess
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+def writeFile(filePath:str, text:str):
+	os.makedirs(os.path.dirname(filePath), exist_ok=True)
+	with open(filePath, "w") as f:
+		f.write(text)
+#
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+		th.createRepository(log)
+		root = th.tempDirPath
+		git = th.git
+
+		def check(bExpectedDirty:bool, bExpectedDirtyIgnoringUntracked:bool, bExpectedDirtyIgnoringSubmodules:bool = None):
+			if bExpectedDirtyIgnoringSubmodules is None:
+				bExpectedDirtyIgnoringSubmodules = bExpectedDirty
+			wc = jk_git.GitWorkingCopy(root, gitWrapper=git)
+			assert wc.isDirty == bExpectedDirty
+			assert wc.isClean == (not bExpectedDirty)
+			assert wc.isDirty == (len(wc.status()) > 0)
+			assert wc.checkIsDirty(bIgnoreUntracked=True) == bExpectedDirtyIgnoringUntracked
+			assert wc.checkIsDirty(bIgnoreSubmodules=True) == bExpectedDirtyIgnoringSubmodules
+
+			async def asyncCheck():
+				awc = jk_git.AsyncGitWorkingCopy(root, jk_git.AsyncGitWrapper(log))
+				assert await awc.isDirty() == bExpectedDirty
+				assert await awc.isClean() == (not bExpectedDirty)
+				assert await awc.isDirty(bIgnoreUntracked=True) == bExpectedDirtyIgnoringUntracked
+				assert await awc.isDirty(bIgnoreSubmodules=True) == bExpectedDirtyIgnoringSubmodules
+			asyncio.run(asyncCheck())
+		#
+
+		# no commits yet
+		check(False, False)
+		writeFile(os.path.join(root, "a.txt"), "a\n")
+		check(True, False)
+		git.add(root, os.path.join(root, "a.txt"), log=log)
+		check(True, True)
+		git.commit(root, "initial commit", log=log)
+		check(False, False)
+
+		# unstaged and staged modifications
+		writeFile(os.path.join(root, "a.txt"), "b\n")
+		check(True, True)
+		git.add(root, os.path.join(root, "a.txt"), log=log)
+		check(True, True)
+		git.commit(root, "second commit", log=log)
+		check(False, False)
+
+		# untracked files in a new directory; ignored files
+		writeFile(os.path.join(root, "sub", "dir", "new.txt"), "new\n")
+		check(True, False)
+		writeFile(os.path.join(root, ".git", "info", "exclude"), "sub/\n")
+		check(False, False)
+
+		# deleted file
+		os.unlink(os.path.join(root, "a.txt"))
+		check(True, True)
+		subprocess.run([ git.gitBinPath, "-C", root, "checkout", "--", "a.txt" ], check=True)
+		check(False, False)
+
+		# submodule with a new commit
+		with tempfile.TemporaryDirectory() as subRepoDir:
+			with log.descend("Creating submodule ...") as log2:
+				git.init(subRepoDir, log=log2)
+				writeFile(os.path.join(subRepoDir, "x.txt"), "x\n")
+				git.add(subRepoDir, os.path.join(subRepoDir, "x.txt"), log=log2)
+				git.commit(subRepoDir, "sub commit", log=log2)
+				subprocess.run([ git.gitBinPath, "-C", root, "-c", "protocol.file.allow=always", "submodule", "add", subRepoDir, "module" ],
+					check=True, capture_output=True)
+				git.commit(root, "add submodule", log=log2)
+		check(False, False)
+		writeFile(os.path.join(root, "module", "x.txt"), "modified\n")
+		check(True, True, False)
+
+		log.success("Success.")
+
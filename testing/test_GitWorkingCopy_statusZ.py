@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+
+
+
+import os
+import asyncio
+import subprocess
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+		th.createRepository(log)
+		root = th.tempDirPath
+
+		with log.descend("Preparing working copy ...") as log2:
+			for fileName in [ "keep.txt", "to be renamed.txt", "script.sh", "deleted.txt" ]:
+				with open(os.path.join(root, fileName), "w") as f:
+					f.write(fileName + "\n")
+				th.git.add(root, os.path.join(root, fileName), log=log2)
+			th.git.commit(root, "initial commit", log=log2)
+
+			subprocess.run([ th.git.gitBinPath, "-C", root, "mv", "to be renamed.txt", "renamed \"quoted\".txt" ], check=True)
+			os.chmod(os.path.join(root, "script.sh"), 0o755)
+			os.unlink(os.path.join(root, "deleted.txt"))
+			with open(os.path.join(root, "new file with spaces.txt"), "w") as f:
+				f.write("new\n")
+			with open(os.path.join(root, "äöü\ttab.txt"), "w") as f:
+				f.write("new\n")
+			with open(os.path.join(root, "added.txt"), "w") as f:
+				f.write("added\n")
+			th.git.add(root, os.path.join(root, "added.txt"), log=log2)
+
+		wc = jk_git.GitWorkingCopy(root, gitWrapper=th.git)
+		assert th.git.supportsStatusZ
+		fileInfos = { x.filePath(): x for x in wc.status(log=log) }
+		for x in fileInfos.values():
+			log.notice(repr((x.status(), x.filePath(), x.origFilePath(), x.xy(), x.modes())))
+
+		assert sorted(fileInfos.keys()) == sorted([
+			"renamed \"quoted\".txt", "script.sh", "deleted.txt", "new file with spaces.txt", "äöü\ttab.txt", "added.txt",
+		])
+
+		x = fileInfos["renamed \"quoted\".txt"]
+		assert x.status() == jk_git.GitFileInfo.RENAMED
+		assert x.origFilePath() == "to be renamed.txt"
+		assert x.indexStatus() == "R"
+
+		x = fileInfos["script.sh"]
+		assert x.status() == jk_git.GitFileInfo.MODIFIED
+		assert x.isModeChanged()
+		assert x.modes() == ( "100644", "100644", "100755" )
+		assert x.worktreeStatus() == "M"
+		assert not x.isSubmodule()
+
+		assert fileInfos["deleted.txt"].status() == jk_git.GitFileInfo.DELETED
+		assert not fileInfos["deleted.txt"].isModeChanged()
+		assert fileInfos["added.txt"].status() == jk_git.GitFileInfo.ADDED
+		assert fileInfos["new file with spaces.txt"].status() == jk_git.GitFileInfo.UNVERSIONED
+		assert fileInfos["äöü\ttab.txt"].status() == jk_git.GitFileInfo.UNVERSIONED
+
+		# the asynchronous implementation must produce the same result
+		async def asyncStatus():
+			awc = jk_git.AsyncGitWorkingCopy(root, jk_git.AsyncGitWrapper(log))
+			return await awc.status(log=log)
+		asyncFileInfos = asyncio.run(asyncStatus())
+		assert sorted([ (x.status(), x.filePath(), x.origFilePath(), x.modes()) for x in asyncFileInfos ]) \
+			== sorted([ (x.status(), x.filePath(), x.origFilePath(), x.modes()) for x in fileInfos.values() ])
+
+		log.success("Success.")
+
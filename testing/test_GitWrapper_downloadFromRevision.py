@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+
+
+
+import os
+import time
+import threading
+
+import jk_logging
+
+import jk_git
+import jk_git.impl
+
+from TestHelper import TestHelper
+
+
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+
+		th.createRepository(log)
+
+		filePath = os.path.join(th.tempDirPath, "foo.txt")
+		with open(filePath, "w") as fout:
+			fout.write("abc\ndef\n")
+		th.git.add(th.tempDirPath, filePath, log=log)
+		th.git.commit(th.tempDirPath, "mycommitmsg1", log=log)
+
+		with open(filePath, "w") as fout:
+			fout.write("xyz\n")
+		th.git.add(th.tempDirPath, filePath, log=log)
+		filePath2 = os.path.join(th.tempDirPath, "bar.txt")
+		with open(filePath2, "wb") as fout:
+			fout.write(b"\n\n  a  \r\nb\t\n\n c\n\n\n")
+		th.git.add(th.tempDirPath, filePath2, log=log)
+		th.git.commit(th.tempDirPath, "mycommitmsg2", log=log)
+
+		with log.descend("Downloading files ...") as log2:
+			assert th.git.downloadFromHead(th.tempDirPath, "foo.txt", log=log2) == "xyz"
+			assert th.git.downloadFromRevision(th.tempDirPath, "HEAD~1", "foo.txt", log=log2) == "abc\ndef\n"
+			assert th.git.downloadFromRevision(th.tempDirPath, "HEAD", "does not exist.txt", log=log2) is None
+			assert th.git.downloadFromHead(th.tempDirPath, "does not exist.txt", log=log2) is None
+
+			# downloadFromHead() normalizes the text as it always did; downloadFromRevision() does not
+			assert th.git.downloadFromHead(th.tempDirPath, "bar.txt", log=log2) == "  a\nb\n\n c"
+			assert th.git.downloadFromRevision(th.tempDirPath, "HEAD", "bar.txt", log=log2) == "\n\n  a  \r\nb\t\n\n c\n\n\n"
+
+			wc = jk_git.GitWorkingCopy(th.tempDirPath, log=log2)
+			assert wc.downloadFromHead("foo.txt") == "xyz"
+			assert wc.downloadFromRevision("HEAD~1", "foo.txt") == "abc\ndef\n"
+			assert wc.downloadFromHead("bar.txt") == "  a\nb\n\n c"
+
+		with log.descend("Checking the shared reader ...") as log2:
+			reader = jk_git.impl.GitCatFileBatch("/usr/bin/git", th.tempDirPath, idleTimeout=0.5)
+
+			errors = []
+			def worker():
+				try:
+					for i in range(50):
+						assert reader.readBlob("HEAD", "foo.txt") == b"xyz\n"
+				except Exception as ee:
+					errors.append(ee)
+			threads = [ threading.Thread(target=worker) for i in range(4) ]
+			for t in threads:
+				t.start()
+			for t in threads:
+				t.join()
+			assert not errors
+			assert reader.countStarts == 1
+
+			# the reader must recover if the process has been terminated
+			reader.close()
+			assert not reader.isRunning
+			assert reader.readBlob("HEAD~1", "foo.txt") == b"abc\ndef\n"
+			assert reader.countStarts == 2
+
+			# the reader must terminate the process if idle
+			time.sleep(1.5)
+			assert not reader.isRunning
+			assert reader.readBlob("HEAD", "foo.txt") == b"xyz\n"
+			reader.close()
+
+			# a process restarted right after the idle watcher stopped the previous one must be terminated if idle as well
+			reader = jk_git.impl.GitCatFileBatch("/usr/bin/git", th.tempDirPath, idleTimeout=0.1)
+			idleWatchLoop = reader._GitCatFileBatch__idleWatchLoop
+			def slowIdleWatchLoop():
+				idleWatchLoop()
+				# (the thread is still alive for a moment after it stopped the process)
+				time.sleep(0.5)
+			reader._GitCatFileBatch__idleWatchLoop = slowIdleWatchLoop
+			assert reader.readBlob("HEAD", "foo.txt") == b"xyz\n"
+			while reader.isRunning:
+				time.sleep(0.01)
+			assert reader.readBlob("HEAD", "foo.txt") == b"xyz\n"
+			assert reader.countStarts == 2
+			time.sleep(0.4)
+			assert not reader.isRunning
+			reader.close()
+
+			# a request interrupted while reading a response must not leave the rest of it to the next request
+			reader = jk_git.impl.GitCatFileBatch("/usr/bin/git", th.tempDirPath)
+			def interruptedRequest(objectName:str):
+				p = reader._GitCatFileBatch__process
+				p.stdin.write(objectName.encode("utf-8") + b"\n")
+				p.stdin.flush()
+				p.stdout.readline()
+				p.stdout.read(2)
+				raise KeyboardInterrupt()
+			reader._GitCatFileBatch__request = interruptedRequest
+			try:
+				reader.readBlob("HEAD~1", "foo.txt")
+				assert False
+			except KeyboardInterrupt:
+				pass
+			del reader._GitCatFileBatch__request
+			assert not reader.isRunning
+			assert reader.readBlob("HEAD", "foo.txt") == b"xyz\n"
+			assert reader.readBlob("HEAD~1", "foo.txt") == b"abc\ndef\n"
+			assert reader.countStarts == 2
+			reader.close()
+
+#
+
+
+
+
+
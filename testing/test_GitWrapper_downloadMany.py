@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+
+
+
+import os
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+BINARY_DATA = bytes(range(256)) * 64
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+
+		th.createRepository(log)
+
+		for fileName, data in [
+				("a.txt", b"line1\nline2\n"),
+				("b.bin", BINARY_DATA),
+				("some dir/c d.txt", b"no trailing newline"),
+			]:
+			filePath = os.path.join(th.tempDirPath, fileName)
+			os.makedirs(os.path.dirname(filePath), exist_ok=True)
+			with open(filePath, "wb") as fout:
+				fout.write(data)
+			th.git.add(th.tempDirPath, filePath, log=log)
+		th.git.commit(th.tempDirPath, "mycommitmsg1", log=log)
+
+		with log.descend("Downloading files ...") as log2:
+			ret = th.git.downloadMany(th.tempDirPath, "HEAD", [ "a.txt", "b.bin", "missing.txt", "some dir/c d.txt" ], log=log2)
+			assert ret == {
+				"a.txt": b"line1\nline2\n",
+				"b.bin": BINARY_DATA,
+				"missing.txt": None,
+				"some dir/c d.txt": b"no trailing newline",
+			}
+
+		with log.descend("Downloading files lazily ...") as log2:
+			it = th.git.iterDownloadMany(th.tempDirPath, "HEAD", [ "b.bin" ] * 100, log=log2)
+			filePath, data = next(it)
+			assert filePath == "b.bin"
+			assert data == BINARY_DATA
+			# stop early: the git process must be terminated without blocking
+			it.close()
+
+			assert list(th.git.iterDownloadMany(th.tempDirPath, "HEAD", [], log=log2)) == []
+
+#
+
+
+
+
+
@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+
+
+
+import os
+import stat
+import tempfile
+import threading
+import tracemalloc
+
+import jk_logging
+
+import jk_git
+
+from TestHelper import TestHelper
+
+
+
+
+
+BIG_FILE_SIZE = 8 * 1024 * 1024
+
+BINARY_DATA = bytes(range(256)) * 64
+
+
+
+def readFile(filePath:str) -> bytes:
+	with open(filePath, "rb") as f:
+		return f.read()
+#
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+		th.createRepository(log)
+		root = th.tempDirPath
+		git = th.git
+
+		bigData = os.urandom(BIG_FILE_SIZE)
+		for fileName, data in [
+				("a.txt", b"line1\nline2\n"),
+				("b.bin", BINARY_DATA),
+				("empty.txt", b""),
+				("some dir/c d.txt", b"no trailing newline"),
+				("big.bin", bigData),
+			]:
+			filePath = os.path.join(root, fileName)
+			os.makedirs(os.path.dirname(filePath), exist_ok=True)
+			with open(filePath, "wb") as fout:
+				fout.write(data)
+			git.add(root, filePath, log=log)
+		git.commit(root, "mycommitmsg1", log=log)
+
+		with tempfile.TemporaryDirectory() as destDirPath:
+
+			# single files (shared process)
+			assert git.exportBlob(root, "HEAD", "b.bin", os.path.join(destDirPath, "b.bin"))
+			assert readFile(os.path.join(destDirPath, "b.bin")) == BINARY_DATA
+			assert git.exportBlob(root, "HEAD", "empty.txt", os.path.join(destDirPath, "empty.txt"))
+			assert readFile(os.path.join(destDirPath, "empty.txt")) == b""
+			assert not git.exportBlob(root, "HEAD", "missing.txt", os.path.join(destDirPath, "missing.txt"))
+			assert not os.path.exists(os.path.join(destDirPath, "missing.txt"))
+			try:
+				git.exportBlob(root, "HEAD", "some dir", os.path.join(destDirPath, "some dir"))
+				assert False
+			except Exception as ee:
+				assert "Not a file" in str(ee)
+			# the shared process is still usable
+			assert git.downloadFromHead(root, "a.txt") == "line1\nline2"
+
+			# memory consumption does not depend on the size of the file
+			tracemalloc.start()
+			assert git.exportBlob(root, "HEAD", "big.bin", os.path.join(destDirPath, "big.bin"))
+			_, peak = tracemalloc.get_traced_memory()
+			tracemalloc.stop()
+			assert peak < 1024 * 1024, peak
+			assert readFile(os.path.join(destDirPath, "big.bin")) == bigData
+
+			# multiple files (dedicated process)
+			exportDirPath = os.path.join(destDirPath, "export")
+			tracemalloc.start()
+			ret = git.exportBlobs(root, "HEAD", {
+				fileName: os.path.join(exportDirPath, fileName)
+				for fileName in [ "a.txt", "big.bin", "missing.txt", "some dir/c d.txt", "empty.txt" ]
+			})
+			_, peak = tracemalloc.get_traced_memory()
+			tracemalloc.stop()
+			assert peak < 1024 * 1024, peak
+			assert ret == {
+				"a.txt": True,
+				"big.bin": True,
+				"missing.txt": False,
+				"some dir/c d.txt": True,
+				"empty.txt": True,
+			}
+			assert sorted(os.listdir(exportDirPath)) == [ "a.txt", "big.bin", "empty.txt", "some dir" ]
+			assert readFile(os.path.join(exportDirPath, "big.bin")) == bigData
+			assert readFile(os.path.join(exportDirPath, "some dir", "c d.txt")) == b"no trailing newline"
+
+			ret = git.exportBlobs(root, "HEAD", [ ("a.txt", os.path.join(destDirPath, "x", "y.txt")) ])
+			assert ret == { "a.txt": True }
+			assert readFile(os.path.join(destDirPath, "x", "y.txt")) == b"line1\nline2\n"
+
+			# exported files get the mode of newly created files
+			umask = os.umask(0o022)
+			os.umask(umask)
+			assert stat.S_IMODE(os.stat(os.path.join(destDirPath, "x", "y.txt")).st_mode) == 0o666 & ~umask
+
+			# concurrent exports to the same destination (shared and dedicated process)
+			destFilePath = os.path.join(destDirPath, "concurrent.bin")
+			errors = []
+			def worker(exportFunction):
+				try:
+					for i in range(20):
+						exportFunction()
+				except Exception as ee:
+					errors.append(ee)
+			threads = [
+				threading.Thread(target=worker, args=(lambda: git.exportBlob(root, "HEAD", "big.bin", destFilePath),)),
+				threading.Thread(target=worker, args=(lambda: git.exportBlobs(root, "HEAD", [ ("big.bin", destFilePath) ]),)),
+			]
+			for t in threads:
+				t.start()
+			for t in threads:
+				t.join()
+			assert not errors, errors
+			assert readFile(destFilePath) == bigData
+			assert os.listdir(destDirPath).count("concurrent.bin") == 1
+			assert not [ x for x in os.listdir(destDirPath) if x.endswith(".tmp") ]
+
+		log.notice("Success.")
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+
+
+
+import os
+import time
+import asyncio
+
+import jk_logging
+
+import jk_git
+from jk_git.impl._GitOutputParser import _GitOutputParser
+
+from TestHelper import TestHelper
+
+
+
+
+
+with jk_logging.wrapMain() as log:
+	with TestHelper(log) as th:
+
+		th.createRepository(log)
+		th.createSingleFileAndCommitIt("foo1.txt", "commit 1", log)
+		headHash = th.git.getHeadCommitHash(th.tempDirPath)
+
+		with log.descend("Parsing hosts ...") as log2:
+			assert _GitOutputParser.getHostOfURL("https://Example.org/foo.git") == "example.org"
+			assert _GitOutputParser.getHostOfURL("ssh://git@example.org:2222/foo.git") == "example.org"
+			assert _GitOutputParser.getHostOfURL("git@example.org:foo/bar.git") == "example.org"
+			assert _GitOutputParser.getHostOfURL("/srv/git/foo.git") == ""
+			assert _GitOutputParser.interleaveURLsByHost([ "https://a/1", "https://a/2", "https://a/3", "https://b/1" ]) \
+				== [ "https://a/1", "https://b/1", "https://a/2", "https://a/3" ]
+
+		urls = []
+		for i in range(10):
+			bareDirPath = os.path.join(th.tempDirPath, "bare" + str(i) + ".git")
+			th.git.runGit(cmdArgs=[ "clone", "--bare", "-q", th.tempDirPath, bareDirPath ], workingDirectory=th.tempDirPath, log=log)
+			urls.append(bareDirPath if i % 2 else "file://" + bareDirPath)
+		missingURL = os.path.join(th.tempDirPath, "does-not-exist.git")
+
+		# a remote that never answers: the "ssh" command used by git just sleeps
+		os.environ["GIT_SSH_COMMAND"] = "sh -c 'sleep 30'"
+		slowURL = "ssh://slow.example.org/foo.git"
+
+		with log.descend("Running ls-remote for many URLs ...") as log2:
+			t = time.monotonic()
+			result = th.git.lsRemoteMany(urls + [ missingURL, slowURL ], maxConcurrency=8, maxConcurrencyPerHost=4, timeout=2, log=log2)
+			duration = time.monotonic() - t
+			assert duration < 15, duration
+
+			assert set(result.keys()) == set(urls + [ missingURL, slowURL ])
+			for url in urls:
+				assert [ "HEAD", headHash ] == [ result[url][0][1], result[url][0][0] ], result[url]
+			assert isinstance(result[missingURL], jk_git.GitExecutionException)
+			assert isinstance(result[slowURL], jk_git.GitExecutionException)
+			assert "did not terminate" in str(result[slowURL])
+
+		with log.descend("Running ls-remote for many URLs (asyncio) ...") as log2:
+			asyncGit = jk_git.AsyncGitWrapper(log2)
+			result2 = asyncio.run(asyncGit.lsRemoteMany(urls + [ missingURL, slowURL ], maxConcurrencyPerHost=2, timeout=2, log=log2))
+			for url in urls:
+				assert result2[url] == result[url]
+			assert isinstance(result2[missingURL], jk_git.GitExecutionException)
+			assert isinstance(result2[slowURL], jk_git.GitExecutionException)
+
+		with log.descend("Retrieving head revisions ...") as log2:
+			heads = jk_git.GitRemoteRepository.getHeadRevisionIDs(urls[:3] + [ missingURL ])
+			assert heads[urls[0]] == headHash
+			assert isinstance(heads[missingURL], Exception)
+			assert th.git.lsRemote_url(urls[0])[0] == [ headHash, "HEAD" ]
+
+#
+
+
+
+
+
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+
+#
+# Checks the cost of importing jk_git. Every check runs in a new Python process (using `python -X importtime`).
+#
+
+
+
+import sys
+import types
+import subprocess
+
+import jk_logging
+
+
+
+
+
+# cumulative import time of the package `jk_git` itself (in microseconds; generous to avoid false alarms on slow machines)
+IMPORT_BUDGET_US = 100000
+
+HEAVY_MODULES = [ "jk_utils", "jk_simpleexec", "dateutil", "jk_typing", "jk_prettyprintobj", "jk_version", "jk_logging", "typing" ]
+
+
+
+#
+# Run the specified code and return a dictionary mapping names of imported modules to their cumulative import time.
+#
+def importTimes(code:str) -> dict:
+	stdErr = subprocess.run([ sys.executable, "-X", "importtime", "-c", code ], check=True, stderr=subprocess.PIPE, text=True).stderr
+	ret = {}
+	for line in stdErr.split("\n"):
+		if line.startswith("import time:") and ("cumulative" not in line):
+			_, cumulative, moduleName = line[12:].split("|")
+			ret[moduleName.strip()] = int(cumulative)
+	return ret
+#
+
+
+
+with jk_logging.wrapMain() as log:
+
+	# importing the package itself does not load any dependencies
+	times = importTimes("import jk_git")
+	assert times["jk_git"] <= IMPORT_BUDGET_US, "import jk_git took {:.1f}ms".format(times["jk_git"] / 1000)
+	loaded = [ m for m in HEAVY_MODULES if m in times ]
+	assert not loaded, loaded
+	log.info("import jk_git: {:.1f}ms".format(times["jk_git"] / 1000))
+
+	# only the dependencies needed are loaded
+	times = importTimes("from jk_git import GitCommitHistory")
+	for m in [ "jk_utils", "jk_simpleexec", "dateutil" ]:
+		assert m not in times, m
+	times = importTimes("from jk_git import GitWrapper, GitWorkingCopy")
+	for m in [ "jk_utils", "dateutil" ]:
+		assert m not in times, m
+
+	# ----
+
+	# exported classes are not shadowed by the submodules defining them
+	import jk_git
+	import jk_git.GitWrapper
+	from jk_git.GitWorkingCopy import GitWorkingCopy
+	assert isinstance(jk_git.GitWrapper, type)
+	assert jk_git.GitWorkingCopy is GitWorkingCopy
+	assert isinstance(jk_git.impl.GitCatFileBatch, type)
+	assert isinstance(jk_git.workingcopy, types.ModuleType)
+	assert "GitIndex" in dir(jk_git)
+	try:
+		jk_git.DoesNotExist
+		assert False
+	except AttributeError:
+		pass
+
+	ns = {}
+	exec("from jk_git import *", ns)
+	assert ns["GitRefDatabase"] is jk_git.GitRefDatabase
+
+	log.notice("Success.")